@@ -17,10 +17,14 @@
 from builtins import str
 
 import logging
+import os
 import re
 import shlex
 import shutil
+import stat
+import time
 
+from acts.controllers.adb_lib import protocol
 from acts.controllers.adb_lib.error import AdbCommandError
 from acts.controllers.adb_lib.error import AdbError
 from acts.libs.proc import job
@@ -43,6 +47,16 @@ GREP_REGEX = re.compile('grep(\s+)')
 ROOT_USER_ID = '0'
 SHELL_USER_ID = '2000'
 
+# Runs every adb command with the adb tool.
+SUBPROCESS_BACKEND = 'subprocess'
+# Sends shell, pull and push commands to the adb server directly.
+NATIVE_BACKEND = 'native'
+ADB_BACKENDS = (SUBPROCESS_BACKEND, NATIVE_BACKEND)
+# The adb commands after which adbd restarts, closing its connections.
+ADBD_RESTARTING_COMMANDS = ('root', 'unroot', 'reboot', 'remount',
+                            'disable-verity', 'enable-verity', 'usb', 'tcpip',
+                            'reconnect', 'kill-server')
+
 
 def parsing_parcel_output(output):
     """Parsing the adb output in Parcel format.
@@ -102,6 +116,9 @@ class AdbProxy(object):
         self.adb_str = " ".join(adb_cmd)
         self._ssh_connection = ssh_connection
 
+    def close(self):
+        """Releases the resources of the proxy."""
+
     def get_user_id(self):
         """Returns the adb user. Either 2000 (shell) or 0 (root)."""
         return self.shell('id -u')
@@ -161,6 +178,20 @@ class AdbProxy(object):
         if isinstance(cmd, list):
             cmd = ' '.join(cmd)
         result = job.run(cmd, ignore_status=True, timeout=timeout)
+        return self._get_output(cmd, result, ignore_status)
+
+    def _get_output(self, cmd, result, ignore_status=False):
+        """Returns the output of a completed adb command.
+
+        Args:
+            cmd: The adb command string.
+            result: The job.Result of the command.
+            ignore_status: Whether to return the output of a failed command.
+
+        Raises:
+            AdbError for errors in ADB operations.
+            AdbCommandError for errors from commands executed through ADB.
+        """
         ret, out, err = result.exit_status, result.stdout, result.stderr
 
         if any(pattern.match(err) for pattern in
@@ -290,3 +321,135 @@ class AdbProxy(object):
                           'output: %s' % version_output)
             raise AdbError('adb version', version_output, '', '')
         return int(match.group(1))
+
+
+class NativeAdbProxy(AdbProxy):
+    """An AdbProxy sending shell, pull and push commands to the adb server.
+
+    These commands use the adb server's socket protocol instead of forking
+    the adb tool, and return the same output and raise the same errors.
+    Pulls and pushes of a single file use pooled sync sessions. Devices
+    without the shell protocol, and any other command, use the adb tool.
+
+    Attributes:
+        persistent_shell: Whether shell commands run in pooled interactive
+            shell sessions, rather than in a new shell each.
+    """
+
+    def __init__(self, serial='', ssh_connection=None,
+                 persistent_shell=False):
+        """Construct an instance of NativeAdbProxy.
+
+        Args:
+            serial: str serial number of Android device from `adb devices`
+            ssh_connection: SshConnection instance if the Android device is
+                            connected to a remote host that we can reach via SSH.
+            persistent_shell: Whether to run shell commands in pooled
+                              interactive shell sessions.
+        """
+        super().__init__(serial, ssh_connection=ssh_connection)
+        self.persistent_shell = persistent_shell
+        # Like the adb tool, find the local server on the port set by
+        # ANDROID_ADB_SERVER_PORT, if any.
+        port = self._server_local_port or int(
+            os.environ.get('ANDROID_ADB_SERVER_PORT',
+                           protocol.DEFAULT_ADB_SERVER_PORT))
+        self._client = protocol.AdbServerClient(serial, port=port)
+
+    def close(self):
+        self._client.close_sessions()
+
+    def _exec_adb_cmd(self, name, arg_str, **kwargs):
+        try:
+            return super()._exec_adb_cmd(name, arg_str, **kwargs)
+        finally:
+            if name in ADBD_RESTARTING_COMMANDS:
+                self._client.close_sessions()
+
+    def shell(self, command, ignore_status=False, timeout=DEFAULT_ADB_TIMEOUT):
+        if not self._client.supports_shell_v2():
+            return super().shell(command, ignore_status=ignore_status,
+                                 timeout=timeout)
+        if self.persistent_shell:
+            result = self._client.run_in_session(command, timeout)
+        else:
+            result = self._client.shell(command, timeout)
+        return self._get_output(
+            ' '.join((self.adb_str, 'shell', shlex.quote(command))), result,
+            ignore_status)
+
+    def _get_file_args(self, args):
+        """Returns the (source, destination) of a pull or push command.
+
+        Returns None if the command has options or several sources.
+        """
+        file_args = shlex.split(' '.join(str(arg) for arg in args))
+        if len(file_args) != 2 or any(
+                arg.startswith('-') for arg in file_args):
+            return None
+        return file_args
+
+    def _transfer_output(self, path, action, size, start):
+        """Returns the output of adb pulling or pushing a file."""
+        duration = max(time.time() - start, 1e-6)
+        return ('%s: 1 file %s, 0 skipped. %.1f MB/s (%d bytes in %.3fs)' %
+                (path, action, size / duration / 1e6, size, duration))
+
+    def pull(self, *args, timeout=DEFAULT_ADB_PULL_TIMEOUT, **kwargs):
+        """Runs adb pull, with the sync protocol for a single file.
+
+        Directories and symbolic links, which the adb tool follows, are
+        pulled with the adb tool.
+        """
+        file_args = self._get_file_args(args)
+        if file_args and not kwargs:
+            remote_path, local_path = file_args
+            start = time.time()
+            mode, _, _ = self._client.stat(remote_path, timeout)
+            if mode == 0:
+                raise AdbError(
+                    cmd='pull %s' % remote_path, stdout='',
+                    stderr="adb: error: failed to stat remote object '%s': "
+                    "No such file or directory" % remote_path, ret_code=1)
+            if not stat.S_ISDIR(mode) and not stat.S_ISLNK(mode):
+                size = self._client.pull(remote_path, local_path,
+                                         timeout=timeout)
+                return self._transfer_output(remote_path, 'pulled', size,
+                                             start)
+        return self._exec_adb_cmd('pull', ' '.join(str(arg) for arg in args),
+                                  timeout=timeout, **kwargs)
+
+    def push(self, *args, timeout=DEFAULT_ADB_PULL_TIMEOUT, **kwargs):
+        """Runs adb push, with the sync protocol for a single file."""
+        file_args = self._get_file_args(args)
+        if file_args and not kwargs and os.path.isfile(file_args[0]):
+            local_path, remote_path = file_args
+            start = time.time()
+            size = self._client.push(local_path, remote_path, timeout=timeout)
+            return self._transfer_output(local_path, 'pushed', size, start)
+        return self._exec_adb_cmd('push', ' '.join(str(arg) for arg in args),
+                                  timeout=timeout, **kwargs)
+
+
+def create_proxy(serial='', ssh_connection=None, backend=SUBPROCESS_BACKEND,
+                 persistent_shell=False):
+    """Creates the AdbProxy of a device.
+
+    Args:
+        serial: str serial number of Android device from `adb devices`
+        ssh_connection: SshConnection instance if the Android device is
+                        connected to a remote host that we can reach via SSH.
+        backend: One of ADB_BACKENDS, the way adb commands are sent.
+        persistent_shell: Whether the native backend runs shell commands in
+                          pooled interactive shell sessions.
+
+    Raises:
+        ValueError if the backend is unknown.
+    """
+    if backend == SUBPROCESS_BACKEND:
+        return AdbProxy(serial, ssh_connection=ssh_connection)
+    if backend == NATIVE_BACKEND:
+        return NativeAdbProxy(serial, ssh_connection=ssh_connection,
+                              persistent_shell=persistent_shell)
+    raise ValueError('Unknown adb backend %r, expected one of %s.' %
+                     (backend, ', '.join(ADB_BACKENDS)))
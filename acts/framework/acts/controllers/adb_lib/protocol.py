@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""A client of the adb server's socket protocol.
+
+The adb host tool forwards every command to the adb server, which listens on
+localhost:5037 by default. This client sends the server the same requests
+directly, instead of forking an adb process per command:
+
+    - A request is a string prefixed by its length, as 4 hex digits. The
+      server answers OKAY, or FAIL followed by a length-prefixed message.
+    - host:transport:<serial> connects a socket to a device, after which a
+      single service of the device can be opened on it.
+    - The shell,v2 service sends stdin, stdout, stderr and the exit status as
+      packets of a one byte id and a little-endian 32 bit length.
+    - The sync service transfers files with 8 byte headers of a 4 letter id
+      and a little-endian 32 bit length or value.
+"""
+
+import os
+import re
+import select
+import socket
+import stat
+import struct
+import threading
+import time
+import uuid
+
+from acts.controllers.adb_lib.error import AdbError
+from acts.libs.proc import job
+
+DEFAULT_ADB_SERVER_HOST = '127.0.0.1'
+DEFAULT_ADB_SERVER_PORT = 5037
+# The number of idle sync and shell sessions kept open per device.
+DEFAULT_MAX_IDLE_SESSIONS = 4
+
+SHELL_V2_FEATURE = 'shell_v2'
+SHELL_ID_STDIN = 0
+SHELL_ID_STDOUT = 1
+SHELL_ID_STDERR = 2
+SHELL_ID_EXIT = 3
+# The largest amount of file data sent in one sync DATA message.
+SYNC_DATA_MAX = 64 * 1024
+
+_RECV_SIZE = 64 * 1024
+_SHELL_HEADER = struct.Struct('<BI')
+_SYNC_HEADER = struct.Struct('<4sI')
+_SYNC_STAT = struct.Struct('<4sIII')
+
+
+def _error(cmd, message):
+    """Returns an AdbError like the one of the adb tool failing cmd."""
+    return AdbError(cmd=cmd, stdout='', stderr='error: %s' % message,
+                    ret_code=1)
+
+
+class _ServerConnection(object):
+    """A socket connected to the adb server, with buffered reads.
+
+    Every read and write has to complete before the connection's deadline,
+    or raises socket.timeout.
+    """
+
+    def __init__(self, address, timeout=None):
+        self.deadline = None
+        self.set_timeout(timeout)
+        self._socket = socket.create_connection(address,
+                                                self._remaining_time())
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buffer = bytearray()
+
+    def set_timeout(self, timeout):
+        """Sets the deadline to timeout seconds from now, or None."""
+        self.deadline = None if timeout is None else time.time() + timeout
+
+    def _remaining_time(self):
+        if self.deadline is None:
+            return None
+        remaining = self.deadline - time.time()
+        if remaining <= 0:
+            raise socket.timeout('timed out')
+        return remaining
+
+    def send(self, data):
+        self._socket.settimeout(self._remaining_time())
+        self._socket.sendall(data)
+
+    def recv_exactly(self, size):
+        """Reads size bytes.
+
+        Raises:
+            EOFError if the connection is closed first.
+        """
+        while len(self._buffer) < size:
+            self._socket.settimeout(self._remaining_time())
+            chunk = self._socket.recv(_RECV_SIZE)
+            if not chunk:
+                raise EOFError('The adb server closed the connection.')
+            self._buffer += chunk
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def recv_string(self):
+        """Reads a string prefixed by its length in hex."""
+        return self.recv_exactly(int(self.recv_exactly(4), 16)).decode(
+            errors='replace')
+
+    def request(self, request):
+        """Sends a request, and reads the server's OKAY.
+
+        Raises:
+            AdbError if the server fails the request.
+        """
+        data = request.encode()
+        self.send(b'%04x' % len(data) + data)
+        status = self.recv_exactly(4)
+        if status == b'FAIL':
+            raise _error(request, self.recv_string())
+        if status != b'OKAY':
+            raise _error(request, 'unexpected adb server reply %r' % status)
+
+    def is_stale(self):
+        """Returns whether the connection can no longer be used.
+
+        An idle connection has nothing to read, unless the server closed it.
+        """
+        if self._buffer:
+            return True
+        try:
+            readable, _, _ = select.select([self._socket], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def close(self):
+        self._socket.close()
+
+
+class AdbShellSession(object):
+    """An interactive shell of the device, which runs one command at a time.
+
+    Each command runs in a subshell reading from /dev/null, so it can neither
+    change the directory or variables of later commands, nor read their
+    input. The end of a command's output is found by echoing a marker after
+    it, with the exit status, to stdout and to stderr.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.closed = False
+
+    def run(self, command, timeout=None):
+        """Runs a command in the shell.
+
+        Args:
+            command: The command string.
+            timeout: The seconds to wait for the command to complete.
+
+        Returns:
+            A job.Result of the command.
+
+        Raises:
+            job.TimeoutError if the command doesn't complete in time. The
+                session is closed.
+            AdbError if the shell exits. The session is closed.
+        """
+        marker = ('ACTS_%s' % uuid.uuid4().hex).encode()
+        stdout_end = re.compile(re.escape(marker) + br'(\d+)\n$')
+        stderr_end = marker + b'\n'
+        stdin = ('(%s\n) </dev/null; echo "%s$?"; echo %s >&2\n' %
+                 (command, marker.decode(), marker.decode())).encode()
+        stdout = bytearray()
+        stderr = bytearray()
+        start = time.time()
+        exit_status = None
+        try:
+            self._connection.set_timeout(timeout)
+            self._connection.send(
+                _SHELL_HEADER.pack(SHELL_ID_STDIN, len(stdin)) + stdin)
+            match = None
+            while match is None or not stderr.endswith(stderr_end):
+                packet_id, data = _recv_shell_packet(self._connection)
+                if packet_id == SHELL_ID_STDOUT:
+                    stdout += data
+                    match = stdout_end.search(
+                        stdout, max(len(stdout) - len(marker) - 5, 0))
+                elif packet_id == SHELL_ID_STDERR:
+                    stderr += data
+                elif packet_id == SHELL_ID_EXIT:
+                    raise EOFError('The shell exited.')
+            exit_status = int(match.group(1))
+            del stdout[match.start():]
+            del stderr[-len(stderr_end):]
+        except socket.timeout:
+            self.close()
+            raise job.TimeoutError(
+                job.Result(command, bytes(stdout), bytes(stderr), None,
+                           time.time() - start, did_timeout=True))
+        except (EOFError, OSError) as e:
+            self.close()
+            raise _error('shell %s' % command, e)
+        return job.Result(command, bytes(stdout), bytes(stderr), exit_status,
+                          time.time() - start)
+
+    def is_stale(self):
+        return self.closed or self._connection.is_stale()
+
+    def close(self):
+        self.closed = True
+        self._connection.close()
+
+
+class AdbSyncSession(object):
+    """A connection to the sync service of the device, to transfer files.
+
+    The device ends the sync service after failing a request, so the session
+    is closed by any error.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.closed = False
+
+    def _send(self, sync_id, data=b'', value=None):
+        if value is None:
+            value = len(data)
+        self._connection.send(_SYNC_HEADER.pack(sync_id, value) + data)
+
+    def _recv_header(self):
+        return _SYNC_HEADER.unpack(
+            self._connection.recv_exactly(_SYNC_HEADER.size))
+
+    def _run(self, cmd, timeout, transfer):
+        """Calls transfer(), closing the session if it fails."""
+        try:
+            self._connection.set_timeout(timeout)
+            return transfer()
+        except socket.timeout:
+            self.close()
+            raise job.TimeoutError(
+                job.Result(cmd, did_timeout=True, exit_status=None))
+        except (EOFError, OSError) as e:
+            self.close()
+            raise _error(cmd, e)
+        except BaseException:
+            self.close()
+            raise
+
+    def _raise_failure(self, cmd, length):
+        message = self._connection.recv_exactly(length).decode(
+            errors='replace')
+        raise AdbError(cmd=cmd, stdout='', stderr='adb: error: %s' % message,
+                       ret_code=1)
+
+    def stat(self, path, timeout=None):
+        """Returns the (mode, size, mtime) of a path on the device.
+
+        A path that doesn't exist has a mode of 0.
+        """
+        def transfer():
+            self._send(b'STAT', path.encode())
+            _, mode, size, mtime = _SYNC_STAT.unpack(
+                self._connection.recv_exactly(_SYNC_STAT.size))
+            return mode, size, mtime
+
+        return self._run('stat %s' % path, timeout, transfer)
+
+    def pull(self, remote_path, local_path, timeout=None):
+        """Copies a file of the device to the host.
+
+        Returns:
+            The number of bytes copied.
+        """
+        cmd = 'pull %s %s' % (remote_path, local_path)
+
+        def transfer():
+            size = 0
+            try:
+                with open(local_path, 'wb') as f:
+                    self._send(b'RECV', remote_path.encode())
+                    while True:
+                        sync_id, length = self._recv_header()
+                        if sync_id == b'DONE':
+                            return size
+                        if sync_id != b'DATA':
+                            self._raise_failure(cmd, length)
+                        f.write(self._connection.recv_exactly(length))
+                        size += length
+            except BaseException:
+                if os.path.exists(local_path):
+                    os.remove(local_path)
+                raise
+
+        return self._run(cmd, timeout, transfer)
+
+    def push(self, local_path, remote_path, timeout=None):
+        """Copies a file of the host to the device, with the same mode.
+
+        Returns:
+            The number of bytes copied.
+        """
+        cmd = 'push %s %s' % (local_path, remote_path)
+
+        def transfer():
+            size = 0
+            with open(local_path, 'rb') as f:
+                file_stat = os.fstat(f.fileno())
+                self._send(b'SEND', ('%s,%d' % (remote_path,
+                                                file_stat.st_mode)).encode())
+                for data in iter(lambda: f.read(SYNC_DATA_MAX), b''):
+                    self._send(b'DATA', data)
+                    size += len(data)
+            self._send(b'DONE', value=int(file_stat.st_mtime))
+            sync_id, length = self._recv_header()
+            if sync_id != b'OKAY':
+                self._raise_failure(cmd, length)
+            return size
+
+        return self._run(cmd, timeout, transfer)
+
+    def is_stale(self):
+        return self.closed or self._connection.is_stale()
+
+    def close(self):
+        self.closed = True
+        self._connection.close()
+
+
+def _recv_shell_packet(connection):
+    packet_id, length = _SHELL_HEADER.unpack(
+        connection.recv_exactly(_SHELL_HEADER.size))
+    return packet_id, connection.recv_exactly(length)
+
+
+class _SessionPool(object):
+    """Idle sessions of one kind, kept open for reuse."""
+
+    def __init__(self, max_idle):
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Returns an idle session that can still be used, or None."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                session = self._idle.pop()
+            if not session.is_stale():
+                return session
+            session.close()
+
+    def put(self, session):
+        with self._lock:
+            if not session.closed and len(self._idle) < self.max_idle:
+                self._idle.append(session)
+                return
+        session.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
+
+class AdbServerClient(object):
+    """Runs commands on a device through the adb server.
+
+    The adb server closes a connection once the device service opened on it
+    ends, so each shell command uses a new connection. Sync sessions and
+    interactive shell sessions stay open between requests instead, and idle
+    ones are pooled so that concurrent callers each get their own.
+
+    Attributes:
+        serial: The serial of the device, or '' for the only device.
+        address: The (host, port) of the adb server.
+    """
+
+    def __init__(self,
+                 serial='',
+                 host=DEFAULT_ADB_SERVER_HOST,
+                 port=DEFAULT_ADB_SERVER_PORT,
+                 max_idle_sessions=DEFAULT_MAX_IDLE_SESSIONS):
+        self.serial = serial
+        self.address = (host, port)
+        self._features = None
+        self._shell_sessions = _SessionPool(max_idle_sessions)
+        self._sync_sessions = _SessionPool(max_idle_sessions)
+
+    def _connect(self, request, timeout):
+        try:
+            return _ServerConnection(self.address, timeout)
+        except socket.timeout:
+            raise job.TimeoutError(job.Result(request, did_timeout=True))
+        except OSError as e:
+            raise _error(request, 'cannot connect to adb server at %s:%d: %s'
+                         % (self.address + (e, )))
+
+    def _request(self, connection, request):
+        try:
+            connection.request(request)
+        except socket.timeout:
+            connection.close()
+            raise job.TimeoutError(job.Result(request, did_timeout=True))
+        except (EOFError, OSError) as e:
+            connection.close()
+            raise _error(request, e)
+        except AdbError:
+            connection.close()
+            raise
+
+    def host_request(self, request, timeout=None):
+        """Sends a request to the adb server, and returns its reply string."""
+        connection = self._connect(request, timeout)
+        try:
+            self._request(connection, request)
+            return connection.recv_string()
+        except socket.timeout:
+            raise job.TimeoutError(job.Result(request, did_timeout=True))
+        except (EOFError, OSError) as e:
+            raise _error(request, e)
+        finally:
+            connection.close()
+
+    def open_service(self, service, timeout=None):
+        """Opens a service of the device on a new connection.
+
+        Returns:
+            The _ServerConnection to the service.
+        """
+        transport = ('host:transport:%s' % self.serial
+                     if self.serial else 'host:transport-any')
+        connection = self._connect(service, timeout)
+        self._request(connection, transport)
+        self._request(connection, service)
+        return connection
+
+    def features(self):
+        """Returns the set of adb features supported by the device."""
+        if self._features is None:
+            prefix = ('host-serial:%s:' % self.serial
+                      if self.serial else 'host:')
+            self._features = set(
+                self.host_request(prefix + 'features').split(','))
+        return self._features
+
+    def supports_shell_v2(self):
+        return SHELL_V2_FEATURE in self.features()
+
+    def shell(self, command, timeout=None):
+        """Runs a command with the shell protocol, on a new connection.
+
+        Returns:
+            A job.Result of the command.
+
+        Raises:
+            job.TimeoutError if the command doesn't complete in time.
+            AdbError if adb fails to run the command.
+        """
+        start = time.time()
+        connection = self.open_service('shell,v2,raw:%s' % command, timeout)
+        stdout = bytearray()
+        stderr = bytearray()
+        try:
+            while True:
+                packet_id, data = _recv_shell_packet(connection)
+                if packet_id == SHELL_ID_STDOUT:
+                    stdout += data
+                elif packet_id == SHELL_ID_STDERR:
+                    stderr += data
+                elif packet_id == SHELL_ID_EXIT:
+                    break
+        except socket.timeout:
+            raise job.TimeoutError(
+                job.Result(command, bytes(stdout), bytes(stderr), None,
+                           time.time() - start, did_timeout=True))
+        except (EOFError, OSError) as e:
+            raise _error('shell %s' % command, e)
+        finally:
+            connection.close()
+        return job.Result(command, bytes(stdout), bytes(stderr), data[0],
+                          time.time() - start)
+
+    def run_in_session(self, command, timeout=None):
+        """Runs a command in a pooled interactive shell session.
+
+        Returns:
+            A job.Result of the command.
+
+        Raises:
+            job.TimeoutError if the command doesn't complete in time.
+            AdbError if adb fails to run the command.
+        """
+        session = self._shell_sessions.get()
+        if session is None:
+            session = AdbShellSession(
+                self.open_service('shell,v2,raw:', timeout))
+        try:
+            return session.run(command, timeout)
+        finally:
+            self._shell_sessions.put(session)
+
+    def _run_sync(self, timeout, function, *args):
+        session = self._sync_sessions.get()
+        if session is None:
+            session = AdbSyncSession(self.open_service('sync:', timeout))
+        try:
+            return function(session, *args, timeout=timeout)
+        finally:
+            self._sync_sessions.put(session)
+
+    def stat(self, path, timeout=None):
+        """Returns the (mode, size, mtime) of a path on the device."""
+        return self._run_sync(timeout, AdbSyncSession.stat, path)
+
+    def pull(self, remote_path, local_path, timeout=None):
+        """Copies a file of the device to the host.
+
+        If local_path is a directory, the file is copied into it.
+
+        Returns:
+            The number of bytes copied.
+        """
+        if os.path.isdir(local_path):
+            local_path = os.path.join(local_path,
+                                      os.path.basename(remote_path))
+        return self._run_sync(timeout, AdbSyncSession.pull, remote_path,
+                              local_path)
+
+    def push(self, local_path, remote_path, timeout=None):
+        """Copies a file of the host to the device.
+
+        If remote_path is a directory, the file is copied into it.
+
+        Returns:
+            The number of bytes copied.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        if stat.S_ISDIR(self.stat(remote_path, timeout)[0]):
+            remote_path = '%s/%s' % (remote_path.rstrip('/'),
+                                     os.path.basename(local_path))
+        if deadline is not None:
+            timeout = max(deadline - time.time(), 0)
+        return self._run_sync(timeout, AdbSyncSession.push, local_path,
+                              remote_path)
+
+    def close_sessions(self):
+        """Closes the idle sessions, e.g. once adbd restarts."""
+        self._shell_sessions.close()
+        self._sync_sessions.close()
@@ -15,10 +15,12 @@
 #   limitations under the License.
 
 import collections
+import itertools
 import logging
 import math
 import os
 import re
+import shlex
 import socket
 import time
 from builtins import open
@@ -35,11 +37,14 @@ from acts.controllers import fastboot
 from acts.controllers.android_lib import errors
 from acts.controllers.android_lib import events as android_events
 from acts.controllers.android_lib import logcat
+from acts.controllers.android_lib import logcat_index
 from acts.controllers.android_lib import services
+from acts.controllers.sl4a_lib import event_dispatcher
 from acts.controllers.sl4a_lib import sl4a_manager
 from acts.controllers.utils_lib.ssh import connection
 from acts.controllers.utils_lib.ssh import settings
 from acts.event import event_bus
+from acts.libs.logging import logline_timestamp
 from acts.libs.proc import job
 from acts.metrics.loggers.usage_metadata_logger import record_api_usage
 
@@ -51,8 +56,12 @@ ANDROID_DEVICE_PICK_ALL_TOKEN = "*"
 ANDROID_DEVICE_SL4A_CLIENT_PORT_KEY = "sl4a_client_port"
 ANDROID_DEVICE_SL4A_FORWARDED_PORT_KEY = "sl4a_forwarded_port"
 ANDROID_DEVICE_SL4A_SERVER_PORT_KEY = "sl4a_server_port"
+ANDROID_DEVICE_SL4A_EVENT_DRAIN_SIZE_KEY = "sl4a_event_drain_size"
 # Key name for adb logcat extra params in config file.
 ANDROID_DEVICE_ADB_LOGCAT_PARAM_KEY = "adb_logcat_param"
+# Key names for the way adb commands are sent, see adb.create_proxy.
+ANDROID_DEVICE_ADB_BACKEND_KEY = "adb_backend"
+ANDROID_DEVICE_ADB_PERSISTENT_SHELL_KEY = "adb_persistent_shell"
 ANDROID_DEVICE_EMPTY_CONFIG_MSG = "Configuration is empty, abort!"
 ANDROID_DEVICE_NOT_LIST_CONFIG_MSG = "Configuration should be a list, abort!"
 CRASH_REPORT_PATHS = ("/data/tombstones/", "/data/vendor/ramdump/",
@@ -68,11 +77,15 @@ PORT_RETRY_COUNT = 3
 ADB_ROOT_RETRY_COUNT = 2
 ADB_ROOT_RETRY_INTERVAL = 10
 IPERF_TIMEOUT = 60
+# The number of logcat lines whose timestamps are parsed at once.
+LOGCAT_PARSE_BLOCK_SIZE = 4096
 SL4A_APK_NAME = "com.googlecode.android_scripting"
 WAIT_FOR_DEVICE_TIMEOUT = 180
 ENCRYPTION_WINDOW = "CryptKeeper"
 DEFAULT_DEVICE_PASSWORD = "1111"
 RELEASE_ID_REGEXES = [re.compile(r'\w+\.\d+\.\d+'), re.compile(r'N\w+')]
+# Matches the "[name]: [value]" lines of getprop. Values may span lines.
+GETPROP_REGEX = re.compile(r'^\[([^\]]+)\]: \[(.*?)\]$', re.M | re.S)
 
 
 def create(configs):
@@ -179,6 +192,12 @@ def _parse_device_list(device_list_str, key):
     return re.findall(r"(\S+)\t%s" % key, device_list_str)
 
 
+def _parse_getprop_output(output):
+    """Parses the output of getprop into a dict of property names to values.
+    """
+    return dict(GETPROP_REGEX.findall(output))
+
+
 def list_adb_devices():
     """List all android devices connected to the computer that are detected by
     adb.
@@ -261,16 +280,37 @@ def get_instances_with_configs(configs):
                 raise errors.AndroidDeviceConfigError(
                     "'%s' is not a valid number for config %s" %
                     (ANDROID_DEVICE_SL4A_FORWARDED_PORT_KEY, c))
+        event_drain_size = event_dispatcher.DEFAULT_DRAIN_SIZE
+        if ANDROID_DEVICE_SL4A_EVENT_DRAIN_SIZE_KEY in c:
+            try:
+                event_drain_size = int(
+                    c.pop(ANDROID_DEVICE_SL4A_EVENT_DRAIN_SIZE_KEY))
+            except ValueError:
+                raise errors.AndroidDeviceConfigError(
+                    "'%s' is not a valid number for config %s" %
+                    (ANDROID_DEVICE_SL4A_EVENT_DRAIN_SIZE_KEY, c))
         ssh_config = c.pop('ssh_config', None)
         ssh_connection = None
         if ssh_config is not None:
             ssh_settings = settings.from_config(ssh_config)
             ssh_connection = connection.SshConnection(ssh_settings)
+        adb_backend = c.pop(ANDROID_DEVICE_ADB_BACKEND_KEY,
+                            adb.SUBPROCESS_BACKEND)
+        if adb_backend not in adb.ADB_BACKENDS:
+            raise errors.AndroidDeviceConfigError(
+                "'%s' is not a valid %s for config %s, expected one of %s" %
+                (adb_backend, ANDROID_DEVICE_ADB_BACKEND_KEY, c,
+                 ', '.join(adb.ADB_BACKENDS)))
+        adb_persistent_shell = bool(
+            c.pop(ANDROID_DEVICE_ADB_PERSISTENT_SHELL_KEY, False))
         ad = AndroidDevice(serial,
                            ssh_connection=ssh_connection,
                            client_port=client_port,
                            forwarded_port=forwarded_port,
-                           server_port=server_port)
+                           server_port=server_port,
+                           adb_backend=adb_backend,
+                           adb_persistent_shell=adb_persistent_shell,
+                           event_drain_size=event_drain_size)
         ad.load_config(c)
         results.append(ad)
     return results
@@ -394,6 +434,9 @@ class AndroidDevice:
         forwarded_port: Preferred server port number forwarded from Android
                         to the host PC via adb for SL4A connections
         server_port: Preferred server port used by SL4A on Android device
+        event_drain_size: The number of pending SL4A events drained per
+                          eventPoll by the event dispatchers. 0 disables
+                          draining.
 
     """
 
@@ -402,7 +445,10 @@ class AndroidDevice:
                  ssh_connection=None,
                  client_port=0,
                  forwarded_port=0,
-                 server_port=None):
+                 server_port=None,
+                 adb_backend=adb.SUBPROCESS_BACKEND,
+                 adb_persistent_shell=False,
+                 event_drain_size=event_dispatcher.DEFAULT_DRAIN_SIZE):
         self.serial = serial
         # logging.log_path only exists when this is used in an ACTS test run.
         log_path_base = getattr(logging, 'log_path', '/tmp/logs')
@@ -411,6 +457,7 @@ class AndroidDevice:
         self.client_port = client_port
         self.forwarded_port = forwarded_port
         self.server_port = server_port
+        self.event_drain_size = event_drain_size
         self.log = tracelogger.TraceLogger(
             AndroidDeviceLoggerAdapter(logging.getLogger(),
                                        {'serial': serial}))
@@ -419,7 +466,13 @@ class AndroidDevice:
         self.register_service(services.AdbLogcatService(self))
         self.register_service(services.Sl4aService(self))
         self.adb_logcat_process = None
-        self.adb = adb.AdbProxy(serial, ssh_connection=ssh_connection)
+        # Snapshot of the read-only system properties, see get_properties.
+        self._properties = None
+        self._properties_pinned = False
+        self.adb = adb.create_proxy(serial,
+                                    ssh_connection=ssh_connection,
+                                    backend=adb_backend,
+                                    persistent_shell=adb_persistent_shell)
         self.fastboot = fastboot.FastbootProxy(serial,
                                                ssh_connection=ssh_connection)
         if not self.is_bootloader:
@@ -432,7 +485,6 @@ class AndroidDevice:
         self.last_logcat_timestamp = None
         # Device info cache.
         self._user_added_device_info = {}
-        self._sdk_api_level = None
 
     def clean_up(self):
         """Cleans up the AndroidDevice object and releases any resources it
@@ -442,6 +494,7 @@ class AndroidDevice:
         for service in self._services:
             service.unregister()
         self._services.clear()
+        self.adb.close()
         if self._ssh_connection:
             self._ssh_connection.close()
 
@@ -495,8 +548,9 @@ class AndroidDevice:
                            "info.")
             return
 
-        build_id = self.adb.getprop("ro.build.id")
-        incremental_build_id = self.adb.getprop("ro.build.version.incremental")
+        build_id = self.get_property("ro.build.id")
+        incremental_build_id = self.get_property(
+            "ro.build.version.incremental")
         valid_build_id = False
         for regex in RELEASE_ID_REGEXES:
             if re.match(regex, build_id):
@@ -508,7 +562,7 @@ class AndroidDevice:
         info = {
             "build_id": build_id,
             "incremental_build_id": incremental_build_id,
-            "build_type": self.adb.getprop("ro.build.type")
+            "build_type": self.get_property("ro.build.type")
         }
         return info
 
@@ -529,21 +583,69 @@ class AndroidDevice:
         return info
 
     def sdk_api_level(self):
-        if self._sdk_api_level is not None:
-            return self._sdk_api_level
         if self.is_bootloader:
             self.log.error(
                 'Device is in fastboot mode. Cannot get build info.')
             return
-        self._sdk_api_level = int(
-            self.adb.shell('getprop ro.build.version.sdk'))
-        return self._sdk_api_level
+        return int(self.get_property('ro.build.version.sdk'))
+
+    def get_properties(self, refresh=False):
+        """Returns a snapshot of the system properties of the device.
+
+        All the properties are read with a single getprop, when the snapshot
+        is first needed. The snapshot is kept until the device reboots, is
+        rooted, or is flashed, as seen by reboot(), root_adb() and
+        wait_for_boot_completion(), unless it is pinned. It is also dropped,
+        even if pinned, whenever is_bootloader finds the device in bootloader
+        mode, where it may be flashed.
+
+        Only read-only properties should be looked up in the snapshot. Other
+        properties may change at any time, use adb.getprop() for them.
+
+        Args:
+            refresh: Whether to read the properties again, even if the
+                snapshot is pinned.
+
+        Returns:
+            A dict of property names to values.
+        """
+        if refresh or self._properties is None:
+            self._properties = _parse_getprop_output(self.adb.shell('getprop'))
+        return self._properties
+
+    def get_property(self, name):
+        """Returns the value of a property in the snapshot of properties.
+
+        Like getprop, returns an empty string for a missing property.
+        """
+        return self.get_properties().get(name, '')
+
+    def invalidate_properties(self):
+        """Drops the snapshot of properties, unless it is pinned.
+
+        Call this after changing the build of the device by other means than
+        this class, e.g. flashing it from the bootloader.
+        """
+        if not self._properties_pinned:
+            self._properties = None
+
+    def pin_properties(self, pinned=True):
+        """Keeps the snapshot of properties through reboots, or stops to.
+
+        Useful when a test reboots the device many times without changing its
+        build. A pinned snapshot can still be refreshed explicitly.
+        """
+        self._properties_pinned = pinned
 
     @property
     def is_bootloader(self):
         """True if the device is in bootloader mode.
         """
-        return self.serial in list_fastboot_devices()
+        if self.serial not in list_fastboot_devices():
+            return False
+        # The device may be flashed before it boots again.
+        self._properties = None
+        return True
 
     @property
     def is_adb_root(self):
@@ -570,16 +672,16 @@ class AndroidDevice:
                 if len(tokens) > 1:
                     return tokens[1].lower()
             return None
-        model = self.adb.getprop("ro.build.product").lower()
+        model = self.get_property("ro.build.product").lower()
         if model == "sprout":
             return model
         else:
-            return self.adb.getprop("ro.product.name").lower()
+            return self.get_property("ro.product.name").lower()
 
     @property
     def flavor(self):
         """Returns the specific flavor of Android build the device is using."""
-        return self.adb.getprop("ro.build.flavor").lower()
+        return self.get_property("ro.build.flavor").lower()
 
     @property
     def droid(self):
@@ -630,7 +732,7 @@ class AndroidDevice:
         return context.get_current_context().get_full_output_path(self.serial)
 
     def update_sdk_api_level(self):
-        self._sdk_api_level = None
+        self.get_properties(refresh=True)
         self.sdk_api_level()
 
     def load_config(self, config):
@@ -661,6 +763,7 @@ class AndroidDevice:
         if self.is_adb_root:
             return
 
+        self.invalidate_properties()
         for attempt in range(ADB_ROOT_RETRY_COUNT):
             try:
                 self.log.debug('Enabling ADB root mode: attempt %d.' % attempt)
@@ -703,7 +806,8 @@ class AndroidDevice:
         session = self._sl4a_manager.create_session(
             client_port=self.client_port,
             forwarded_port=self.forwarded_port,
-            server_port=self.server_port)
+            server_port=self.server_port,
+            event_drain_size=self.event_drain_size)
         droid = session.rpc_client
         if handle_event:
             ed = session.get_event_dispatcher()
@@ -794,25 +898,27 @@ class AndroidDevice:
         tag_len = utils.MAX_FILENAME_LEN - len(out_name)
         out_name = '%s,%s' % (tag[:tag_len], out_name)
         adb_excerpt_path = os.path.join(adb_excerpt_dir, out_name)
+        # Only the parts of the logcat file in the time window are read if
+        # the file is indexed.
+        ranges = logcat_index.find_byte_ranges(logcat_path, begin_time,
+                                               end_time)
+        begin_key = logline_timestamp.to_key(log_begin_time)
+        end_key = logline_timestamp.to_key(log_end_time)
+        lines = logcat_index.read_lines(logcat_path, ranges)
         with open(adb_excerpt_path, 'w', encoding='utf-8') as out:
-            in_file = logcat_path
-            with open(in_file, 'r', encoding='utf-8', errors='replace') as f:
-                while True:
-                    line = None
-                    try:
-                        line = f.readline()
-                        if not line:
-                            break
-                    except:
-                        continue
-                    line_time = line[:acts_logger.log_line_timestamp_len]
-                    if not acts_logger.is_valid_logline_timestamp(line_time):
-                        continue
-                    if self._is_timestamp_in_range(line_time, log_begin_time,
-                                                   log_end_time):
-                        if not line.endswith('\n'):
-                            line += '\n'
-                        out.write(line)
+            while True:
+                # The timestamps are parsed a block of lines at a time.
+                block = list(itertools.islice(lines, LOGCAT_PARSE_BLOCK_SIZE))
+                if not block:
+                    break
+                keys = logline_timestamp.parse_block(block)
+                in_range = ((keys != logline_timestamp.INVALID_KEY)
+                            & (keys >= begin_key) & (keys <= end_key))
+                for index in in_range.nonzero()[0]:
+                    line = block[index]
+                    if not line.endswith('\n'):
+                        line += '\n'
+                    out.write(line)
         return adb_excerpt_path
 
     def search_logcat(self,
@@ -853,32 +959,46 @@ class AndroidDevice:
         if not os.path.exists(logcat_path):
             self.log.warning("Logcat file %s does not exist." % logcat_path)
             return
-        output = job.run("grep '%s' %s" % (matching_string, logcat_path),
-                         ignore_status=True)
+        ranges = None
+        if begin_time or end_time:
+            # Only the parts of the logcat file in the time window are
+            # searched if the file is indexed.
+            ranges = logcat_index.find_byte_ranges(logcat_path,
+                                                   begin_time or None,
+                                                   end_time or None)
+        if ranges is None:
+            command = 'grep %s %s' % (shlex.quote(matching_string),
+                                      shlex.quote(logcat_path))
+        else:
+            command = logcat_index.create_search_command(
+                matching_string, logcat_path, ranges)
+        output = job.run(command, ignore_status=True)
         if not output.stdout or output.exit_status != 0:
             return []
+        begin_key = None
         if begin_time:
-            if not isinstance(begin_time, datetime):
-                log_begin_time = acts_logger.epoch_to_log_line_timestamp(
-                    begin_time)
-                begin_time = datetime.strptime(log_begin_time,
-                                               "%Y-%m-%d %H:%M:%S.%f")
+            if isinstance(begin_time, datetime):
+                begin_key = logline_timestamp.datetime_to_key(begin_time)
+            else:
+                begin_key = logline_timestamp.to_key(
+                    acts_logger.epoch_to_log_line_timestamp(begin_time))
+        end_key = None
         if end_time:
-            if not isinstance(end_time, datetime):
-                log_end_time = acts_logger.epoch_to_log_line_timestamp(
-                    end_time)
-                end_time = datetime.strptime(log_end_time,
-                                             "%Y-%m-%d %H:%M:%S.%f")
+            if isinstance(end_time, datetime):
+                end_key = logline_timestamp.datetime_to_key(end_time)
+            else:
+                end_key = logline_timestamp.to_key(
+                    acts_logger.epoch_to_log_line_timestamp(end_time))
         result = []
         logs = re.findall(r'(\S+\s\S+)(.*)', output.stdout)
         for log in logs:
             time_stamp = log[0]
-            time_obj = datetime.strptime(time_stamp, "%Y-%m-%d %H:%M:%S.%f")
+            key = logline_timestamp.to_key(time_stamp)
 
-            if begin_time and time_obj < begin_time:
+            if begin_key is not None and key < begin_key:
                 continue
 
-            if end_time and time_obj > end_time:
+            if end_key is not None and key > end_key:
                 continue
 
             res = re.findall(r'.*\[(\d+)\]', log[1])
@@ -890,7 +1010,7 @@ class AndroidDevice:
             result.append({
                 "log_message": "".join(log),
                 "time_stamp": time_stamp,
-                "datetime_obj": time_obj,
+                "datetime_obj": logline_timestamp.key_to_datetime(key),
                 "message_id": message_id
             })
         return result
@@ -1217,11 +1337,21 @@ class AndroidDevice:
                 timeout=PULL_TIMEOUT,
                 ignore_status=True)
 
-    def start_new_session(self, max_connections=None, server_port=None):
+    def start_new_session(self,
+                          max_connections=None,
+                          server_port=None,
+                          pipelined=False):
         """Start a new session in sl4a.
 
         Also caches the droid in a dict with its uid being the key.
 
+        Args:
+            max_connections: The max number of client connections for the
+                session.
+            server_port: The SL4A server port on the device.
+            pipelined: If True, the RPCs of the returned droid are multiplexed
+                over a single connection. See rpc_client.RpcPipeline.
+
         Returns:
             An Android object used to communicate with sl4a on the android
                 device.
@@ -1231,7 +1361,10 @@ class AndroidDevice:
             existing uid to a new session.
         """
         session = self._sl4a_manager.create_session(
-            max_connections=max_connections, server_port=server_port)
+            max_connections=max_connections,
+            server_port=server_port,
+            pipelined=pipelined,
+            event_drain_size=self.event_drain_size)
 
         self._sl4a_manager.sessions[session.uid] = session
         return session.rpc_client
@@ -1316,6 +1449,7 @@ class AndroidDevice:
             15 minutes.
         """
         timeout_start = time.time()
+        self.invalidate_properties()
 
         self.log.debug("ADB waiting for device")
         self.adb.wait_for_device(timeout=timeout)
@@ -1353,6 +1487,7 @@ class AndroidDevice:
             wait_after_reboot_complete: time in seconds to wait after the boot
                 completion.
         """
+        self.invalidate_properties()
         if self.is_bootloader:
             self.fastboot.reboot()
             return
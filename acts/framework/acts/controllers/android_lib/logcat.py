@@ -17,11 +17,15 @@
 import logging
 import re
 
+from acts import logger as acts_logger
+from acts.controllers.android_lib.logcat_index import LogcatIndexHandler
 from acts.libs.proc.process import Process
 from acts.libs.logging import log_stream
+from acts.libs.logging import logline_timestamp
 from acts.libs.logging.log_stream import LogStyles
 
 TIMESTAMP_REGEX = r'((?:\d+-)?\d+-\d+ \d+:\d+:\d+.\d+)'
+_TIMESTAMP_PATTERN = re.compile(TIMESTAMP_REGEX)
 
 
 class TimestampTracker(object):
@@ -35,10 +39,16 @@ class TimestampTracker(object):
         return self._last_timestamp
 
     def read_output(self, message):
-        """Reads the message and parses all timestamps from it."""
-        all_timestamps = re.findall(TIMESTAMP_REGEX, message)
-        if len(all_timestamps) > 0:
-            self._last_timestamp = all_timestamps[0]
+        """Reads the message and keeps the first timestamp found in it."""
+        # Lines output with '-v year' start with their timestamp.
+        timestamp = message[:logline_timestamp.LOGLINE_TIMESTAMP_LEN]
+        if (acts_logger.is_valid_logline_timestamp(timestamp)
+                and not message[len(timestamp):len(timestamp) + 1].isdigit()):
+            self._last_timestamp = timestamp
+            return
+        match = _TIMESTAMP_PATTERN.search(message)
+        if match:
+            self._last_timestamp = match.group(1)
 
 
 def _get_log_level(message):
@@ -82,6 +92,9 @@ def _on_retry(serial, extra_params, timestamp_tracker):
 def create_logcat_keepalive_process(serial, logcat_dir, extra_params=''):
     """Creates a Logcat Process that automatically attempts to reconnect.
 
+    The logcat files are indexed by time while they are written. See
+    acts.controllers.android_lib.logcat_index.
+
     Args:
         serial: The serial of the device to read the logcat of.
         logcat_dir: The directory used for logcat file output.
@@ -93,6 +106,7 @@ def create_logcat_keepalive_process(serial, logcat_dir, extra_params=''):
     logger = log_stream.create_logger(
         'adblog_%s' % serial, log_name=serial, subcontext=logcat_dir,
         log_styles=(LogStyles.LOG_DEBUG | LogStyles.TESTCASE_LOG))
+    logger.addHandler(LogcatIndexHandler(logger))
     process = Process('adb -s %s logcat -T 1 -v year %s' %
                       (serial, extra_params))
     timestamp_tracker = TimestampTracker()
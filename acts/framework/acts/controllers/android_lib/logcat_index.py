@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""A sidecar index mapping the timestamps of a logcat file to byte offsets.
+
+The index of a logcat file is stored next to it, at the logcat path plus
+INDEX_SUFFIX. Each of its lines describes one block of the logcat file:
+
+    <start offset>\t<end offset>\t<min timestamp>\t<max timestamp>
+
+The block spans the bytes [start offset, end offset). The timestamps are the
+lowest and highest logline timestamps of the block's lines, or '-' if none of
+its lines has one. As logline timestamps have a fixed width, they are ordered
+like the strings they are.
+
+Lines in a time window are then found by reading only the blocks whose
+timestamps overlap with it, instead of the whole file. Bytes not covered by
+the index, such as the tail written after the last block, are always read.
+"""
+
+import datetime
+import logging
+import os
+import shlex
+
+from acts import logger as acts_logger
+
+INDEX_SUFFIX = '.idx'
+
+# The number of logcat bytes described by a block of the index.
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+# The margin, in ms, the time windows are widened by when selecting blocks.
+# Callers still filter the lines of the blocks by their exact window, which
+# may be rounded differently.
+TIME_MARGIN_MS = 1000
+
+_NO_TIMESTAMP = '-'
+
+
+def index_path_for(logcat_path):
+    """Returns the path of the index of the given logcat file."""
+    return logcat_path + INDEX_SUFFIX
+
+
+def to_index_timestamp(time, offset_ms=0):
+    """Converts a time to the logline timestamp format stored in the index.
+
+    Args:
+        time: An epoch time in ms, or a datetime object.
+        offset_ms: The ms to add to the time.
+
+    Returns:
+        The logline timestamp, zero-padded to its full width.
+    """
+    if not isinstance(time, datetime.datetime):
+        time = datetime.datetime.fromtimestamp(time / 1000)
+    time += datetime.timedelta(milliseconds=offset_ms)
+    return time.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
+def _get_line_timestamp(line):
+    """Returns the logline timestamp of a line, or None if it has none."""
+    timestamp = line[:acts_logger.log_line_timestamp_len]
+    if acts_logger.is_valid_logline_timestamp(timestamp):
+        return timestamp
+    return None
+
+
+class LogcatIndexWriter(object):
+    """Appends the blocks of a logcat file to its index.
+
+    Attributes:
+        logcat_path: The path of the indexed logcat file.
+        block_size: The number of logcat bytes each block describes.
+    """
+
+    def __init__(self, logcat_path, start_offset=0,
+                 block_size=DEFAULT_BLOCK_SIZE, truncate=False):
+        """Creates a LogcatIndexWriter.
+
+        Args:
+            logcat_path: The path of the indexed logcat file.
+            start_offset: The offset of the first line that will be added.
+            block_size: The number of logcat bytes each block describes.
+            truncate: If True, the existing index is overwritten instead of
+                appended to.
+        """
+        self.logcat_path = logcat_path
+        self.block_size = block_size
+        self._file = open(index_path_for(logcat_path),
+                          'w' if truncate else 'a', encoding='utf-8')
+        self._start = start_offset
+        self._end = start_offset
+        self._min = None
+        self._max = None
+
+    def add_line(self, end_offset, timestamp):
+        """Adds a line to the current block of the index.
+
+        Args:
+            end_offset: The offset right after the end of the line.
+            timestamp: The logline timestamp of the line, or None.
+        """
+        self._end = end_offset
+        if timestamp is not None:
+            if self._min is None or timestamp < self._min:
+                self._min = timestamp
+            if self._max is None or timestamp > self._max:
+                self._max = timestamp
+        if self._end - self._start >= self.block_size:
+            self.flush_block()
+
+    def flush_block(self):
+        """Writes the current block to the index, and starts a new one."""
+        if self._end <= self._start:
+            return
+        self._file.write('%d\t%d\t%s\t%s\n' %
+                         (self._start, self._end, self._min or _NO_TIMESTAMP,
+                          self._max or _NO_TIMESTAMP))
+        self._file.flush()
+        self._start = self._end
+        self._min = None
+        self._max = None
+
+    def close(self):
+        """Writes the current block, and closes the index."""
+        if self._file.closed:
+            return
+        self.flush_block()
+        self._file.close()
+
+
+class LogcatIndexHandler(logging.Handler):
+    """Indexes the logcat files written by the FileHandlers of a logger.
+
+    Must be added to the logger after its FileHandlers, so the records have
+    already been written to their files when the handler receives them.
+    """
+
+    def __init__(self, logger, block_size=DEFAULT_BLOCK_SIZE):
+        """Creates a LogcatIndexHandler.
+
+        Args:
+            logger: The logger whose FileHandlers are indexed.
+            block_size: The number of logcat bytes each block describes.
+        """
+        super().__init__()
+        self._logger = logger
+        self._block_size = block_size
+        # A dict of FileHandler to the LogcatIndexWriter of its file.
+        self._writers = {}
+
+    def emit(self, record):
+        timestamp = _get_line_timestamp(record.getMessage())
+        for handler in self._logger.handlers:
+            if (not isinstance(handler, logging.FileHandler)
+                    or record.levelno < handler.level
+                    or handler.stream is None):
+                continue
+            try:
+                end_offset = handler.stream.tell()
+                writer = self._writers.get(handler)
+                if (writer is None
+                        or writer.logcat_path != handler.baseFilename):
+                    if writer is not None:
+                        writer.close()
+                    line = handler.format(record) + handler.terminator
+                    writer = LogcatIndexWriter(
+                        handler.baseFilename,
+                        end_offset - len(line.encode('utf-8')),
+                        self._block_size)
+                    self._writers[handler] = writer
+                writer.add_line(end_offset, timestamp)
+            except (OSError, ValueError):
+                self.handleError(record)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        super().close()
+
+
+class LogcatIndex(object):
+    """The index of a logcat file, read from its sidecar file.
+
+    Attributes:
+        logcat_path: The path of the indexed logcat file.
+        blocks: A list of (start offset, end offset, min timestamp,
+            max timestamp) tuples, sorted by offset. The timestamps are None
+            for blocks without any.
+    """
+
+    def __init__(self, logcat_path):
+        self.logcat_path = logcat_path
+        self.blocks = []
+        with open(index_path_for(logcat_path), 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != 4:
+                    # A partially written last block.
+                    continue
+                start, end, min_ts, max_ts = fields
+                self.blocks.append(
+                    (int(start), int(end),
+                     None if min_ts == _NO_TIMESTAMP else min_ts,
+                     None if max_ts == _NO_TIMESTAMP else max_ts))
+
+    @staticmethod
+    def load(logcat_path):
+        """Returns the LogcatIndex of a logcat file, or None if it has none."""
+        try:
+            return LogcatIndex(logcat_path)
+        except (OSError, ValueError):
+            return None
+
+    def is_valid(self):
+        """Returns whether the index describes the current logcat file."""
+        last_end = 0
+        for start, end, _, _ in self.blocks:
+            if start < last_end or end < start:
+                return False
+            last_end = end
+        return last_end <= os.path.getsize(self.logcat_path)
+
+    def find_ranges(self, begin_timestamp=None, end_timestamp=None):
+        """Finds the parts of the logcat file that may be in a time window.
+
+        Args:
+            begin_timestamp: The logline timestamp the window begins at, or
+                None to leave it unbounded.
+            end_timestamp: The logline timestamp the window ends at, or None to
+                leave it unbounded.
+
+        Returns:
+            A sorted list of (start offset, end offset) byte ranges. The end
+            offset of the last range is None if it runs to the end of the file.
+        """
+        ranges = []
+
+        def add_range(start, end):
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            elif end is None or end > start:
+                ranges.append((start, end))
+
+        offset = 0
+        for start, end, min_ts, max_ts in self.blocks:
+            # Bytes between blocks are not indexed, so they are always read.
+            add_range(offset, start)
+            offset = end
+            if min_ts is None:
+                continue
+            if begin_timestamp is not None and max_ts < begin_timestamp:
+                continue
+            if end_timestamp is not None and min_ts > end_timestamp:
+                continue
+            add_range(start, end)
+        add_range(offset, None)
+        return ranges
+
+
+def find_byte_ranges(logcat_path, begin_time=None, end_time=None):
+    """Finds the parts of a logcat file that may be in a time window.
+
+    The window is widened by TIME_MARGIN_MS on both sides, so callers need to
+    filter the lines in the ranges by their exact window.
+
+    Args:
+        logcat_path: The path of the logcat file.
+        begin_time: The epoch time in ms, or datetime, the window begins at.
+            None leaves the window unbounded.
+        end_time: The epoch time in ms, or datetime, the window ends at.
+            None leaves the window unbounded.
+
+    Returns:
+        A list of byte ranges, as returned by LogcatIndex.find_ranges(), or
+        None if the file has no valid index.
+    """
+    index = LogcatIndex.load(logcat_path)
+    if index is None or not index.is_valid():
+        return None
+    begin_timestamp = None
+    if begin_time is not None:
+        begin_timestamp = to_index_timestamp(begin_time, -TIME_MARGIN_MS)
+    end_timestamp = None
+    if end_time is not None:
+        end_timestamp = to_index_timestamp(end_time, TIME_MARGIN_MS)
+    return index.find_ranges(begin_timestamp, end_timestamp)
+
+
+def read_lines(logcat_path, ranges=None):
+    """Yields the lines of a logcat file within the given byte ranges.
+
+    Args:
+        logcat_path: The path of the logcat file.
+        ranges: A list of byte ranges, as returned by find_byte_ranges(). If
+            None, the whole file is read.
+
+    Yields:
+        The decoded lines, with their line endings.
+    """
+    if ranges is None:
+        ranges = [(0, None)]
+    with open(logcat_path, 'rb') as f:
+        for start, end in ranges:
+            f.seek(start)
+            remaining = None if end is None else end - start
+            while remaining is None or remaining > 0:
+                line = f.readline(-1 if remaining is None else remaining)
+                if not line:
+                    break
+                if remaining is not None:
+                    remaining -= len(line)
+                yield line.decode('utf-8', errors='replace')
+
+
+def rebuild_logcat_index(logcat_path, block_size=DEFAULT_BLOCK_SIZE):
+    """Builds the index of an existing logcat file, replacing any other.
+
+    Args:
+        logcat_path: The path of the logcat file.
+        block_size: The number of logcat bytes each block describes.
+    """
+    writer = LogcatIndexWriter(logcat_path, 0, block_size, truncate=True)
+    try:
+        offset = 0
+        with open(logcat_path, 'rb') as f:
+            for line in f:
+                offset += len(line)
+                writer.add_line(
+                    offset,
+                    _get_line_timestamp(line.decode('utf-8',
+                                                    errors='replace')))
+    finally:
+        writer.close()
+
+
+def create_search_command(matching_string, logcat_path, ranges):
+    """Returns a shell command grepping the given byte ranges of a file.
+
+    Args:
+        matching_string: The grep pattern to search for.
+        logcat_path: The path of the logcat file.
+        ranges: A list of byte ranges, as returned by find_byte_ranges().
+    """
+    readers = []
+    for start, end in ranges:
+        # tail counts bytes from 1.
+        reader = 'tail -c +%d %s' % (start + 1, shlex.quote(logcat_path))
+        if end is not None:
+            reader += ' | head -c %d' % (end - start)
+        readers.append(reader)
+    return '(%s) | grep %s' % ('; '.join(readers),
+                               shlex.quote(matching_string))
@@ -14,9 +14,12 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import collections
+import functools
 import importlib
 import logging
 
+from acts import utils
 from acts.keys import Config
 from acts.libs.proc import job
 
@@ -162,6 +165,53 @@ def get_attenuators_for_device(device_attenuator_configs, attenuators,
     return attenuator_list
 
 
+def set_attens(attenuators, values, strict=True, skip_unchanged=False):
+    """Sets the attenuation of several attenuators at once.
+
+    The attenuators of each instrument are set with a single call to its
+    set_attens(), and the instruments are set concurrently, so that setting
+    all the attenuators of a testbed takes about one instrument round trip.
+
+    Args:
+        attenuators: A list of Attenuator objects.
+        values: A floating point value for nominal attenuation to be set on
+            all attenuators, or a list of the values to set on each of them.
+        strict: if True, function raises an error when given out of
+            bounds attenuation values, if false, the function sets out of
+            bounds values to 0 or max_atten.
+        skip_unchanged: if True, attenuators already set to their value by
+            this process, since their instrument was last opened, are not set
+            again. Only safe if nothing else changes the attenuation.
+
+    Raises:
+        ValueError if a value + offset is greater than the maximum value.
+    """
+    if not isinstance(values, (list, tuple)):
+        values = [values] * len(attenuators)
+    if len(values) != len(attenuators):
+        raise ValueError('Expected %s attenuation values, got %s.' %
+                         (len(attenuators), len(values)))
+
+    instrument_values = collections.OrderedDict()
+    for attenuator, value in zip(attenuators, values):
+        instrument_value = attenuator._get_instrument_value(value, strict)
+        instrument = attenuator.instrument
+        if (skip_unchanged and instrument.get_cached_atten(attenuator.idx)
+                == instrument.get_applied_atten(instrument_value)):
+            continue
+        instrument_values.setdefault(instrument, collections.OrderedDict())
+        instrument_values[instrument][attenuator.idx] = instrument_value
+
+    calls = [
+        functools.partial(instrument.set_attens, idx_values, strict)
+        for instrument, idx_values in instrument_values.items()
+    ]
+    if len(calls) == 1:
+        calls[0]()
+    elif calls:
+        utils.run_concurrent_actions(*calls)
+
+
 """Classes for accessing, managing, and manipulating attenuators.
 
 Users will instantiate a specific child class, but almost all operation should
@@ -227,6 +277,7 @@ class AttenuatorInstrument(object):
         self.num_atten = num_atten
         self.max_atten = AttenuatorInstrument.INVALID_MAX_ATTEN
         self.properties = None
+        self._cached_attens = {}
 
     def set_atten(self, idx, value, strict=True):
         """Sets the attenuation given its index in the instrument.
@@ -241,6 +292,23 @@ class AttenuatorInstrument(object):
         """
         raise NotImplementedError('Base class should not be called directly!')
 
+    def set_attens(self, values, strict=True):
+        """Sets the attenuation of several attenuators of the instrument.
+
+        Instruments able to set several attenuators in a single round trip
+        should override this. By default, attenuators are set one by one.
+
+        Args:
+            values: A dict of the floating point values for nominal
+                attenuation to be set, by attenuator index.
+            strict: if True, function raises an error when given out of
+                bounds attenuation values, if false, the function sets out of
+                bounds values to 0 or max_atten.
+        """
+        for idx, value in values.items():
+            self.set_atten(idx, value, strict)
+            self.cache_atten(idx, self.get_applied_atten(value))
+
     def get_atten(self, idx):
         """Returns the current attenuation of the attenuator at index idx.
 
@@ -253,6 +321,31 @@ class AttenuatorInstrument(object):
         """
         raise NotImplementedError('Base class should not be called directly!')
 
+    def get_applied_atten(self, value):
+        """Returns the attenuation applied when setting a value.
+
+        Out of bounds values set without strict checking are applied as 0 or
+        max_atten.
+        """
+        return min(max(value, 0), self.max_atten)
+
+    def cache_atten(self, idx, value):
+        """Records the attenuation set on, or read from, an attenuator."""
+        self._cached_attens[idx] = value
+
+    def get_cached_atten(self, idx):
+        """Returns the attenuation last set on, or read from, an attenuator.
+
+        Returns:
+            The attenuation value, or None if it is unknown.
+        """
+        return self._cached_attens.get(idx)
+
+    def clear_atten_cache(self):
+        """Forgets the cached attenuations, e.g. after the instrument reset.
+        """
+        self._cached_attens = {}
+
 
 class Attenuator(object):
     """An object representing a single attenuator in a remote instrument.
@@ -299,18 +392,30 @@ class Attenuator(object):
                 bounds attenuation values, if false, the function sets out of
                 bounds values to 0 or max_atten.
 
+        Raises:
+            ValueError if value + offset is greater than the maximum value.
+        """
+        instrument_value = self._get_instrument_value(value, strict)
+        self.instrument.set_atten(self.idx, instrument_value, strict)
+        self.instrument.cache_atten(
+            self.idx, self.instrument.get_applied_atten(instrument_value))
+
+    def _get_instrument_value(self, value, strict):
+        """Returns the attenuation to set on the instrument for a value.
+
         Raises:
             ValueError if value + offset is greater than the maximum value.
         """
         if value + self.offset > self.instrument.max_atten and strict:
             raise ValueError(
                 'Attenuator Value+Offset greater than Max Attenuation!')
-
-        self.instrument.set_atten(self.idx, value + self.offset, strict)
+        return value + self.offset
 
     def get_atten(self):
         """Returns the attenuation as a float, normalized by the offset."""
-        return self.instrument.get_atten(self.idx) - self.offset
+        instrument_value = self.instrument.get_atten(self.idx)
+        self.instrument.cache_atten(self.idx, instrument_value)
+        return instrument_value - self.offset
 
     def get_max_atten(self):
         """Returns the max attenuation as a float, normalized by the offset."""
@@ -393,15 +498,18 @@ class AttenuatorGroup(object):
                 return False
         return True
 
-    def set_atten(self, value):
+    def set_atten(self, value, skip_unchanged=False):
         """Sets the attenuation value of all attenuators in the group.
 
+        The attenuators are set with set_attens(), in about one round trip.
+
         Args:
             value: A floating point value for nominal attenuation to be set.
+            skip_unchanged: if True, attenuators already set to the value by
+                this process are not set again.
         """
         value = float(value)
-        for att in self.attens:
-            att.set_atten(value)
+        set_attens(self.attens, value, skip_unchanged=skip_unchanged)
         self._value = value
 
     def get_atten(self):
@@ -114,6 +114,40 @@ class _TNHelper(object):
         if wait_ret is False:
             return None
 
+        return self._read_reply(cmd_str)
+
+    def cmds(self, cmd_strs, wait_ret=True):
+        """Sends several commands in a single write, then reads their replies.
+
+        Unlike calling cmd() for each command, the commands do not wait for
+        the reply to the previous one, so they take a single round trip.
+
+        Args:
+            cmd_strs: A list of command strings.
+            wait_ret: Whether each command returns a reply to read.
+
+        Returns:
+            The list of replies to the commands, or None if wait_ret is False.
+        """
+        for cmd_str in cmd_strs:
+            if not isinstance(cmd_str, str):
+                raise TypeError('Invalid command string', cmd_str)
+
+        if not self.is_open():
+            raise attenuator.InvalidOperationError(
+                'Telnet connection not open for commands')
+
+        self._tn.read_until(_ascii_string(self.prompt), 2)
+        self._tn.write(
+            _ascii_string(''.join(cmd_str + self.tx_cmd_separator
+                                  for cmd_str in cmd_strs)))
+
+        if wait_ret is False:
+            return None
+
+        return [self._read_reply(cmd_str) for cmd_str in cmd_strs]
+
+    def _read_reply(self, cmd_str):
         match_idx, match_val, ret_text = self._tn.expect(
             [_ascii_string('\S+' + self.rx_cmd_separator)], 1)
 
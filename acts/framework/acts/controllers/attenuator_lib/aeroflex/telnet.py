@@ -50,6 +50,8 @@ class AttenuatorInstrument(attenuator.AttenuatorInstrument):
             port: An optional port number (defaults to telnet default 23)
         """
         self._tnhelper.open(host, port)
+        # The attenuation may have changed while disconnected.
+        self.clear_atten_cache()
 
         # work around a bug in IO, but this is a good thing to do anyway
         self._tnhelper.cmd('*CLS', False)
@@ -77,6 +79,7 @@ class AttenuatorInstrument(attenuator.AttenuatorInstrument):
         attenuator instrument leaving scope.
         """
         self._tnhelper.close()
+        self.clear_atten_cache()
 
     def set_atten(self, idx, value):
         """This function sets the attenuation of an attenuator given its index
@@ -107,6 +110,40 @@ class AttenuatorInstrument(attenuator.AttenuatorInstrument):
 
         self._tnhelper.cmd('ATTN ' + str(idx + 1) + ' ' + str(value), False)
 
+    def set_attens(self, values, strict=True):
+        """This function sets the attenuation of several attenuators of the
+        instrument in a single write.
+
+        Args:
+            values: A dict of the floating point values for nominal
+                attenuation to be set, by zero-based attenuator index.
+            strict: Unused, values greater than the maximum attenuation
+                always raise an error.
+
+        Raises:
+            InvalidOperationError if the telnet connection is not open.
+            IndexError if an index is not valid for this instrument.
+            ValueError if a requested set value is greater than the maximum
+                attenuation value.
+        """
+        if not self.is_open():
+            raise attenuator.InvalidOperationError('Connection not open!')
+
+        for idx, value in values.items():
+            if idx >= self.num_atten:
+                raise IndexError('Attenuator index out of range!',
+                                 self.num_atten, idx)
+            if value > self.max_atten:
+                raise ValueError('Attenuator value out of range!',
+                                 self.max_atten, value)
+
+        self._tnhelper.cmds([
+            'ATTN ' + str(idx + 1) + ' ' + str(value)
+            for idx, value in values.items()
+        ], False)
+        for idx, value in values.items():
+            self.cache_atten(idx, value)
+
     def get_atten(self, idx):
         """Returns the current attenuation of the attenuator at the given index.
 
@@ -58,6 +58,8 @@ class AttenuatorInstrument(attenuator.AttenuatorInstrument):
             port: An optional port number (defaults to telnet default 23)
         """
         self._tnhelper.open(host, port)
+        # The attenuation may have changed while disconnected.
+        self.clear_atten_cache()
         self.address = host
 
         if self.num_atten == 0:
@@ -83,6 +85,7 @@ class AttenuatorInstrument(attenuator.AttenuatorInstrument):
         attenuator instrument leaving scope.
         """
         self._tnhelper.close()
+        self.clear_atten_cache()
 
     def set_atten(self, idx, value, strict_flag=True):
         """This function sets the attenuation of an attenuator given its index
@@ -117,6 +120,41 @@ class AttenuatorInstrument(attenuator.AttenuatorInstrument):
         # The actual device uses one-based index for channel numbers.
         self._tnhelper.cmd('CHAN:%s:SETATT:%s' % (idx + 1, value))
 
+    def set_attens(self, values, strict_flag=True):
+        """This function sets the attenuation of several attenuators of the
+        instrument in a single round trip.
+
+        Args:
+            values: A dict of the floating point values for nominal
+                attenuation to be set, by zero-based attenuator index.
+            strict_flag: if True, function raises an error when given out of
+                bounds attenuation values, if false, the function sets out of
+                bounds values to 0 or max_atten.
+
+        Raises:
+            InvalidOperationError if the telnet connection is not open.
+            IndexError if an index is not valid for this instrument.
+            ValueError if a requested set value is greater than the maximum
+                attenuation value.
+        """
+        if not self.is_open():
+            raise attenuator.InvalidOperationError('Connection not open!')
+
+        for idx, value in values.items():
+            if idx >= self.num_atten:
+                raise IndexError('Attenuator index out of range!',
+                                 self.num_atten, idx)
+            if value > self.max_atten and strict_flag:
+                raise ValueError('Attenuator value out of range!',
+                                 self.max_atten, value)
+        # The commands are pipelined: the instrument replies to each in turn.
+        self._tnhelper.cmds([
+            'CHAN:%s:SETATT:%s' % (idx + 1, value)
+            for idx, value in values.items()
+        ])
+        for idx, value in values.items():
+            self.cache_atten(idx, self.get_applied_atten(value))
+
     def get_atten(self, idx):
         """Returns the current attenuation of the attenuator at the given index.
 
@@ -39,6 +39,7 @@ from acts.controllers.fuchsia_lib.bt.avdtp_lib import FuchsiaAvdtpLib
 from acts.controllers.fuchsia_lib.bt.hfp_lib import FuchsiaHfpLib
 from acts.controllers.fuchsia_lib.light_lib import FuchsiaLightLib
 
+from acts.controllers.fuchsia_lib.base_lib import get_transport
 from acts.controllers.fuchsia_lib.basemgr_lib import FuchsiaBasemgrLib
 from acts.controllers.fuchsia_lib.bt.ble_lib import FuchsiaBleLib
 from acts.controllers.fuchsia_lib.bt.bts_lib import FuchsiaBtsLib
@@ -58,7 +59,7 @@ from acts.controllers.fuchsia_lib.ram_lib import FuchsiaRamLib
 from acts.controllers.fuchsia_lib.syslog_lib import FuchsiaSyslogError
 from acts.controllers.fuchsia_lib.syslog_lib import start_syslog
 from acts.controllers.fuchsia_lib.sysinfo_lib import FuchsiaSysInfoLib
-from acts.controllers.fuchsia_lib.utils_lib import create_ssh_connection
+from acts.controllers.fuchsia_lib.utils_lib import PersistentSshConnection
 from acts.controllers.fuchsia_lib.utils_lib import SshResults
 from acts.controllers.fuchsia_lib.wlan_deprecated_configuration_lib import FuchsiaWlanDeprecatedConfigurationLib
 from acts.controllers.fuchsia_lib.wlan_lib import FuchsiaWlanLib
@@ -232,7 +233,6 @@ class FuchsiaDevice:
         self.device_pdu_config = fd_conf_data.get("PduDevice", None)
         self.config_country_code = fd_conf_data.get(
             'country_code', FUCHSIA_DEFAULT_COUNTRY_CODE_US).upper()
-        self._persistent_ssh_conn = None
 
         # Whether to use 'policy' or 'drivers' for WLAN connect/disconnect calls
         # If set to None, wlan is not configured.
@@ -284,6 +284,14 @@ class FuchsiaDevice:
             self.log_path, "fuchsialog_%s_debug.txt" % self.serial)
         self.log_process = None
 
+        # The pooled SL4F connections shared by the facade libraries.
+        self.sl4f_transport = get_transport(self.address)
+        # The SSH connection shared by the commands sent via SSH.
+        self.ssh_connection = PersistentSshConnection(self.ip,
+                                                      self.ssh_username,
+                                                      self.ssh_config,
+                                                      ssh_port=self.ssh_port)
+
         # Grab commands from FuchsiaAudioLib
         self.audio_lib = FuchsiaAudioLib(self.address, self.test_counter,
                                          self.client_id)
@@ -643,6 +651,7 @@ class FuchsiaDevice:
             self.init_server_connection()
             raise ConnectionError('Device never went down.')
         self.log.info('Device is unreachable as expected.')
+        self.ssh_connection.close()
         if reboot_type == FUCHSIA_REBOOT_TYPE_HARD:
             self.log.info('Restoring power to FuchsiaDevice (%s)...' % self.ip)
             device_pdu.on(str(device_pdu_port))
@@ -731,19 +740,15 @@ class FuchsiaDevice:
             A SshResults object containing the results of the ssh command.
         """
         command_result = False
-        ssh_conn = None
         if not self.ssh_config:
             self.log.warning(FUCHSIA_SSH_CONFIG_NOT_DEFINED)
         else:
             try:
-                ssh_conn = create_ssh_connection(
-                    self.ip,
-                    self.ssh_username,
-                    self.ssh_config,
-                    ssh_port=self.ssh_port,
-                    connect_timeout=connect_timeout)
                 cmd_result_stdin, cmd_result_stdout, cmd_result_stderr = (
-                    ssh_conn.exec_command(test_cmd, timeout=timeout))
+                    self.ssh_connection.exec_command(
+                        test_cmd,
+                        connect_timeout=connect_timeout,
+                        timeout=timeout))
                 if not skip_status_code_check:
                     command_result = SshResults(cmd_result_stdin,
                                                 cmd_result_stdout,
@@ -753,9 +758,6 @@ class FuchsiaDevice:
                 self.log.warning("Problem running ssh command: %s"
                                  "\n Exception: %s" % (test_cmd, e))
                 return e
-            finally:
-                if ssh_conn is not None:
-                    ssh_conn.close()
         return command_result
 
     def ping(self,
@@ -872,10 +874,23 @@ class FuchsiaDevice:
             self.run_commands_from_config(self.teardown_commands)
         except Exception as err:
             self.log.warning('Failed to run teardown_commands: %s' % err)
+        try:
+            self.log_connection_metrics()
+        except Exception as err:
+            self.log.warning('Unable to log connection metrics: %s' % err)
 
         # This MUST be run, otherwise syslog threads will never join.
         self.clean_up_services()
 
+    def log_connection_metrics(self):
+        """Logs the latencies of the SL4F commands and SSH connections made
+        to the device so far.
+        """
+        self.log.info('SL4F command latencies: %s' % json.dumps(
+            self.sl4f_transport.get_latency_report(), sort_keys=True))
+        self.log.info('SSH connection metrics: %s' % json.dumps(
+            self.ssh_connection.get_metrics(), sort_keys=True))
+
     def clean_up_services(self):
         """ Cleans up FuchsiaDevice services (e.g. SL4F). Subset of clean_up,
         to be used for reboots, when testing is to continue (as opposed to
@@ -901,6 +916,7 @@ class FuchsiaDevice:
             self.log.exception("Cleanup request failed with %s:" % err)
         finally:
             self.test_counter += 1
+            self.sl4f_transport.close()
             self.stop_services()
 
     def check_process_state(self, process_name):
@@ -945,14 +961,10 @@ class FuchsiaDevice:
         unable_to_connect_msg = None
         process_state = False
         try:
-            if not self._persistent_ssh_conn:
-                self._persistent_ssh_conn = (create_ssh_connection(
-                    self.ip,
-                    self.ssh_username,
-                    self.ssh_config,
-                    ssh_port=self.ssh_port))
-            self._persistent_ssh_conn.exec_command(
-                "killall %s" % process_name, timeout=CHANNEL_OPEN_TIMEOUT)
+            self.ssh_connection.exec_command(
+                "killall %s" % process_name,
+                connect_timeout=CHANNEL_OPEN_TIMEOUT,
+                timeout=CHANNEL_OPEN_TIMEOUT)
             # This command will effectively stop the process but should
             # be used as a cleanup before starting a process.  It is a bit
             # confusing to have the msg saying "attempting to stop
@@ -962,7 +974,7 @@ class FuchsiaDevice:
             if action in DAEMON_ACTIVATED_STATES:
                 self.log.debug("Attempting to start Fuchsia "
                                "devices services.")
-                self._persistent_ssh_conn.exec_command(
+                self.ssh_connection.exec_command(
                     "run fuchsia-pkg://fuchsia.com/%s#meta/%s &" %
                     (process_name[:-4], process_name))
                 process_initial_msg = (
@@ -1007,8 +1019,7 @@ class FuchsiaDevice:
         finally:
             if action == 'stop' and (process_name == 'sl4f'
                                      or process_name == 'sl4f.cmx'):
-                self._persistent_ssh_conn.close()
-                self._persistent_ssh_conn = None
+                self.ssh_connection.close()
 
     def check_connect_response(self, connect_response):
         if connect_response.get("error") is None:
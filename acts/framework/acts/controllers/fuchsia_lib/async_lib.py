@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Awaitable SL4F facade calls, to drive several Fuchsia devices at once.
+
+Example, scanning from every device on one event loop:
+
+    results = run_on_devices(
+        fuchsia_devices,
+        lambda fd: AsyncFacade(fd.wlan_lib).wlanStartScan(),
+        timeout=30)
+    for fd, result in zip(fuchsia_devices, results):
+        if result.exception:
+            ...
+"""
+
+import asyncio
+import functools
+import time
+
+from acts import utils
+
+
+class AsyncFacade(object):
+    """Wraps a facade library, e.g. a FuchsiaWlanLib, in awaitable methods.
+
+    Each method of the library, including send_command, is awaitable with the
+    same arguments. The calls run on a thread pool, and send their commands
+    over the pooled connections of the device's Sl4fTransport, so calls to
+    many devices, or many calls to one device, run concurrently.
+    """
+
+    def __init__(self, lib, executor=None):
+        """Wraps a facade library.
+
+        Args:
+            lib: The facade library, e.g. fuchsia_device.wlan_lib.
+            executor: The concurrent.futures.Executor running the calls.
+                Defaults to the executor shared by concurrent actions.
+        """
+        self._lib = lib
+        self._executor = executor or utils.get_shared_executor()
+
+    def __getattr__(self, name):
+        attr = getattr(self._lib, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(attr, *args, **kwargs))
+
+        return call
+
+
+async def gather_on_devices(devices, call, timeout=None):
+    """Awaits the same call on several devices concurrently.
+
+    A device whose call raises or times out does not stop the calls to the
+    others. The timeout stops waiting for a call, but an SL4F command already
+    sent still runs until it is answered or its own response_timeout passes.
+
+    Args:
+        devices: A list of devices, e.g. FuchsiaDevices.
+        call: A function taking a device, and returning an awaitable, e.g.
+            lambda fd: AsyncFacade(fd.wlan_lib).wlanStatus().
+        timeout: The seconds to wait for the call of each device, or None to
+            wait indefinitely.
+
+    Returns:
+        A list of the utils.ConcurrentCallResult of each device, in the order
+        given. The exception of a timed out call is an asyncio.TimeoutError.
+    """
+
+    async def timed_call(device):
+        start_time = time.time()
+        try:
+            value = await asyncio.wait_for(call(device), timeout)
+        except Exception as e:
+            return utils.ConcurrentCallResult(None, e, start_time,
+                                              time.time())
+        return utils.ConcurrentCallResult(value, None, start_time,
+                                          time.time())
+
+    return await asyncio.gather(*[timed_call(device) for device in devices])
+
+
+def run_on_devices(devices, call, timeout=None):
+    """Runs gather_on_devices on a new event loop, from synchronous code.
+
+    Args:
+        devices: A list of devices, e.g. FuchsiaDevices.
+        call: A function taking a device, and returning an awaitable.
+        timeout: The seconds to wait for the call of each device, or None to
+            wait indefinitely.
+
+    Returns:
+        A list of the utils.ConcurrentCallResult of each device, in the order
+        given.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(
+            gather_on_devices(devices, call, timeout))
+    finally:
+        loop.close()
@@ -14,6 +14,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import bisect
 import collections
 import json
 import logging
@@ -23,24 +24,203 @@ import random
 import re
 import requests
 import socket
+import threading
 import time
 
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse
 
 from acts import utils
 from acts.libs.proc import job
 
+# The number of keep-alive connections kept open to the SL4F server of each
+# device. More concurrent commands open extra, short-lived connections.
+DEFAULT_POOL_SIZE = 8
+# The seconds for which a response from a device proves that it is reachable,
+# so that it is not pinged before the next command.
+DEFAULT_LIVENESS_TTL = 10
+# The upper bounds, in seconds, of the buckets of SL4F latency histograms.
+LATENCY_BUCKETS = (.001, .002, .005, .01, .02, .05, .1, .2, .5, 1, 2, 5, 10,
+                   30, 60, math.inf)
+
 
 class DeviceOffline(Exception):
     """Exception if the device is no longer reachable via the network."""
 
 
+class LatencyHistogram(object):
+    """Counts latencies in the buckets of LATENCY_BUCKETS.
+
+    Attributes:
+        counts: The number of latencies in each bucket.
+        count: The number of latencies.
+        total: The sum of the latencies, in seconds.
+        max: The highest latency, in seconds.
+    """
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, latency):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket holding a percentile."""
+        rank = percent / 100 * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return 0
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'buckets': {
+                str(bound): count
+                for bound, count in zip(LATENCY_BUCKETS, self.counts) if count
+            },
+        }
+
+
+class Sl4fTransport(object):
+    """Sends JSON-RPC commands to the SL4F server of a device.
+
+    Commands share a pool of keep-alive HTTP connections, and may be sent
+    concurrently. Instead of pinging the device before every command, it is
+    only pinged when a command fails, or when no command succeeded in the
+    last liveness_ttl seconds.
+
+    Attributes:
+        address: The URL of the SL4F server.
+        liveness_ttl: The seconds for which a response proves that the device
+            is reachable.
+        latencies: A dict of SL4F method names to the LatencyHistogram of
+            their commands.
+    """
+
+    def __init__(self,
+                 address,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 liveness_ttl=DEFAULT_LIVENESS_TTL):
+        self.address = address
+        self.liveness_ttl = liveness_ttl
+        self.latencies = collections.defaultdict(LatencyHistogram)
+        self._hostname = urlparse(address).hostname
+        self._last_alive_time = None
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._session.mount('http://',
+                            HTTPAdapter(pool_connections=1,
+                                        pool_maxsize=pool_size))
+
+    def _raise_if_offline(self):
+        if not utils.can_ping(job, self._hostname):
+            raise DeviceOffline("FuchsiaDevice %s is not reachable via the "
+                                "network." % self._hostname)
+        self._last_alive_time = time.time()
+
+    def send(self, url, test_id, test_cmd, test_args, response_timeout=30):
+        """Sends a JSON-RPC command to the SL4F server.
+
+        Args:
+            url: The URL to send the command to, e.g. the address.
+            test_id: string, unique identifier of test command.
+            test_cmd: string, sl4f method name of command.
+            test_args: dictionary, arguments required to execute test_cmd.
+            response_timeout: int, seconds to wait for a response before
+                throwing an exception.
+
+        Returns:
+            Dictionary, Result of sl4f command executed.
+
+        Raises:
+            DeviceOffline if the device does not answer pings.
+        """
+        last_alive_time = self._last_alive_time
+        if (last_alive_time is None
+                or time.time() - last_alive_time > self.liveness_ttl):
+            self._raise_if_offline()
+        test_data = json.dumps({
+            "jsonrpc": "2.0",
+            "id": test_id,
+            "method": test_cmd,
+            "params": test_args
+        })
+        start = time.time()
+        try:
+            response = self._session.get(url=url,
+                                         data=test_data,
+                                         timeout=response_timeout).json()
+        except requests.exceptions.Timeout:
+            self._raise_if_offline()
+            logging.debug('FuchsiaDevice %s is online but SL4f call timed out.'
+                          % self._hostname)
+            raise
+        except requests.exceptions.ConnectionError:
+            self._raise_if_offline()
+            raise
+        end = time.time()
+        with self._lock:
+            self.latencies[test_cmd].add(end - start)
+            self._last_alive_time = end
+        return response
+
+    def get_latency_report(self):
+        """Returns a dict of SL4F method names to their latency statistics."""
+        with self._lock:
+            return {
+                method: histogram.to_dict()
+                for method, histogram in self.latencies.items()
+            }
+
+    def close(self):
+        """Closes the pooled connections, e.g. before the device reboots.
+
+        Later commands open new connections.
+        """
+        self._last_alive_time = None
+        self._session.close()
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(address):
+    """Returns the Sl4fTransport shared by all the facades of an address."""
+    with _transports_lock:
+        if address not in _transports:
+            _transports[address] = Sl4fTransport(address)
+        return _transports[address]
+
+
 class BaseLib():
     def __init__(self, addr, tc, client_id):
         self.address = addr
         self.test_counter = tc
         self.client_id = client_id
 
+    @property
+    def transport(self):
+        """The Sl4fTransport shared by the facades of the device."""
+        return get_transport(self.address)
+
     def build_id(self, test_id):
         """Concatenates client_id and test_id to form a command_id.
 
@@ -62,26 +242,5 @@ class BaseLib():
         Returns:
             Dictionary, Result of sl4f command executed.
         """
-        if not utils.can_ping(job, urlparse(self.address).hostname):
-            raise DeviceOffline("FuchsiaDevice %s is not reachable via the "
-                                "network." % urlparse(self.address).hostname)
-        test_data = json.dumps({
-            "jsonrpc": "2.0",
-            "id": test_id,
-            "method": test_cmd,
-            "params": test_args
-        })
-        try:
-            return requests.get(url=self.address,
-                                data=test_data,
-                                timeout=response_timeout).json()
-        except requests.exceptions.Timeout as e:
-            if not utils.can_ping(job, urlparse(self.address).hostname):
-                raise DeviceOffline(
-                    "FuchsiaDevice %s is not reachable via the "
-                    "network." % urlparse(self.address).hostname)
-            else:
-                logging.debug(
-                    'FuchsiaDevice %s is online but SL4f call timed out.' %
-                    urlparse(self.address).hostname)
-                raise e
+        return self.transport.send(self.address, test_id, test_cmd, test_args,
+                                   response_timeout)
@@ -19,10 +19,12 @@ import os
 import logging
 import paramiko
 import socket
+import threading
 import time
 
 from acts import utils
 from acts.controllers.fuchsia_lib.base_lib import DeviceOffline
+from acts.controllers.fuchsia_lib.base_lib import LatencyHistogram
 from acts.libs.proc import job
 
 logging.getLogger("paramiko").setLevel(logging.WARNING)
@@ -117,6 +119,115 @@ def ssh_is_connected(ssh_client):
     return ssh_client and ssh_client.get_transport().is_active()
 
 
+class PersistentSshConnection(object):
+    """An SSH connection to a Fuchsia device, reused by every command.
+
+    The connection is opened by the first command, and each command runs on
+    its own channel of it, so commands from several threads run concurrently
+    without a handshake and key exchange each. If the connection dropped,
+    e.g. because the device rebooted, the next command reconnects. A channel
+    refused on a connection still active does not close the connection, so
+    the commands running on its other channels are not interrupted.
+
+    Attributes:
+        connect_times: A LatencyHistogram of the seconds taken to connect.
+    """
+
+    def __init__(self, ip_address, ssh_username, ssh_config, ssh_port=22):
+        """
+        Args:
+            ip_address: IP address of ssh server.
+            ssh_username: Username for ssh server.
+            ssh_config: ssh_config location for the ssh server.
+            ssh_port: The port of the ssh server.
+        """
+        self.ip_address = ip_address
+        self.ssh_username = ssh_username
+        self.ssh_config = ssh_config
+        self.ssh_port = ssh_port
+        self.connect_times = LatencyHistogram()
+        self._ssh_client = None
+        self._lock = threading.Lock()
+
+    def _get_transport(self, connect_timeout):
+        """Returns the active paramiko transport, connecting if needed."""
+        with self._lock:
+            if not ssh_is_connected(self._ssh_client):
+                if self._ssh_client is not None:
+                    self._ssh_client.close()
+                    self._ssh_client = None
+                start = time.time()
+                self._ssh_client = create_ssh_connection(
+                    self.ip_address,
+                    self.ssh_username,
+                    self.ssh_config,
+                    ssh_port=self.ssh_port,
+                    connect_timeout=connect_timeout)
+                self.connect_times.add(time.time() - start)
+                logging.debug('Connected to %s via SSH in %.2fs.' %
+                              (self.ip_address, time.time() - start))
+            return self._ssh_client.get_transport()
+
+    def _drop_transport(self, transport):
+        """Closes the connection, unless another thread already replaced it."""
+        with self._lock:
+            if (self._ssh_client is not None
+                    and self._ssh_client.get_transport() is transport):
+                self._ssh_client.close()
+                self._ssh_client = None
+
+    def exec_command(self,
+                     command,
+                     connect_timeout=10,
+                     timeout=None):
+        """Runs a command on a new channel of the connection.
+
+        A command is only retried on a new connection if the channel to run
+        it could not be opened because the connection dropped, so that no
+        command ever runs twice.
+
+        Args:
+            command: The command to run.
+            connect_timeout: Timeout value for connecting to ssh_server, and
+                for opening a channel.
+            timeout: Timeout value for reading the outputs of the command.
+
+        Returns:
+            The stdin, stdout and stderr of the command, like
+            paramiko.SSHClient.exec_command.
+        """
+        transport = self._get_transport(connect_timeout)
+        try:
+            channel = transport.open_session(timeout=connect_timeout)
+        except (paramiko.SSHException, EOFError, socket.error) as e:
+            if transport.is_active():
+                raise
+            logging.debug('Reconnecting to %s via SSH after: %s' %
+                          (self.ip_address, e))
+            self._drop_transport(transport)
+            channel = self._get_transport(connect_timeout).open_session(
+                timeout=connect_timeout)
+        channel.settimeout(timeout)
+        channel.exec_command(command)
+        return (channel.makefile('wb'), channel.makefile('r'),
+                channel.makefile_stderr('r'))
+
+    def get_metrics(self):
+        """Returns a dict of the connections made and the time they took."""
+        with self._lock:
+            return {
+                'connections': self.connect_times.count,
+                'connect_time': self.connect_times.to_dict(),
+            }
+
+    def close(self):
+        """Closes the connection. The next command reconnects."""
+        with self._lock:
+            if self._ssh_client is not None:
+                self._ssh_client.close()
+                self._ssh_client = None
+
+
 def get_ssh_key_for_host(host, ssh_config_file):
     """Gets the SSH private key path from a supplied ssh_config_file and the
        host.
@@ -16,6 +16,7 @@
 
 import logging
 import os
+import signal
 import subprocess
 import socket
 import threading
@@ -25,6 +26,7 @@ from acts import utils
 from acts.controllers.adb_lib.error import AdbCommandError
 from acts.controllers.android_device import AndroidDevice
 from acts.controllers.iperf_server import _AndroidDeviceBridge
+from acts.controllers.iperf_server import IPerfResultStream
 from acts.controllers.fuchsia_lib.utils_lib import create_ssh_connection
 from acts.controllers.fuchsia_lib.utils_lib import ssh_is_connected
 from acts.controllers.fuchsia_lib.utils_lib import SshResults
@@ -38,6 +40,11 @@ from acts.libs.proc import job
 from paramiko.buffered_pipe import PipeTimeout
 MOBLY_CONTROLLER_CONFIG_NAME = 'IPerfClient'
 ACTS_CONTROLLER_REFERENCE_NAME = 'iperf_clients'
+# Prefix of remote iperf commands printing the pid of the shell, which iperf
+# then replaces, so that iperf can be interrupted.
+REMOTE_PID_PREFIX = 'echo $$; exec '
+# Seconds to wait for an interrupted iperf client to print its results.
+INTERRUPT_GRACE_PERIOD = 5
 
 
 class IPerfError(Exception):
@@ -71,6 +78,64 @@ def create(configs):
     return results
 
 
+def get_json_stream_args(iperf_args):
+    """Returns iperf args making iperf3 print each result as it comes.
+
+    The --json-stream option requires iperf3 3.10 or later.
+
+    Args:
+        iperf_args: A string representing arguments to start iperf client.
+    """
+    args = iperf_args.split()
+    for arg in ('-J', '--json-stream', '--forceflush'):
+        if arg not in args and not (arg == '-J' and '--json' in args):
+            args.append(arg)
+    return ' '.join(args)
+
+
+def _decode_lines(stream):
+    """Yields the lines of a binary stream as they are read."""
+    for line in iter(stream.readline, b''):
+        yield line.decode('utf-8', errors='replace')
+
+
+def _read_remote_pid(lines):
+    """Reads the pid printed by a command prefixed with REMOTE_PID_PREFIX."""
+    pid = next(lines, '').strip()
+    if not pid.isdigit():
+        logging.warning('Unable to read iperf client pid from %r. It will '
+                        'not be interrupted.' % pid)
+        return None
+    return pid
+
+
+def _close_process(process):
+    """Waits for a local process to exit, killing it if it does not."""
+    try:
+        process.wait(timeout=INTERRUPT_GRACE_PERIOD)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    if process.stdout:
+        process.stdout.close()
+
+
+class _StreamingProcess(object):
+    """A running iperf client whose output is read as it is produced.
+
+    Attributes:
+        lines: An iterator over the lines output by the client.
+        interrupt: A function interrupting the client, which then prints its
+            results and exits.
+        close: A function waiting for the client to exit, and releasing its
+            resources.
+    """
+    def __init__(self, lines, interrupt, close):
+        self.lines = lines
+        self.interrupt = interrupt
+        self.close = close
+
+
 def get_info(iperf_clients):
     """Placeholder for info about iperf clients
 
@@ -138,6 +203,91 @@ class IPerfClientBase(object):
         """
         raise NotImplementedError('start() must be implemented.')
 
+    def _start_streaming_process(self, ip, iperf_args, timeout,
+                                 iperf_binary):
+        """Starts iperf client without waiting for it.
+
+        Args:
+            ip: iperf server ip address.
+            iperf_args: A string representing arguments to start iperf
+                client.
+            timeout: the maximum amount of time the iperf client can run.
+            iperf_binary: Location of iperf3 binary.
+
+        Returns:
+            A _StreamingProcess of the started client.
+        """
+        raise NotImplementedError(
+            '_start_streaming_process() must be implemented.')
+
+    def start_streaming(self,
+                        ip,
+                        iperf_args,
+                        tag,
+                        timeout=3600,
+                        iperf_binary=None,
+                        convergence=None,
+                        on_interval=None):
+        """Starts iperf client, and waits for completion or convergence.
+
+        Runs iperf3 with --json-stream, so that its results are parsed as
+        they come: self.stream is an IPerfResultStream of the results of the
+        run so far. Once the rates received converged according to
+        convergence, iperf is interrupted, ending the run early.
+
+        Args:
+            ip: iperf server ip address.
+            iperf_args: A string representing arguments to start iperf
+                client. Eg: iperf_args = "-t 10 -p 5001 -w 512k/-u -b 200M -J".
+            tag: A string to further identify iperf results file
+            timeout: the maximum amount of time the iperf client can run.
+            iperf_binary: Location of iperf3 binary. If none, it is assumed the
+                the binary is in the path.
+            convergence: A RateConvergence deciding when to end the run, or
+                None to run iperf for its whole duration.
+            on_interval: A function called with self.stream whenever the
+                results of an interval are received.
+
+        Returns:
+            full_out_path: iperf result path, which IPerfResult can load.
+        """
+        if not iperf_binary:
+            logging.debug('No iperf3 binary specified.  '
+                          'Assuming iperf3 is in the path.')
+            iperf_binary = 'iperf3'
+        else:
+            logging.debug('Using iperf3 binary located at %s' % iperf_binary)
+        full_out_path = self._get_full_file_path(tag)
+        self.stream = IPerfResultStream()
+        process = self._start_streaming_process(
+            ip, get_json_stream_args(iperf_args), timeout, iperf_binary)
+        timer = threading.Timer(timeout, process.interrupt)
+        timer.daemon = True
+        timer.start()
+        interrupted = False
+        try:
+            with open(full_out_path, 'w') as out_file:
+                for line in process.lines:
+                    out_file.write(line)
+                    if self.stream.feed(line) != 'interval':
+                        continue
+                    if on_interval:
+                        on_interval(self.stream)
+                    if (convergence and not interrupted
+                            and convergence.has_converged(
+                                self.stream.instantaneous_rates)):
+                        logging.info(
+                            'iperf rates converged after %d intervals. '
+                            'Stopping iperf client.' %
+                            len(self.stream.intervals))
+                        interrupted = True
+                        process.interrupt()
+        finally:
+            timer.cancel()
+            process.close()
+
+        return full_out_path
+
 
 class IPerfClient(IPerfClientBase):
     """Class that handles iperf3 client operations."""
@@ -170,6 +320,15 @@ class IPerfClient(IPerfClientBase):
 
         return full_out_path
 
+    def _start_streaming_process(self, ip, iperf_args, timeout,
+                                 iperf_binary):
+        iperf_cmd = [str(iperf_binary), '-c', ip] + iperf_args.split(' ')
+        process = subprocess.Popen(iperf_cmd, stdout=subprocess.PIPE)
+        return _StreamingProcess(
+            _decode_lines(process.stdout),
+            lambda: process.send_signal(signal.SIGINT),
+            lambda: _close_process(process))
+
 
 class IPerfClientOverSsh(IPerfClientBase):
     """Class that handles iperf3 client operations on remote machines."""
@@ -215,17 +374,8 @@ class IPerfClientOverSsh(IPerfClientBase):
         full_out_path = self._get_full_file_path(tag)
 
         try:
-            if not self._ssh_session:
-                self.start_ssh()
+            self._connect_ssh()
             if self._use_paramiko:
-                if not ssh_is_connected(self._ssh_session):
-                    logging.info('Lost SSH connection to %s. Reconnecting.' %
-                                 self._ssh_settings.hostname)
-                    self._ssh_session.close()
-                    self._ssh_session = create_ssh_connection(
-                        ip_address=self._ssh_settings.hostname,
-                        ssh_username=self._ssh_settings.username,
-                        ssh_config=self._ssh_settings.ssh_config)
                 cmd_result_stdin, cmd_result_stdout, cmd_result_stderr = (
                     self._ssh_session.exec_command(iperf_cmd, timeout=timeout))
                 iperf_process = SshResults(cmd_result_stdin, cmd_result_stdout,
@@ -248,6 +398,48 @@ class IPerfClientOverSsh(IPerfClientBase):
 
         return full_out_path
 
+    def _start_streaming_process(self, ip, iperf_args, timeout,
+                                 iperf_binary):
+        iperf_cmd = '{}{} -c {} {}'.format(REMOTE_PID_PREFIX, iperf_binary, ip,
+                                            iperf_args)
+        self._connect_ssh()
+        if self._use_paramiko:
+            _, stdout, _ = self._ssh_session.exec_command(iperf_cmd,
+                                                          timeout=timeout)
+            lines = iter(stdout)
+            close = stdout.channel.close
+        else:
+            process = self._ssh_session.run_nb(iperf_cmd)
+            lines = _decode_lines(process.stdout)
+            close = lambda: _close_process(process)
+        pid = _read_remote_pid(lines)
+
+        def interrupt():
+            if pid is None:
+                return
+            kill_cmd = 'kill -INT {}'.format(pid)
+            if self._use_paramiko:
+                self._ssh_session.exec_command(kill_cmd)
+            else:
+                self._ssh_session.run(kill_cmd, ignore_status=True)
+
+        return _StreamingProcess(lines, interrupt, close)
+
+    def _connect_ssh(self):
+        """Starts an ssh session to the iperf client, or restarts it if the
+        paramiko connection was lost.
+        """
+        if not self._ssh_session:
+            self.start_ssh()
+        if self._use_paramiko and not ssh_is_connected(self._ssh_session):
+            logging.info('Lost SSH connection to %s. Reconnecting.' %
+                         self._ssh_settings.hostname)
+            self._ssh_session.close()
+            self._ssh_session = create_ssh_connection(
+                ip_address=self._ssh_settings.hostname,
+                ssh_username=self._ssh_settings.username,
+                ssh_config=self._ssh_settings.ssh_config)
+
     def start_ssh(self):
         """Starts an ssh session to the iperf client."""
         if not self._ssh_session:
@@ -331,3 +523,19 @@ class IPerfClientOverAdb(IPerfClientBase):
             out_file.write('\n'.join(clean_out))
 
         return full_out_path
+
+    def _start_streaming_process(self, ip, iperf_args, timeout,
+                                 iperf_binary):
+        iperf_cmd = '{}{} -c {} {}'.format(REMOTE_PID_PREFIX, iperf_binary, ip,
+                                            iperf_args)
+        process = self._android_device.adb.shell_nb(iperf_cmd)
+        lines = _decode_lines(process.stdout)
+        pid = _read_remote_pid(lines)
+
+        def interrupt():
+            if pid is not None:
+                self._android_device.adb.shell('kill -INT {}'.format(pid),
+                                               ignore_status=True)
+
+        return _StreamingProcess(lines, interrupt,
+                                 lambda: _close_process(process))
@@ -40,6 +40,8 @@ KILOBITS = 1024
 MEGABITS = KILOBITS * 1024
 GIGABITS = MEGABITS * 1024
 BITS_IN_BYTE = 8
+# The beginning of each line of iperf3 --json-stream output.
+JSON_STREAM_PREFIX = '{"event":'
 
 
 def create(configs):
@@ -89,6 +91,24 @@ def destroy(iperf_server_list):
             logging.exception('Unable to properly clean up %s.' % iperf_server)
 
 
+def _get_reporting_speed(network_speed_in_bits_per_second,
+                         reporting_speed_units):
+    """Converts a network speed from bits per second to reporting units.
+
+    See IPerfResult._get_reporting_speed.
+    """
+    speed_divisor = 1
+    if reporting_speed_units[1:].lower() == 'bytes':
+        speed_divisor = speed_divisor * BITS_IN_BYTE
+    if reporting_speed_units[0:1].lower() == 'k':
+        speed_divisor = speed_divisor * KILOBITS
+    if reporting_speed_units[0:1].lower() == 'm':
+        speed_divisor = speed_divisor * MEGABITS
+    if reporting_speed_units[0:1].lower() == 'g':
+        speed_divisor = speed_divisor * GIGABITS
+    return network_speed_in_bits_per_second / speed_divisor
+
+
 class IPerfResult(object):
     def __init__(self, result_path, reporting_speed_units='Mbytes'):
         """Loads iperf result from file.
@@ -106,6 +126,12 @@ class IPerfResult(object):
             try:
                 with open(result_path, 'r') as f:
                     iperf_output = f.readlines()
+                    if is_json_stream(iperf_output):
+                        stream = IPerfResultStream()
+                        for line in iperf_output:
+                            stream.feed(line)
+                        self.result = stream.get_json()
+                        return
                     if '}\n' in iperf_output:
                         iperf_output = iperf_output[:iperf_output.index('}\n'
                                                                         ) + 1]
@@ -143,16 +169,8 @@ class IPerfResult(object):
         Returns:
             The value of the throughput in the appropriate units.
         """
-        speed_divisor = 1
-        if self.reporting_speed_units[1:].lower() == 'bytes':
-            speed_divisor = speed_divisor * BITS_IN_BYTE
-        if self.reporting_speed_units[0:1].lower() == 'k':
-            speed_divisor = speed_divisor * KILOBITS
-        if self.reporting_speed_units[0:1].lower() == 'm':
-            speed_divisor = speed_divisor * MEGABITS
-        if self.reporting_speed_units[0:1].lower() == 'g':
-            speed_divisor = speed_divisor * GIGABITS
-        return network_speed_in_bits_per_second / speed_divisor
+        return _get_reporting_speed(network_speed_in_bits_per_second,
+                                    self.reporting_speed_units)
 
     def get_json(self):
         """Returns the raw json output from iPerf."""
@@ -253,6 +271,156 @@ class IPerfResult(object):
         return std_dev
 
 
+def is_json_stream(iperf_output):
+    """Returns True if iperf output lines are from an iperf3 --json-stream run.
+    """
+    for line in iperf_output:
+        if line.strip():
+            return line.lstrip().startswith(JSON_STREAM_PREFIX)
+    return False
+
+
+class IPerfResultStream(object):
+    """Parses the output of an iperf3 --json-stream run as it is produced.
+
+    Each line of --json-stream output is a JSON object with an 'event' name
+    and its 'data': 'start', then an 'interval' per reporting interval, then
+    'end', or an 'error'. Lines are fed as they are read, so the rates of the
+    intervals received so far can be read while iperf is running.
+    """
+    def __init__(self, reporting_speed_units='Mbytes'):
+        self.reporting_speed_units = reporting_speed_units
+        self.start = None
+        self.intervals = []
+        self.end = None
+        self.error = None
+
+    def feed(self, line):
+        """Parses a line of iperf output.
+
+        Args:
+            line: A line of iperf3 --json-stream output.
+
+        Returns:
+            The name of the event the line holds, or None if it holds none.
+        """
+        line = line.strip()
+        if not line.startswith(JSON_STREAM_PREFIX):
+            return None
+        try:
+            event = json.loads(line.replace('nan', '0'))
+        except ValueError:
+            logging.debug('Skipping partial iperf output line: %s', line)
+            return None
+        name = event.get('event')
+        data = event.get('data')
+        if name == 'start':
+            self.start = data
+        elif name == 'interval':
+            self.intervals.append(data)
+        elif name == 'end':
+            self.end = data
+        elif name == 'error':
+            self.error = data
+        return name
+
+    @property
+    def finished(self):
+        """True once iperf reported the end of the run, or an error."""
+        return self.end is not None or self.error is not None
+
+    @property
+    def instantaneous_rates(self):
+        """Rates of the intervals received so far, in reporting units."""
+        return [
+            _get_reporting_speed(interval['sum']['bits_per_second'],
+                                 self.reporting_speed_units)
+            for interval in self.intervals
+        ]
+
+    def get_json(self):
+        """Returns the results received so far in iperf3 -J format.
+
+        If iperf was stopped before reporting the end of the run, e.g. once
+        its rates converged, the end summary is computed from the intervals
+        received.
+        """
+        result = {'start': self.start or {}, 'intervals': self.intervals}
+        if self.end is not None:
+            result['end'] = self.end
+        elif self.intervals:
+            seconds = math.fsum(interval['sum']['seconds']
+                                for interval in self.intervals)
+            transferred = math.fsum(interval['sum']['bytes']
+                                    for interval in self.intervals)
+            result['end'] = {
+                'sum': {
+                    'seconds': seconds,
+                    'bytes': transferred,
+                    'bits_per_second':
+                    transferred * BITS_IN_BYTE / seconds if seconds else 0
+                }
+            }
+        if self.error is not None:
+            result['error'] = self.error
+        return result
+
+    def get_result(self):
+        """Returns an IPerfResult of the results received so far."""
+        return IPerfResult(json.dumps(self.get_json()),
+                           self.reporting_speed_units)
+
+
+class RateConvergence(object):
+    """Decides when the rates of an iperf run are known precisely enough.
+
+    The rates are considered converged once the confidence interval of their
+    mean, assuming independent and normally distributed rates, is within
+    tolerance of the mean.
+
+    Attributes:
+        confidence: The confidence level of the interval, e.g. 0.95.
+        tolerance: The maximum half width of the interval, as a fraction of
+            the mean rate.
+        min_intervals: The minimum number of rates to decide on.
+        ignored_intervals: The number of first rates to ignore, e.g. while
+            TCP ramps up.
+    """
+    def __init__(self,
+                 confidence=0.95,
+                 tolerance=0.05,
+                 min_intervals=5,
+                 ignored_intervals=2):
+        self.confidence = confidence
+        self.tolerance = tolerance
+        self.min_intervals = max(min_intervals, 2)
+        self.ignored_intervals = ignored_intervals
+
+    def get_interval_half_width(self, rates):
+        """Returns the half width of the confidence interval of the mean."""
+        # Imported here as scipy is slow to import and seldom needed.
+        from scipy import stats
+        count = len(rates)
+        mean = math.fsum(rates) / count
+        std_dev = math.sqrt(
+            math.fsum((rate - mean)**2 for rate in rates) / (count - 1))
+        t_value = stats.t.ppf((1 + self.confidence) / 2, count - 1)
+        return t_value * std_dev / math.sqrt(count)
+
+    def has_converged(self, rates):
+        """Returns True if the mean of the rates is known precisely enough.
+
+        Args:
+            rates: The instantaneous rates received so far.
+        """
+        rates = rates[self.ignored_intervals:]
+        if len(rates) < self.min_intervals:
+            return False
+        mean = math.fsum(rates) / len(rates)
+        return (self.get_interval_half_width(rates) <=
+                self.tolerance * abs(mean))
+
+
 class IPerfServerBase(object):
     # Keeps track of the number of IPerfServer logs to prevent file name
     # collisions.
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""A compact binary format for Monsoon captures.
+
+A capture is made of two files:
+
+    <path>      The record file. A fixed-size header followed by fixed-width
+                (sample_time, current) records, in the order they were sampled.
+    <path>.idx  The sparse time index. The sample_time of every
+                index_stride-th record, stored as float64 values.
+
+Header layout (little-endian, padded to HEADER_SIZE bytes):
+
+    Offset │ Format  │ Field
+    ───────┼─────────┼──────────────────────────────────────────────────────
+       0   │ char[8] │ magic, always MAGIC
+       8   │ uint16  │ format version
+      10   │ uint16  │ current item size in bytes (8 for float64, 4 float32)
+      12   │ uint32  │ index_stride
+      16   │ float64 │ time_offset, added to every stored sample_time on read
+
+Records are read with numpy.memmap, so opening a capture takes constant time
+and memory regardless of its size.
+"""
+
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b'MONSCAP\x00'
+VERSION = 1
+HEADER_SIZE = 64
+INDEX_SUFFIX = '.idx'
+# The suffix added to a text output path to get its capture file path.
+CAPTURE_SUFFIX = '.mcap'
+
+_HEADER_FORMAT = '<8sHHId'
+_TIME_OFFSET_POSITION = struct.calcsize('<8sHHI')
+_DEFAULT_INDEX_STRIDE = 4096
+
+
+class CaptureError(Exception):
+    """Raised when a file is not a valid Monsoon capture."""
+
+
+def record_dtype(current_size=8):
+    """Returns the numpy dtype of a single capture record.
+
+    Args:
+        current_size: The item size of the current value, either 8 (float64)
+            or 4 (float32).
+    """
+    if current_size not in (4, 8):
+        raise CaptureError('Invalid current item size %s.' % current_size)
+    return np.dtype([('sample_time', '<f8'), ('current', '<f%s' % current_size)
+                     ])
+
+
+def capture_path_for(path):
+    """Returns the capture file path associated with a text output path."""
+    return path + CAPTURE_SUFFIX
+
+
+def is_capture_file(path):
+    """Returns True if the given path is a Monsoon capture file."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except (IOError, OSError):
+        return False
+
+
+def find_capture_file(path):
+    """Returns the capture file for the given path, or None if there is none.
+
+    Args:
+        path: Either the path to a capture file, or a text output path that
+            has a capture file stored next to it. See capture_path_for().
+    """
+    if is_capture_file(path):
+        return path
+    if is_capture_file(capture_path_for(path)):
+        return capture_path_for(path)
+    return None
+
+
+def set_time_offset(path, time_offset):
+    """Sets the time offset of an existing capture in-place.
+
+    Only the header is rewritten; the records are left untouched.
+    """
+    with open(path, 'r+b') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise CaptureError('%s is not a Monsoon capture file.' % path)
+        f.seek(_TIME_OFFSET_POSITION)
+        f.write(struct.pack('<d', time_offset))
+
+
+class CaptureWriter(object):
+    """Writes readings into a capture file and its time index.
+
+    Attributes:
+        path: The path of the capture file.
+        index_stride: The number of records between time index entries.
+        num_records: The number of records written so far.
+    """
+
+    def __init__(self,
+                 path,
+                 current_dtype=np.float64,
+                 index_stride=_DEFAULT_INDEX_STRIDE,
+                 time_offset=0):
+        """Creates a CaptureWriter.
+
+        Args:
+            path: The path to write the capture file to.
+            current_dtype: np.float64 or np.float32. The precision to store
+                current values with.
+            index_stride: The number of records between time index entries.
+            time_offset: The offset added to every sample time on read.
+        """
+        self.path = path
+        self.index_stride = index_stride
+        self.num_records = 0
+        self._dtype = record_dtype(np.dtype(current_dtype).itemsize)
+        self._fd = open(path, 'wb')
+        self._index_fd = open(path + INDEX_SUFFIX, 'wb')
+
+        header = struct.pack(_HEADER_FORMAT, MAGIC, VERSION,
+                             self._dtype['current'].itemsize, index_stride,
+                             time_offset)
+        self._fd.write(header.ljust(HEADER_SIZE, b'\x00'))
+
+    def write(self, sample_times, currents):
+        """Appends the given samples to the capture.
+
+        Args:
+            sample_times: An array of sample times, in seconds.
+            currents: An array of the current values, in amps.
+        """
+        records = np.empty(len(sample_times), dtype=self._dtype)
+        records['sample_time'] = sample_times
+        records['current'] = currents
+        records.tofile(self._fd)
+
+        # The position of the first indexed record within this batch.
+        first_indexed = -self.num_records % self.index_stride
+        np.asarray(records['sample_time'][first_indexed::self.index_stride],
+                   dtype='<f8').tofile(self._index_fd)
+        self.num_records += len(records)
+
+    def flush(self):
+        self._fd.flush()
+        self._index_fd.flush()
+
+    def close(self):
+        self._fd.close()
+        self._index_fd.close()
+
+
+class CaptureFile(object):
+    """A read-only, memory-mapped view of a capture file.
+
+    Indexing a CaptureFile returns (sample_time, current) tuples, so it may be
+    used wherever a list of samples is expected. Bulk readers should use
+    get_range() and iter_chunks(), which return numpy arrays.
+
+    Attributes:
+        path: The path of the capture file.
+        index_stride: The number of records between time index entries.
+        time_offset: The offset added to every stored sample time.
+        records: The numpy.memmap of the stored records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or not header.startswith(MAGIC):
+            raise CaptureError('%s is not a Monsoon capture file.' % path)
+        (_, version, current_size, self.index_stride,
+         self.time_offset) = struct.unpack_from(_HEADER_FORMAT, header)
+        if version != VERSION:
+            raise CaptureError('Unsupported capture version %s.' % version)
+
+        dtype = record_dtype(current_size)
+        num_records = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+        if num_records:
+            self.records = np.memmap(path,
+                                     dtype=dtype,
+                                     mode='r',
+                                     offset=HEADER_SIZE,
+                                     shape=(num_records, ))
+        else:
+            # numpy.memmap cannot map an empty region.
+            self.records = np.empty(0, dtype=dtype)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        """Loads the time index, rebuilding it if it is missing or stale."""
+        expected_length = -(-len(self.records) // self.index_stride)
+        index_path = self.path + INDEX_SUFFIX
+        if os.path.exists(index_path):
+            index = np.fromfile(index_path, dtype='<f8')
+            if len(index) == expected_length:
+                return index
+        return np.array(self.records['sample_time'][::self.index_stride])
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            records = self.records[index]
+            return list(
+                zip((records['sample_time'] + self.time_offset).tolist(),
+                    records['current'].tolist()))
+        record = self.records[index]
+        return (float(record['sample_time']) + self.time_offset,
+                float(record['current']))
+
+    def __iter__(self):
+        for sample_times, currents in self.iter_chunks():
+            yield from zip(sample_times.tolist(), currents.tolist())
+
+    def find_range(self, start, end):
+        """Returns the [low, high) record indices with start <= time <= end.
+
+        Only the time index and the records near the boundaries are read.
+        """
+        low = self._search(start - self.time_offset, 'left')
+        high = self._search(end - self.time_offset, 'right')
+        return low, max(low, high)
+
+    def _search(self, stored_time, side):
+        """Binary searches the records for the given stored time."""
+        # Narrow down to a single index_stride-sized window with the index.
+        block = np.searchsorted(self._index, stored_time, side=side)
+        low = max(block - 1, 0) * self.index_stride
+        high = min(block * self.index_stride + 1, len(self.records))
+        window = self.records['sample_time'][low:high]
+        return low + int(np.searchsorted(window, stored_time, side=side))
+
+    def get_range(self, start, end):
+        """Returns the samples taken between start and end, inclusive.
+
+        Returns:
+            A tuple of (sample_times, currents) numpy arrays.
+        """
+        low, high = self.find_range(start, end)
+        records = self.records[low:high]
+        return (records['sample_time'] + self.time_offset,
+                np.array(records['current'], dtype=np.float64))
+
+    def iter_chunks(self, chunk_size=1 << 20):
+        """Yields the samples in (sample_times, currents) array chunks."""
+        for low in range(0, len(self.records), chunk_size):
+            records = self.records[low:low + chunk_size]
+            yield (records['sample_time'] + self.time_offset,
+                   np.array(records['current'], dtype=np.float64))
+
+    def export_text(self, path):
+        """Writes the capture in the '<sample_time> <current>' text format.
+
+        Sample times are written with a fixed 9 decimal places, matching the
+        precision of Tee's output.
+
+        Args:
+            path: The path to write the text file to.
+        """
+        with open(path, 'w') as f:
+            for sample_times, currents in self.iter_chunks():
+                f.write(''.join('%.9f %s\n' % sample for sample in zip(
+                    sample_times.tolist(), currents.tolist())))
@@ -14,6 +14,8 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import numpy as np
+
 
 class UncalibratedSampleChunk(object):
     """An uncalibrated sample collection stored with its calibration data.
@@ -29,3 +31,106 @@ class UncalibratedSampleChunk(object):
     def __init__(self, samples, calibration_data):
         self.samples = samples
         self.calibration_data = calibration_data
+
+
+class ReadingBlock(object):
+    """A contiguous block of fully calibrated readings.
+
+    Rather than holding one reading object per sample, each reading value is
+    stored in its own contiguous numpy array. These objects are created by the
+    CalibrationApplier Transformers and passed between all engine
+    Transformers.
+
+    For compatibility, indexing or iterating over a ReadingBlock lazily creates
+    the per-sample reading objects (e.g. HvpmReading) for the requested
+    samples.
+
+    Attributes:
+        readings: A 2D numpy array of shape (number of reading values, number
+            of samples). Each row holds one reading value, in the order of:
+                [0] Main Current
+                [1] USB Current
+                [2] Aux Current
+                [3] Main Voltage
+                [4] USB Voltage (not available on all devices)
+        sample_time: A numpy array of the time each sample was collected.
+        reading_type: The per-sample reading class constructed when the block
+            is indexed. Takes the arguments (reading_list, time_of_reading).
+    """
+
+    def __init__(self, readings, sample_time, reading_type):
+        self.readings = np.asarray(readings, dtype=np.float64)
+        self.sample_time = np.asarray(sample_time, dtype=np.float64)
+        self.reading_type = reading_type
+
+    @staticmethod
+    def from_readings(readings, reading_type=None):
+        """Creates a ReadingBlock from a list of per-sample reading objects.
+
+        Args:
+            readings: A list of reading objects (e.g. HvpmReadings), or a
+                ReadingBlock, which is returned as-is.
+            reading_type: The reading class of the returned block. Defaults to
+                the class of the first reading.
+        """
+        if isinstance(readings, ReadingBlock):
+            return readings
+        if reading_type is None:
+            reading_type = type(readings[0]) if len(readings) else None
+        values = [reading._reading_list for reading in readings]
+        width = len(values[0]) if values else 5
+        return ReadingBlock(
+            np.array(values, dtype=np.float64).reshape(-1, width).T,
+            [reading.sample_time for reading in readings], reading_type)
+
+    @staticmethod
+    def concatenate(blocks):
+        """Returns a single ReadingBlock containing all of the given blocks."""
+        return ReadingBlock(
+            np.concatenate([block.readings for block in blocks], axis=1),
+            np.concatenate([block.sample_time for block in blocks]),
+            blocks[0].reading_type)
+
+    @property
+    def main_current(self):
+        return self.readings[0]
+
+    @property
+    def usb_current(self):
+        return self.readings[1]
+
+    @property
+    def aux_current(self):
+        return self.readings[2]
+
+    @property
+    def main_voltage(self):
+        return self.readings[3]
+
+    @property
+    def usb_voltage(self):
+        return self.readings[4]
+
+    def __len__(self):
+        return len(self.sample_time)
+
+    def __getitem__(self, index):
+        """Returns a reading object, or a ReadingBlock if index is a slice."""
+        if isinstance(index, slice):
+            return ReadingBlock(self.readings[:, index],
+                                self.sample_time[index], self.reading_type)
+        return self.reading_type(
+            self.readings[:, index].tolist(), float(self.sample_time[index]))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __add__(self, other):
+        return ReadingBlock(self.readings + other.readings,
+                            self.sample_time + other.sample_time,
+                            self.reading_type)
+
+    def __truediv__(self, other):
+        return ReadingBlock(self.readings / other, self.sample_time / other,
+                            self.reading_type)
@@ -14,10 +14,19 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import pickle
 import queue
+import struct
+import time
 from concurrent.futures import ThreadPoolExecutor
 import multiprocessing
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # multiprocessing.shared_memory is only available on Python 3.8+.
+    shared_memory = None
+
 
 class AssemblyLine(object):
     """A class for passing data through a chain of threads or processes,
@@ -88,6 +97,8 @@ class ProcessAssemblyLine(AssemblyLine):
                                      [node.input_stream])
         process_pool.close()
         process_pool.join()
+        for node in self.nodes:
+            node.input_stream.close()
 
 
 class ThreadAssemblyLine(AssemblyLine):
@@ -99,6 +110,8 @@ class ThreadAssemblyLine(AssemblyLine):
             for node in self.nodes:
                 thread_pool.submit(node.transformer.transform,
                                    node.input_stream)
+        for node in self.nodes:
+            node.input_stream.close()
 
 
 class AssemblyLineBuilder(object):
@@ -122,19 +135,36 @@ class AssemblyLineBuilder(object):
 
             Returns:
                 A Queue object.
+
+    _stream_generator: The callable that creates the BufferStreams between
+        nodes, or None to create queue-backed BufferStreams. Should be in the
+        form of:
+
+            Args:
+                None.
+
+            Returns:
+                A BufferStream object.
     """
 
-    def __init__(self, queue_generator, assembly_line_generator):
+    def __init__(self,
+                 queue_generator,
+                 assembly_line_generator,
+                 stream_generator=None):
         """Creates an AssemblyLineBuilder.
 
         Args:
             queue_generator: A callable of type lambda: Queue().
             assembly_line_generator: A callable of type
                 lambda list<AssemblyLine.Node>: AssemblyLine.
+            stream_generator: A callable of type lambda: BufferStream(), e.g.
+                SharedMemoryBufferStream. Defaults to creating BufferStreams
+                from queue_generator's queues.
         """
         super().__init__()
         self._assembly_line_generator = assembly_line_generator
         self._queue_generator = queue_generator
+        self._stream_generator = stream_generator
 
         self.nodes = []
         self._built = False
@@ -147,6 +177,12 @@ class AssemblyLineBuilder(object):
         """Returns a new Queue object for passing information between nodes."""
         return self._queue_generator()
 
+    def __generate_stream(self):
+        """Returns a new BufferStream for passing buffers between nodes."""
+        if self._stream_generator is not None:
+            return self._stream_generator()
+        return BufferStream(self.__generate_queue())
+
     @property
     def queue_generator(self):
         """Returns the callable used for generating queues."""
@@ -188,7 +224,7 @@ class AssemblyLineBuilder(object):
         if self.built:
             raise ValueError('Cannot add additional nodes after the '
                              'AssemblyLine has been built.')
-        stream = BufferStream(self.__generate_queue())
+        stream = self.__generate_stream()
         self.nodes[-1].transformer.set_output_stream(stream)
         self.nodes.append(AssemblyLine.Node(transformer, stream))
         return self
@@ -225,9 +261,17 @@ class ProcessAssemblyLineBuilder(AssemblyLineBuilder):
             with one another over multiple processes.
     """
 
-    def __init__(self):
+    def __init__(self, stream_generator=None):
+        """Creates a ProcessAssemblyLineBuilder.
+
+        Args:
+            stream_generator: A callable of type lambda: BufferStream(). Use
+                SharedMemoryBufferStream to pass buffers between processes
+                without pickling them through the manager's queues.
+        """
         self.manager = multiprocessing.Manager()
-        super().__init__(self.manager.Queue, ProcessAssemblyLine)
+        super().__init__(self.manager.Queue, ProcessAssemblyLine,
+                         stream_generator)
 
 
 class IndexedBuffer(object):
@@ -307,6 +351,218 @@ class BufferStream(object):
         """
         return self._buffer_queue.get()
 
+    def qsize(self):
+        """Returns the approximate number of buffers waiting in the stream."""
+        return self._buffer_queue.qsize()
+
+    def close(self):
+        """Releases the resources of the stream, once it is no longer used."""
+        pass
+
+
+class SharedMemoryBufferStream(BufferStream):
+    """A BufferStream backed by a ring buffer in shared memory.
+
+    Buffers are copied into fixed-size slots of a multiprocessing.shared_memory
+    block, and the two ends of the stream only exchange the write and read
+    counts, which are also stored in the block. This avoids pickling buffers
+    and sending them through a manager process, as queue-backed streams do.
+
+    Buffers that are lists of bytes (or None), like PacketCollector's raw
+    packets, are copied as-is. Any other buffer is pickled into its slot.
+
+    The stream must have a single writer and a single reader, which is always
+    the case within an AssemblyLine.
+
+    Layout of the shared memory block:
+
+        [write count: uint64][read count: uint64][slot 0]...[slot n - 1]
+
+    Layout of a slot:
+
+        [index: int64][kind: uint8][pad][item count or size: uint32][payload]
+
+    Where the payload of a list of bytes is an int32 length per item (-1 for
+    None), followed by the items' bytes.
+    """
+
+    # The slot kinds.
+    _END = 0
+    _BYTES_LIST = 1
+    _PICKLED = 2
+
+    _COUNTERS_SIZE = 16
+    _SLOT_HEADER = struct.Struct('<qB3xI')
+
+    # The minimum and maximum time to sleep between polls of the counters.
+    _MIN_POLL_DELAY = 0.00001
+    _MAX_POLL_DELAY = 0.001
+
+    def __init__(self, num_slots=1024, slot_size=8192):
+        """Creates a new SharedMemoryBufferStream.
+
+        Args:
+            num_slots: The number of buffers the stream can hold at once.
+                Writers wait for a free slot when the stream is full.
+            slot_size: The size in bytes of each slot. Must fit the largest
+                buffer sent over the stream, see bytes_list_slot_size().
+        """
+        if shared_memory is None:
+            raise NotImplementedError(
+                'SharedMemoryBufferStream requires Python 3.8 or newer.')
+        super().__init__(None)
+        self._num_slots = num_slots
+        self._slot_size = slot_size
+        self._shared_memory = shared_memory.SharedMemory(
+            create=True, size=self._COUNTERS_SIZE + num_slots * slot_size)
+        self._buf = self._shared_memory.buf
+        struct.pack_into('<QQ', self._buf, 0, 0, 0)
+        self._is_owner = True
+
+    @staticmethod
+    def is_supported():
+        """Returns True if shared memory is available on this Python."""
+        return shared_memory is not None
+
+    @classmethod
+    def bytes_list_slot_size(cls, length, max_item_size):
+        """Returns the slot size that fits any list of bytes of this shape.
+
+        Args:
+            length: The number of items in the list.
+            max_item_size: The size in bytes of the largest item.
+        """
+        return cls._SLOT_HEADER.size + length * (4 + max_item_size)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Memoryviews cannot be pickled, and only the creator may unlink.
+        del state['_buf']
+        state['_is_owner'] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._buf = self._shared_memory.buf
+
+    def initialize(self):
+        """Touches the shared memory, so the first access is not delayed."""
+        self._get_count(0)
+
+    def _get_count(self, offset):
+        return struct.unpack_from('<Q', self._buf, offset)[0]
+
+    def _wait_until(self, condition):
+        """Polls until condition() is True, backing off exponentially."""
+        delay = 0
+        while not condition():
+            time.sleep(delay)
+            delay = min(delay * 2 or self._MIN_POLL_DELAY,
+                        self._MAX_POLL_DELAY)
+
+    def _write_slot(self, index, kind, count, items=(), payload=b''):
+        """Writes a slot once one is free, then publishes it to the reader."""
+        write_count = self._get_count(0)
+        self._wait_until(
+            lambda: write_count - self._get_count(8) < self._num_slots)
+        offset = (self._COUNTERS_SIZE +
+                  write_count % self._num_slots * self._slot_size)
+        self._SLOT_HEADER.pack_into(self._buf, offset, index, kind, count)
+        offset += self._SLOT_HEADER.size
+        if kind == self._BYTES_LIST:
+            lengths = [-1 if item is None else len(item) for item in items]
+            struct.pack_into('<%di' % count, self._buf, offset, *lengths)
+            offset += 4 * count
+            payload = b''.join(item for item in items if item)
+        self._buf[offset:offset + len(payload)] = payload
+        struct.pack_into('<Q', self._buf, 0, write_count + 1)
+
+    @staticmethod
+    def _bytes_list_size(buffer):
+        """Returns the payload size of a list of bytes, or None otherwise."""
+        if not isinstance(buffer, list):
+            return None
+        size = 4 * len(buffer)
+        for item in buffer:
+            if item is None:
+                continue
+            if not isinstance(item, (bytes, bytearray)):
+                return None
+            size += len(item)
+        return size
+
+    def end_stream(self):
+        """Closes the stream by sending an end-of-stream slot."""
+        self._write_slot(0, self._END, 0)
+
+    def add_indexed_buffer(self, buffer):
+        """Copies the given IndexedBuffer into the next free slot.
+
+        Raises:
+            ValueError if the buffer does not fit in a slot.
+        """
+        items = buffer.buffer
+        payload_size = self._bytes_list_size(items)
+        if payload_size is None:
+            payload = pickle.dumps(items, pickle.HIGHEST_PROTOCOL)
+            payload_size = len(payload)
+            kind, count = self._PICKLED, payload_size
+        else:
+            payload = b''
+            kind, count = self._BYTES_LIST, len(items)
+        if payload_size + self._SLOT_HEADER.size > self._slot_size:
+            raise ValueError('A buffer of %s bytes does not fit in slots of %s '
+                             'bytes.' % (payload_size, self._slot_size))
+        self._write_slot(buffer.index, kind, count, items, payload)
+
+    def remove_indexed_buffer(self):
+        """Removes the next IndexedBuffer from the stream.
+
+        This operation blocks until data is received.
+
+        Returns:
+            an IndexedBuffer, or None at the end of the stream.
+        """
+        read_count = self._get_count(8)
+        self._wait_until(lambda: self._get_count(0) > read_count)
+        offset = (self._COUNTERS_SIZE +
+                  read_count % self._num_slots * self._slot_size)
+        index, kind, count = self._SLOT_HEADER.unpack_from(self._buf, offset)
+        offset += self._SLOT_HEADER.size
+        if kind == self._END:
+            buffer = None
+        elif kind == self._BYTES_LIST:
+            lengths = struct.unpack_from('<%di' % count, self._buf, offset)
+            offset += 4 * count
+            payload = bytes(
+                self._buf[offset:offset + sum(max(length, 0)
+                                              for length in lengths)])
+            items = []
+            position = 0
+            for length in lengths:
+                if length < 0:
+                    items.append(None)
+                    continue
+                items.append(payload[position:position + length])
+                position += length
+            buffer = IndexedBuffer(index, items)
+        else:
+            buffer = IndexedBuffer(
+                index, pickle.loads(self._buf[offset:offset + count]))
+        struct.pack_into('<Q', self._buf, 8, read_count + 1)
+        return buffer
+
+    def qsize(self):
+        """Returns the number of buffers waiting in the stream."""
+        return self._get_count(0) - self._get_count(8)
+
+    def close(self):
+        """Unmaps the shared memory, and frees it if this end created it."""
+        self._buf.release()
+        self._shared_memory.close()
+        if self._is_owner:
+            self._shared_memory.unlink()
+
 
 class DevNullBufferStream(BufferStream):
     """A BufferStream that is always empty."""
@@ -329,3 +585,7 @@ class DevNullBufferStream(BufferStream):
     def remove_indexed_buffer(self):
         """Always returns the end-of-stream marker."""
         return None
+
+    def qsize(self):
+        """Always returns 0. The stream is always empty."""
+        return 0
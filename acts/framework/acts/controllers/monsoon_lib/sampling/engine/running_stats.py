@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import math
+
+import numpy as np
+
+
+class RunningStats(object):
+    """Numerically stable running statistics over chunks of samples.
+
+    Each chunk is reduced to (count, mean, M2) with numpy, then merged into the
+    running totals with Chan et al.'s parallel variant of Welford's algorithm.
+    Unlike the sum-of-squares formula, this does not lose precision as the
+    number of samples grows.
+
+    Attributes:
+        count: The number of samples seen.
+        mean: The mean of the samples seen.
+        m2: The sum of squared differences from the mean.
+        min: The smallest sample seen, or None.
+        max: The largest sample seen, or None.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add_samples(self, samples):
+        """Adds a chunk of samples to the statistics.
+
+        Args:
+            samples: A numpy array of values.
+        """
+        if not len(samples):
+            return
+        chunk = RunningStats()
+        chunk.count = len(samples)
+        chunk.mean = float(np.mean(samples))
+        chunk.m2 = float(np.sum(np.square(samples - chunk.mean)))
+        chunk.min = float(np.min(samples))
+        chunk.max = float(np.max(samples))
+        self.merge(chunk)
+
+    def merge(self, other):
+        """Merges the statistics of another RunningStats into this one."""
+        if not other.count:
+            return
+        if not self.count:
+            self.count = other.count
+            self.mean = other.mean
+            self.m2 = other.m2
+            self.min = other.min
+            self.max = other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        """The sample variance, or 0 if fewer than 2 samples were seen."""
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stdev(self):
+        """The sample standard deviation."""
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch(object):
+    """A mergeable sketch for estimating quantiles of a stream of samples.
+
+    Values are counted in logarithmically sized buckets, so every quantile is
+    estimated within the given relative accuracy, using memory proportional to
+    the log of the range of the values (see the DDSketch paper, Masson et al.
+    2019). Sketches of different chunks or segments can be merged exactly.
+
+    Attributes:
+        relative_accuracy: The maximum relative error of a quantile estimate.
+        count: The number of samples seen.
+    """
+
+    # Values closer to zero than this are all counted as zero.
+    MIN_INDEXABLE_VALUE = 1e-12
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.count = 0
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._positive_buckets = {}
+        self._negative_buckets = {}
+        self._zero_count = 0
+
+    def add_samples(self, samples):
+        """Adds a chunk of samples to the sketch.
+
+        Args:
+            samples: A numpy array of values.
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        positive = samples[samples > self.MIN_INDEXABLE_VALUE]
+        negative = -samples[samples < -self.MIN_INDEXABLE_VALUE]
+        self._add_to_buckets(self._positive_buckets, positive)
+        self._add_to_buckets(self._negative_buckets, negative)
+        self._zero_count += len(samples) - len(positive) - len(negative)
+        self.count += len(samples)
+
+    def _add_to_buckets(self, buckets, magnitudes):
+        if not len(magnitudes):
+            return
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        for key, count in zip(*np.unique(keys, return_counts=True)):
+            buckets[int(key)] = buckets.get(int(key), 0) + int(count)
+
+    def merge(self, other):
+        """Merges the counts of another QuantileSketch into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError('Cannot merge sketches with different accuracies.')
+        for buckets, other_buckets in (
+                (self._positive_buckets, other._positive_buckets),
+                (self._negative_buckets, other._negative_buckets)):
+            for key, count in other_buckets.items():
+                buckets[key] = buckets.get(key, 0) + count
+        self._zero_count += other._zero_count
+        self.count += other.count
+
+    def _bucket_value(self, key):
+        """Returns the representative magnitude of the bucket at key."""
+        return 2 * self._gamma**key / (self._gamma + 1)
+
+    def quantile(self, q):
+        """Returns the estimated value at quantile q, or None if empty.
+
+        Args:
+            q: The quantile, between 0 and 1.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError('Quantile must be between 0 and 1. Got %s.' % q)
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self._negative_buckets, reverse=True):
+            seen += self._negative_buckets[key]
+            if seen > rank:
+                return -self._bucket_value(key)
+        seen += self._zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self._positive_buckets):
+            seen += self._positive_buckets[key]
+            if seen > rank:
+                return self._bucket_value(key)
+        return self._bucket_value(max(self._positive_buckets))
+
+
+class SegmentStats(object):
+    """The running statistics and quantile sketch of a segment of samples.
+
+    Attributes:
+        running_stats: The RunningStats of the segment.
+        sketch: The QuantileSketch of the segment.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.running_stats = RunningStats()
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add_samples(self, samples):
+        self.running_stats.add_samples(samples)
+        self.sketch.add_samples(samples)
+
+    def merge(self, other):
+        self.running_stats.merge(other.running_stats)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def count(self):
+        return self.running_stats.count
+
+    @property
+    def mean(self):
+        return self.running_stats.mean
+
+    @property
+    def stdev(self):
+        return self.running_stats.stdev
+
+    @property
+    def min(self):
+        return self.running_stats.min
+
+    @property
+    def max(self):
+        return self.running_stats.max
+
+    def percentile(self, percent):
+        """Returns the estimated value at the given percentile (0 to 100)."""
+        return self.sketch.quantile(percent / 100)
@@ -14,13 +14,140 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import json
 import logging
+import os
+import time
 
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import BufferList
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import BufferStream
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import DevNullBufferStream
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import IndexedBuffer
 
+# The suffix added to a capture path to get the path of its stage report.
+STAGE_REPORT_SUFFIX = '.stages.jsonl'
+
+# The path StageStats are appended to. None when instrumentation is disabled.
+_stage_report_path = None
+
+
+def enable_instrumentation(report_path):
+    """Enables the per-stage instrumentation of Transformers.
+
+    Every Transformer that starts transforming afterwards, including those in
+    processes forked afterwards, records its StageStats. When it ends, it
+    appends them to report_path as a line of JSON.
+
+    Args:
+        report_path: The path of the report. Any existing report is cleared.
+    """
+    global _stage_report_path
+    open(report_path, 'w').close()
+    _stage_report_path = report_path
+
+
+def disable_instrumentation():
+    """Disables the per-stage instrumentation of Transformers."""
+    global _stage_report_path
+    _stage_report_path = None
+
+
+def read_stage_report(report_path):
+    """Returns the list of StageStats dicts written to a stage report."""
+    with open(report_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class StageStats(object):
+    """Statistics of a single Transformer's run through an AssemblyLine.
+
+    Attributes:
+        stage: The name of the Transformer class.
+        buffers_processed: The number of buffers transformed.
+        busy_seconds: The time spent in _transform_buffer.
+        input_wait_seconds: The time spent waiting on the input stream.
+        output_wait_seconds: The time spent writing to the output stream.
+        queue_depths: A list of (seconds since start, input stream depth)
+            samples, taken at most every QUEUE_DEPTH_INTERVAL seconds.
+        start_time: The time the Transformer started.
+        end_time: The time the Transformer ended.
+    """
+
+    QUEUE_DEPTH_INTERVAL = 0.1
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.buffers_processed = 0
+        self.busy_seconds = 0
+        self.input_wait_seconds = 0
+        self.output_wait_seconds = 0
+        self.queue_depths = []
+        self.start_time = time.time()
+        self.end_time = None
+        self._next_queue_depth_time = self.start_time
+
+    def sample_queue_depth(self, stream):
+        """Records the depth of the stream, if it is time for a new sample."""
+        now = time.time()
+        if now < self._next_queue_depth_time:
+            return
+        self._next_queue_depth_time = now + self.QUEUE_DEPTH_INTERVAL
+        try:
+            depth = stream.qsize()
+        except (AttributeError, NotImplementedError):
+            return
+        self.queue_depths.append((round(now - self.start_time, 6), depth))
+
+    def to_dict(self):
+        return {
+            'stage': self.stage,
+            'pid': os.getpid(),
+            'buffers_processed': self.buffers_processed,
+            'busy_seconds': self.busy_seconds,
+            'input_wait_seconds': self.input_wait_seconds,
+            'output_wait_seconds': self.output_wait_seconds,
+            'wall_seconds': (self.end_time or time.time()) - self.start_time,
+            'queue_depths': self.queue_depths,
+        }
+
+    def write(self, report_path):
+        """Appends the stats to the report as a single line of JSON."""
+        with open(report_path, 'a') as f:
+            f.write(json.dumps(self.to_dict()) + '\n')
+
+
+class _InstrumentedBufferStream(BufferStream):
+    """Wraps a BufferStream, recording the time spent waiting on it."""
+
+    def __init__(self, stream, stats):
+        super().__init__(None)
+        self._stream = stream
+        self._stats = stats
+
+    def initialize(self):
+        self._stream.initialize()
+
+    def end_stream(self):
+        self._stream.end_stream()
+
+    def add_indexed_buffer(self, buffer):
+        start = time.perf_counter()
+        self._stream.add_indexed_buffer(buffer)
+        self._stats.output_wait_seconds += time.perf_counter() - start
+
+    def remove_indexed_buffer(self):
+        self._stats.sample_queue_depth(self._stream)
+        start = time.perf_counter()
+        buffer = self._stream.remove_indexed_buffer()
+        self._stats.input_wait_seconds += time.perf_counter() - start
+        return buffer
+
+    def qsize(self):
+        return self._stream.qsize()
+
+    def close(self):
+        self._stream.close()
+
 
 class Transformer(object):
     """An object that represents how to transform a given buffer into a result.
@@ -48,6 +175,37 @@ class Transformer(object):
                 for performance, users should expect the data to be properly
                 formatted anyway.
         """
+        if _stage_report_path is not None:
+            self._transform_instrumented(input_stream, _stage_report_path)
+        else:
+            self._run(input_stream)
+
+    def _transform_instrumented(self, input_stream, report_path):
+        """Runs the transformer, recording its StageStats to report_path."""
+        stats = StageStats(self.__class__.__qualname__)
+        transform_buffer = self._transform_buffer
+
+        def timed_transform_buffer(buffer):
+            start = time.perf_counter()
+            result = transform_buffer(buffer)
+            stats.busy_seconds += time.perf_counter() - start
+            if result is not None:
+                stats.buffers_processed += 1
+            return result
+
+        output_stream = self.output_stream
+        self._transform_buffer = timed_transform_buffer
+        self.output_stream = _InstrumentedBufferStream(output_stream, stats)
+        try:
+            self._run(_InstrumentedBufferStream(input_stream, stats))
+        finally:
+            self.output_stream = output_stream
+            del self._transform_buffer
+            stats.end_time = time.time()
+            stats.write(report_path)
+
+    def _run(self, input_stream):
+        """Calls the on_begin, _transform and on_end steps of transform()."""
         input_stream.initialize()
         self.output_stream.initialize()
         class_name = self.__class__.__qualname__
@@ -14,9 +14,15 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import threading
+import time
+
 import numpy as np
 
+from acts.controllers.monsoon_lib.sampling.capture import CaptureWriter
+from acts.controllers.monsoon_lib.sampling.common import ReadingBlock
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import BufferList
+from acts.controllers.monsoon_lib.sampling.engine.running_stats import SegmentStats
 from acts.controllers.monsoon_lib.sampling.engine.transformer import ParallelTransformer
 from acts.controllers.monsoon_lib.sampling.engine.transformer import SequentialTransformer
 
@@ -54,16 +60,18 @@ class Tee(SequentialTransformer):
         """Writes the reading values to a file.
 
         Args:
-            buffer: A list of HvpmReadings.
+            buffer: A ReadingBlock, or a list of H/LvpmReadings.
         """
-        for sample in buffer:
+        buffer = ReadingBlock.from_readings(buffer)
+        if len(buffer):
             if self._start_time is None:
-                self._start_time = sample.sample_time
-            if (sample.sample_time - self._start_time <
-                    self.measure_after_seconds):
-                continue
-            self._fd.write('%0.9f %.12f\n' %
-                           (sample.sample_time, sample.main_current))
+                self._start_time = buffer.sample_time[0]
+            measured = (buffer.sample_time - self._start_time >=
+                        self.measure_after_seconds)
+            self._fd.write(''.join(
+                '%0.9f %.12f\n' % record
+                for record in zip(buffer.sample_time[measured].tolist(),
+                                  buffer.main_current[measured].tolist())))
         self._fd.flush()
         return BufferList([buffer])
 
@@ -113,22 +121,81 @@ class PerfgateTee(SequentialTransformer):
         """Writes the reading values to a file.
 
             Args:
-                buffer: A list of HvpmReadings.
+                buffer: A ReadingBlock, or a list of HvpmReadings.
         """
-        for sample in buffer:
+        buffer = ReadingBlock.from_readings(buffer)
+        if len(buffer):
             if self._start_time is None:
-                self._start_time = sample.sample_time
-            if (sample.sample_time - self._start_time <
-                    self.measure_after_seconds):
-                continue
-            self._fd.write(
-                '%i,%.6f,%.6f\n' %
-                (sample.sample_time * 1e9, sample.main_current,
-                 sample.main_voltage))
+                self._start_time = buffer.sample_time[0]
+            measured = (buffer.sample_time - self._start_time >=
+                        self.measure_after_seconds)
+            self._fd.write(''.join(
+                '%i,%.6f,%.6f\n' % record
+                for record in zip((buffer.sample_time[measured] * 1e9).tolist(),
+                                  buffer.main_current[measured].tolist(),
+                                  buffer.main_voltage[measured].tolist())))
         self._fd.flush()
         return BufferList([buffer])
 
 
+class CaptureTee(SequentialTransformer):
+    """Outputs sample_time and main_current values to a binary capture file.
+
+    Similar to Tee, but writes the compact binary format of
+    monsoon_lib.sampling.capture. The capture can be opened instantly with
+    capture.CaptureFile, and exported to Tee's text format on demand.
+
+    Attributes:
+        _filename: the name of the file to open.
+        _writer: the CaptureWriter written to.
+    """
+
+    def __init__(self,
+                 filename,
+                 measure_after_seconds=0,
+                 current_dtype=np.float64):
+        """Creates a CaptureTee.
+
+        Args:
+            filename: the path to the file to write the collected data to.
+            measure_after_seconds: the number of seconds to skip before
+                logging data as part of the measurement.
+            current_dtype: np.float64 or np.float32. The precision to store
+                current values with.
+        """
+        super().__init__()
+        self._filename = filename
+        self._writer = None
+        self._current_dtype = current_dtype
+        self.measure_after_seconds = measure_after_seconds
+        # The time of the first sample gathered.
+        self._start_time = None
+
+    def on_begin(self):
+        self._writer = CaptureWriter(self._filename,
+                                     current_dtype=self._current_dtype)
+
+    def on_end(self):
+        self._writer.close()
+
+    def _transform_buffer(self, buffer):
+        """Writes the reading values to the capture file.
+
+        Args:
+            buffer: A ReadingBlock, or a list of H/LvpmReadings.
+        """
+        buffer = ReadingBlock.from_readings(buffer)
+        if len(buffer):
+            if self._start_time is None:
+                self._start_time = buffer.sample_time[0]
+            measured = (buffer.sample_time - self._start_time >=
+                        self.measure_after_seconds)
+            self._writer.write(buffer.sample_time[measured],
+                               buffer.main_current[measured])
+        self._writer.flush()
+        return BufferList([buffer])
+
+
 class SampleAggregator(ParallelTransformer):
     """Aggregates the main current value and the number of samples gathered."""
 
@@ -151,15 +218,17 @@ class SampleAggregator(ParallelTransformer):
         """Aggregates the sample data.
 
         Args:
-            buffer: A buffer of H/LvpmReadings.
+            buffer: A ReadingBlock, or a list of H/LvpmReadings.
         """
-        for sample in buffer:
-            if self._start_time is None:
-                self._start_time = sample.sample_time
-            if sample.sample_time - self._start_time < self.start_after_seconds:
-                continue
-            self._num_samples += 1
-            self._sum_currents += sample.main_current
+        buffer = ReadingBlock.from_readings(buffer)
+        if not len(buffer):
+            return buffer
+        if self._start_time is None:
+            self._start_time = buffer.sample_time[0]
+        measured = (buffer.sample_time - self._start_time >=
+                    self.start_after_seconds)
+        self._num_samples += int(np.count_nonzero(measured))
+        self._sum_currents += float(buffer.main_current[measured].sum())
         return buffer
 
     @property
@@ -173,6 +242,94 @@ class SampleAggregator(ParallelTransformer):
         return self._sum_currents
 
 
+class SegmentStatsSink(ParallelTransformer):
+    """Computes the main current statistics of named time segments online.
+
+    Each buffer is reduced to a count, mean, M2, min, max and quantile sketch
+    per segment, and merged into that segment's running SegmentStats. No
+    samples are kept, so the statistics are available as soon as sampling
+    ends, without reading anything back from disk.
+
+    Segments may be added ahead of time with add_segment(), or opened and
+    closed while sampling with open_segment() and close_segment(). All three
+    are thread-safe. Times are in seconds, on the same clock as the sample
+    times (time.time() on the host).
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        """Creates a SegmentStatsSink.
+
+        Args:
+            relative_accuracy: The relative accuracy of percentile estimates.
+        """
+        super().__init__()
+        self._relative_accuracy = relative_accuracy
+        self._lock = threading.Lock()
+        # A dict of segment name to [start_time, end_time, SegmentStats].
+        self._segments = {}
+
+    def add_segment(self, name, start_time, end_time=float('inf')):
+        """Adds a segment of samples to compute the statistics of.
+
+        Args:
+            name: The name of the segment.
+            start_time: The time of the first sample in the segment.
+            end_time: The time of the last sample in the segment. Defaults to
+                infinity, i.e. the segment is open until it is closed.
+        """
+        with self._lock:
+            if name in self._segments:
+                raise ValueError('Segment "%s" already exists.' % name)
+            self._segments[name] = [
+                start_time, end_time,
+                SegmentStats(self._relative_accuracy)
+            ]
+
+    def open_segment(self, name, start_time=None):
+        """Opens a segment, starting at start_time or now."""
+        self.add_segment(name,
+                         time.time() if start_time is None else start_time)
+
+    def close_segment(self, name, end_time=None):
+        """Closes an open segment, ending at end_time or now."""
+        with self._lock:
+            if name not in self._segments:
+                raise ValueError('Segment "%s" does not exist.' % name)
+            self._segments[name][1] = (time.time()
+                                       if end_time is None else end_time)
+
+    @property
+    def segment_names(self):
+        """The names of the segments, in the order they were added."""
+        with self._lock:
+            return list(self._segments)
+
+    def get_stats(self, name):
+        """Returns the SegmentStats of the given segment."""
+        with self._lock:
+            return self._segments[name][2]
+
+    def _transform_buffer(self, buffer):
+        """Merges the buffer's main current values into each segment.
+
+        Args:
+            buffer: A ReadingBlock, or a list of H/LvpmReadings.
+        """
+        buffer = ReadingBlock.from_readings(buffer)
+        if not len(buffer):
+            return buffer
+        sample_time = buffer.sample_time
+        first_time, last_time = sample_time[0], sample_time[-1]
+        with self._lock:
+            for start_time, end_time, stats in self._segments.values():
+                if start_time > last_time or end_time < first_time:
+                    continue
+                in_segment = (sample_time >= start_time) & (sample_time <=
+                                                             end_time)
+                stats.add_samples(buffer.main_current[in_segment])
+        return buffer
+
+
 class DownSampler(SequentialTransformer):
     """Takes in sample outputs and returns a downsampled version of that data.
 
@@ -191,7 +348,7 @@ class DownSampler(SequentialTransformer):
         super().__init__()
 
         self._mean_width = int(downsample_factor)
-        self._leftovers = []
+        self._leftovers = None
 
     def _transform_buffer(self, buffer):
         """Returns the buffer downsampled by an integer factor.
@@ -227,20 +384,24 @@ class DownSampler(SequentialTransformer):
                   ║ ╚╝ ╚╝ ╚╝ ╚╝ ╚╝ ║           ║ ╚╝ ╚╝ ╚╝ ╚╝ ╚╝ ║
                   ╚════════════════╝           ╚════════════════╝
                    output buffer n             output buffer n + 1
-        """
-        tail_length = int(
-            (len(buffer) + len(self._leftovers)) % self._mean_width)
-
-        tailless_buffer = np.array(buffer[:len(buffer) - tail_length])
 
-        sample_count = len(tailless_buffer) + len(self._leftovers)
+        Args:
+            buffer: A ReadingBlock, or a list of H/LvpmReadings.
 
-        downsampled_values = np.mean(
-            np.resize(
-                np.append(self._leftovers, tailless_buffer),
-                (sample_count // self._mean_width, self._mean_width)),
-            axis=1)
+        Returns:
+            A ReadingBlock of the downsampled readings.
+        """
+        buffer = ReadingBlock.from_readings(buffer)
+        if self._leftovers is not None:
+            buffer = ReadingBlock.concatenate([self._leftovers, buffer])
 
+        tail_length = len(buffer) % self._mean_width
+        tailless_buffer = buffer[:len(buffer) - tail_length]
         self._leftovers = buffer[len(buffer) - tail_length:]
 
-        return downsampled_values
+        # Sums every self._mean_width samples together at the array level.
+        downsampled_values = tailless_buffer[0::self._mean_width]
+        for offset in range(1, self._mean_width):
+            downsampled_values += tailless_buffer[offset::self._mean_width]
+
+        return downsampled_values / self._mean_width
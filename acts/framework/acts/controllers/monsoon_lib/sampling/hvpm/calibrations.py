@@ -22,6 +22,7 @@ from acts.controllers.monsoon_lib.sampling.engine.calibration import Calibration
 from acts.controllers.monsoon_lib.sampling.enums import Channel
 from acts.controllers.monsoon_lib.sampling.enums import Granularity
 from acts.controllers.monsoon_lib.sampling.enums import Origin
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import HvpmMeasurement
 from acts.controllers.monsoon_lib.sampling.hvpm.packet import SampleType
 
 
@@ -54,14 +55,7 @@ class HvpmCalibrationData(CalibrationWindows):
             [8]: 0x10 == Origin.ZERO
                  0x30 == Origin.REFERENCE
         """
-        sample_type = sample.get_sample_type()
-        if sample_type == SampleType.ZERO_CAL:
-            origin = Origin.ZERO
-        elif sample_type == SampleType.REF_CAL:
-            origin = Origin.REFERENCE
-        else:
-            raise ValueError(
-                'Packet of type %s is not a calibration packet.' % sample_type)
+        origin = self._get_origin(sample.get_sample_type())
 
         for i in range(6):
             # Reads the last bit to get the Granularity value.
@@ -71,6 +65,32 @@ class HvpmCalibrationData(CalibrationWindows):
             self.add(channel, origin, granularity,
                      sample[channel, granularity])
 
+    def add_calibration_record(self, record):
+        """Adds calibration values from a decoded calibration sample.
+
+        Args:
+            record: A single sample of dtype hvpm.packet.SAMPLE_DTYPE, as
+                returned by hvpm.packet.decode_packets().
+        """
+        origin = self._get_origin(record['sample_type'])
+
+        for i in range(6):
+            granularity = i & 0x01
+            channel = i >> 1
+            self.add(channel, origin, granularity,
+                     int(record[HvpmMeasurement.FIELDS[i]]))
+
+    @staticmethod
+    def _get_origin(sample_type):
+        """Returns the calibration Origin of the given SampleType."""
+        if sample_type == SampleType.ZERO_CAL:
+            return Origin.ZERO
+        elif sample_type == SampleType.REF_CAL:
+            return Origin.REFERENCE
+        else:
+            raise ValueError(
+                'Packet of type %s is not a calibration packet.' % sample_type)
+
 
 class HvpmCalibrationConstants(CalibrationScalars):
     """Tracks the calibration values gathered from the Monsoon status packet."""
@@ -15,6 +15,8 @@
 #   limitations under the License.
 import struct
 
+import numpy as np
+
 from acts.controllers.monsoon_lib.sampling.enums import Reading
 
 
@@ -75,6 +77,16 @@ class HvpmMeasurement(object):
     # The total number of bytes in a measurement. See the table above.
     SIZE = 18
 
+    # The names of each value, in the order of the table above. These are also
+    # the field names of the measurement columns in SAMPLE_DTYPE.
+    FIELDS = ('main_coarse', 'main_fine', 'usb_coarse', 'usb_fine',
+              'aux_coarse', 'aux_fine', 'main_voltage', 'usb_voltage',
+              'usb_gain', 'main_gain')
+
+    # The numpy dtype of the raw measurement bytes. See the table above.
+    DTYPE = np.dtype([(name, '>u2') for name in FIELDS[:8]] +
+                     [(name, 'u1') for name in FIELDS[8:]])
+
     def __init__(self, raw_data, sample_time):
         self.values = struct.unpack('>8H2B', raw_data)
         self._sample_time = sample_time
@@ -119,6 +131,17 @@ class HvpmMeasurement(object):
         # reading_or_granularity is a granularity value.
         return channel * 2 + reading_or_granularity
 
+    @staticmethod
+    def get_field(channel, reading_or_granularity):
+        """Returns the SAMPLE_DTYPE field name that corresponds with the query.
+
+        Args:
+            channel: The channel to read data from.
+            reading_or_granularity: The reading or granularity desired.
+        """
+        return HvpmMeasurement.FIELDS[HvpmMeasurement.get_index(
+            channel, reading_or_granularity)]
+
     def get_sample_time(self):
         """Returns the calculated time for the given sample."""
         return self._sample_time
@@ -208,3 +231,86 @@ class Packet(object):
 
     def __len__(self):
         return self.num_measurements
+
+
+# The numpy dtype of a single decoded sample, as returned by decode_packets().
+# Contains the packet header values the sample arrived in, each of the raw
+# measurement values (see HvpmMeasurement.FIELDS), the SampleType of the sample,
+# and the calculated time the sample was taken.
+SAMPLE_DTYPE = np.dtype(
+    [('dropped_count', '<i2'), ('flags', 'u1')] +
+    [(name, HvpmMeasurement.DTYPE.fields[name][0])
+     for name in HvpmMeasurement.FIELDS] +
+    [('sample_type', 'u1'), ('sample_time', '<f8')])
+
+# The size of the time data PacketCollector prepends to each USB packet, plus
+# the size of the USB packet's header. See Packet.
+_PACKET_HEADER_SIZE = struct.calcsize('<2dhBx')
+
+
+def _packet_dtype(num_measurements):
+    """Returns the numpy dtype of a raw packet with the given measurement count.
+
+    The layout mirrors the struct string used by Packet.
+    """
+    return np.dtype([('time_of_read', '<f8'),
+                     ('time_since_last_sample', '<f8'),
+                     ('dropped_count', '<i2'),
+                     ('flags', 'u1'),
+                     ('num_measurements', 'u1'),
+                     ('measurements', HvpmMeasurement.DTYPE,
+                      (num_measurements,))])
+
+
+def decode_packets(raw_packets):
+    """Decodes a list of raw packets into a single array of samples.
+
+    This is the batch equivalent of creating a Packet for each of the raw
+    packets, and reading each HvpmMeasurement within them. Rather than
+    creating Python objects for each sample, all packets with the same number
+    of measurements are decoded at once with numpy.
+
+    Args:
+        raw_packets: A list of bytes objects, each as collected by
+            PacketCollector. None values (failed reads) are skipped.
+
+    Returns:
+        A numpy array of SAMPLE_DTYPE, holding every sample in the order it was
+        received.
+    """
+    raw_packets = [packet for packet in raw_packets if packet is not None]
+    lengths = np.fromiter((len(packet) for packet in raw_packets),
+                          dtype=np.int64, count=len(raw_packets))
+    counts = np.maximum(lengths - Packet.FIRST_MEASUREMENT_OFFSET,
+                        0) // HvpmMeasurement.SIZE
+    # The index of each packet's first sample within the output array.
+    offsets = np.cumsum(counts) - counts
+
+    samples = np.empty(int(counts.sum()), dtype=SAMPLE_DTYPE)
+
+    for num_measurements in np.unique(counts):
+        if num_measurements == 0:
+            continue
+        indices = np.flatnonzero(counts == num_measurements)
+        packet_size = _PACKET_HEADER_SIZE + (
+            HvpmMeasurement.SIZE * num_measurements)
+        packets = np.frombuffer(
+            b''.join(raw_packets[i][:packet_size] for i in indices),
+            dtype=_packet_dtype(num_measurements))
+
+        positions = (offsets[indices, np.newaxis] +
+                     np.arange(num_measurements))
+        measurements = packets['measurements']
+        for name in HvpmMeasurement.FIELDS:
+            samples[name][positions] = measurements[name]
+        samples['dropped_count'][positions] = packets['dropped_count'][:, None]
+        samples['flags'][positions] = packets['flags'][:, None]
+        samples['sample_type'][positions] = measurements['main_gain'] & 0x30
+
+        # See Packet._get_sample_time().
+        time_per_sample = packets['time_since_last_sample'] / num_measurements
+        samples['sample_time'][positions] = (
+            time_per_sample[:, None] * np.arange(1, num_measurements + 1) +
+            packets['time_of_read'][:, None])
+
+    return samples
@@ -15,6 +15,7 @@
 #   limitations under the License.
 
 import array
+import functools
 import logging
 import struct
 import time
@@ -22,9 +23,11 @@ import time
 import numpy as np
 from Monsoon import HVPM
 
+from acts.controllers.monsoon_lib.sampling.common import ReadingBlock
 from acts.controllers.monsoon_lib.sampling.common import UncalibratedSampleChunk
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import BufferList
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ProcessAssemblyLineBuilder
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import SharedMemoryBufferStream
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ThreadAssemblyLineBuilder
 from acts.controllers.monsoon_lib.sampling.engine.calibration import CalibrationError
 from acts.controllers.monsoon_lib.sampling.engine.calibration import CalibrationSnapshot
@@ -40,7 +43,9 @@ from acts.controllers.monsoon_lib.sampling.hvpm.calibrations import HvpmCalibrat
 from acts.controllers.monsoon_lib.sampling.hvpm.calibrations import HvpmCalibrationData
 from acts.controllers.monsoon_lib.sampling.hvpm.packet import HvpmMeasurement
 from acts.controllers.monsoon_lib.sampling.hvpm.packet import Packet
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import SAMPLE_DTYPE
 from acts.controllers.monsoon_lib.sampling.hvpm.packet import SampleType
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import decode_packets
 
 
 class HvpmTransformer(Transformer):
@@ -60,9 +65,18 @@ class HvpmTransformer(Transformer):
         monsoon_status_packet = monsoon.statusPacket()
         monsoon.closeDevice()
 
+        collector = PacketCollector(self.monsoon_serial, self.duration)
+        # Pass the raw packets through shared memory where available, so
+        # the collector process does not spend its time pickling them.
+        stream_generator = None
+        if SharedMemoryBufferStream.is_supported():
+            stream_generator = functools.partial(
+                SharedMemoryBufferStream,
+                slot_size=collector.shared_memory_slot_size())
+
         # yapf: disable. Yapf doesn't handle fluent interfaces well.
-        (ProcessAssemblyLineBuilder()
-         .source(PacketCollector(self.monsoon_serial, self.duration))
+        (ProcessAssemblyLineBuilder(stream_generator)
+         .source(collector)
          .into(SampleNormalizer(monsoon_status_packet=monsoon_status_packet))
          .build(output_stream=self.output_stream).run())
         # yapf: enable
@@ -88,6 +102,13 @@ class PacketCollector(SourceTransformer):
         self.array = array.array('B', b'\x00' * Packet.MAX_PACKET_SIZE)
         self.sampling_duration = sampling_duration
 
+    def shared_memory_slot_size(self):
+        """Returns the SharedMemoryBufferStream slot size fitting any buffer."""
+        # Each packet is prefixed with the read times.
+        return SharedMemoryBufferStream.bytes_list_slot_size(
+            self._buffer_size,
+            struct.calcsize('dd') + Packet.MAX_PACKET_SIZE)
+
     def _initialize_monsoon(self):
         """Initializes the monsoon object.
 
@@ -174,14 +195,14 @@ class SampleNormalizer(Transformer):
 
 
 class PacketReader(ParallelTransformer):
-    """Reads raw HVPM Monsoon data and converts it into Packet objects.
+    """Reads raw HVPM Monsoon data and decodes it into an array of samples.
 
     Attributes:
         rollover_count: The number of times the dropped_count value has rolled
             over it's maximum value (2^16-1).
         previous_dropped_count: The dropped count read from the last packet.
             Used for determining the true number of dropped samples.
-        start_time: The time of the first packet ever read.
+        start_time: The time of the first sample ever read.
     """
     """The number of seconds before considering dropped_count to be meaningful.
 
@@ -197,32 +218,45 @@ class PacketReader(ParallelTransformer):
         self.start_time = 0
 
     def _transform_buffer(self, buffer):
-        """Reads raw sample data and converts it into packet objects."""
-
-        for i in range(len(buffer)):
-            buffer[i] = Packet(buffer[i])
-
-            if buffer and not self.start_time and i == 0:
-                self.start_time = buffer[0].time_of_read
-
-            if (buffer[i].time_of_read - self.start_time >
-                    PacketReader.DROP_COUNT_TIMER_THRESHOLD):
-                self._process_dropped_count(buffer[i])
+        """Decodes the raw packets in the buffer into a single sample array.
 
-        return buffer
+        Args:
+            buffer: A list of raw packet bytes, as sent by PacketCollector.
 
-    def _process_dropped_count(self, packet):
+        Returns:
+            A numpy array of hvpm.packet.SAMPLE_DTYPE.
+        """
+        samples = decode_packets(buffer)
+
+        if len(samples) and not self.start_time:
+            self.start_time = samples['sample_time'][0]
+
+        counted = samples[samples['sample_time'] - self.start_time >
+                          PacketReader.DROP_COUNT_TIMER_THRESHOLD]
+        if len(counted):
+            dropped_counts = counted['dropped_count']
+            # Only the samples where the dropped count changes matter.
+            changes = np.flatnonzero(
+                dropped_counts != np.append(self.previous_dropped_count,
+                                            dropped_counts[:-1]))
+            for index in changes:
+                self._process_dropped_count(int(dropped_counts[index]),
+                                            counted['sample_time'][index])
+
+        return samples
+
+    def _process_dropped_count(self, dropped_count, time_of_read):
         """Processes the dropped count value, updating the internal counters."""
-        if packet.dropped_count == self.previous_dropped_count:
+        if dropped_count == self.previous_dropped_count:
             return
 
-        if packet.dropped_count < self.previous_dropped_count:
+        if dropped_count < self.previous_dropped_count:
             self.rollover_count += 1
 
-        self.previous_dropped_count = packet.dropped_count
+        self.previous_dropped_count = dropped_count
         log_function = logging.info if __debug__ else logging.warning
         log_function('At %9f, total dropped count: %s' %
-                     (packet.time_of_read, self.total_dropped_count))
+                     (time_of_read, self.total_dropped_count))
 
     @property
     def total_dropped_count(self):
@@ -249,12 +283,12 @@ class PacketReader(ParallelTransformer):
 
 
 class SampleChunker(SequentialTransformer):
-    """Chunks input packets into lists of samples with identical calibration.
+    """Chunks input samples into arrays of samples with identical calibration.
 
     This step helps to quickly apply calibration across many samples at once.
 
     Attributes:
-        _stored_raw_samples: The queue of raw samples that have yet to be
+        _stored_raw_samples: The list of raw sample arrays that have yet to be
             split into a new calibration group.
         calibration_data: The calibration window information.
     """
@@ -274,28 +308,36 @@ class SampleChunker(SequentialTransformer):
         This transformer is meant to after the PacketReader.
 
         Args:
-            buffer: A list of Packet objects.
+            buffer: A numpy array of hvpm.packet.SAMPLE_DTYPE.
 
         Returns:
             A BufferList containing 0 or more UncalibratedSampleChunk objects.
         """
         buffer_list = BufferList()
-        for packet in buffer:
-            for sample in packet:
-                sample_type = sample.get_sample_type()
-
-                if sample_type == SampleType.MEASUREMENT:
-                    self._stored_raw_samples.append(sample)
-                elif SampleType.is_calibration(sample_type):
-                    if len(self._stored_raw_samples) > 0:
-                        buffer_list.append(self._cut_new_buffer())
-                    self.calibration_data.add_calibration_sample(sample)
-                else:
-                    # There's no information on what this packet means within
-                    # the documentation or code Monsoon Inc. provides.
-                    logging.warning('Received unidentifiable packet with '
-                                    'SampleType %s: %s' % (sample_type,
-                                                           packet.get_bytes()))
+        sample_types = buffer['sample_type']
+        non_measurements = np.flatnonzero(
+            sample_types != SampleType.MEASUREMENT)
+
+        start = 0
+        for index in non_measurements:
+            if start < index:
+                self._stored_raw_samples.append(buffer[start:index])
+            start = index + 1
+
+            sample = buffer[index]
+            sample_type = sample_types[index]
+            if SampleType.is_calibration(sample_type):
+                if len(self._stored_raw_samples) > 0:
+                    buffer_list.append(self._cut_new_buffer())
+                self.calibration_data.add_calibration_record(sample)
+            else:
+                # There's no information on what this packet means within
+                # the documentation or code Monsoon Inc. provides.
+                logging.warning('Received unidentifiable packet with '
+                                'SampleType %s: %s' % (sample_type, sample))
+        if start < len(buffer):
+            self._stored_raw_samples.append(buffer[start:])
+
         return buffer_list
 
     def _cut_new_buffer(self):
@@ -305,10 +347,13 @@ class SampleChunker(SequentialTransformer):
             The newly generated UncalibratedSampleChunk.
         """
         calibration_snapshot = CalibrationSnapshot(self.calibration_data)
-        new_chunk = UncalibratedSampleChunk(self._stored_raw_samples,
-                                            calibration_snapshot)
-        # Do not clear the list. Instead, create a new one so the old list can
-        # be owned solely by the UncalibratedSampleChunk.
+        if self._stored_raw_samples:
+            samples = np.concatenate(self._stored_raw_samples)
+        else:
+            samples = np.empty(0, dtype=SAMPLE_DTYPE)
+        new_chunk = UncalibratedSampleChunk(samples, calibration_snapshot)
+        # Do not clear the list. Instead, create a new one so the old arrays
+        # can be owned solely by the UncalibratedSampleChunk.
         self._stored_raw_samples = []
         return new_chunk
 
@@ -316,6 +361,9 @@ class SampleChunker(SequentialTransformer):
 class HvpmReading(object):
     """The result of fully calibrating a sample. Contains all Monsoon readings.
 
+    CalibrationApplier passes readings along as ReadingBlocks. HvpmReadings
+    are only created when a single sample of a ReadingBlock is requested.
+
     Attributes:
         _reading_list: The list of values obtained from the Monsoon.
         _time_of_reading: The time since sampling began that the reading was
@@ -414,22 +462,23 @@ class CalibrationApplier(ParallelTransformer):
         return True
 
     def _transform_buffer(self, buffer):
-        """Transforms the buffer's information into HvpmReadings.
+        """Transforms the buffer's information into a block of HvpmReadings.
 
         Args:
-            buffer: An UncalibratedSampleChunk. This buffer is in-place
-                transformed into a buffer of HvpmReadings.
+            buffer: An UncalibratedSampleChunk holding an array of
+                hvpm.packet.SAMPLE_DTYPE samples.
+
+        Returns:
+            A ReadingBlock of HvpmReadings.
         """
         calibration_data = buffer.calibration_data
+        measurements = buffer.samples
 
         if not self._is_device_calibrated(calibration_data):
-            buffer.samples.clear()
-            return buffer.samples
+            return ReadingBlock(np.zeros((5, 0)), [], HvpmReading)
 
-        readings = np.zeros((len(buffer.samples), 5))
-
-        measurements = np.array([sample.values for sample in buffer.samples])
-        calibrated_value = np.zeros((len(buffer.samples), 2))
+        readings = np.zeros((5, len(measurements)))
+        calibrated_value = np.zeros((len(measurements), 2))
 
         for channel in Channel.values:
             for granularity in Granularity.values:
@@ -449,28 +498,24 @@ class CalibrationApplier(ParallelTransformer):
                 if granularity == Granularity.FINE:
                     slope /= 1000
 
-                index = HvpmMeasurement.get_index(channel, granularity)
+                field = HvpmMeasurement.get_field(channel, granularity)
                 calibrated_value[:, granularity] = slope * (
-                    measurements[:, index] - zero_offset)
+                    measurements[field] - zero_offset)
 
-            fine_data_position = HvpmMeasurement.get_index(
+            fine_data_field = HvpmMeasurement.get_field(
                 channel, Granularity.FINE)
-            readings[:, channel] = np.where(
-                measurements[:, fine_data_position] < self.fine_threshold,
+            readings[channel] = np.where(
+                measurements[fine_data_field] < self.fine_threshold,
                 calibrated_value[:, Granularity.FINE],
                 calibrated_value[:, Granularity.COARSE]) / 1000.0  # to mA
 
-        main_voltage_index = HvpmMeasurement.get_index(Channel.MAIN,
+        main_voltage_field = HvpmMeasurement.get_field(Channel.MAIN,
                                                        Reading.VOLTAGE)
-        usb_voltage_index = HvpmMeasurement.get_index(Channel.USB,
+        usb_voltage_field = HvpmMeasurement.get_field(Channel.USB,
                                                       Reading.VOLTAGE)
-        readings[:, 3] = (measurements[:, main_voltage_index] * self._adc_ratio
-                          * self._main_voltage_scale)
-        readings[:, 4] = (measurements[:, usb_voltage_index] * self._adc_ratio
-                          * self._usb_voltage_scale)
-
-        for i in range(len(buffer.samples)):
-            buffer.samples[i] = HvpmReading(
-                list(readings[i]), buffer.samples[i].get_sample_time())
+        readings[3] = (measurements[main_voltage_field] * self._adc_ratio *
+                       self._main_voltage_scale)
+        readings[4] = (measurements[usb_voltage_field] * self._adc_ratio *
+                       self._usb_voltage_scale)
 
-        return buffer.samples
+        return ReadingBlock(readings, measurements['sample_time'], HvpmReading)
@@ -14,6 +14,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import functools
 import logging
 import struct
 import time
@@ -21,9 +22,11 @@ import time
 import numpy as np
 
 from acts.controllers.monsoon_lib.api.lvpm_stock.monsoon_proxy import MonsoonProxy
+from acts.controllers.monsoon_lib.sampling.common import ReadingBlock
 from acts.controllers.monsoon_lib.sampling.common import UncalibratedSampleChunk
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import BufferList
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ProcessAssemblyLineBuilder
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import SharedMemoryBufferStream
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ThreadAssemblyLineBuilder
 from acts.controllers.monsoon_lib.sampling.engine.calibration import CalibrationError
 from acts.controllers.monsoon_lib.sampling.engine.transformer import ParallelTransformer
@@ -48,9 +51,18 @@ class StockLvpmSampler(Transformer):
         self.duration = duration
 
     def _transform(self, input_stream):
+        collector = PacketCollector(self.monsoon_serial, self.duration)
+        # Pass the raw packets through shared memory where available, so
+        # the collector process does not spend its time pickling them.
+        stream_generator = None
+        if SharedMemoryBufferStream.is_supported():
+            stream_generator = functools.partial(
+                SharedMemoryBufferStream,
+                slot_size=collector.shared_memory_slot_size())
+
         # yapf: disable. Yapf doesn't handle fluent interfaces well.
-        (ProcessAssemblyLineBuilder()
-         .source(PacketCollector(self.monsoon_serial, self.duration))
+        (ProcessAssemblyLineBuilder(stream_generator)
+         .source(collector)
          .into(SampleNormalizer())
          .build(output_stream=self.output_stream)
          .run())
@@ -60,6 +72,10 @@ class StockLvpmSampler(Transformer):
 class PacketCollector(SourceTransformer):
     """Collects Monsoon packets into a buffer to be sent to another process."""
 
+    # The largest packet in a buffer: the read times, then a packet body of
+    # up to 255 bytes, without its checksum.
+    MAX_PACKET_SIZE = struct.calcsize('dd') + 0xFF - 1
+
     def __init__(self, serial=None, sampling_duration=None):
         super().__init__()
         self._monsoon_serial = serial
@@ -67,6 +83,11 @@ class PacketCollector(SourceTransformer):
         self.start_time = 0
         self.sampling_duration = sampling_duration
 
+    def shared_memory_slot_size(self):
+        """Returns the SharedMemoryBufferStream slot size fitting any buffer."""
+        return SharedMemoryBufferStream.bytes_list_slot_size(
+            self._buffer_size, self.MAX_PACKET_SIZE)
+
     def _initialize_monsoon(self):
         """Initializes the MonsoonProxy object."""
         self._monsoon_proxy = MonsoonProxy(serialno=self._monsoon_serial)
@@ -258,6 +279,9 @@ class SampleChunker(SequentialTransformer):
 class LvpmReading(object):
     """The result of fully calibrating a sample. Contains all Monsoon readings.
 
+    CalibrationApplier passes readings along as ReadingBlocks. LvpmReadings
+    are only created when a single sample of a ReadingBlock is requested.
+
     Attributes:
         _reading_list: The list of values obtained from the Monsoon.
         _time_of_reading: The time since sampling began that the reading was
@@ -350,11 +374,12 @@ class CalibrationApplier(ParallelTransformer):
     def _transform_buffer(self, buffer):
         calibration_data = buffer.calibration_data
 
-        if not self._is_device_calibrated(calibration_data):
-            return []
+        if (not buffer.samples
+                or not self._is_device_calibrated(calibration_data)):
+            return ReadingBlock(np.zeros((4, 0)), [], LvpmReading)
 
         measurements = np.array([sample.values for sample in buffer.samples])
-        readings = np.zeros((len(buffer.samples), 5))
+        readings = np.zeros((4, len(buffer.samples)))
 
         for channel in Channel.values:
             fine_zero = calibration_data.get(channel, Origin.ZERO,
@@ -372,7 +397,7 @@ class CalibrationApplier(ParallelTransformer):
             # this operation. This explains the mismatch of calibration
             # constants between the reverse-engineered algorithm and the
             # Monsoon.py algorithm.
-            readings[:, channel] = np.where(
+            readings[channel] = np.where(
                 measurements[:, channel] & 1,
                 ((measurements[:, channel] & ~1) - coarse_zero) * coarse_scale,
                 (measurements[:, channel] - fine_zero) * fine_scale)
@@ -381,10 +406,7 @@ class CalibrationApplier(ParallelTransformer):
         # http://wiki/Main/MonsoonProtocol#Data_response
         # It represents how many volts represents each tick in the sample
         # packet.
-        readings[:, 3] = measurements[:, 3] * 0.000125
-
-        for i in range(len(buffer.samples)):
-            buffer.samples[i] = LvpmReading(
-                list(readings[i]), buffer.samples[i].get_sample_time())
+        readings[3] = measurements[:, 3] * 0.000125
 
-        return buffer.samples
+        sample_times = [sample.get_sample_time() for sample in buffer.samples]
+        return ReadingBlock(readings, sample_times, LvpmReading)
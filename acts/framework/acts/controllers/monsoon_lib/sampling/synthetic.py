@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Synthetic Monsoon packet streams, for running the sampling engine offline.
+
+SyntheticPacketCollector stands in for the HVPM and LVPM stock
+PacketCollectors. It sends generated or recorded raw packets down the
+AssemblyLine exactly as the real collectors would, so the rest of the sampling
+engine can be run and benchmarked without a Monsoon attached.
+"""
+
+import struct
+import time
+
+import numpy as np
+
+from acts.controllers.monsoon_lib.sampling.engine.transformer import SourceTransformer
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import HvpmMeasurement
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import SampleType as HvpmSampleType
+from acts.controllers.monsoon_lib.sampling.lvpm_stock.packet import LvpmMeasurement
+from acts.controllers.monsoon_lib.sampling.lvpm_stock.packet import SampleType as LvpmSampleType
+
+HVPM = 'hvpm'
+LVPM_STOCK = 'lvpm_stock'
+
+# The number of calibration samples of each origin needed before the sampling
+# engine starts producing readings. See CalibrationWindows.
+_CALIBRATION_WINDOW_SIZE = 5
+
+# The raw measurement values of generated packets.
+_HVPM_MEASUREMENT_VALUES = {
+    'main_coarse': 500,
+    'main_fine': 20000,
+    'usb_coarse': 300,
+    'usb_fine': 1000,
+    'aux_coarse': 300,
+    'aux_fine': 1000,
+    # 4.2V, in ticks of 6.25e-5 * mainvoltageScale volts.
+    'main_voltage': 16800,
+    'usb_voltage': 0,
+    'usb_gain': 7,
+}
+_HVPM_ZERO_CALIBRATION_VALUE = 100
+_HVPM_REF_CALIBRATION_VALUE = 30000
+
+_LVPM_CURRENT_VALUE = 2000
+# 4.2V, in ticks of 0.000125 volts.
+_LVPM_VOLTAGE_VALUE = 33600
+_LVPM_ZERO_CALIBRATION_VALUE = 100
+_LVPM_REF_CALIBRATION_VALUE = 3000
+
+# The format of the header of an HVPM USB packet. See hvpm.packet.Packet.
+_HVPM_HEADER = struct.Struct('<HBB')
+# The format of the header of an LVPM serial packet. See
+# lvpm_stock.packet.Packet.
+_LVPM_HEADER = struct.Struct('>4B')
+# The format of the time data PacketCollectors prepend to every packet.
+_TIME_DATA = struct.Struct('dd')
+
+
+class SyntheticStatusPacket(object):
+    """Stands in for an HVPM status packet, holding calibration constants.
+
+    May be passed to hvpm.transformers.SampleNormalizer and
+    hvpm.transformers.CalibrationApplier in place of
+    Monsoon.HVPM.Monsoon().statusPacket().
+    """
+
+    def __init__(self):
+        for channel in ('main', 'usb', 'aux'):
+            setattr(self, channel + 'FineScale', 35000.0)
+            setattr(self, channel + 'CoarseScale', 2500.0)
+            setattr(self, channel + 'FineZeroOffset', 0)
+            setattr(self, channel + 'CoarseZeroOffset', 0)
+
+
+def _hvpm_packet_dtype(num_measurements):
+    """Returns the numpy dtype of a raw HVPM USB packet."""
+    return np.dtype([('dropped_count', '<u2'), ('flags', 'u1'),
+                     ('num_measurements', 'u1'),
+                     ('measurements', HvpmMeasurement.DTYPE,
+                      (num_measurements, ))])
+
+
+def _hvpm_calibration_packet(origin_sample_type, flags):
+    """Returns a raw HVPM packet holding a single calibration sample."""
+    packet = np.zeros(1, dtype=_hvpm_packet_dtype(1))
+    packet['flags'] = flags
+    packet['num_measurements'] = 1
+    measurements = packet['measurements']
+    value = (_HVPM_ZERO_CALIBRATION_VALUE
+             if origin_sample_type == HvpmSampleType.ZERO_CAL else
+             _HVPM_REF_CALIBRATION_VALUE)
+    for field in HvpmMeasurement.FIELDS[:6]:
+        measurements[field] = value
+    measurements['main_gain'] = origin_sample_type
+    return packet.tobytes()
+
+
+def generate_hvpm_packets(num_packets,
+                          measurements_per_packet=3,
+                          calibration_interval=250,
+                          drops_per_packet=0,
+                          initial_dropped_count=0,
+                          noise=100,
+                          seed=0):
+    """Generates the raw USB packets of an HVPM sampling session.
+
+    The stream starts with enough calibration samples for the sampling engine
+    to calibrate, and a zero and a reference calibration sample are then sent
+    every calibration_interval packets, like the HVPM does.
+
+    Args:
+        num_packets: The number of measurement packets to generate.
+        measurements_per_packet: The number of measurements per packet, 1-3.
+        calibration_interval: The number of measurement packets between
+            calibration samples.
+        drops_per_packet: The number of packets the device reports as
+            dropped for every packet sent. May be fractional, e.g. 0.01 for a
+            drop every 100 packets. The dropped count is a 16-bit value, so a
+            large value exercises its rollovers.
+        initial_dropped_count: The dropped count of the first packet.
+        noise: The amplitude of the random noise added to the main current.
+        seed: The seed of the noise.
+
+    Returns:
+        A list of bytes, one per packet, as read from the USB endpoint.
+    """
+    dtype = _hvpm_packet_dtype(measurements_per_packet)
+    packets = np.zeros(num_packets, dtype=dtype)
+    packets['dropped_count'] = np.floor(
+        initial_dropped_count +
+        drops_per_packet * np.arange(num_packets)).astype(np.int64) % 2**16
+    packets['flags'] = np.arange(num_packets) % 16
+    packets['num_measurements'] = measurements_per_packet
+    measurements = packets['measurements']
+    for field, value in _HVPM_MEASUREMENT_VALUES.items():
+        measurements[field] = value
+    random = np.random.RandomState(seed)
+    measurements['main_fine'] += random.randint(
+        0, noise + 1, size=measurements.shape).astype(np.uint16)
+    measurements['main_gain'] = HvpmSampleType.MEASUREMENT
+
+    raw = packets.tobytes()
+    size = dtype.itemsize
+    calibration = [
+        _hvpm_calibration_packet(HvpmSampleType.ZERO_CAL, 0),
+        _hvpm_calibration_packet(HvpmSampleType.REF_CAL, 0)
+    ]
+    result = calibration * _CALIBRATION_WINDOW_SIZE
+    for index in range(num_packets):
+        if index and calibration_interval and (index % calibration_interval
+                                               == 0):
+            result.extend(calibration)
+        result.append(raw[index * size:(index + 1) * size])
+    return result
+
+
+def _lvpm_packet(packet_type, sequence, values):
+    """Returns a raw LVPM packet with the given measurement values.
+
+    Args:
+        packet_type: The LVPM SampleType of the packet.
+        sequence: The packet sequence number.
+        values: A list of (main, usb, aux, voltage) value tuples.
+    """
+    # 0x20: the unit is at voltage. See lvpm_stock.packet.Packet.
+    header = _LVPM_HEADER.pack(0x20 | sequence % 16, packet_type, 0, 0)
+    return header + b''.join(
+        struct.pack('>3hH', *value) for value in values) + b'\x00'
+
+
+def generate_lvpm_packets(num_packets,
+                          measurements_per_packet=5,
+                          calibration_interval=250,
+                          noise=100,
+                          seed=0):
+    """Generates the raw serial packets of an LVPM stock sampling session.
+
+    Each calibration packet holds a fine and a coarse calibration value. The
+    stream starts with enough of them for the sampling engine to calibrate,
+    and a zero and a reference calibration packet are then sent every
+    calibration_interval packets.
+
+    Args:
+        num_packets: The number of measurement packets to generate.
+        measurements_per_packet: The number of measurements per packet.
+        calibration_interval: The number of measurement packets between
+            calibration packets.
+        noise: The amplitude of the random noise added to the main current.
+        seed: The seed of the noise.
+
+    Returns:
+        A list of bytes, one per packet, as returned by
+        lvpm_stock.stock_transformers.PacketCollector._read_packet().
+    """
+    calibration = [
+        _lvpm_packet(LvpmSampleType.ZERO_CAL, 0,
+                     [(_LVPM_ZERO_CALIBRATION_VALUE, ) * 3 + (0, )] * 2),
+        _lvpm_packet(LvpmSampleType.REF_CAL, 0,
+                     [(_LVPM_REF_CALIBRATION_VALUE, ) * 3 + (0, )] * 2)
+    ]
+    result = calibration * _CALIBRATION_WINDOW_SIZE
+    random = np.random.RandomState(seed)
+    # Even values, so every current is read with FINE granularity.
+    main_currents = (_LVPM_CURRENT_VALUE + 2 * random.randint(
+        0, noise // 2 + 1, size=(num_packets, measurements_per_packet)))
+    for index in range(num_packets):
+        if index and calibration_interval and (index % calibration_interval
+                                               == 0):
+            result.extend(calibration)
+        result.append(
+            _lvpm_packet(LvpmSampleType.MEASUREMENT, index,
+                         [(int(main_current), 0, 0, _LVPM_VOLTAGE_VALUE)
+                          for main_current in main_currents[index]]))
+    return result
+
+
+def count_samples(monsoon_type, packet):
+    """Returns the number of samples in a raw packet.
+
+    Args:
+        monsoon_type: Either HVPM or LVPM_STOCK.
+        packet: The raw packet bytes, without the PacketCollector time data.
+    """
+    if monsoon_type == HVPM:
+        return (len(packet) - _HVPM_HEADER.size) // HvpmMeasurement.SIZE
+    elif monsoon_type == LVPM_STOCK:
+        return (len(packet) - _LVPM_HEADER.size - 1) // LvpmMeasurement.SIZE
+    raise ValueError('Unknown Monsoon type "%s".' % monsoon_type)
+
+
+def save_packets(path, packets):
+    """Records raw packets to a file, for replaying them later.
+
+    Args:
+        path: The path of the file to write.
+        packets: An iterable of raw packet bytes.
+    """
+    with open(path, 'wb') as f:
+        for packet in packets:
+            f.write(struct.pack('<H', len(packet)))
+            f.write(packet)
+
+
+def load_packets(path):
+    """Returns the list of raw packets recorded with save_packets()."""
+    packets = []
+    with open(path, 'rb') as f:
+        data = f.read()
+    position = 0
+    while position < len(data):
+        length, = struct.unpack_from('<H', data, position)
+        position += 2
+        packets.append(data[position:position + length])
+        position += length
+    return packets
+
+
+class SyntheticPacketCollector(SourceTransformer):
+    """Sends recorded or generated raw packets, like a PacketCollector.
+
+    Each packet is prefixed with the time data the real collectors add. Packet
+    times are derived from the sample rate, starting from when collection
+    begins, so time-based logic downstream behaves as with a real capture.
+
+    Attributes:
+        monsoon_type: Either HVPM or LVPM_STOCK.
+        sample_rate: The number of samples per second the packets carry.
+        realtime: If True, packets are sent at the sample rate. Otherwise they
+            are sent as fast as the AssemblyLine accepts them.
+        sampling_duration: If set, the number of seconds of samples to send.
+        start_time: The time collection began at.
+        num_samples: The number of samples sent so far.
+    """
+
+    def __init__(self,
+                 packets,
+                 monsoon_type=HVPM,
+                 sample_rate=5000,
+                 realtime=False,
+                 sampling_duration=None):
+        """Creates a SyntheticPacketCollector.
+
+        Args:
+            packets: A sequence of raw packet bytes, e.g. from
+                generate_hvpm_packets() or load_packets(). Must be picklable
+                if the collector runs in a ProcessAssemblyLine.
+            monsoon_type: Either HVPM or LVPM_STOCK.
+            sample_rate: The number of samples per second the packets carry.
+            realtime: If True, packets are sent at the sample rate.
+            sampling_duration: If set, the number of seconds of samples to
+                send. Otherwise, every packet is sent once.
+        """
+        super().__init__()
+        self._packets = packets
+        self._packet_iterator = None
+        self.monsoon_type = monsoon_type
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        self.sampling_duration = sampling_duration
+        self.start_time = None
+        self.num_samples = 0
+
+    def on_begin(self):
+        self.start_time = time.time()
+        self._packet_iterator = iter(self._packets)
+
+    def _transform_buffer(self, buffer):
+        """Fills the buffer with the next packets.
+
+        Returns:
+            The filled buffer, possibly shorter than given when the packets
+            run out. None once every packet has been sent.
+        """
+        for index in range(len(buffer)):
+            elapsed = self.num_samples / self.sample_rate
+            if self.sampling_duration and elapsed >= self.sampling_duration:
+                return buffer[:index] or None
+            packet = next(self._packet_iterator, None)
+            if packet is None:
+                return buffer[:index] or None
+
+            packet_samples = count_samples(self.monsoon_type, packet)
+            time_since_last_read = packet_samples / self.sample_rate
+            self.num_samples += packet_samples
+            time_of_read = self.start_time + self.num_samples / self.sample_rate
+            if self.realtime:
+                delay = time_of_read - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            buffer[index] = (
+                _TIME_DATA.pack(time_of_read, time_since_last_read) + packet)
+        return buffer
@@ -14,8 +14,18 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import itertools
 import math
 
+import numpy as np
+
+from acts.controllers.monsoon_lib.sampling.capture import CaptureFile
+from acts.controllers.monsoon_lib.sampling.capture import find_capture_file
+
+# The number of (timestamp, sample) pairs converted to an array at a time,
+# so that long captures are never held in memory at once.
+RAW_DATA_CHUNK_SIZE = 1 << 20
+
 # Metrics timestamp keys
 START_TIMESTAMP = 'start'
 END_TIMESTAMP = 'end'
@@ -155,11 +165,19 @@ class Metric(object):
 def import_raw_data(path):
     """Create a generator from a Monsoon data file.
 
+    If the path is a binary capture file, or has one stored next to it (see
+    monsoon_lib.sampling.capture), the samples are read from the capture
+    without any parsing.
+
     Args:
         path: path to raw data file
 
     Returns: generator that yields (timestamp, sample) per line
     """
+    capture_path = find_capture_file(path)
+    if capture_path:
+        yield from CaptureFile(capture_path)
+        return
     with open(path, 'r') as f:
         for line in f:
             time, sample = line.split()
@@ -172,7 +190,12 @@ def generate_test_metrics(raw_data, timestamps=None,
     given as a dict.
 
     Args:
-        raw_data: raw data as list or generator of (timestamp, sample)
+        raw_data: raw data as list or generator of (timestamp, sample), an
+            (N, 2) numpy array of the same, or a
+            monsoon_lib.sampling.capture.CaptureFile. Captures only have the
+            samples within each segment read. Segments are found with a binary
+            search over the sample times, and their metrics are computed over
+            whole arrays at once.
         timestamps: dict following the output format of
             instrumentation_proto_parser.get_test_timestamps()
         voltage: voltage used during measurements
@@ -205,10 +228,18 @@ def generate_test_metrics(raw_data, timestamps=None,
                 'instrumentation_proto.txt for details.' % seg_name)
 
     # Assign data to tests based on timestamps
-    for timestamp, amps in raw_data:
+    if isinstance(raw_data, CaptureFile):
         for seg_name in timestamps:
-            if test_starts[seg_name] <= timestamp <= test_ends[seg_name]:
-                test_metrics[seg_name].update_metrics(amps)
+            _, amps = raw_data.get_range(test_starts[seg_name],
+                                         test_ends[seg_name])
+            test_metrics[seg_name].update_metrics_from_array(amps)
+    else:
+        for sample_times, amps in _iter_array_chunks(raw_data):
+            segment_samples = _assign_segments(sample_times, test_starts,
+                                               test_ends)
+            for seg_name, samples in segment_samples.items():
+                test_metrics[seg_name].update_metrics_from_array(
+                    amps[samples])
 
     result = {}
     for seg_name, power_metrics in test_metrics.items():
@@ -221,6 +252,94 @@ def generate_test_metrics(raw_data, timestamps=None,
     return result
 
 
+def generate_metrics_from_stats(segment_stats, voltage=None):
+    """Builds the metrics of each segment from precomputed statistics.
+
+    Args:
+        segment_stats: A dict of segment name to an object with count, mean,
+            stdev, min and max attributes, in amps. For example, the
+            monsoon_lib.sampling.engine.running_stats.SegmentStats of a
+            SegmentStatsSink.
+        voltage: voltage used during measurements
+
+    Returns:
+        A dict of segment name to metrics, in the same format as
+        generate_test_metrics().
+    """
+    result = {}
+    for seg_name, stats in segment_stats.items():
+        mean = stats.mean if stats.count else 0
+        result[seg_name] = [
+            Metric.amps(mean, 'avg_current').to_unit(MILLIAMP),
+            Metric.amps(stats.max or 0, 'max_current').to_unit(MILLIAMP),
+            Metric.amps(stats.min or 0, 'min_current').to_unit(MILLIAMP),
+            Metric.amps(stats.stdev, 'stdev_current').to_unit(MILLIAMP),
+            Metric.watts(mean * voltage, 'avg_power').to_unit(MILLIWATT)]
+    return result
+
+
+def _iter_array_chunks(raw_data):
+    """Converts (timestamp, sample) pairs into pairs of numpy arrays.
+
+    Generators are consumed RAW_DATA_CHUNK_SIZE pairs at a time, in order.
+
+    Yields:
+        The sample times and samples of each chunk, as numpy arrays.
+    """
+    if isinstance(raw_data, np.ndarray):
+        data = raw_data.reshape(-1, 2)
+        yield data[:, 0], data[:, 1]
+        return
+    raw_data = iter(raw_data)
+    while True:
+        chunk = list(itertools.islice(raw_data, RAW_DATA_CHUNK_SIZE))
+        if not chunk:
+            return
+        data = np.array(chunk, dtype=np.float64).reshape(-1, 2)
+        yield data[:, 0], data[:, 1]
+
+
+def _assign_segments(sample_times, test_starts, test_ends):
+    """Finds the samples that belong to each segment.
+
+    Segments may overlap. A sample belongs to a segment if
+    start <= sample_time <= end.
+
+    Args:
+        sample_times: A numpy array of the sample timestamps.
+        test_starts: A dict of segment name to start time.
+        test_ends: A dict of segment name to end time.
+
+    Returns:
+        A dict of segment name to an index (slice or boolean mask) selecting
+        the segment's samples, in their original order.
+    """
+    seg_names = list(test_starts)
+    if not seg_names:
+        return {}
+    starts = np.array([test_starts[name] for name in seg_names])
+    ends = np.array([test_ends[name] for name in seg_names])
+
+    if np.all(sample_times[1:] >= sample_times[:-1]):
+        # Sorted samples: each segment is a contiguous slice, found by binary
+        # searching the sorted segment boundaries in O(K log N).
+        boundaries, positions = np.unique(np.concatenate([starts, ends]),
+                                          return_inverse=True)
+        lows = np.searchsorted(sample_times, boundaries, side='left')
+        highs = np.searchsorted(sample_times, boundaries, side='right')
+        num_segs = len(seg_names)
+        return {
+            name: slice(lows[positions[i]],
+                        max(lows[positions[i]], highs[positions[num_segs + i]]))
+            for i, name in enumerate(seg_names)
+        }
+
+    return {
+        name: (sample_times >= starts[i]) & (sample_times <= ends[i])
+        for i, name in enumerate(seg_names)
+    }
+
+
 class PowerMetrics(object):
     """Class for processing raw power metrics generated by Monsoon measurements.
     Provides useful metrics such as average current, max current, and average
@@ -257,6 +376,30 @@ class PowerMetrics(object):
         if self._min_current is None or sample < self._min_current:
             self._min_current = sample
 
+    def update_metrics_from_array(self, samples):
+        """Update the running metrics with an array of samples.
+
+        Equivalent to calling update_metrics() for each sample in order. The
+        sums are accumulated sequentially, so the results are identical.
+
+        Args:
+            samples: A numpy array of current samples in Amps.
+        """
+        if not len(samples):
+            return
+        samples = np.asarray(samples, dtype=np.float64)
+        self._num_samples += len(samples)
+        self._sum_currents = float(
+            np.add.accumulate(np.append(self._sum_currents, samples))[-1])
+        self._sum_squares = float(
+            np.add.accumulate(np.append(self._sum_squares, samples**2))[-1])
+        max_current = float(samples.max())
+        min_current = float(samples.min())
+        if self._max_current is None or max_current > self._max_current:
+            self._max_current = max_current
+        if self._min_current is None or min_current < self._min_current:
+            self._min_current = min_current
+
     # Numeric metrics
     @property
     def avg_current(self):
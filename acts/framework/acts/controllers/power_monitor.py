@@ -15,10 +15,13 @@
 #   limitations under the License.
 
 import logging
-import tempfile
 
 from acts.controllers import power_metrics
 from acts.controllers.monsoon_lib.api.common import MonsoonError
+from acts.controllers.monsoon_lib.sampling import capture
+from acts.controllers.monsoon_lib.sampling.engine import transformer
+from acts.controllers.monsoon_lib.sampling.engine.transformers import CaptureTee
+from acts.controllers.monsoon_lib.sampling.engine.transformers import SegmentStatsSink
 
 
 class ResourcesRegistryError(Exception):
@@ -53,23 +56,6 @@ def get_registry():
     return _REGISTRY
 
 
-def _write_raw_data_in_standard_format(raw_data, path, start_time):
-    """Writes the raw data to a file in (seconds since epoch, amps).
-
-    TODO(b/155294049): Deprecate this once Monsoon controller output
-        format is updated.
-
-    Args:
-        start_time: Measurement start time in seconds since epoch
-        raw_data: raw data as list or generator of (timestamp, sample)
-        path: path to write output
-    """
-    with open(path, 'w') as f:
-        for timestamp, amps in raw_data:
-            f.write('%s %s\n' %
-                    (timestamp + start_time, amps))
-
-
 class BasePowerMonitor(object):
 
     def setup(self, **kwargs):
@@ -109,6 +95,13 @@ class PowerMonitorMonsoonFacade(BasePowerMonitor):
         """
         self.monsoon = monsoon
         self._log = logging.getLogger()
+        # The SegmentStatsSink of the current or last measurement.
+        self.segment_stats = None
+        # The SegmentStatsSink holding the segments opened before measuring.
+        self._next_segment_stats = None
+        self._measuring = False
+        # The monsoon_output_path of the last measurement.
+        self._last_output_path = None
 
     def setup(self, monsoon_config=None, **__):
         """Set up the Monsoon controller for this testclass/testcase."""
@@ -145,18 +138,93 @@ class PowerMonitorMonsoonFacade(BasePowerMonitor):
         self.monsoon.usb('on')
 
     def measure(self, measurement_args=None, start_time=None,
-                monsoon_output_path=None, **__):
+                monsoon_output_path=None, export_text=True,
+                instrument_stages=False, **__):
+        """Measures power, saving the samples as a binary capture.
+
+        The capture is written to capture.capture_path_for(monsoon_output_path)
+        with the start_time stored as its time offset. get_waveform() and
+        get_metrics() read it back without any parsing.
+
+        While measuring, segments may be opened and closed with
+        open_segment() and close_segment(). Their metrics are computed as the
+        samples arrive, and are returned by get_metrics() without reading the
+        capture back.
+
+        Args:
+            measurement_args: The kwargs passed to Monsoon.measure_power().
+            start_time: The offset, in seconds, between the device and the
+                host clocks. Added to every sample time.
+            monsoon_output_path: The path to save the samples to.
+            export_text: If True, the samples are also written to
+                monsoon_output_path in the '<seconds since epoch> <amps>'
+                text format. If False, only the binary capture is kept.
+            instrument_stages: If True, the statistics of every sampling
+                stage are written to monsoon_output_path +
+                transformer.STAGE_REPORT_SUFFIX, one JSON object per line.
+        """
         if measurement_args is None:
             raise MonsoonError('measurement_args can not be None')
 
-        with tempfile.NamedTemporaryFile(prefix='monsoon_') as tmon:
+        if self._next_segment_stats is None:
+            self._next_segment_stats = SegmentStatsSink()
+        self.segment_stats = self._next_segment_stats
+        self._next_segment_stats = None
+        self._last_output_path = monsoon_output_path
+        self._measuring = True
+        transformers = [self.segment_stats]
+        capture_path = None
+        if monsoon_output_path and start_time is not None:
+            capture_path = capture.capture_path_for(monsoon_output_path)
+            transformers.insert(0, CaptureTee(
+                capture_path, measurement_args.get('measure_after_seconds', 0)))
+
+        if instrument_stages and monsoon_output_path:
+            transformer.enable_instrumentation(
+                monsoon_output_path + transformer.STAGE_REPORT_SUFFIX)
+        try:
             self.monsoon.measure_power(**measurement_args,
-                                       output_path=tmon.name)
+                                       transformers=transformers)
+        finally:
+            self._measuring = False
+            transformer.disable_instrumentation()
+        if capture_path is None:
+            return
+        capture.set_time_offset(capture_path, start_time)
+        if export_text:
+            capture.CaptureFile(capture_path).export_text(monsoon_output_path)
+
+    def open_segment(self, name, start_time=None):
+        """Starts computing the metrics of a segment of the measurement.
+
+        May be called while measure() is running, e.g. from another thread,
+        or before it, in which case the segment is part of the next
+        measurement.
 
-            if monsoon_output_path and start_time is not None:
-                _write_raw_data_in_standard_format(
-                    power_metrics.import_raw_data(tmon.name),
-                    monsoon_output_path, start_time)
+        Args:
+            name: The name of the segment.
+            start_time: The host time the segment starts at. Defaults to now.
+        """
+        if self._measuring:
+            self.segment_stats.open_segment(name, start_time)
+            return
+        if self._next_segment_stats is None:
+            self._next_segment_stats = SegmentStatsSink()
+        self._next_segment_stats.open_segment(name, start_time)
+
+    def close_segment(self, name, end_time=None):
+        """Stops computing the metrics of a segment of the measurement.
+
+        Args:
+            name: The name of the segment.
+            end_time: The host time the segment ends at. Defaults to now.
+        """
+        segment_stats = self.segment_stats
+        if not self._measuring and self._next_segment_stats is not None:
+            segment_stats = self._next_segment_stats
+        if segment_stats is None:
+            raise MonsoonError('No segment named %s was opened.' % name)
+        segment_stats.close_segment(name, end_time)
 
     def release_resources(self, **__):
         # nothing to do
@@ -169,15 +237,21 @@ class PowerMonitorMonsoonFacade(BasePowerMonitor):
         """Parses a file to obtain all current (in amps) samples.
 
         Args:
-            file_path: Path to a monsoon file.
+            file_path: Path to a monsoon file, or the monsoon_output_path
+                passed to measure().
 
         Returns:
             A list of tuples in which the first element is a timestamp and the
-            second element is the sampled current at that time.
+            second element is the sampled current at that time. If the samples
+            were saved as a binary capture, a memory-mapped CaptureFile, which
+            behaves like that list, is returned instead.
         """
         if file_path is None:
             raise MonsoonError('file_path can not be None')
 
+        capture_path = capture.find_capture_file(file_path)
+        if capture_path:
+            return capture.CaptureFile(capture_path)
         return list(power_metrics.import_raw_data(file_path))
 
     def get_metrics(self, start_time=None, voltage=None, monsoon_file_path=None,
@@ -192,23 +266,36 @@ class PowerMonitorMonsoonFacade(BasePowerMonitor):
                 power from current.
             monsoon_file_path: Path to a monsoon file.
             timestamps: Named timestamps delimiting the segments of interest.
+                If None, the metrics of the segments opened during the last
+                measurement are returned, straight from memory, as long as
+                monsoon_file_path is None or that measurement's output path.
             **__:
 
         Returns:
             A list of power_metrics.Metric.
         """
-        if start_time is None:
-            raise MonsoonError('start_time can not be None')
         if voltage is None:
             raise MonsoonError('voltage can not be None')
+        if (timestamps is None and self.segment_stats is not None
+                and monsoon_file_path in (None, self._last_output_path)):
+            return power_metrics.generate_metrics_from_stats(
+                {name: self.segment_stats.get_stats(name)
+                 for name in self.segment_stats.segment_names},
+                voltage=voltage)
+        if start_time is None:
+            raise MonsoonError('start_time can not be None')
         if monsoon_file_path is None:
             raise MonsoonError('monsoon_file_path can not be None')
         if timestamps is None:
             raise MonsoonError('timestamps can not be None')
 
+        capture_path = capture.find_capture_file(monsoon_file_path)
+        if capture_path:
+            raw_data = capture.CaptureFile(capture_path)
+        else:
+            raw_data = power_metrics.import_raw_data(monsoon_file_path)
         return power_metrics.generate_test_metrics(
-            power_metrics.import_raw_data(monsoon_file_path),
-            timestamps=timestamps, voltage=voltage)
+            raw_data, timestamps=timestamps, voltage=voltage)
 
     def teardown(self, **__):
         # nothing to do
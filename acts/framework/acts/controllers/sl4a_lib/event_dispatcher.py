@@ -15,14 +15,23 @@
 #   limitations under the License.
 
 from concurrent.futures import ThreadPoolExecutor
+import collections
 import queue
 import re
+import sys
 import threading
 import time
 
 from acts import logger
 from acts.controllers.sl4a_lib import rpc_client
 
+# The number of unhandled events of a name kept by default.
+DEFAULT_MAX_QUEUED_EVENTS = 1000
+# The number of seconds an unhandled event is kept for by default.
+DEFAULT_EVENT_TTL = 60 * 60
+# The number of pending events drained per eventPoll by SL4A sessions.
+DEFAULT_DRAIN_SIZE = 100
+
 
 class EventDispatcherError(Exception):
     """The base class for all EventDispatcher exceptions."""
@@ -36,6 +45,145 @@ class DuplicateError(EventDispatcherError):
     """Raise when two event handlers have been assigned to an event name."""
 
 
+class RetentionPolicy(object):
+    """Limits how many unhandled events of a name are kept, and for how long.
+
+    Attributes:
+        max_length: The maximum number of events kept. Unbounded if None.
+        overflow: What to drop when an event arrives at a full queue, either
+            DROP_OLDEST or DROP_NEWEST.
+        ttl: The number of seconds an event is kept for. Forever if None.
+    """
+    DROP_OLDEST = 'drop_oldest'
+    DROP_NEWEST = 'drop_newest'
+
+    def __init__(self, max_length=None, overflow=DROP_OLDEST, ttl=None):
+        if overflow not in (self.DROP_OLDEST, self.DROP_NEWEST):
+            raise ValueError('Invalid overflow policy: %s' % overflow)
+        if max_length is not None and max_length < 1:
+            raise ValueError('max_length must be at least 1.')
+        self.max_length = max_length
+        self.overflow = overflow
+        self.ttl = ttl
+
+    def __repr__(self):
+        return 'RetentionPolicy(max_length=%s, overflow=%s, ttl=%s)' % (
+            self.max_length, self.overflow, self.ttl)
+
+
+def _deep_size(obj):
+    """Returns the approximate number of bytes used by a JSON object."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in obj.items())
+    elif isinstance(obj, list):
+        size += sum(_deep_size(item) for item in obj)
+    return size
+
+
+class EventQueue(object):
+    """The unhandled events of a single name, oldest first.
+
+    Events are dropped as required by the RetentionPolicy, and counted. Not
+    thread-safe; the EventDispatcher only accesses it while holding its lock.
+
+    Attributes:
+        policy: The RetentionPolicy of the queue.
+        dropped_overflow: The number of events dropped because the queue was
+            full.
+        dropped_expired: The number of events dropped because they were older
+            than the policy's ttl.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.dropped_overflow = 0
+        self.dropped_expired = 0
+        self._events = collections.deque()
+        # The time.monotonic() each event was queued at.
+        self._queue_times = collections.deque()
+
+    def __len__(self):
+        return len(self._events)
+
+    def __iter__(self):
+        return iter(list(self._events))
+
+    def put(self, event):
+        """Queues an event.
+
+        Returns:
+            The number of events dropped to make room for it, counting the
+            event itself if it was dropped.
+        """
+        now = time.monotonic()
+        self.expire(now)
+        max_length = self.policy.max_length
+        if max_length is not None and len(self._events) >= max_length:
+            if self.policy.overflow == RetentionPolicy.DROP_NEWEST:
+                self.dropped_overflow += 1
+                return 1
+            dropped = len(self._events) - max_length + 1
+            for _ in range(dropped):
+                self._events.popleft()
+                self._queue_times.popleft()
+            self.dropped_overflow += dropped
+        else:
+            dropped = 0
+        self._events.append(event)
+        self._queue_times.append(now)
+        return dropped
+
+    def expire(self, now=None):
+        """Drops the events older than the policy's ttl."""
+        if self.policy.ttl is None:
+            return
+        deadline = (time.monotonic() if now is None else now) - self.policy.ttl
+        while self._queue_times and self._queue_times[0] < deadline:
+            self._events.popleft()
+            self._queue_times.popleft()
+            self.dropped_expired += 1
+
+    def trim(self):
+        """Drops the oldest events in excess of the policy's max_length."""
+        self.expire()
+        max_length = self.policy.max_length
+        while max_length is not None and len(self._events) > max_length:
+            self._events.popleft()
+            self._queue_times.popleft()
+            self.dropped_overflow += 1
+
+    def pop_oldest(self):
+        """Returns and removes the oldest event, or None if there is none."""
+        self.expire()
+        if not self._events:
+            return None
+        self._queue_times.popleft()
+        return self._events.popleft()
+
+    def pop_at(self, index):
+        """Returns and removes the event at the given index."""
+        event = self._events[index]
+        del self._events[index]
+        del self._queue_times[index]
+        return event
+
+    def pop_all(self):
+        """Returns and removes all events."""
+        self.expire()
+        events = list(self._events)
+        self.clear()
+        return events
+
+    def clear(self):
+        self._events.clear()
+        self._queue_times.clear()
+
+    def size_in_bytes(self):
+        """Returns the approximate number of bytes used by the events."""
+        return sum(_deep_size(event) for event in self._events)
+
+
 class EventDispatcher:
     """A class for managing the events for an SL4A Session.
 
@@ -46,22 +194,60 @@ class EventDispatcher:
                   running.
         _executor: The thread pool executor for running event handlers and
                    polling.
-        _event_dict: A dictionary of str eventName = Queue<Event> eventQueue
+        _event_dict: A dictionary of str eventName = EventQueue eventQueue
         _handlers: A dictionary of str eventName => (lambda, args) handler
         _lock: A lock that prevents multiple reads/writes to the event queues.
+        _patterns: A dictionary of str regex_pattern => (compiled pattern,
+                   set of the event names it matches). Every event name ever
+                   queued is matched once against every pattern ever waited on.
+        _name_waiters: A dictionary of str eventName => set of the Conditions
+                       waiting for an event of that name.
+        _pattern_waiters: A dictionary of str regex_pattern => set of the
+                          Conditions waiting for an event matching it.
+        _queued_counts: A Counter of str eventName => the number of events of
+                        that name ever queued.
+        _retention_policies: A list of (compiled pattern, RetentionPolicy),
+                             in the order they were set.
+        default_retention_policy: The RetentionPolicy of the events whose
+                                  names match no other policy. By default,
+                                  the newest DEFAULT_MAX_QUEUED_EVENTS events
+                                  of each name are kept, for at most
+                                  DEFAULT_EVENT_TTL seconds.
+        drain_size: If nonzero, after each event received through eventWait,
+                    every pending event is drained with eventPoll, up to
+                    drain_size events per round trip. May be changed at any
+                    time.
         log: The EventDispatcher's logger.
+
+    Waiting on events does not poll. Each waiter waits on its own Condition of
+    _lock, which is notified only when an event it may be waiting for is
+    queued.
     """
 
     DEFAULT_TIMEOUT = 60
 
-    def __init__(self, serial, rpc_client):
+    def __init__(self,
+                 serial,
+                 rpc_client,
+                 drain_size=0,
+                 default_retention_policy=None):
         self._serial = serial
+        self.drain_size = drain_size
+        self.default_retention_policy = (default_retention_policy
+                                         or RetentionPolicy(
+                                             DEFAULT_MAX_QUEUED_EVENTS,
+                                             ttl=DEFAULT_EVENT_TTL))
+        self._retention_policies = []
         self._rpc_client = rpc_client
         self._started = False
         self._executor = None
         self._event_dict = {}
         self._handlers = {}
         self._lock = threading.RLock()
+        self._patterns = {}
+        self._name_waiters = {}
+        self._pattern_waiters = {}
+        self._queued_counts = collections.Counter()
 
         def _log_formatter(message):
             """Defines the formatting used in the logger."""
@@ -82,6 +268,16 @@ class EventDispatcher:
             try:
                 # 60000 in ms, timeout in second
                 event_obj = self._rpc_client.eventWait(60000, timeout=120)
+                if not event_obj:
+                    continue
+                if not self._route_events([event_obj]):
+                    return
+                while self.drain_size:
+                    events = self._drain_events()
+                    if not self._route_events(events):
+                        return
+                    if len(events) < self.drain_size:
+                        break
             except rpc_client.Sl4aConnectionError as e:
                 if self._rpc_client.is_alive:
                     self.log.warning('Closing due to closed session.')
@@ -90,6 +286,26 @@ class EventDispatcher:
                     self.log.warning('Closing due to error: %s.' % e)
                     self.close()
                     raise e
+
+    def _drain_events(self):
+        """Pops up to drain_size pending events from sl4a, in one round trip.
+        """
+        try:
+            return self._rpc_client.eventPoll(self.drain_size) or []
+        except rpc_client.Sl4aApiError as e:
+            self.log.warning('Disabling event draining: %s' % e)
+            self.drain_size = 0
+            return []
+
+    def _route_events(self, events):
+        """Passes events to their handlers, and queues the others in bulk.
+
+        Returns:
+            False if the shutdown signal was received, True otherwise.
+        """
+        to_queue = []
+        running = True
+        for event_obj in events:
             if not event_obj:
                 continue
             elif 'name' not in event_obj:
@@ -102,7 +318,8 @@ class EventDispatcher:
                 self.log.debug('Received shutdown signal.')
                 # closeSl4aSession has been called, which closes the event
                 # dispatcher. Stop execution on this polling thread.
-                return
+                running = False
+                break
             if event_name in self._handlers:
                 self.log.debug(
                     'Using handler %s for event: %r' %
@@ -110,14 +327,89 @@ class EventDispatcher:
                 self.handle_subscribed_event(event_obj, event_name)
             else:
                 self.log.debug('Queuing event: %r' % event_obj)
-                self._lock.acquire()
-                if event_name in self._event_dict:  # otherwise, cache event
-                    self._event_dict[event_name].put(event_obj)
+                to_queue.append(event_obj)
+        self._queue_events(to_queue)
+        return running
+
+    def _queue_events(self, events):
+        """Queues events by name, waking up each matching waiter once."""
+        if not events:
+            return
+        with self._lock:
+            names = set()
+            for event_obj in events:
+                event_queue = self.get_event_q(event_obj['name'])
+                dropped = event_queue.put(event_obj)
+                # Only warn about the first events dropped from each queue.
+                if dropped and event_queue.dropped_overflow == dropped:
+                    self.log.warning(
+                        'The %s event queue is full. Dropping events per %s.'
+                        % (event_obj['name'], event_queue.policy))
+                names.add(event_obj['name'])
+                self._queued_counts[event_obj['name']] += 1
+            for event_name in names:
+                for waiter in self._name_waiters.get(event_name, ()):
+                    waiter.notify()
+            for pattern, waiters in self._pattern_waiters.items():
+                if not names.isdisjoint(self._patterns[pattern][1]):
+                    for waiter in waiters:
+                        waiter.notify()
+
+    def _get_pattern_names(self, regex_pattern):
+        """Returns the set of known event names matching regex_pattern.
+
+        The set is kept up to date as new event names are queued.
+        """
+        if regex_pattern not in self._patterns:
+            compiled = re.compile(regex_pattern)
+            self._patterns[regex_pattern] = (compiled, {
+                name
+                for name in self._event_dict if compiled.match(name)
+            })
+        return self._patterns[regex_pattern][1]
+
+    def _wait_for(self, take, timeout, event_name=None, regex_pattern=None):
+        """Waits until take() returns something other than None.
+
+        take() is called right away, then every time an event named event_name,
+        or with a name matching regex_pattern, is queued. Must be called with
+        _lock held.
+
+        Args:
+            take: A function returning the awaited result, or None.
+            timeout: Number of seconds to wait. Never times out if None.
+            event_name: The name of the events that may satisfy take().
+            regex_pattern: The pattern of the event names that may satisfy
+                take().
+
+        Returns:
+            The result of take(), or None if timed out.
+        """
+        result = take()
+        if result is not None or timeout == 0:
+            return result
+        waiter = threading.Condition(self._lock)
+        if regex_pattern is not None:
+            self._get_pattern_names(regex_pattern)
+            waiters = self._pattern_waiters.setdefault(regex_pattern, set())
+        else:
+            waiters = self._name_waiters.setdefault(event_name, set())
+        waiters.add(waiter)
+        deadline = None if timeout is None else time.time() + timeout
+        try:
+            while True:
+                if deadline is None:
+                    waiter.wait()
                 else:
-                    q = queue.Queue()
-                    q.put(event_obj)
-                    self._event_dict[event_name] = q
-                self._lock.release()
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    waiter.wait(remaining)
+                result = take()
+                if result is not None:
+                    return result
+        finally:
+            waiters.discard(waiter)
 
     def register_handler(self, handler, event_name, args):
         """Registers an event handler.
@@ -173,6 +465,10 @@ class EventDispatcher:
             return
         self._started = False
         self._executor.shutdown(wait=True)
+        dropped_counts = self.get_dropped_counts()
+        if dropped_counts:
+            self.log.warning('Events dropped by their retention policies: %s'
+                             % dropped_counts)
         self.clear_all_events()
 
     def pop_event(self, event_name, timeout=DEFAULT_TIMEOUT):
@@ -198,27 +494,20 @@ class EventDispatcher:
             raise IllegalStateError(
                 'Dispatcher needs to be started before popping.')
 
-        e_queue = self.get_event_q(event_name)
-
-        if not e_queue:
-            raise IllegalStateError(
-                'Failed to get an event queue for {}'.format(event_name))
+        def pop_oldest():
+            return self.get_event_q(event_name).pop_oldest()
 
-        try:
-            # Block for timeout
-            if timeout:
-                return e_queue.get(True, timeout)
-            # Non-blocking poll for event
-            elif timeout == 0:
-                return e_queue.get(False)
-            else:
-                # Block forever on event wait
-                return e_queue.get(True)
-        except queue.Empty:
+        with self._lock:
+            # Only None blocks forever, and only 0 does not block at all.
+            event = self._wait_for(pop_oldest,
+                                   timeout if timeout or timeout == 0 else None,
+                                   event_name=event_name)
+        if event is None:
             msg = 'Timeout after {}s waiting for event: {}'.format(
                 timeout, event_name)
             self.log.info(msg)
             raise queue.Empty(msg)
+        return event
 
     def wait_for_event(self,
                        event_name,
@@ -228,10 +517,11 @@ class EventDispatcher:
                        **kwargs):
         """Wait for an event that satisfies a predicate to appear.
 
-        Continuously pop events of a particular name and check against the
-        predicate until an event that satisfies the predicate is popped or
+        Check the events of a particular name against the predicate, as they
+        are queued, until an event that satisfies the predicate is popped or
         timed out. Note this will remove all the events of the same name that
-        do not satisfy the predicate in the process.
+        do not satisfy the predicate in the process, unless
+        consume_ignored_events is False, in which case they are left in place.
 
         Args:
             event_name: Name of the event to be popped.
@@ -250,35 +540,41 @@ class EventDispatcher:
             queue.Empty: Raised if no event that satisfies the predicate was
                 found before time out.
         """
-        deadline = time.time() + timeout
-        ignored_events = []
+        if not self._started:
+            raise IllegalStateError(
+                'Dispatcher needs to be started before popping.')
         consume_events = kwargs.pop('consume_ignored_events', True)
-        while True:
-            event = None
-            try:
-                event = self.pop_event(event_name, 1)
-                if consume_events:
+
+        def pop_matching():
+            events = self.get_event_q(event_name)
+            if consume_events:
+                while True:
+                    event = events.pop_oldest()
+                    if event is None:
+                        break
                     self.log.debug('Consuming event: %r' % event)
-                else:
-                    self.log.debug('Peeking at event: %r' % event)
-                    ignored_events.append(event)
-            except queue.Empty:
-                pass
-
-            if event and predicate(event, *args, **kwargs):
-                for ignored_event in ignored_events:
-                    self.get_event_q(event_name).put(ignored_event)
-                self.log.debug('Matched event: %r with %s' %
-                               (event, predicate.__name__))
-                return event
-
-            if time.time() > deadline:
-                for ignored_event in ignored_events:
-                    self.get_event_q(event_name).put(ignored_event)
-                msg = 'Timeout after {}s waiting for event: {}'.format(
-                    timeout, event_name)
-                self.log.info(msg)
-                raise queue.Empty(msg)
+                    if predicate(event, *args, **kwargs):
+                        return event
+                return None
+            # Other consumers may have popped events in the meantime, so the
+            # ignored events are checked again on every wake-up.
+            events.expire()
+            for index, event in enumerate(events):
+                if predicate(event, *args, **kwargs):
+                    return events.pop_at(index)
+                self.log.debug('Peeking at event: %r' % event)
+            return None
+
+        with self._lock:
+            event = self._wait_for(pop_matching, timeout, event_name=event_name)
+        if event is None:
+            msg = 'Timeout after {}s waiting for event: {}'.format(
+                timeout, event_name)
+            self.log.info(msg)
+            raise queue.Empty(msg)
+        self.log.debug('Matched event: %r with %s' %
+                       (event, predicate.__name__))
+        return event
 
     def pop_events(self, regex_pattern, timeout, freq=1):
         """Pop events whose names match a regex pattern.
@@ -294,6 +590,7 @@ class EventDispatcher:
                 should match in order to be popped.
             timeout: Number of seconds to wait for events in case no event
                 matching the condition exits when the function is called.
+            freq: Unused. Waiting no longer polls; kept for compatibility.
 
         Returns:
             results: Pop events whose names match a regex pattern.
@@ -307,14 +604,12 @@ class EventDispatcher:
         if not self._started:
             raise IllegalStateError(
                 "Dispatcher needs to be started before popping.")
-        deadline = time.time() + timeout
-        while True:
-            # TODO: fix the sleep loop
-            results = self._match_and_pop(regex_pattern)
-            if len(results) != 0 or time.time() > deadline:
-                break
-            time.sleep(freq)
-        if len(results) == 0:
+        with self._lock:
+            results = self._wait_for(
+                lambda: self._match_and_pop(regex_pattern) or None,
+                timeout,
+                regex_pattern=regex_pattern)
+        if not results:
             msg = 'Timeout after {}s waiting for event: {}'.format(
                 timeout, regex_pattern)
             self.log.error(msg)
@@ -322,38 +617,144 @@ class EventDispatcher:
 
         return sorted(results, key=lambda event: event['time'])
 
+    def get_queued_count(self, regex_pattern):
+        """Returns the number of events matching regex_pattern queued so far.
+
+        Events count whether or not they have been popped since.
+        """
+        with self._lock:
+            return sum(self._queued_counts[name]
+                       for name in self._get_pattern_names(regex_pattern))
+
+    def wait_for_new_events(self, regex_pattern, queued_count, timeout):
+        """Waits for new events matching regex_pattern, without popping them.
+
+        Lets callers react to events that other consumers may also be waiting
+        for.
+
+        Args:
+            regex_pattern: The regular expression pattern that an event name
+                should match.
+            queued_count: The get_queued_count(regex_pattern) the new events
+                are counted from.
+            timeout: Number of seconds to wait. Never times out if None.
+
+        Returns:
+            The new get_queued_count(regex_pattern), or None if no new event
+            was queued before time out.
+        """
+        if not self._started:
+            raise IllegalStateError(
+                'Dispatcher needs to be started before waiting.')
+
+        def count_if_new():
+            count = self.get_queued_count(regex_pattern)
+            return count if count > queued_count else None
+
+        with self._lock:
+            return self._wait_for(count_if_new, timeout,
+                                  regex_pattern=regex_pattern)
+
     def _match_and_pop(self, regex_pattern):
         """Pop one event from each of the event queues whose names
         match (in a sense of regular expression) regex_pattern.
         """
         results = []
-        self._lock.acquire()
-        for name in self._event_dict.keys():
-            if re.match(regex_pattern, name):
-                q = self._event_dict[name]
-                if q:
-                    try:
-                        results.append(q.get(False))
-                    except queue.Empty:
-                        pass
-        self._lock.release()
+        with self._lock:
+            for name in self._get_pattern_names(regex_pattern):
+                events = self._event_dict.get(name)
+                event = events.pop_oldest() if events else None
+                if event is not None:
+                    results.append(event)
         return results
 
     def get_event_q(self, event_name):
         """Obtain the queue storing events of the specified name.
 
-        If no event of this name has been polled, wait for one to.
+        If no event of this name has been polled, an empty queue is created.
 
-        Returns: A queue storing all the events of the specified name.
+        Returns: An EventQueue storing all the events of the specified name.
+            Must only be accessed while holding _lock.
         """
-        self._lock.acquire()
-        if (event_name not in self._event_dict
-                or self._event_dict[event_name] is None):
-            self._event_dict[event_name] = queue.Queue()
-        self._lock.release()
+        with self._lock:
+            if event_name not in self._event_dict:
+                self._event_dict[event_name] = EventQueue(
+                    self._get_retention_policy(event_name))
+                for compiled, names in self._patterns.values():
+                    if compiled.match(event_name):
+                        names.add(event_name)
+            return self._event_dict[event_name]
+
+    def _get_retention_policy(self, event_name):
+        """Returns the last RetentionPolicy set for a matching pattern."""
+        for compiled, policy in reversed(self._retention_policies):
+            if compiled.match(event_name):
+                return policy
+        return self.default_retention_policy
+
+    def set_retention_policy(self, regex_pattern, policy):
+        """Sets how the unhandled events of matching names are retained.
+
+        Applies to the events already queued, and overrides the policies set
+        before it for the same names.
 
-        event_queue = self._event_dict[event_name]
-        return event_queue
+        Args:
+            regex_pattern: The regular expression pattern that an event name
+                should match for the policy to apply.
+            policy: A RetentionPolicy.
+        """
+        with self._lock:
+            compiled = re.compile(regex_pattern)
+            self._retention_policies.append((compiled, policy))
+            for event_name, event_queue in self._event_dict.items():
+                if compiled.match(event_name):
+                    event_queue.policy = policy
+                    event_queue.trim()
+
+    def get_dropped_counts(self):
+        """Returns the number of events dropped by each retention policy.
+
+        Returns:
+            A dict of event name to a dict of {'overflow': count,
+            'expired': count}, for every name that dropped events.
+        """
+        with self._lock:
+            for event_queue in self._event_dict.values():
+                event_queue.expire()
+            return {
+                name: {
+                    'overflow': event_queue.dropped_overflow,
+                    'expired': event_queue.dropped_expired,
+                }
+                for name, event_queue in self._event_dict.items()
+                if event_queue.dropped_overflow or event_queue.dropped_expired
+            }
+
+    def get_memory_report(self):
+        """Returns the memory used by the unhandled events of this session.
+
+        Returns:
+            A dict with the 'total_events' and 'total_bytes' queued, and the
+            'queues', a dict of event name to the 'events' and 'bytes' it
+            holds, its 'dropped_overflow' and 'dropped_expired' counts and its
+            'policy'. Byte counts are estimates.
+        """
+        with self._lock:
+            queues = {}
+            for name, event_queue in self._event_dict.items():
+                event_queue.expire()
+                queues[name] = {
+                    'events': len(event_queue),
+                    'bytes': event_queue.size_in_bytes(),
+                    'dropped_overflow': event_queue.dropped_overflow,
+                    'dropped_expired': event_queue.dropped_expired,
+                    'policy': repr(event_queue.policy),
+                }
+        return {
+            'total_events': sum(q['events'] for q in queues.values()),
+            'total_bytes': sum(q['bytes'] for q in queues.values()),
+            'queues': queues,
+        }
 
     def handle_subscribed_event(self, event_obj, event_name):
         """Execute the registered handler of an event.
@@ -432,16 +833,11 @@ class EventDispatcher:
         if not self._started:
             raise IllegalStateError(("Dispatcher needs to be started before "
                                      "popping."))
-        results = []
-        try:
-            self._lock.acquire()
-            while True:
-                e = self._event_dict[event_name].get(block=False)
-                results.append(e)
-        except (queue.Empty, KeyError):
-            return results
-        finally:
-            self._lock.release()
+        with self._lock:
+            events = self._event_dict.get(event_name)
+            if not events:
+                return []
+            return events.pop_all()
 
     def clear_events(self, event_name):
         """Clear all events of a particular name.
@@ -449,20 +845,32 @@ class EventDispatcher:
         Args:
             event_name: Name of the events to be popped.
         """
-        self._lock.acquire()
-        try:
-            q = self.get_event_q(event_name)
-            q.queue.clear()
-        except queue.Empty:
-            return
-        finally:
-            self._lock.release()
+        with self._lock:
+            self.get_event_q(event_name).clear()
+
+    def clear_new_events(self, event_name, queued_count):
+        """Clears the events of a name queued after a given count.
+
+        The events queued before are kept, so that events received for other
+        consumers are not lost.
+
+        Args:
+            event_name: Name of the events to be cleared.
+            queued_count: The get_queued_count of the name the events to clear
+                are counted from.
+        """
+        with self._lock:
+            event_queue = self.get_event_q(event_name)
+            new_count = self._queued_counts[event_name] - queued_count
+            for _ in range(min(new_count, len(event_queue))):
+                event_queue.pop_at(-1)
 
     def clear_all_events(self):
         """Clear all event queues and their cached events."""
-        self._lock.acquire()
-        self._event_dict.clear()
-        self._lock.release()
+        with self._lock:
+            self._event_dict.clear()
+            for _, names in self._patterns.values():
+                names.clear()
 
     def is_event_match(self, event, field, value):
         return self.is_event_match_for_list(event, field, [value])
@@ -13,6 +13,7 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
+import contextlib
 import json
 import socket
 import threading
@@ -29,6 +30,11 @@ SOCKET_TIMEOUT = 60
 # The Session UID when a UID has not been received yet.
 UNKNOWN_UID = -1
 
+# The prefixes of the RPCs that block on the device until an event arrives.
+# Pipelined clients send them over pooled connections, so that they do not
+# hold up the RPCs sent after them.
+BLOCKING_RPC_PREFIXES = ('eventWait', 'eventPoll')
+
 class Sl4aException(error.ActsError):
     """The base class for all SL4A exceptions."""
 
@@ -87,6 +93,249 @@ class Sl4aRpcTimeoutError(Sl4aException):
     """An error raised when an SL4A RPC has timed out."""
 
 
+def _is_blocking_rpc(method):
+    """Returns whether an RPC may block on the device, e.g. eventWait."""
+    return method.startswith(BLOCKING_RPC_PREFIXES)
+
+
+def _get_rpc_result(method, result):
+    """Returns the result of an RPC response, or raises its Sl4aApiError.
+
+    Args:
+        method: The name of the RPC method the response is for.
+        result: The decoded JSON response.
+    """
+    if result['error']:
+        error_object = result['error']
+        if isinstance(error_object, dict):
+            # Uses JSON-RPC 2.0 Format
+            raise Sl4aApiError(error_object.get('message', None),
+                               error_object.get('code', -1),
+                               error_object.get('data', {}),
+                               rpc_name=method)
+        else:
+            # Fallback on JSON-RPC 1.0 Format
+            raise Sl4aApiError(error_object, rpc_name=method)
+    return result['result']
+
+
+class RpcPipeline(object):
+    """Multiplexes many in-flight RPCs over a single RpcConnection.
+
+    Requests are written as soon as they are submitted, without waiting for
+    the responses to the requests sent before them. A background reader thread
+    matches each response to its request by id, and completes its future.
+
+    Note that SL4A executes the requests of a connection in order, so an RPC
+    that blocks on the device (e.g. eventWait) delays the responses of the
+    RPCs sent after it. RpcClient sends such RPCs over its pooled connections
+    instead.
+
+    Attributes:
+        connection: The RpcConnection the requests are sent over.
+        is_alive: False once the connection has failed or has been closed.
+        _pending: A dict of request id to (method name, Future).
+        _lock: A lock guarding _pending, is_alive and writes to the connection.
+    """
+
+    def __init__(self, connection, on_error_callback, log):
+        """Creates an RpcPipeline, and starts reading responses.
+
+        Args:
+            connection: An opened RpcConnection to send requests over.
+            on_error_callback: A callback for when the connection fails.
+            log: The logger of the owning RpcClient.
+        """
+        self.connection = connection
+        self.is_alive = True
+        self._on_error = on_error_callback
+        self._log = log
+        self._pending = {}
+        self._lock = threading.Lock()
+        # The reader waits on responses for as long as the connection is open.
+        # RPC timeouts are applied while waiting on the futures instead.
+        connection.set_timeout(None)
+        self._reader = threading.Thread(target=self._read_responses,
+                                        name='RpcPipeline reader',
+                                        daemon=True)
+        self._reader.start()
+
+    def submit(self, method, args):
+        """Sends an RPC, and returns a Future holding its result."""
+        return self.submit_all([(method, args)])[0]
+
+    def submit_all(self, calls):
+        """Sends several RPCs in a single write.
+
+        Args:
+            calls: A list of (method name, args) tuples.
+
+        Returns:
+            A list of Futures holding the result of each call, in order. A
+            Future raises Sl4aApiError if its RPC executed with errors.
+
+        Raises:
+            Sl4aConnectionError: The connection is closed or broken.
+        """
+        requests = []
+        submitted = []
+        with self._lock:
+            if not self.is_alive:
+                raise Sl4aConnectionError(
+                    'The RPC pipeline over %s has been closed.' %
+                    self.connection.ports)
+            for method, args in calls:
+                ticket = self.connection.get_new_ticket()
+                future = futures.Future()
+                self._pending[ticket] = (method, future)
+                requests.append(
+                    json.dumps({
+                        'id': ticket,
+                        'method': method,
+                        'params': args
+                    }))
+                submitted.append((ticket, future))
+            try:
+                self.connection.send_requests(requests)
+            except OSError as e:
+                for ticket, _ in submitted:
+                    self._pending.pop(ticket, None)
+                raise Sl4aConnectionError(e)
+        return [future for _, future in submitted]
+
+    def _read_responses(self):
+        """Completes the future of every response, until the connection ends.
+        """
+        while True:
+            try:
+                response = self.connection.get_response()
+            except (OSError, ValueError) as e:
+                self._fail(Sl4aConnectionError(e))
+                return
+            if not response:
+                self._fail(
+                    Sl4aProtocolError(
+                        Sl4aProtocolError.NO_RESPONSE_FROM_SERVER))
+                return
+            try:
+                result = json.loads(str(response, encoding='utf8'))
+                ticket = result['id']
+            except (ValueError, KeyError, TypeError) as e:
+                self._fail(
+                    Sl4aProtocolError('Malformed response from server: %r. '
+                                      '%s' % (response, e)))
+                return
+            with self._lock:
+                method, future = self._pending.pop(ticket, (None, None))
+            if future is None:
+                self._log.error('Received a response with unknown api id %s',
+                                ticket)
+                continue
+            try:
+                future.set_result(_get_rpc_result(method, result))
+            except Sl4aApiError as e:
+                self._log.warning(e)
+                future.set_exception(e)
+
+    def _fail(self, error):
+        """Fails all pending RPCs with the given error."""
+        with self._lock:
+            was_alive = self.is_alive
+            self.is_alive = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for _, future in pending:
+            future.set_exception(error)
+        if was_alive:
+            self._log.error('The RPC pipeline over %s failed: %s',
+                            self.connection.ports, error)
+            self._on_error(self.connection)
+
+    def close(self):
+        """Closes the connection. Pending RPCs fail with an Sl4aException."""
+        with self._lock:
+            self.is_alive = False
+        self.connection.close()
+
+
+class RpcBatch(object):
+    """Collects RPC calls, then sends them in a single write on exit.
+
+    Each call returns a Future, completed once the batch has been sent. Its
+    result() returns the result of the RPC, or raises its Sl4aApiError, just
+    like calling the RPC directly. See RpcClient.batch().
+
+    Attributes:
+        _rpc_client: The RpcClient to send the batch with.
+        _timeout: The amount of time to wait for the responses.
+        _calls: A list of the (method name, args) of each call.
+        _futures: A list of the Future returned by each call.
+        _sent: Whether the batch has been sent.
+    """
+
+    def __init__(self, rpc_client, timeout=None):
+        self._rpc_client = rpc_client
+        self._timeout = timeout
+        self._calls = []
+        self._futures = []
+        self._sent = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.send()
+        elif not self._sent:
+            # The calls are dropped, but their Futures must not hang.
+            self._sent = True
+            for future in self._futures:
+                future.set_exception(
+                    Sl4aException('The RPC batch was not sent: %r' %
+                                  exc_value))
+
+    def send(self):
+        """Sends the batched calls, and waits for all of their results.
+
+        Raises:
+            Sl4aException: The batch as a whole failed. Every call's Future
+                raises the same error. Other errors, e.g. socket errors, are
+                raised and set on every Future alike.
+        """
+        if self._sent:
+            raise Sl4aException('This RPC batch has already been sent.')
+        self._sent = True
+        if not self._calls:
+            return
+        try:
+            results = self._rpc_client._batch_rpc(self._calls, self._timeout)
+        except Exception as e:
+            for future in self._futures:
+                future.set_exception(e)
+            raise
+        for future, result in zip(self._futures, results):
+            if result.exception() is not None:
+                future.set_exception(result.exception())
+            else:
+                future.set_result(result.result())
+
+    def __getattr__(self, name):
+        """Wrapper for python magic to turn method calls into batched calls."""
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def rpc_call(*args):
+            if self._sent:
+                raise Sl4aException('This RPC batch has already been sent.')
+            usage_metadata_logger.log_usage(self.__module__, name)
+            future = futures.Future()
+            self._calls.append((name, args))
+            self._futures.append(future)
+            return future
+
+        return rpc_call
+
+
 class RpcClient(object):
     """An RPC client capable of processing multiple RPCs concurrently.
 
@@ -123,6 +372,12 @@ class RpcClient(object):
             """Wrapper for python magic to turn method calls into RPC calls."""
 
             def rpc_call(*args, **kwargs):
+                # Pipelined calls need no worker thread. Calls with a timeout
+                # still use one, so the timeout is applied.
+                if (self._rpc_client.pipelined and not kwargs
+                        and not _is_blocking_rpc(name)):
+                    usage_metadata_logger.log_usage(self.__module__, name)
+                    return self._rpc_client._get_pipeline().submit(name, args)
                 future = self._executor.submit(
                     self._rpc_client.__getattr__(name), *args, **kwargs)
                 return future
@@ -134,7 +389,8 @@ class RpcClient(object):
                  serial,
                  on_error_callback,
                  _create_connection_func,
-                 max_connections=None):
+                 max_connections=None,
+                 pipelined=False):
         """Creates a new RpcClient object.
 
         Args:
@@ -145,6 +401,10 @@ class RpcClient(object):
                 new session.
             max_connections: The maximum number of connections the RpcClient
                 can have.
+            pipelined: If True, RPCs are multiplexed over a single
+                RpcPipeline connection, instead of taking a connection each.
+                RPCs blocking on the device, e.g. eventWait, still take a
+                connection each.
         """
         self._serial = serial
         self.on_error = on_error_callback
@@ -166,6 +426,10 @@ class RpcClient(object):
         else:
             self.max_connections = max_connections
 
+        self.pipelined = pipelined
+        self._pipeline = None
+        self._pipeline_lock = threading.Lock()
+
         self._async_client = RpcClient.AsyncClient(self)
         self.is_alive = True
 
@@ -184,6 +448,26 @@ class RpcClient(object):
         self._free_connections = []
         self._working_connections = []
         self.is_alive = False
+        with self._pipeline_lock:
+            if self._pipeline is not None:
+                self._log.debug('Closing pipelined connection over ports %s' %
+                                self._pipeline.connection.ports)
+                self._pipeline.close()
+                self._pipeline = None
+
+    def _get_pipeline(self):
+        """Returns the RpcPipeline, opening a new one if it is not alive."""
+        with self._pipeline_lock:
+            if self._pipeline is None or not self._pipeline.is_alive:
+                self._pipeline = RpcPipeline(
+                    self._create_connection_func(self.uid),
+                    self._on_pipeline_error, self._log)
+            return self._pipeline
+
+    def _on_pipeline_error(self, connection):
+        """Reports the failure of the pipelined connection."""
+        if self.is_alive:
+            self.on_error(connection)
 
     def _get_free_connection(self):
         """Returns a free connection to be used for an RPC call.
@@ -228,6 +512,53 @@ class RpcClient(object):
             self._working_connections.remove(connection)
             self._free_connections.append(connection)
 
+    def _discard_working_connection(self, connection):
+        """Closes a working connection, and removes it from the pool."""
+        connection.close()
+        with self._lock:
+            self._working_connections.remove(connection)
+
+    @contextlib.contextmanager
+    def _connection_in_use(self, connection, method, ticket, timeout):
+        """Handles the errors of a working connection, then releases it.
+
+        Args:
+            connection: The working connection the RPCs are sent over.
+            method: The name of the RPC method(s) being sent. Used for logging.
+            ticket: The id(s) of the RPCs being sent. Used for logging.
+            timeout: The amount of time to wait for a response.
+        """
+        if timeout:
+            connection.set_timeout(timeout)
+        try:
+            yield
+        except BrokenPipeError as e:
+            if self.is_alive:
+                self._log.exception('The device disconnected during RPC call '
+                                    '%s. Please check the logcat for a crash '
+                                    'or disconnect.', method)
+                self.on_error(connection)
+            else:
+                self._log.warning('The connection was killed during cleanup:')
+                self._log.warning(e)
+            raise Sl4aConnectionError(e)
+        except socket.timeout as err:
+            # If a socket connection has timed out, the socket can no longer be
+            # used. Close it out and remove the socket from the connection pool.
+            self._log.warning('RPC "%s" (id: %s) timed out after %s seconds.',
+                              method, ticket, timeout or SOCKET_TIMEOUT)
+            self._log.debug(
+                'Closing timed out connection over %s' % connection.ports)
+            self._discard_working_connection(connection)
+            # Re-raise the error as an SL4A Error so end users can process it.
+            raise Sl4aRpcTimeoutError(err)
+        finally:
+            # Discarded connections are no longer working connections.
+            if connection in self._working_connections:
+                if timeout:
+                    connection.set_timeout(SOCKET_TIMEOUT)
+                self._release_working_connection(connection)
+
     def rpc(self, method, *args, timeout=None, retries=3):
         """Sends an rpc to sl4a.
 
@@ -246,15 +577,14 @@ class RpcClient(object):
             Sl4aProtocolError: Something went wrong with the sl4a protocol.
             Sl4aApiError: The rpc went through, however executed with errors.
         """
+        if self.pipelined and not _is_blocking_rpc(method):
+            return self._pipelined_rpc(method, args, timeout, retries)
         connection = self._get_free_connection()
         ticket = connection.get_new_ticket()
-        timed_out = False
-        if timeout:
-            connection.set_timeout(timeout)
         data = {'id': ticket, 'method': method, 'params': args}
         request = json.dumps(data)
         response = ''
-        try:
+        with self._connection_in_use(connection, method, ticket, timeout):
             for i in range(1, retries + 1):
                 connection.send_request(request)
 
@@ -274,53 +604,146 @@ class RpcClient(object):
                             Sl4aProtocolError.NO_RESPONSE_FROM_SERVER)
                 else:
                     break
-        except BrokenPipeError as e:
-            if self.is_alive:
-                self._log.exception('The device disconnected during RPC call '
-                                    '%s. Please check the logcat for a crash '
-                                    'or disconnect.', method)
-                self.on_error(connection)
-            else:
-                self._log.warning('The connection was killed during cleanup:')
-                self._log.warning(e)
-            raise Sl4aConnectionError(e)
-        except socket.timeout as err:
-            # If a socket connection has timed out, the socket can no longer be
-            # used. Close it out and remove the socket from the connection pool.
-            timed_out = True
-            self._log.warning('RPC "%s" (id: %s) timed out after %s seconds.',
-                              method, ticket, timeout or SOCKET_TIMEOUT)
-            self._log.debug(
-                'Closing timed out connection over %s' % connection.ports)
-            connection.close()
-            self._working_connections.remove(connection)
-            # Re-raise the error as an SL4A Error so end users can process it.
-            raise Sl4aRpcTimeoutError(err)
-        finally:
-            if not timed_out:
-                if timeout:
-                    connection.set_timeout(SOCKET_TIMEOUT)
-                self._release_working_connection(connection)
         result = json.loads(str(response, encoding='utf8'))
 
-        if result['error']:
-            error_object = result['error']
-            if isinstance(error_object, dict):
-                # Uses JSON-RPC 2.0 Format
-                sl4a_api_error = Sl4aApiError(error_object.get('message', None),
-                                              error_object.get('code', -1),
-                                              error_object.get('data', {}),
-                                              rpc_name=method)
-            else:
-                # Fallback on JSON-RPC 1.0 Format
-                sl4a_api_error = Sl4aApiError(error_object, rpc_name=method)
+        try:
+            rpc_result = _get_rpc_result(method, result)
+        except Sl4aApiError as sl4a_api_error:
             self._log.warning(sl4a_api_error)
-            raise sl4a_api_error
+            raise
         if result['id'] != ticket:
             self._log.error('RPC method %s with mismatched api id %s', method,
                             result['id'])
             raise Sl4aProtocolError(Sl4aProtocolError.MISMATCHED_API_ID)
-        return result['result']
+        return rpc_result
+
+    def _pipelined_rpc(self, method, args, timeout, retries):
+        """Sends an rpc over the RpcPipeline, and waits for its result.
+
+        Like the responses missing from a pooled connection, a failure of the
+        pipeline is retried on a new pipeline, up to retries tries in total.
+        """
+        for i in range(1, retries + 1):
+            future = self._get_pipeline().submit(method, args)
+            try:
+                return future.result(timeout=timeout or SOCKET_TIMEOUT)
+            except futures.TimeoutError as err:
+                # Unlike a timed out socket, the pipeline remains usable. The
+                # late response, if any, completes the abandoned future.
+                self._log.warning(
+                    'Pipelined RPC "%s" timed out after %s seconds.', method,
+                    timeout or SOCKET_TIMEOUT)
+                raise Sl4aRpcTimeoutError(err)
+            except (Sl4aConnectionError, Sl4aProtocolError) as err:
+                if i == retries:
+                    raise
+                self._log.warning(
+                    'Pipelined RPC method %s failed on iteration %s: %s',
+                    method, i, err)
+
+    def batch(self, timeout=None):
+        """Returns an RpcBatch, sending the RPCs called on it in one write.
+
+        This function allows the idiom:
+
+        >>> with rpc_client.batch() as batch:
+        ...     state = batch.telephonyGetCallState()
+        ...     addresses = batch.connectivityGetIPv4Addresses('wlan0')
+        >>> # The batch is sent, and all responses are received, on exit.
+        >>> state.result()
+
+        Args:
+            timeout: The amount of time to wait for the responses.
+        """
+        return RpcBatch(self, timeout=timeout)
+
+    def _batch_rpc(self, calls, timeout=None):
+        """Sends several rpcs in a single write, and waits for their results.
+
+        Args:
+            calls: A list of (method name, args) tuples.
+            timeout: The amount of time to wait for the responses.
+
+        Returns:
+            A list of completed Futures holding the result of each call, in
+            order. A Future raises Sl4aApiError if its RPC executed with
+            errors.
+
+        Raises:
+            Sl4aProtocolError: Something went wrong with the sl4a protocol.
+            Sl4aConnectionError: The device disconnected.
+            Sl4aRpcTimeoutError: Not every response was received in time.
+        """
+        methods = ', '.join(method for method, _ in calls)
+        if self.pipelined and not any(
+                _is_blocking_rpc(method) for method, _ in calls):
+            results = self._get_pipeline().submit_all(calls)
+            _, not_done = futures.wait(results,
+                                       timeout=timeout or SOCKET_TIMEOUT)
+            if not_done:
+                self._log.warning(
+                    'Batched RPCs "%s" timed out after %s seconds.', methods,
+                    timeout or SOCKET_TIMEOUT)
+                raise Sl4aRpcTimeoutError(
+                    '%s of %s batched RPCs timed out.' % (len(not_done),
+                                                          len(results)))
+            return results
+
+        connection = self._get_free_connection()
+        pending = {}
+        requests = []
+        results = []
+        for method, args in calls:
+            ticket = connection.get_new_ticket()
+            future = futures.Future()
+            pending[ticket] = (method, future)
+            requests.append(
+                json.dumps({
+                    'id': ticket,
+                    'method': method,
+                    'params': args
+                }))
+            results.append(future)
+        tickets = '%s-%s' % (min(pending), max(pending))
+        with self._connection_in_use(connection, methods, tickets, timeout):
+            connection.send_requests(requests)
+            for _ in requests:
+                response = connection.get_response()
+                if not response:
+                    self._log.error('No response for batched RPC methods %s',
+                                    methods)
+                    self.on_error(connection)
+                    raise Sl4aProtocolError(
+                        Sl4aProtocolError.NO_RESPONSE_FROM_SERVER)
+                try:
+                    result = json.loads(str(response, encoding='utf8'))
+                    ticket = result['id']
+                except (ValueError, KeyError, TypeError) as e:
+                    self._log.error(
+                        'Malformed response to batched RPC methods %s: %r',
+                        methods, response)
+                    # The rest of the responses cannot be told apart.
+                    self.on_error(connection)
+                    self._discard_working_connection(connection)
+                    raise Sl4aProtocolError(
+                        'Malformed response from server: %r. %s' %
+                        (response, e))
+                method, future = pending.pop(ticket, (None, None))
+                if future is None:
+                    self._log.error('Batched RPC with mismatched api id %s',
+                                    ticket)
+                    # The rest of the responses are still unread, so the
+                    # connection cannot be reused.
+                    self.on_error(connection)
+                    self._discard_working_connection(connection)
+                    raise Sl4aProtocolError(
+                        Sl4aProtocolError.MISMATCHED_API_ID)
+                try:
+                    future.set_result(_get_rpc_result(method, result))
+                except Sl4aApiError as sl4a_api_error:
+                    self._log.warning(sl4a_api_error)
+                    future.set_exception(sl4a_api_error)
+        return results
 
     @property
     def future(self):
@@ -343,6 +766,10 @@ class RpcClient(object):
         The number of concurrent calls to this method is limited to
         (max_connections - 2), to prevent future calls from exhausting all free
         connections.
+
+        If the client is pipelined, the calls are instead sent over the
+        RpcPipeline right away, and the number of concurrent calls is not
+        limited.
         """
         return self._async_client
 
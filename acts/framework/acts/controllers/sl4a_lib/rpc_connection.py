@@ -127,6 +127,14 @@ class RpcConnection(object):
         self._socket_file.flush()
         self.log.debug('Sent: ' + request)
 
+    def send_requests(self, requests):
+        """Sends several requests over the connection in a single write."""
+        self._socket_file.write(b''.join(
+            request.encode('utf8') + b'\n' for request in requests))
+        self._socket_file.flush()
+        for request in requests:
+            self.log.debug('Sent: ' + request)
+
     def get_response(self):
         """Returns the first response sent back to the client."""
         data = self._socket_file.readline()
@@ -135,5 +143,10 @@ class RpcConnection(object):
 
     def close(self):
         """Closes the connection gracefully."""
+        try:
+            # Unlike close(), shutdown() wakes up threads blocked on reads.
+            self._client_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         self._client_socket.close()
         self.adb.remove_tcp_forward(self.ports.forwarded_port)
@@ -18,6 +18,7 @@ import threading
 import time
 
 from acts import logger
+from acts.controllers.sl4a_lib import event_dispatcher
 from acts.controllers.sl4a_lib import rpc_client
 from acts.controllers.sl4a_lib import sl4a_session
 from acts.controllers.sl4a_lib import error_reporter
@@ -245,7 +246,9 @@ class Sl4aManager(object):
                        max_connections=None,
                        client_port=0,
                        forwarded_port=0,
-                       server_port=None):
+                       server_port=None,
+                       pipelined=False,
+                       event_drain_size=event_dispatcher.DEFAULT_DRAIN_SIZE):
         """Creates an SL4A server with the given ports if possible.
 
         The ports are not guaranteed to be available for use. If the port
@@ -259,6 +262,10 @@ class Sl4aManager(object):
             server_port: The port on the Android device.
             max_connections: The max number of client connections for the
                 session.
+            pipelined: Whether the session multiplexes all RPCs over a single
+                connection. See rpc_client.RpcPipeline.
+            event_drain_size: The number of pending events the session's
+                EventDispatcher drains per eventPoll. 0 disables draining.
 
         Returns:
             A new Sl4aServer instance.
@@ -281,7 +288,9 @@ class Sl4aManager(object):
                                            self.obtain_sl4a_server,
                                            self.diagnose_failure,
                                            forwarded_port,
-                                           max_connections=max_connections)
+                                           max_connections=max_connections,
+                                           pipelined=pipelined,
+                                           event_drain_size=event_drain_size)
         self.sessions[session.uid] = session
         return session
 
@@ -43,6 +43,7 @@ class Sl4aSession(object):
         _terminated: A bool that stores whether or not this session has been
             terminated. Terminated sessions cannot be restarted.
         adb: A reference to the AndroidDevice's AdbProxy.
+        event_drain_size: The drain_size of the session's EventDispatcher.
         log: The logger for this Sl4aSession
         server_port: The SL4A server port this session is established on.
         uid: The uid that corresponds the the SL4A Server's session id. This
@@ -56,7 +57,9 @@ class Sl4aSession(object):
                  get_server_port_func,
                  on_error_callback,
                  forwarded_port=0,
-                 max_connections=None):
+                 max_connections=None,
+                 pipelined=False,
+                 event_drain_size=event_dispatcher.DEFAULT_DRAIN_SIZE):
         """Creates an SL4A Session.
 
         Args:
@@ -70,11 +73,18 @@ class Sl4aSession(object):
                 SL4A server to connect to.
             forwarded_port: The server port on host machine forwarded by adb
                             from Android device to accept SL4A connection
+            max_connections: The max number of client connections for the
+                session.
+            pipelined: Whether the RpcClient multiplexes all RPCs over a
+                single connection. See rpc_client.RpcPipeline.
+            event_drain_size: The drain_size of the session's
+                EventDispatcher. 0 disables draining.
         """
         self._event_dispatcher = None
         self._terminate_lock = threading.Lock()
         self._terminated = False
         self.adb = adb
+        self.event_drain_size = event_drain_size
 
         def _log_formatter(message):
             return '[SL4A Session|%s|%s] %s' % (self.adb.serial, self.uid,
@@ -93,7 +103,8 @@ class Sl4aSession(object):
                                                self.adb.serial,
                                                self.diagnose_failure,
                                                connection_creator,
-                                               max_connections=max_connections)
+                                               max_connections=max_connections,
+                                               pipelined=pipelined)
 
     def _rpc_connection_creator(self, host_port):
         def create_client(uid):
@@ -180,7 +191,9 @@ class Sl4aSession(object):
         """Returns the EventDispatcher for this Sl4aSession."""
         if self._event_dispatcher is None:
             self._event_dispatcher = event_dispatcher.EventDispatcher(
-                self.adb.serial, self.rpc_client)
+                self.adb.serial,
+                self.rpc_client,
+                drain_size=self.event_drain_size)
         return self._event_dispatcher
 
     def _create_client_side_connection(self, ports):
@@ -302,6 +302,32 @@ class SshConnection(object):
         result = self.run(command, env=env)
         return result
 
+    def run_nb(self, command, env=None):
+        """Starts a remote command over ssh, without waiting for its output.
+
+        Args:
+            command: The command to execute over ssh.
+            env: A dictonary of environment variables to setup on the remote
+                 host.
+
+        Returns:
+            The subprocess.Popen object of the local ssh process. Its stdout
+            is the output of the remote command, as it is produced.
+        """
+        try:
+            self.setup_master_ssh(self._settings.connect_timeout)
+        except Error:
+            self.log.warning('Failed to create master ssh connection, using '
+                             'normal ssh connection.')
+
+        extra_options = {'BatchMode': True}
+        if self._master_ssh_proc:
+            extra_options['ControlPath'] = self.socket_path
+
+        terminal_command = self._formatter.format_command(
+            command, env or {}, self._settings, extra_options=extra_options)
+        return job.run_async(terminal_command)
+
     def close(self):
         """Clean up open connections to remote host."""
         self._cleanup_master_ssh()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Fast parsing and comparison of logline timestamps.
+
+A logline timestamp, such as '2020-08-12 14:26:42.611', is converted once to
+an integer key: the microseconds between 1970-01-01 00:00:00 and the
+timestamp, both in the same (unspecified) timezone. Keys are then compared as
+plain integers.
+
+Timestamps without a year, such as the '08-12 14:26:42.611' of logcat's
+default format, take the year given with them.
+"""
+
+import datetime
+import re
+import time
+
+import numpy as np
+
+LOGLINE_TIMESTAMP_LEN = 23
+
+US_PER_SECOND = 1000000
+US_PER_MINUTE = 60 * US_PER_SECOND
+
+# The key of the lines parse_block() finds no valid timestamp in.
+INVALID_KEY = np.iinfo(np.int64).min
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+_TIMESTAMP_RE = re.compile(
+    r'(?:(\d+)-)?(\d+)-(\d+) (\d+):(\d+):(\d+)(?:.(\d+))?$')
+
+# A cache of 'YYYY-MM-DD HH:MM' prefixes to their keys. Consecutive log lines
+# share their prefixes, so most of them only parse their seconds.
+_minute_keys = {}
+_MINUTE_CACHE_SIZE = 4096
+
+# The last second converted by epoch_ms_to_timestamp(), and its prefix.
+_last_second = (None, None)
+
+# The positions of the digits and separators of a logline timestamp. Like
+# acts.logger.logline_timestamp_re, any character separates the seconds from
+# the milliseconds.
+_DIGIT_POSITIONS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18, 20, 21, 22]
+_SEPARATORS = {4: '-', 7: '-', 10: ' ', 13: ':', 16: ':'}
+
+
+def _days_from_epoch(year, month, day):
+    """Returns the days between 1970-01-01 and a date.
+
+    Works on ints and on numpy arrays alike.
+    """
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + 12 * (month <= 2) - 3) + 2) // 5 + day - 1
+    day_of_era = (year_of_era * 365 + year_of_era // 4 - year_of_era // 100 +
+                  day_of_year)
+    return era * 146097 + day_of_era - 719468
+
+
+def _fraction_to_us(fraction):
+    """Returns the microseconds of the decimal digits following a second."""
+    if len(fraction) == 3:
+        return int(fraction) * 1000
+    return int((fraction + '00000')[:6])
+
+
+def _minute_key(prefix):
+    """Returns the key of a 'YYYY-MM-DD HH:MM' prefix."""
+    key = _minute_keys.get(prefix)
+    if key is None:
+        key = _slow_key(prefix + ':00')
+        if len(_minute_keys) >= _MINUTE_CACHE_SIZE:
+            _minute_keys.clear()
+        _minute_keys[prefix] = key
+    return key
+
+
+def _slow_key(timestamp, year=None):
+    match = _TIMESTAMP_RE.match(timestamp)
+    if not match:
+        raise ValueError('Invalid logline timestamp: %r' % timestamp)
+    timestamp_year, month, day, hour, minute, second, fraction = (
+        match.groups())
+    if timestamp_year is not None:
+        year = int(timestamp_year)
+    elif year is None:
+        raise ValueError('No year given for logline timestamp: %r' %
+                         timestamp)
+    days = _days_from_epoch(year, int(month), int(day))
+    seconds = ((days * 24 + int(hour)) * 60 + int(minute)) * 60 + int(second)
+    return (seconds * US_PER_SECOND +
+            (_fraction_to_us(fraction) if fraction else 0))
+
+
+def to_key(timestamp, year=None):
+    """Returns the integer key of a logline timestamp.
+
+    Args:
+        timestamp: A timestamp in logline format, optionally without its year
+            and with any number of digits after its seconds.
+        year: The year of timestamps without one.
+
+    Raises:
+        ValueError if the timestamp is not in logline format.
+    """
+    if len(timestamp) >= LOGLINE_TIMESTAMP_LEN and timestamp[16] == ':':
+        seconds = timestamp[17:19]
+        fraction = timestamp[20:]
+        if seconds.isdigit() and fraction.isdigit():
+            return (_minute_key(timestamp[:16]) +
+                    int(seconds) * US_PER_SECOND + _fraction_to_us(fraction))
+    return _slow_key(timestamp, year)
+
+
+def datetime_to_key(dt):
+    """Returns the key of a naive datetime."""
+    return (dt - _EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def key_to_datetime(key):
+    """Returns the naive datetime of a key."""
+    return _EPOCH + datetime.timedelta(microseconds=int(key))
+
+
+def to_datetime(timestamp, year=None):
+    """Parses a logline timestamp into a naive datetime.
+
+    Equivalent to datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S.%f').
+    """
+    return key_to_datetime(to_key(timestamp, year))
+
+
+def compare(t1, t2):
+    """Compares two logline timestamps.
+
+    Returns:
+        -1 if t1 < t2; 1 if t1 > t2; 0 if t1 == t2.
+    """
+    key1 = to_key(t1)
+    key2 = to_key(t2)
+    return (key1 > key2) - (key1 < key2)
+
+
+def epoch_ms_to_timestamp(epoch_ms):
+    """Converts an epoch time in ms to a local logline timestamp."""
+    global _last_second
+    second, ms = divmod(epoch_ms, 1000)
+    cached_second, prefix = _last_second
+    if second != cached_second:
+        prefix = time.strftime('%Y-%m-%d %H:%M:%S.', time.localtime(second))
+        _last_second = (second, prefix)
+    return '%s%03d' % (prefix, ms)
+
+
+def parse_block(lines):
+    """Computes the keys of the timestamps beginning a block of lines.
+
+    All lines are parsed at once, with numpy.
+
+    Args:
+        lines: A list of log lines, as str or bytes.
+
+    Returns:
+        A numpy int64 array of the keys of the lines. Lines not starting with
+        a valid logline timestamp have INVALID_KEY as their key.
+    """
+    if not lines:
+        return np.empty(0, dtype=np.int64)
+    width = LOGLINE_TIMESTAMP_LEN
+    if isinstance(lines[0], bytes):
+        data = b''.join(line[:width].ljust(width) for line in lines)
+    else:
+        # Non-ASCII characters are replaced by one byte each, keeping the
+        # width of the lines.
+        data = ''.join(line[:width].ljust(width) for line in lines).encode(
+            'ascii', errors='replace')
+    chars = np.frombuffer(data, dtype=np.uint8).reshape(len(lines), width)
+    digits = chars[:, _DIGIT_POSITIONS].astype(np.int64) - ord('0')
+    valid = np.all((digits >= 0) & (digits <= 9), axis=1)
+    for position, separator in _SEPARATORS.items():
+        valid &= chars[:, position] == ord(separator)
+
+    def number(first, last):
+        value = digits[:, first]
+        for index in range(first + 1, last + 1):
+            value = value * 10 + digits[:, index]
+        return value
+
+    days = _days_from_epoch(number(0, 3), number(4, 5), number(6, 7))
+    seconds = (((days * 24 + number(8, 9)) * 60 + number(10, 11)) * 60 +
+               number(12, 13))
+    keys = seconds * US_PER_SECOND + number(14, 16) * 1000
+    keys[~valid] = INVALID_KEY
+    return keys
+
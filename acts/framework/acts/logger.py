@@ -25,6 +25,7 @@ from copy import copy
 
 from acts import tracelogger
 from acts.libs.logging import log_stream
+from acts.libs.logging import logline_timestamp
 from acts.libs.logging.log_stream import LogStyles
 
 log_line_format = "%(asctime)s.%(msecs).03d %(levelname)s %(message)s"
@@ -92,23 +93,6 @@ class ColoredLogFormatter(logging.Formatter):
         return super().format(colored_record)
 
 
-def _parse_logline_timestamp(t):
-    """Parses a logline timestamp into a tuple.
-
-    Args:
-        t: Timestamp in logline format.
-
-    Returns:
-        An iterable of date and time elements in the order of month, day, hour,
-        minute, second, microsecond.
-    """
-    date, time = t.split(' ')
-    year, month, day = date.split('-')
-    h, m, s = time.split(':')
-    s, ms = s.split('.')
-    return year, month, day, h, m, s, ms
-
-
 def is_valid_logline_timestamp(timestamp):
     if len(timestamp) == log_line_timestamp_len:
         if logline_timestamp_re.match(timestamp):
@@ -126,14 +110,7 @@ def logline_timestamp_comparator(t1, t2):
     Returns:
         -1 if t1 < t2; 1 if t1 > t2; 0 if t1 == t2.
     """
-    dt1 = _parse_logline_timestamp(t1)
-    dt2 = _parse_logline_timestamp(t2)
-    for u1, u2 in zip(dt1, dt2):
-        if u1 < u2:
-            return -1
-        elif u1 > u2:
-            return 1
-    return 0
+    return logline_timestamp.compare(t1, t2)
 
 
 def _get_timestamp(time_format, delta=None):
@@ -154,9 +131,7 @@ def epoch_to_log_line_timestamp(epoch_time):
         A string that is the corresponding timestamp in log line timestamp
         format.
     """
-    s, ms = divmod(epoch_time, 1000)
-    d = datetime.datetime.fromtimestamp(s)
-    return d.strftime("%Y-%m-%d %H:%M:%S.") + str(ms)
+    return logline_timestamp.epoch_ms_to_timestamp(epoch_time)
 
 
 def get_log_line_timestamp(delta=None):
@@ -46,6 +46,12 @@ from acts.libs.proc import job
 # the file names we output fits within the limit.
 MAX_FILENAME_LEN = 255
 
+# The maximum number of threads of the executor shared by concurrent actions.
+SHARED_EXECUTOR_MAX_WORKERS = 64
+
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
 
 class ActsUtilsError(Exception):
     """Generic error raised for exceptions in ACTS utils."""
@@ -1127,6 +1133,117 @@ def string_similarity(s1, s2):
     return float(result)
 
 
+class _SharedExecutor(ThreadPoolExecutor):
+    """A ThreadPoolExecutor that tracks how many of its workers are free."""
+
+    def __init__(self, max_workers, thread_name_prefix=''):
+        super().__init__(max_workers=max_workers,
+                         thread_name_prefix=thread_name_prefix)
+        self._workers_lock = threading.Lock()
+        self._busy_workers = 0
+
+    def _release_worker(self, _):
+        with self._workers_lock:
+            self._busy_workers -= 1
+
+    def _submit_reserved(self, fn, *args, **kwargs):
+        """Submits a call for which a worker has already been reserved."""
+        future = super().submit(fn, *args, **kwargs)
+        # Also called if the call is cancelled before it starts.
+        future.add_done_callback(self._release_worker)
+        return future
+
+    def submit(self, fn, *args, **kwargs):
+        with self._workers_lock:
+            self._busy_workers += 1
+        return self._submit_reserved(fn, *args, **kwargs)
+
+    def try_submit_all(self, calls):
+        """Submits the calls only if a free worker can start each of them.
+
+        Args:
+            calls: A list of argumentless callable objects.
+
+        Returns:
+            A list of the future of each call, or None if too few workers
+            were free, in which case no call was submitted.
+        """
+        with self._workers_lock:
+            if self._busy_workers + len(calls) > self._max_workers:
+                return None
+            self._busy_workers += len(calls)
+        return [self._submit_reserved(call) for call in calls]
+
+
+def get_shared_executor():
+    """Returns the ThreadPoolExecutor shared by concurrent actions.
+
+    Reusing its threads saves creating a thread per action, e.g. for every
+    check of every device while waiting for their states.
+    """
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = _SharedExecutor(
+                max_workers=SHARED_EXECUTOR_MAX_WORKERS,
+                thread_name_prefix='acts_concurrent')
+        return _shared_executor
+
+
+class ConcurrentCallResult(object):
+    """The outcome of a call run by run_concurrent_calls.
+
+    Attributes:
+        value: The value returned by the call, or None if it raised.
+        exception: The exception raised by the call, or None.
+        start_time: The time.time() the call started at.
+        end_time: The time.time() the call ended at.
+    """
+
+    def __init__(self, value, exception, start_time, end_time):
+        self.value = value
+        self.exception = exception
+        self.start_time = start_time
+        self.end_time = end_time
+
+    @property
+    def duration(self):
+        """The number of seconds the call took."""
+        return self.end_time - self.start_time
+
+
+def run_concurrent_calls(calls):
+    """Runs callables concurrently on the shared executor.
+
+    If the shared executor does not have a free thread for every call, the
+    calls get their own executor instead, so that each call starts at once
+    on its own thread, and concurrent calls never wait on each other.
+
+    Args:
+        calls: A list of argumentless callable objects.
+
+    Returns:
+        A list of the ConcurrentCallResult of each call, in the order given,
+        once they all returned.
+    """
+    if not calls:
+        return []
+
+    def timed_call(call):
+        start_time = time.time()
+        try:
+            return ConcurrentCallResult(call(), None, start_time, time.time())
+        except Exception as e:
+            return ConcurrentCallResult(None, e, start_time, time.time())
+
+    futures = get_shared_executor().try_submit_all(
+        [functools.partial(timed_call, call) for call in calls])
+    if futures is None:
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            futures = [executor.submit(timed_call, call) for call in calls]
+    return [future.result() for future in futures]
+
+
 def run_concurrent_actions_no_raise(*calls):
     """Concurrently runs all callables passed in using multithreading.
 
@@ -1154,16 +1271,10 @@ def run_concurrent_actions_no_raise(*calls):
         An array of the returned values or exceptions received from calls,
         respective of the order given.
     """
-    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
-        futures = [executor.submit(call) for call in calls]
-
-    results = []
-    for future in futures:
-        try:
-            results.append(future.result())
-        except Exception as e:
-            results.append(e)
-    return results
+    return [
+        result.value if result.exception is None else result.exception
+        for result in run_concurrent_calls(calls)
+    ]
 
 
 def run_concurrent_actions(*calls):
@@ -1196,46 +1307,21 @@ def run_concurrent_actions(*calls):
         If an exception is raised in any of the calls, the first exception
         caught will be raised.
     """
-    first_exception = None
-
-    class WrappedException(Exception):
-        """Raised when a passed-in callable raises an exception."""
-
-    def call_wrapper(call):
-        nonlocal first_exception
-
+    def logged_call(call):
         try:
             return call()
         except Exception as e:
             logging.exception(e)
-            # Note that there is a potential race condition between two
-            # exceptions setting first_exception. Even if a locking mechanism
-            # was added to prevent this from happening, it is still possible
-            # that we capture the second exception as the first exception, as
-            # the active thread can swap to the thread that raises the second
-            # exception. There is no way to solve this with the tools we have
-            # here, so we do not bother. The effects this issue has on the
-            # system as a whole are negligible.
-            if first_exception is None:
-                first_exception = e
-            raise WrappedException(e)
-
-    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
-        futures = [executor.submit(call_wrapper, call) for call in calls]
-
-    results = []
-    for future in futures:
-        try:
-            results.append(future.result())
-        except WrappedException:
-            # We do not need to raise here, since first_exception will already
-            # be set to the first exception raised by these callables.
-            break
-
-    if first_exception:
-        raise first_exception
+            raise
 
-    return results
+    results = run_concurrent_calls(
+        [functools.partial(logged_call, call) for call in calls])
+    exceptions = [
+        result for result in results if result.exception is not None
+    ]
+    if exceptions:
+        raise min(exceptions, key=lambda result: result.end_time).exception
+    return [result.value for result in results]
 
 
 def test_concurrent_actions(*calls, failure_exceptions=(Exception, )):
@@ -14,11 +14,16 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import os
+import shutil
+import tempfile
 import unittest
 import mock
 from acts.controllers import adb
 from acts.controllers.adb_lib.error import AdbCommandError
 from acts.controllers.adb_lib.error import AdbError
+from acts.libs.proc import job
+from tests.controllers.adb_lib.fake_adb_server import FakeAdbServer
 
 
 class MockJob(object):
@@ -106,5 +111,140 @@ class ADBTest(unittest.TestCase):
             proxy.get_version_number()
 
 
+class NativeAdbProxyTest(unittest.TestCase):
+    """Tests acts.controllers.adb.NativeAdbProxy against a fake adb server."""
+
+    def setUp(self):
+        self.server = FakeAdbServer(['SERIAL'])
+        self.addCleanup(self.server.close)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def create_proxy(self, persistent_shell=False):
+        with mock.patch('shutil.which', return_value='adb'), mock.patch(
+                'acts.controllers.adb_lib.protocol.DEFAULT_ADB_SERVER_PORT',
+                self.server.port), mock.patch.dict(os.environ):
+            os.environ.pop('ANDROID_ADB_SERVER_PORT', None)
+            proxy = adb.create_proxy('SERIAL',
+                                     backend=adb.NATIVE_BACKEND,
+                                     persistent_shell=persistent_shell)
+        self.addCleanup(proxy.close)
+        return proxy
+
+    def test_finds_server_on_port_of_environment(self):
+        environ = {'ANDROID_ADB_SERVER_PORT': str(self.server.port)}
+        with mock.patch('shutil.which', return_value='adb'), mock.patch.dict(
+                os.environ, environ):
+            proxy = adb.create_proxy('SERIAL', backend=adb.NATIVE_BACKEND)
+        self.addCleanup(proxy.close)
+
+        self.assertEqual(proxy.shell('echo out'), 'out')
+
+    def test_shell_returns_stripped_stdout(self):
+        for persistent_shell in (False, True):
+            proxy = self.create_proxy(persistent_shell)
+            self.assertEqual(proxy.shell('echo "  out "; echo err >&2'),
+                             'out')
+
+    def test_shell_raises_adb_command_error(self):
+        for persistent_shell in (False, True):
+            proxy = self.create_proxy(persistent_shell)
+            with self.assertRaises(AdbCommandError) as context:
+                proxy.shell('echo out; echo err >&2; exit 2')
+            self.assertEqual(context.exception.ret_code, 2)
+            self.assertEqual(context.exception.stderr, 'err')
+
+    def test_shell_ignores_status(self):
+        proxy = self.create_proxy()
+
+        self.assertEqual(proxy.shell('echo err >&2; exit 2',
+                                     ignore_status=True), 'err')
+        self.assertEqual(proxy.shell('echo foo; exit 1 | grep foo'), 'foo')
+
+    def test_shell_raises_adb_error_for_missing_device(self):
+        proxy = self.create_proxy()
+        self.server.serials = []
+
+        with self.assertRaises(AdbError) as context:
+            proxy.shell('true')
+
+        self.assertNotIsInstance(context.exception, AdbCommandError)
+
+    def test_shell_times_out(self):
+        with self.assertRaises(job.TimeoutError):
+            self.create_proxy().shell('sleep 5', timeout=.2)
+
+    def test_shell_uses_adb_tool_without_shell_protocol(self):
+        self.server.features = ['cmd']
+        proxy = self.create_proxy()
+
+        with mock.patch('acts.libs.proc.job.run',
+                        return_value=MockJob(stdout='out')) as run:
+            self.assertEqual(proxy.shell('echo out'), 'out')
+
+        self.assertEqual(run.call_args[0][0], "adb -s SERIAL shell 'echo out'")
+
+    def test_push_and_pull_file(self):
+        proxy = self.create_proxy()
+        local_path = os.path.join(self.tmp_dir, 'local')
+        with open(local_path, 'w') as f:
+            f.write('data')
+        device_path = os.path.join(self.tmp_dir, 'device')
+        pulled_dir = os.path.join(self.tmp_dir, 'pulled')
+        os.mkdir(pulled_dir)
+
+        self.assertIn('1 file pushed',
+                      proxy.push('%s %s' % (local_path, device_path)))
+        self.assertIn('1 file pulled', proxy.pull(device_path, pulled_dir))
+
+        with open(os.path.join(pulled_dir, 'device')) as f:
+            self.assertEqual(f.read(), 'data')
+
+    def test_pull_missing_file_raises_adb_error(self):
+        with self.assertRaises(AdbError):
+            self.create_proxy().pull('/missing %s' % self.tmp_dir)
+
+    def test_pull_symbolic_link_uses_adb_tool(self):
+        proxy = self.create_proxy()
+        target_path = os.path.join(self.tmp_dir, 'target')
+        with open(target_path, 'w') as f:
+            f.write('data')
+        link_path = os.path.join(self.tmp_dir, 'link')
+        os.symlink(target_path, link_path)
+
+        with mock.patch('acts.libs.proc.job.run',
+                        return_value=MockJob()) as run:
+            proxy.pull(link_path, self.tmp_dir)
+
+        self.assertEqual(run.call_args[0][0], 'adb -s SERIAL pull %s %s' %
+                         (link_path, self.tmp_dir))
+
+    def test_pull_with_options_uses_adb_tool(self):
+        proxy = self.create_proxy()
+
+        with mock.patch('acts.libs.proc.job.run',
+                        return_value=MockJob()) as run:
+            proxy.pull('-a /sdcard/file %s' % self.tmp_dir)
+
+        self.assertEqual(run.call_args[0][0],
+                         'adb -s SERIAL pull -a /sdcard/file %s' % self.tmp_dir)
+        self.assertEqual(run.call_args[1]['timeout'],
+                         adb.DEFAULT_ADB_PULL_TIMEOUT)
+
+    def test_root_closes_sessions(self):
+        proxy = self.create_proxy(persistent_shell=True)
+        proxy.shell('true')
+
+        with mock.patch('acts.libs.proc.job.run', return_value=MockJob()):
+            proxy.root()
+        proxy.shell('true')
+
+        self.assertEqual(self.server.requests.count('shell,v2,raw:'), 2)
+
+    def test_create_proxy_raises_on_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            adb.create_proxy('SERIAL', backend='unknown')
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -24,6 +24,7 @@ import unittest
 from acts import logger
 from acts.controllers import android_device
 from acts.controllers.android_lib import errors
+from acts.controllers.android_lib import logcat_index
 
 # Mock log path for a test run.
 MOCK_LOG_PATH = "/tmp/logs/MockTest/xx-xx-xx_xx-xx-xx/"
@@ -38,6 +39,8 @@ MOCK_SERIAL = 1
 MOCK_RELEASE_BUILD_ID = "ABC1.123456.007"
 MOCK_DEV_BUILD_ID = "ABC-MR1"
 MOCK_NYC_BUILD_ID = "N4F27P"
+MOCK_PROPERTIES = ("ro.build.id", "ro.build.version.incremental",
+                   "ro.build.type", "ro.build.product", "ro.product.name")
 
 
 def get_mock_ads(num):
@@ -80,10 +83,15 @@ class MockAdbProxy(object):
         self.return_value = return_value
         self.return_multiple = False
         self.build_id = build_id
+        self.getprop_dumps = 0
 
     def shell(self, params, ignore_status=False, timeout=60):
         if params == "id -u":
             return "root"
+        elif params == "getprop":
+            self.getprop_dumps += 1
+            return "\n".join("[%s]: [%s]" % (name, self.getprop(name))
+                             for name in MOCK_PROPERTIES)
         elif params == "bugreportz":
             if self.fail_br:
                 return "OMG I died!\n"
@@ -193,6 +201,14 @@ class ActsAndroidDeviceTest(unittest.TestCase):
                                     expected_msg):
             android_device.create("HAHA")
 
+    def test_create_with_invalid_adb_backend(self):
+        with self.assertRaisesRegex(errors.AndroidDeviceConfigError,
+                                    'adb_backend'):
+            android_device.get_instances_with_configs([{
+                'serial': '1',
+                android_device.ANDROID_DEVICE_ADB_BACKEND_KEY: 'unknown'
+            }])
+
     def test_get_device_success_with_serial(self):
         ads = get_mock_ads(5)
         expected_serial = 0
@@ -309,6 +325,83 @@ class ActsAndroidDeviceTest(unittest.TestCase):
         build_info = ad.build_info
         self.assertEqual(build_info["build_id"], MOCK_NYC_BUILD_ID)
 
+    @mock.patch(
+        'acts.controllers.fastboot.FastbootProxy',
+        return_value=MockFastbootProxy(MOCK_SERIAL))
+    def test_AndroidDevice_properties_are_read_once(self, MockFastboot):
+        """Verifies the device info is read from one snapshot of properties.
+        """
+        adb_proxy = MockAdbProxy(MOCK_SERIAL)
+        with mock.patch('acts.controllers.adb.AdbProxy',
+                        return_value=adb_proxy):
+            ad = android_device.AndroidDevice(serial=1)
+        with mock.patch.object(android_device,
+                               'list_fastboot_devices',
+                               return_value=[]):
+            for _ in range(3):
+                device_info = ad.device_info
+        self.assertEqual(device_info["model"], "fakemodel")
+        self.assertEqual(device_info["build_info"]["build_type"], "userdebug")
+        self.assertEqual(adb_proxy.getprop_dumps, 1)
+
+    @mock.patch(
+        'acts.controllers.fastboot.FastbootProxy',
+        return_value=MockFastbootProxy(MOCK_SERIAL))
+    def test_AndroidDevice_properties_are_dropped_in_bootloader(
+            self, MockFastboot):
+        """Verifies the snapshot is not used, nor kept, in bootloader mode."""
+        adb_proxy = MockAdbProxy(MOCK_SERIAL)
+        with mock.patch('acts.controllers.adb.AdbProxy',
+                        return_value=adb_proxy):
+            ad = android_device.AndroidDevice(serial=1)
+        ad.pin_properties()
+        self.assertEqual(ad.build_info["build_id"], MOCK_RELEASE_BUILD_ID)
+        with mock.patch.object(android_device,
+                               'list_fastboot_devices',
+                               return_value=[1]):
+            self.assertIsNone(ad.build_info)
+            self.assertIsNone(ad.sdk_api_level())
+        # The device was flashed in bootloader mode.
+        adb_proxy.build_id = MOCK_DEV_BUILD_ID
+
+        self.assertEqual(ad.get_property("ro.build.id"), MOCK_DEV_BUILD_ID)
+
+    @mock.patch(
+        'acts.controllers.fastboot.FastbootProxy',
+        return_value=MockFastbootProxy(MOCK_SERIAL))
+    def test_AndroidDevice_properties_are_invalidated(self, MockFastboot):
+        """Verifies rooting the device drops the snapshot, unless pinned."""
+        adb_proxy = MockAdbProxy(MOCK_SERIAL)
+        with mock.patch('acts.controllers.adb.AdbProxy',
+                        return_value=adb_proxy):
+            ad = android_device.AndroidDevice(serial=1)
+        self.assertEqual(ad.get_property("ro.build.id"),
+                         MOCK_RELEASE_BUILD_ID)
+        adb_proxy.build_id = MOCK_DEV_BUILD_ID
+        ad.pin_properties()
+        ad.root_adb()
+        self.assertEqual(ad.get_property("ro.build.id"),
+                         MOCK_RELEASE_BUILD_ID)
+        ad.pin_properties(False)
+        ad.root_adb()
+        self.assertEqual(ad.get_property("ro.build.id"), MOCK_DEV_BUILD_ID)
+        adb_proxy.build_id = MOCK_NYC_BUILD_ID
+        ad.pin_properties()
+        self.assertEqual(ad.get_properties(refresh=True)["ro.build.id"],
+                         MOCK_NYC_BUILD_ID)
+        self.assertEqual(ad.get_property("ro.missing"), "")
+
+    def test_parse_getprop_output(self):
+        output = ("[ro.build.id]: [ABC1.123456.007]\n"
+                  "[ro.empty]: []\n"
+                  "[ro.multiline]: [line 1\nline 2]")
+        self.assertEqual(
+            android_device._parse_getprop_output(output), {
+                "ro.build.id": "ABC1.123456.007",
+                "ro.empty": "",
+                "ro.multiline": "line 1\nline 2"
+            })
+
     @mock.patch(
         'acts.controllers.adb.AdbProxy',
         return_value=MockAdbProxy(MOCK_SERIAL))
@@ -377,6 +470,41 @@ class ActsAndroidDeviceTest(unittest.TestCase):
         ad.take_bug_report("test_something", MOCK_ADB_EPOCH_BEGIN_TIME)
         mock_makedirs.assert_called_with(mock_log_path(), exist_ok=True)
 
+    @mock.patch(
+        'acts.controllers.adb.AdbProxy',
+        return_value=MockAdbProxy(MOCK_SERIAL))
+    @mock.patch(
+        'acts.controllers.fastboot.FastbootProxy',
+        return_value=MockFastbootProxy(MOCK_SERIAL))
+    @mock.patch(
+        'acts.controllers.android_device.AndroidDevice.device_log_path',
+        new_callable=mock.PropertyMock)
+    def test_AndroidDevice_cat_adb_log_with_index(self, mock_log_path, *_):
+        """Verifies AndroidDevice.cat_adb_log takes the same excerpt from an
+        indexed logcat file as from an unindexed one.
+        """
+        ad = android_device.AndroidDevice(serial=MOCK_SERIAL)
+        ad.log_path = self.tmp_dir
+        mock_log_path.return_value = self.tmp_dir
+        logcat_path = os.path.join(self.tmp_dir,
+                                   'adblog_%s_debug.txt' % ad.serial)
+        begin_time = MOCK_ADB_EPOCH_BEGIN_TIME
+        with open(logcat_path, 'w') as f:
+            for ms in range(begin_time - 60000, begin_time + 60000, 100):
+                f.write('%s   968  1001 D Tag: message\n' %
+                        logcat_index.to_index_timestamp(ms))
+        end_time = begin_time + 10000
+
+        with open(ad.cat_adb_log('test_unindexed', begin_time,
+                                 end_time)) as f:
+            unindexed_excerpt = f.read()
+        logcat_index.rebuild_logcat_index(logcat_path, block_size=1024)
+        with open(ad.cat_adb_log('test_indexed', begin_time, end_time)) as f:
+            indexed_excerpt = f.read()
+
+        self.assertTrue(unindexed_excerpt)
+        self.assertEqual(indexed_excerpt, unindexed_excerpt)
+
     @mock.patch(
         'acts.controllers.adb.AdbProxy',
         return_value=MockAdbProxy(MOCK_SERIAL))
@@ -31,6 +31,23 @@ class ActsLoggerTest(unittest.TestCase):
         actual_stamp = logger.epoch_to_log_line_timestamp(1469134262116)
         self.assertEqual("2016-07-21 13:51:02.116", actual_stamp)
 
+    def test_epoch_to_log_line_timestamp_pads_milliseconds(self):
+        os.environ['TZ'] = 'US/Pacific'
+        time.tzset()
+        actual_stamp = logger.epoch_to_log_line_timestamp(1469134262005)
+        self.assertEqual("2016-07-21 13:51:02.005", actual_stamp)
+
+    def test_logline_timestamp_comparator(self):
+        self.assertEqual(
+            logger.logline_timestamp_comparator("2016-07-21 13:51:02.116",
+                                                "2016-07-21 13:51:02.117"), -1)
+        self.assertEqual(
+            logger.logline_timestamp_comparator("2017-01-01 00:00:00.000",
+                                                "2016-12-31 23:59:59.999"), 1)
+        self.assertEqual(
+            logger.logline_timestamp_comparator("2016-07-21 13:51:02.116",
+                                                "2016-07-21 13:51:02.116"), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
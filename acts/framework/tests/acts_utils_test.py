@@ -15,6 +15,7 @@
 #   limitations under the License.
 
 import logging
+import threading
 import time
 import unittest
 
@@ -374,6 +375,50 @@ class ConcurrentActionsTest(unittest.TestCase):
                 lambda: self.function_returns_passed_in_arg('ARG1'), lambda:
                 self.function_raises_passed_in_exception_type(KeyError))
 
+    def test_run_concurrent_calls_returns_results_and_timing(self):
+        """Tests run_concurrent_calls returns each call's outcome and timing."""
+        results = utils.run_concurrent_calls([
+            lambda: self.function_returns_passed_in_arg('ARG1'),
+            lambda: self.function_raises_passed_in_exception_type(KeyError)
+        ])
+
+        self.assertEqual(results[0].value, 'ARG1')
+        self.assertIsNone(results[0].exception)
+        self.assertIsNone(results[1].value)
+        self.assertEqual(results[1].exception.__class__, KeyError)
+        for result in results:
+            self.assertGreaterEqual(result.duration, 0)
+
+    def test_run_concurrent_calls_can_be_nested(self):
+        """Tests nested concurrent calls do not wait for each other's threads.
+        """
+        executor = utils._SharedExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        with mock.patch.object(utils, '_shared_executor', executor):
+            results = utils.run_concurrent_calls([
+                lambda: utils.run_concurrent_actions(
+                    lambda: self.function_returns_passed_in_arg('ARG1'),
+                    lambda: self.function_returns_passed_in_arg('ARG2'))
+            ])
+
+        self.assertEqual(results[0].value, ['ARG1', 'ARG2'])
+
+    def test_run_concurrent_calls_start_at_once_on_a_busy_executor(self):
+        """Tests calls get their own threads if too few shared ones are free.
+        """
+        executor = utils._SharedExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        executor.submit(release.wait)
+        barrier = threading.Barrier(2, timeout=5)
+
+        with mock.patch.object(utils, '_shared_executor', executor):
+            results = utils.run_concurrent_calls([barrier.wait, barrier.wait])
+
+        self.assertEqual([result.exception for result in results],
+                         [None, None])
+
     def test_test_concurrent_actions_raises_non_test_failure(self):
         """Tests test_concurrent_actions raises the given exception."""
         with self.assertRaises(KeyError):
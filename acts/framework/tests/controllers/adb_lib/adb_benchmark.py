@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Benchmarks the shell commands per second of the AdbProxy backends.
+
+Runs the same shell command repeatedly, from one or more threads, through:
+    - subprocess: AdbProxy, forking the adb tool per command.
+    - native: NativeAdbProxy, opening a shell service per command.
+    - native-persistent: NativeAdbProxy, reusing interactive shell sessions.
+
+With --serial, the commands run on a real device through the adb tool and
+server. Otherwise they run on a fake adb server, and the subprocess backend
+forks a stand-in adb script, which only measures the cost of forking a
+process per command: the real adb tool also connects to the adb server.
+
+Usage:
+    python3 adb_benchmark.py [--serial SERIAL] [--commands 200]
+        [--threads 1] [--command 'echo ok'] [--json report.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+
+import mock
+
+from acts.controllers import adb
+from acts.controllers.adb_lib import protocol
+from tests.controllers.adb_lib.fake_adb_server import FakeAdbServer
+
+BACKENDS = ('subprocess', 'native', 'native-persistent')
+
+# Stands in for the adb tool, running "adb [-s serial] shell <command>".
+FAKE_ADB_SCRIPT = '''#!/bin/sh
+while [ "$1" = "-s" ] || [ "$1" = "-P" ]; do shift 2; done
+[ "$1" = "shell" ] && shift
+exec /bin/sh -c "$*"
+'''
+
+
+def create_proxy(backend, serial):
+    if backend == 'subprocess':
+        return adb.create_proxy(serial)
+    return adb.create_proxy(serial,
+                            backend=adb.NATIVE_BACKEND,
+                            persistent_shell=backend == 'native-persistent')
+
+
+def run_backend(backend, serial, command, num_commands, num_threads):
+    """Runs a benchmark of one backend.
+
+    Returns:
+        A dict report of the backend's results.
+    """
+    proxy = create_proxy(backend, serial)
+    # Opens the connections and sessions used by every thread.
+    threads = [
+        threading.Thread(target=proxy.shell, args=(command, ))
+        for _ in range(num_threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    def run_commands(count):
+        for _ in range(count):
+            proxy.shell(command)
+
+    threads = [
+        threading.Thread(target=run_commands,
+                         args=(num_commands // num_threads, ))
+        for _ in range(num_threads)
+    ]
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+    proxy.close()
+
+    commands = num_commands // num_threads * num_threads
+    return {
+        'backend': backend,
+        'commands': commands,
+        'threads': num_threads,
+        'seconds': elapsed,
+        'cpu_seconds': cpu_seconds,
+        'commands_per_second': commands / elapsed,
+    }
+
+
+def run_on_fake_server(backends, command, num_commands, num_threads):
+    """Runs the benchmarks on a fake adb server and adb tool."""
+    server = FakeAdbServer(['FAKESERIAL'])
+    bin_dir = tempfile.mkdtemp()
+    adb_path = os.path.join(bin_dir, 'adb')
+    with open(adb_path, 'w') as f:
+        f.write(FAKE_ADB_SCRIPT)
+    os.chmod(adb_path, os.stat(adb_path).st_mode | stat.S_IEXEC)
+    try:
+        with mock.patch.dict(os.environ, {
+                'PATH': bin_dir + os.pathsep + os.environ['PATH']
+        }), mock.patch.object(protocol, 'DEFAULT_ADB_SERVER_PORT',
+                              server.port):
+            return [
+                run_backend(backend, 'FAKESERIAL', command, num_commands,
+                            num_threads) for backend in backends
+            ]
+    finally:
+        server.close()
+        shutil.rmtree(bin_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--serial',
+                        help='The serial of a real device to benchmark.')
+    parser.add_argument('--commands', type=int, default=200,
+                        help='The number of commands run per backend.')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='The number of threads running commands.')
+    parser.add_argument('--command', default='echo ok',
+                        help='The shell command to run.')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS),
+                        choices=list(BACKENDS))
+    parser.add_argument('--json', help='A path to write the report to.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.serial:
+        reports = [
+            run_backend(backend, args.serial, args.command, args.commands,
+                        args.threads) for backend in args.backends
+        ]
+    else:
+        reports = run_on_fake_server(args.backends, args.command,
+                                     args.commands, args.threads)
+
+    for report in reports:
+        print('%-18s %5d commands in %.2fs, CPU %.2fs, %.1f commands/s' %
+              (report['backend'], report['commands'], report['seconds'],
+               report['cpu_seconds'], report['commands_per_second']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
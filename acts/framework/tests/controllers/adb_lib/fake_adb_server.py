@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""A local stand-in for the adb server, for tests and benchmarks.
+
+The simulated device runs shell commands with the host's /bin/sh, and its
+sync service reads and writes files of the host.
+"""
+
+import os
+import socket
+import struct
+import subprocess
+import threading
+
+SHELL_HEADER = struct.Struct('<BI')
+SYNC_HEADER = struct.Struct('<4sI')
+SYNC_STAT = struct.Struct('<4sIII')
+
+
+class FakeAdbServer(object):
+    """Serves the adb server protocol on a local port.
+
+    Attributes:
+        serials: The serials of the connected devices.
+        features: The adb features of the devices.
+        requests: The requests received, in order.
+        port: The port the server listens on.
+    """
+
+    def __init__(self, serials=('FAKESERIAL', ),
+                 features=('shell_v2', 'cmd', 'stat_v2')):
+        self.serials = list(serials)
+        self.features = list(features)
+        self.requests = []
+        self._lock = threading.Lock()
+        self._connections = []
+        self._processes = []
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(16)
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            # Like the adb server, sends small packets without delay.
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self._connections.append(conn)
+            threading.Thread(target=self._serve, args=(conn, ),
+                             daemon=True).start()
+
+    def _serve(self, conn):
+        reader = conn.makefile('rb')
+        try:
+            self._serve_requests(conn, reader)
+        except (OSError, ValueError, struct.error):
+            pass
+        finally:
+            reader.close()
+            conn.close()
+
+    def _read_request(self, reader):
+        length = reader.read(4)
+        if len(length) < 4:
+            raise ValueError('Connection closed.')
+        request = reader.read(int(length, 16)).decode()
+        with self._lock:
+            self.requests.append(request)
+        return request
+
+    @staticmethod
+    def _okay(conn, message=None):
+        data = b'OKAY'
+        if message is not None:
+            data += b'%04x' % len(message) + message.encode()
+        conn.sendall(data)
+
+    @staticmethod
+    def _fail(conn, message):
+        conn.sendall(b'FAIL%04x' % len(message) + message.encode())
+
+    def _serve_requests(self, conn, reader):
+        request = self._read_request(reader)
+        if request in ('host:version', ):
+            self._okay(conn, '0029')
+        elif request.endswith(':features'):
+            serial = request.split(':')[1] if request.startswith(
+                'host-serial:') else None
+            if serial is None or serial in self.serials:
+                self._okay(conn, ','.join(self.features))
+            else:
+                self._fail(conn, "device '%s' not found" % serial)
+        elif request.startswith('host:transport'):
+            serial = request[len('host:transport:'):]
+            if request != 'host:transport-any' and serial not in self.serials:
+                self._fail(conn, "device '%s' not found" % serial)
+                return
+            self._okay(conn)
+            self._serve_service(conn, reader, self._read_request(reader))
+        else:
+            self._fail(conn, 'unknown host service')
+
+    def _serve_service(self, conn, reader, service):
+        if service.startswith('shell,v2,raw:'):
+            self._okay(conn)
+            self._serve_shell(conn, reader, service[len('shell,v2,raw:'):])
+        elif service == 'sync:':
+            self._okay(conn)
+            self._serve_sync(conn, reader)
+        else:
+            self._fail(conn, 'closed')
+
+    def _serve_shell(self, conn, reader, command):
+        args = ['/bin/sh', '-c', command] if command else ['/bin/sh']
+        process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE if not command else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        with self._lock:
+            self._processes.append(process)
+        write_lock = threading.Lock()
+
+        def send(packet_id, data):
+            with write_lock:
+                conn.sendall(SHELL_HEADER.pack(packet_id, len(data)) + data)
+
+        def forward(packet_id, stream):
+            for data in iter(lambda: stream.read1(65536), b''):
+                send(packet_id, data)
+
+        forwarders = [
+            threading.Thread(target=forward, args=(1, process.stdout),
+                             daemon=True),
+            threading.Thread(target=forward, args=(2, process.stderr),
+                             daemon=True)
+        ]
+        for thread in forwarders:
+            thread.start()
+        if not command:
+            threading.Thread(target=self._forward_stdin,
+                             args=(reader, process),
+                             daemon=True).start()
+        for thread in forwarders:
+            thread.join()
+        process.stdout.close()
+        process.stderr.close()
+        send(3, bytes([process.wait() & 0xff]))
+
+    @staticmethod
+    def _forward_stdin(reader, process):
+        try:
+            while True:
+                header = reader.read(SHELL_HEADER.size)
+                if len(header) < SHELL_HEADER.size:
+                    break
+                packet_id, length = SHELL_HEADER.unpack(header)
+                data = reader.read(length)
+                if packet_id == 0:
+                    process.stdin.write(data)
+                    process.stdin.flush()
+                elif packet_id == 4:
+                    break
+        except (OSError, ValueError):
+            pass
+        finally:
+            process.stdin.close()
+
+    def _serve_sync(self, conn, reader):
+        while True:
+            sync_id, length = SYNC_HEADER.unpack(reader.read(SYNC_HEADER.size))
+            if sync_id == b'QUIT':
+                return
+            path = reader.read(length).decode()
+            if sync_id == b'STAT':
+                try:
+                    # Like adbd, does not follow symbolic links.
+                    st = os.lstat(path)
+                    stat = (st.st_mode, st.st_size, int(st.st_mtime))
+                except OSError:
+                    stat = (0, 0, 0)
+                conn.sendall(SYNC_STAT.pack(b'STAT', *stat))
+            elif sync_id == b'RECV':
+                if not self._sync_recv(conn, path):
+                    return
+            elif sync_id == b'SEND':
+                if not self._sync_send(conn, reader, path):
+                    return
+            else:
+                return
+
+    def _sync_fail(self, conn, message):
+        conn.sendall(SYNC_HEADER.pack(b'FAIL', len(message)) +
+                     message.encode())
+
+    def _sync_recv(self, conn, path):
+        try:
+            with open(path, 'rb') as f:
+                for data in iter(lambda: f.read(64 * 1024), b''):
+                    conn.sendall(SYNC_HEADER.pack(b'DATA', len(data)) + data)
+        except OSError as e:
+            self._sync_fail(conn, 'open failed: %s' % e.strerror)
+            return False
+        conn.sendall(SYNC_HEADER.pack(b'DONE', 0))
+        return True
+
+    def _sync_send(self, conn, reader, path_and_mode):
+        path, mode = path_and_mode.rsplit(',', 1)
+        data = bytearray()
+        while True:
+            sync_id, length = SYNC_HEADER.unpack(reader.read(SYNC_HEADER.size))
+            if sync_id == b'DONE':
+                break
+            data += reader.read(length)
+        try:
+            with open(path, 'wb') as f:
+                f.write(data)
+            os.chmod(path, int(mode) & 0o777)
+        except OSError as e:
+            self._sync_fail(conn, 'couldn\'t create file: %s' % e.strerror)
+            return False
+        conn.sendall(SYNC_HEADER.pack(b'OKAY', 0))
+        return True
+
+    def drop_connections(self):
+        """Closes every connection, like adbd restarting."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            processes, self._processes = self._processes, []
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+
+    def close(self):
+        self.drop_connections()
+        self._server.close()
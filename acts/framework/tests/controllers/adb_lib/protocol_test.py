@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from acts.controllers.adb_lib import protocol
+from acts.controllers.adb_lib.error import AdbError
+from acts.libs.proc import job
+from tests.controllers.adb_lib.fake_adb_server import FakeAdbServer
+
+SERIAL = 'FAKESERIAL'
+
+
+class AdbServerClientTest(unittest.TestCase):
+    """Tests acts.controllers.adb_lib.protocol.AdbServerClient."""
+
+    def setUp(self):
+        self.server = FakeAdbServer([SERIAL])
+        self.addCleanup(self.server.close)
+        self.client = protocol.AdbServerClient(SERIAL, port=self.server.port)
+        self.addCleanup(self.client.close_sessions)
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_features(self):
+        self.assertTrue(self.client.supports_shell_v2())
+        self.client.features()
+
+        self.assertEqual(self.server.requests,
+                         ['host-serial:%s:features' % SERIAL])
+
+    def test_shell_returns_output_and_exit_status(self):
+        result = self.client.shell('echo out; echo err >&2; exit 3')
+
+        self.assertEqual(result.stdout, 'out')
+        self.assertEqual(result.stderr, 'err')
+        self.assertEqual(result.exit_status, 3)
+        self.assertEqual(self.server.requests[-2:], [
+            'host:transport:%s' % SERIAL,
+            'shell,v2,raw:echo out; echo err >&2; exit 3'
+        ])
+
+    def test_shell_times_out(self):
+        with self.assertRaises(job.TimeoutError) as context:
+            self.client.shell('echo started; sleep 5', timeout=.3)
+
+        self.assertTrue(context.exception.result.did_timeout)
+
+    def test_unknown_device_raises_adb_error(self):
+        client = protocol.AdbServerClient('OTHER', port=self.server.port)
+
+        with self.assertRaises(AdbError) as context:
+            client.shell('true')
+
+        self.assertEqual(context.exception.stderr,
+                         "error: device 'OTHER' not found")
+
+    def test_no_server_raises_adb_error(self):
+        # Holds a port without listening on it, so no server can take it.
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.addCleanup(sock.close)
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+        with self.assertRaises(AdbError):
+            protocol.AdbServerClient(SERIAL, port=port).shell('true')
+
+    def test_session_runs_commands_on_one_connection(self):
+        results = [
+            self.client.run_in_session('echo %d; echo err%d >&2; exit %d' %
+                                       (i, i, i)) for i in range(3)
+        ]
+
+        self.assertEqual([result.stdout for result in results],
+                         ['0', '1', '2'])
+        self.assertEqual([result.stderr for result in results],
+                         ['err0', 'err1', 'err2'])
+        self.assertEqual([result.exit_status for result in results],
+                         [0, 1, 2])
+        self.assertEqual(self.server.requests.count('shell,v2,raw:'), 1)
+
+    def test_session_isolates_commands(self):
+        self.client.run_in_session('cd /; FOO=1')
+        result = self.client.run_in_session('echo "$FOO"; read line; echo $?')
+
+        self.assertEqual(result.stdout, '1')
+
+    def test_session_keeps_output_without_newline(self):
+        result = self.client.run_in_session('printf abc')
+
+        self.assertEqual(result.stdout, 'abc')
+
+    def test_session_is_reopened_after_timeout(self):
+        with self.assertRaises(job.TimeoutError):
+            self.client.run_in_session('sleep 5', timeout=.3)
+
+        self.assertEqual(self.client.run_in_session('echo ok').stdout, 'ok')
+        self.assertEqual(self.server.requests.count('shell,v2,raw:'), 2)
+
+    def test_session_is_reopened_after_adbd_restarts(self):
+        self.client.run_in_session('true')
+        self.server.drop_connections()
+        time.sleep(.1)
+
+        self.assertEqual(self.client.run_in_session('echo ok').stdout, 'ok')
+
+    def test_concurrent_sessions(self):
+        # Each session marks its arrival, waits up to 5s for the others, then
+        # prints how many arrived. Sessions run one at a time would each
+        # wait in vain.
+        barrier_dir = os.path.join(self.tmp_dir, 'barrier')
+        os.mkdir(barrier_dir)
+        command = ('touch {0}/$$; for i in $(seq 50); do '
+                   '[ $(ls {0} | wc -l) -ge 3 ] && break; sleep .1; done; '
+                   'ls {0} | wc -l').format(barrier_dir)
+        results = []
+
+        def run():
+            results.append(self.client.run_in_session(command, timeout=10))
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([result.stdout.strip() for result in results],
+                         ['3'] * 3)
+
+    def test_push_and_pull(self):
+        local_path = os.path.join(self.tmp_dir, 'local')
+        data = os.urandom(3 * protocol.SYNC_DATA_MAX + 5)
+        with open(local_path, 'wb') as f:
+            f.write(data)
+        os.chmod(local_path, 0o750)
+        device_dir = os.path.join(self.tmp_dir, 'device')
+        os.mkdir(device_dir)
+
+        self.assertEqual(self.client.push(local_path, device_dir), len(data))
+        self.assertEqual(
+            self.client.pull(os.path.join(device_dir, 'local'),
+                             os.path.join(self.tmp_dir, 'pulled')), len(data))
+
+        with open(os.path.join(self.tmp_dir, 'pulled'), 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(
+            os.stat(os.path.join(device_dir, 'local')).st_mode & 0o777, 0o750)
+        self.assertEqual(self.server.requests.count('sync:'), 1)
+
+    def test_pull_missing_file_raises_adb_error(self):
+        local_path = os.path.join(self.tmp_dir, 'pulled')
+
+        with self.assertRaises(AdbError):
+            self.client.pull(os.path.join(self.tmp_dir, 'missing'),
+                             local_path)
+
+        self.assertFalse(os.path.exists(local_path))
+        self.assertNotEqual(self.client.stat(self.tmp_dir)[0], 0)
+        self.assertEqual(self.server.requests.count('sync:'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
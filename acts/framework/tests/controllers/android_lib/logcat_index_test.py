@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from acts.controllers.android_lib import logcat_index
+from acts.libs.proc import job
+
+BLOCK_SIZE = 256
+START = datetime.datetime(2020, 8, 12, 14, 26, 42)
+
+
+def _logcat_line(second, message='message'):
+    timestamp = logcat_index.to_index_timestamp(
+        START + datetime.timedelta(seconds=second))
+    return '%s   968  1001 D Tag: %s %d' % (timestamp, message, second)
+
+
+def _epoch_ms(second):
+    return int((START + datetime.timedelta(seconds=second)).timestamp() *
+               1000)
+
+
+class LogcatIndexTest(unittest.TestCase):
+    """Tests acts.controllers.android_lib.logcat_index."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.logcat_path = os.path.join(self.tmp_dir, 'adblog_1_debug.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_logcat(self, lines):
+        with open(self.logcat_path, 'a', encoding='utf-8') as f:
+            for line in lines:
+                f.write(line + '\n')
+
+    def read_window(self, begin_second, end_second):
+        ranges = logcat_index.find_byte_ranges(self.logcat_path,
+                                               _epoch_ms(begin_second),
+                                               _epoch_ms(end_second))
+        return ranges, list(logcat_index.read_lines(self.logcat_path, ranges))
+
+    def test_to_index_timestamp_pads_milliseconds(self):
+        epoch_ms = _epoch_ms(0) + 5
+
+        self.assertEqual(logcat_index.to_index_timestamp(epoch_ms),
+                         '2020-08-12 14:26:42.005')
+        self.assertEqual(logcat_index.to_index_timestamp(epoch_ms, -10),
+                         '2020-08-12 14:26:41.995')
+
+    def test_find_byte_ranges_returns_none_without_index(self):
+        self.write_logcat([_logcat_line(0)])
+
+        self.assertIsNone(logcat_index.find_byte_ranges(self.logcat_path))
+
+    def test_rebuilt_index_reads_only_blocks_in_window(self):
+        self.write_logcat([_logcat_line(second) for second in range(1000)])
+        logcat_index.rebuild_logcat_index(self.logcat_path, BLOCK_SIZE)
+
+        ranges, lines = self.read_window(500, 510)
+
+        # The block range, and the empty unindexed tail.
+        self.assertEqual(len(ranges), 2)
+        self.assertEqual(ranges[1], (os.path.getsize(self.logcat_path), None))
+        self.assertLess(ranges[0][1] - ranges[0][0], 4 * BLOCK_SIZE + 2000)
+        expected = [_logcat_line(second) + '\n' for second in range(500, 511)]
+        for line in expected:
+            self.assertIn(line, lines)
+        self.assertLess(len(lines), 50)
+
+    def test_lines_without_timestamps_do_not_bound_blocks(self):
+        self.write_logcat(['--------- beginning of main'] +
+                          [_logcat_line(second) for second in range(100)] +
+                          ['--------- beginning of system'] * 20)
+        logcat_index.rebuild_logcat_index(self.logcat_path, BLOCK_SIZE)
+        index = logcat_index.LogcatIndex(self.logcat_path)
+
+        self.assertIsNone(index.blocks[-1][2])
+        _, lines = self.read_window(0, 99)
+        self.assertEqual(
+            [line for line in lines if not line.startswith('-')],
+            [_logcat_line(second) + '\n' for second in range(100)])
+
+    def test_unindexed_bytes_are_always_read(self):
+        self.write_logcat([_logcat_line(second) for second in range(100)])
+        logcat_index.rebuild_logcat_index(self.logcat_path, BLOCK_SIZE)
+        self.write_logcat([_logcat_line(5, 'late')])
+
+        _, lines = self.read_window(0, 10)
+
+        self.assertEqual(lines[-1], _logcat_line(5, 'late') + '\n')
+
+    def test_find_ranges_skips_index_of_truncated_file(self):
+        self.write_logcat([_logcat_line(second) for second in range(100)])
+        logcat_index.rebuild_logcat_index(self.logcat_path, BLOCK_SIZE)
+        os.remove(self.logcat_path)
+        self.write_logcat([_logcat_line(0)])
+
+        self.assertIsNone(logcat_index.find_byte_ranges(self.logcat_path))
+
+    def test_handler_indexes_file_handler_output(self):
+        logger = logging.getLogger('logcat_index_test')
+        logger.propagate = False
+        logger.setLevel(logging.NOTSET + 1)
+        self.write_logcat(['--------- beginning of main'])
+        file_handler = logging.FileHandler(self.logcat_path)
+        file_handler.setLevel(logging.DEBUG)
+        index_handler = logcat_index.LogcatIndexHandler(logger, BLOCK_SIZE)
+        logger.addHandler(file_handler)
+        logger.addHandler(index_handler)
+        try:
+            for second in range(100):
+                logger.debug(_logcat_line(second))
+                # Filtered out by the FileHandler.
+                logger.log(logging.NOTSET + 1, _logcat_line(second, 'skip'))
+        finally:
+            logger.removeHandler(index_handler)
+            logger.removeHandler(file_handler)
+            index_handler.close()
+            file_handler.close()
+        streamed_blocks = logcat_index.LogcatIndex(self.logcat_path).blocks
+        logcat_index.rebuild_logcat_index(self.logcat_path, BLOCK_SIZE)
+        rebuilt_blocks = logcat_index.LogcatIndex(self.logcat_path).blocks
+
+        # The line written before the handler is left out of the index.
+        first_line_len = len('--------- beginning of main\n')
+        self.assertEqual(streamed_blocks[0][0], first_line_len)
+        self.assertEqual(streamed_blocks[-1][1], rebuilt_blocks[-1][1])
+        self.assertEqual([block[3] for block in streamed_blocks][-1],
+                         rebuilt_blocks[-1][3])
+        _, lines = self.read_window(50, 52)
+        self.assertIn(_logcat_line(51) + '\n', lines)
+        self.assertFalse([line for line in lines if 'skip' in line])
+
+    def test_search_command_greps_only_ranges(self):
+        self.write_logcat([_logcat_line(second) for second in range(1000)])
+        logcat_index.rebuild_logcat_index(self.logcat_path, BLOCK_SIZE)
+        ranges = logcat_index.find_byte_ranges(self.logcat_path,
+                                               _epoch_ms(500), _epoch_ms(510))
+        # A range with no match, to check the ranges are concatenated.
+        ranges.insert(1, (ranges[0][1] + BLOCK_SIZE,
+                          ranges[0][1] + 3 * BLOCK_SIZE))
+
+        output = job.run(logcat_index.create_search_command(
+            'message 50.$', self.logcat_path, ranges))
+
+        self.assertEqual(output.stdout.splitlines(),
+                         [_logcat_line(second) for second in range(500, 510)])
+
+    def test_search_command_quotes_path_and_pattern(self):
+        self.logcat_path = os.path.join(self.tmp_dir, "it's $HOME; adblog")
+        self.write_logcat([
+            _logcat_line(second, message="it's a message")
+            for second in range(100)
+        ])
+        logcat_index.rebuild_logcat_index(self.logcat_path, BLOCK_SIZE)
+        ranges = logcat_index.find_byte_ranges(self.logcat_path,
+                                               _epoch_ms(50), _epoch_ms(52))
+
+        output = job.run(logcat_index.create_search_command(
+            "it's a message 5[01]$", self.logcat_path, ranges))
+
+        self.assertEqual(
+            output.stdout.splitlines(),
+            [_logcat_line(second, message="it's a message")
+             for second in range(50, 52)])
+
+
+if __name__ == '__main__':
+    unittest.main()
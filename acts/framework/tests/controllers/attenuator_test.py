@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import socketserver
+import threading
+import unittest
+
+import mock
+
+from acts.controllers import attenuator
+from acts.controllers.attenuator_lib.aeroflex import telnet as aeroflex
+from acts.controllers.attenuator_lib.minicircuits import telnet as minicircuits
+
+
+class FakeMiniCircuitsInstrument(socketserver.ThreadingTCPServer):
+    """A local telnet server speaking the Mini-Circuits RC-DAT protocol.
+
+    Attributes:
+        attens: The attenuation of each channel, by one-based channel number.
+        commands: The commands received, in order.
+        set_barrier: A threading.Barrier that SETATT commands wait at before
+            being applied, if any. Commands that wait in vain are applied
+            anyway, after breaking the barrier.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, num_atten=4, set_barrier=None):
+        super().__init__(('127.0.0.1', 0), _FakeMiniCircuitsHandler)
+        self.attens = {chan: 0.0 for chan in range(1, num_atten + 1)}
+        self.commands = []
+        self.set_barrier = set_barrier
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        args=(.01, ),
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def reply(self, command):
+        self.commands.append(command)
+        if command == 'MN?':
+            return 'MN=RC4DAT-6G-95'
+        fields = command.split(':')
+        if command == ':ATT?':
+            return str(self.attens[1])
+        if fields[0] == 'CHAN' and fields[2] == 'ATT?':
+            return str(self.attens[int(fields[1])])
+        if fields[0] == 'CHAN' and fields[2] == 'SETATT':
+            if self.set_barrier is not None:
+                try:
+                    self.set_barrier.wait()
+                except threading.BrokenBarrierError:
+                    pass
+            self.attens[int(fields[1])] = float(fields[3])
+            return '1'
+        return '0'
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _FakeMiniCircuitsHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            reply = self.server.reply(line.decode().strip())
+            self.wfile.write((reply + '\r\n').encode())
+
+
+class FakeInstrument(attenuator.AttenuatorInstrument):
+    """An instrument without set_attens() of its own."""
+
+    def __init__(self, num_atten=2):
+        super().__init__(num_atten)
+        self.max_atten = 95
+        self.set_calls = []
+
+    def set_atten(self, idx, value, strict=True):
+        self.set_calls.append((idx, value))
+
+
+class AttenuatorTestCase(unittest.TestCase):
+    """Connects Mini-Circuits instruments to fake instruments."""
+
+    def open_instrument(self, num_atten=4, set_barrier=None):
+        fake = FakeMiniCircuitsInstrument(num_atten, set_barrier)
+        self.addCleanup(fake.stop)
+        instrument = minicircuits.AttenuatorInstrument(num_atten)
+        instrument.open('127.0.0.1', fake.port)
+        self.addCleanup(instrument.close)
+        del fake.commands[:]
+        return fake, instrument
+
+
+class TNHelperTest(AttenuatorTestCase):
+    """Tests acts.controllers.attenuator_lib._tnhelper._TNHelper."""
+
+    def test_cmds_sends_commands_in_a_single_write(self):
+        fake, instrument = self.open_instrument()
+        tnhelper = instrument._tnhelper
+        tnhelper._tn.write = mock.Mock(wraps=tnhelper._tn.write)
+
+        replies = tnhelper.cmds(['CHAN:1:SETATT:10', 'CHAN:2:ATT?'])
+
+        self.assertEqual(replies, ['1', '0.0'])
+        tnhelper._tn.write.assert_called_once_with(
+            b'CHAN:1:SETATT:10\r\nCHAN:2:ATT?\r\n')
+
+    def test_cmds_without_reply(self):
+        fake, instrument = self.open_instrument()
+
+        self.assertIsNone(instrument._tnhelper.cmds(['MN?'], False))
+
+
+class MiniCircuitsTelnetTest(AttenuatorTestCase):
+    """Tests the telnet Mini-Circuits AttenuatorInstrument."""
+
+    def test_set_attens_sets_each_channel(self):
+        fake, instrument = self.open_instrument()
+
+        instrument.set_attens({0: 10, 2: 30.5})
+
+        self.assertEqual(fake.attens, {1: 10, 2: 0, 3: 30.5, 4: 0})
+        self.assertEqual(instrument.get_cached_atten(0), 10)
+        self.assertIsNone(instrument.get_cached_atten(1))
+
+    def test_set_attens_checks_values_before_sending_any(self):
+        fake, instrument = self.open_instrument()
+
+        with self.assertRaises(ValueError):
+            instrument.set_attens({0: 10, 1: 100})
+        with self.assertRaises(IndexError):
+            instrument.set_attens({0: 10, 4: 10})
+
+        self.assertEqual(fake.commands, [])
+
+
+class AeroflexTelnetTest(unittest.TestCase):
+    """Tests the telnet Aeroflex AttenuatorInstrument."""
+
+    def test_set_attens_sends_commands_in_a_single_write(self):
+        instrument = aeroflex.AttenuatorInstrument(2)
+        instrument.max_atten = 95
+        instrument._tnhelper = mock.Mock()
+
+        instrument.set_attens({0: 10, 1: 20})
+
+        instrument._tnhelper.cmds.assert_called_once_with(
+            ['ATTN 1 10', 'ATTN 2 20'], False)
+
+
+class SetAttensTest(AttenuatorTestCase):
+    """Tests acts.controllers.attenuator.set_attens."""
+
+    def test_sets_value_on_all_attenuators(self):
+        fake, instrument = self.open_instrument()
+        attens = [attenuator.Attenuator(instrument, idx) for idx in range(4)]
+
+        attenuator.set_attens(attens, 20)
+
+        self.assertEqual(list(fake.attens.values()), [20] * 4)
+
+    def test_sets_each_value_with_offsets(self):
+        fake, instrument = self.open_instrument(num_atten=2)
+        attens = [
+            attenuator.Attenuator(instrument, 0, offset=5),
+            attenuator.Attenuator(instrument, 1)
+        ]
+
+        attenuator.set_attens(attens, [10, 20])
+
+        self.assertEqual(fake.attens, {1: 15, 2: 20})
+
+    def test_skips_unchanged_attenuators(self):
+        fake, instrument = self.open_instrument()
+        attens = [attenuator.Attenuator(instrument, idx) for idx in range(4)]
+        attens[0].set_atten(20)
+        del fake.commands[:]
+
+        attenuator.set_attens(attens, 20, skip_unchanged=True)
+        attenuator.set_attens(attens, 20, skip_unchanged=True)
+
+        self.assertEqual(fake.commands, [
+            'CHAN:2:SETATT:20', 'CHAN:3:SETATT:20', 'CHAN:4:SETATT:20'
+        ])
+
+    def test_sets_unchanged_attenuators_by_default(self):
+        fake, instrument = self.open_instrument(num_atten=1)
+        attens = [attenuator.Attenuator(instrument, 0)]
+
+        attenuator.set_attens(attens, 20)
+        attenuator.set_attens(attens, 20)
+
+        self.assertEqual(fake.commands, ['CHAN:1:SETATT:20'] * 2)
+
+    def test_reading_attenuation_updates_cache(self):
+        fake, instrument = self.open_instrument(num_atten=1)
+        attens = [attenuator.Attenuator(instrument, 0)]
+        attenuator.set_attens(attens, 20)
+        fake.attens[1] = 30.0
+
+        self.assertEqual(attens[0].get_atten(), 30)
+        attenuator.set_attens(attens, 20, skip_unchanged=True)
+
+        self.assertEqual(fake.attens[1], 20)
+
+    def test_reopening_instrument_clears_cache(self):
+        fake, instrument = self.open_instrument(num_atten=1)
+        attens = [attenuator.Attenuator(instrument, 0)]
+        attenuator.set_attens(attens, 20)
+        instrument.close()
+        fake.attens[1] = 30.0
+        instrument.open('127.0.0.1', fake.port)
+
+        attenuator.set_attens(attens, 20, skip_unchanged=True)
+
+        self.assertEqual(fake.attens[1], 20)
+
+    def test_caches_clamped_values_if_not_strict(self):
+        fake, instrument = self.open_instrument(num_atten=1)
+        attens = [attenuator.Attenuator(instrument, 0)]
+
+        attenuator.set_attens(attens, 200, strict=False)
+        self.assertEqual(instrument.get_cached_atten(0), 95)
+        del fake.commands[:]
+        attenuator.set_attens(attens, 95, skip_unchanged=True)
+        attenuator.set_attens(attens, 300, strict=False, skip_unchanged=True)
+
+        self.assertEqual(fake.commands, [])
+
+    def test_checks_max_attenuation(self):
+        fake, instrument = self.open_instrument(num_atten=1)
+        attens = [attenuator.Attenuator(instrument, 0, offset=10)]
+
+        with self.assertRaises(ValueError):
+            attenuator.set_attens(attens, 90)
+        attenuator.set_attens(attens, 90, strict=False)
+
+        self.assertEqual(fake.attens[1], 100)
+
+    def test_sets_instruments_concurrently(self):
+        # Sets made one instrument at a time would each wait in vain.
+        barrier = threading.Barrier(3, timeout=5)
+        attens = []
+        for _ in range(3):
+            _, instrument = self.open_instrument(num_atten=1,
+                                                 set_barrier=barrier)
+            attens.append(attenuator.Attenuator(instrument, 0))
+
+        attenuator.set_attens(attens, 10)
+
+        self.assertFalse(barrier.broken)
+        for atten in attens:
+            self.assertEqual(atten.get_atten(), 10)
+
+    def test_falls_back_to_set_atten(self):
+        instrument = FakeInstrument()
+        attens = [attenuator.Attenuator(instrument, idx) for idx in range(2)]
+
+        attenuator.set_attens(attens, [1, 2])
+
+        self.assertEqual(instrument.set_calls, [(0, 1), (1, 2)])
+
+    def test_raises_on_wrong_number_of_values(self):
+        instrument = FakeInstrument()
+
+        with self.assertRaises(ValueError):
+            attenuator.set_attens([attenuator.Attenuator(instrument, 0)],
+                                  [1, 2])
+
+
+class AttenuatorGroupTest(AttenuatorTestCase):
+    """Tests acts.controllers.attenuator.AttenuatorGroup."""
+
+    def test_set_atten_sets_all_attenuators(self):
+        fake, instrument = self.open_instrument()
+        group = attenuator.AttenuatorGroup('group')
+        group.add_from_instrument(instrument, range(4))
+
+        group.set_atten(40)
+
+        self.assertEqual(list(fake.attens.values()), [40] * 4)
+        self.assertEqual(group.get_atten(), 40)
+        self.assertTrue(group.is_synchronized())
+
+    def test_synchronize_resets_attenuators(self):
+        fake, instrument = self.open_instrument(num_atten=2)
+        group = attenuator.AttenuatorGroup('group')
+        group.add_from_instrument(instrument, [0, 1])
+        group.set_atten(40)
+        del fake.commands[:]
+
+        group.synchronize()
+
+        self.assertEqual(fake.commands,
+                         ['CHAN:1:SETATT:40.0', 'CHAN:2:SETATT:40.0'])
+
+
+if __name__ == '__main__':
+    unittest.main()
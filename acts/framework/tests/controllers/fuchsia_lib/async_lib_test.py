@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import asyncio
+import threading
+import time
+import unittest
+
+import mock
+
+from acts.controllers.fuchsia_lib import async_lib
+from acts.controllers.fuchsia_lib.base_lib import DeviceOffline
+from acts.controllers.fuchsia_lib.wlan_lib import FuchsiaWlanLib
+from tests.controllers.fuchsia_lib.fake_sl4f_server import FakeSl4fServer
+
+
+def get_wlan_status(fuchsia_device):
+    return async_lib.AsyncFacade(fuchsia_device.wlan_lib).wlanStatus()
+
+
+class FakeFuchsiaDevice(object):
+    """A device with a wlan_lib, served by a FakeSl4fServer.
+
+    Its wlan status takes delay seconds to get, and goes through statuses,
+    staying at the last one. If a threading.Barrier is given, each status
+    request waits at it first, and goes on if it is broken.
+    """
+
+    def __init__(self, delay=0, statuses=('connected', ), barrier=None):
+        self.delay = delay
+        self.statuses = list(statuses)
+        self.barrier = barrier
+        self.server = FakeSl4fServer({
+            'wlan.status': self.get_status,
+            'test.echo': lambda params: params,
+        })
+        self.wlan_lib = FuchsiaWlanLib(self.server.address, 0, 'client')
+
+    def get_status(self, params):
+        if self.barrier is not None:
+            try:
+                self.barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+        time.sleep(self.delay)
+        if len(self.statuses) > 1:
+            return self.statuses.pop(0)
+        return self.statuses[0]
+
+    def close(self):
+        self.wlan_lib.transport.close()
+        self.server.close()
+
+
+class AsyncLibTest(unittest.TestCase):
+    """Tests acts.controllers.fuchsia_lib.async_lib."""
+
+    def setUp(self):
+        patcher = mock.patch('acts.utils.can_ping', return_value=True)
+        self.can_ping = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_devices(self, *delays):
+        devices = [FakeFuchsiaDevice(delay) for delay in delays]
+        for device in devices:
+            self.addCleanup(device.close)
+        return devices
+
+    def test_facade_methods_are_awaitable(self):
+        device, = self.create_devices(0)
+        facade = async_lib.AsyncFacade(device.wlan_lib)
+
+        async def run():
+            status = await facade.wlanStatus()
+            echo = await facade.send_command('id', 'test.echo', {'a': 1})
+            return status, echo
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        status, echo = loop.run_until_complete(run())
+
+        self.assertEqual(status['result'], 'connected')
+        self.assertEqual(echo['result'], {'a': 1})
+        self.assertEqual(facade.address, device.server.address)
+
+    def test_calls_to_devices_run_concurrently(self):
+        # Calls made one device at a time would each wait in vain.
+        barrier = threading.Barrier(4, timeout=5)
+        devices = [FakeFuchsiaDevice(barrier=barrier) for _ in range(4)]
+        for device in devices:
+            self.addCleanup(device.close)
+
+        results = async_lib.run_on_devices(devices, get_wlan_status)
+
+        self.assertFalse(barrier.broken)
+        self.assertEqual([result.value['result'] for result in results],
+                         ['connected'] * 4)
+        for result in results:
+            self.assertIsNone(result.exception)
+
+    def test_timeout_applies_to_each_device(self):
+        devices = self.create_devices(0, 1, 0)
+
+        start = time.time()
+        results = async_lib.run_on_devices(devices, get_wlan_status,
+                                           timeout=.3)
+
+        self.assertLess(time.time() - start, .8)
+        self.assertEqual(results[0].value['result'], 'connected')
+        self.assertIsInstance(results[1].exception, asyncio.TimeoutError)
+        self.assertIsNone(results[1].value)
+        self.assertEqual(results[2].value['result'], 'connected')
+
+    def test_failure_of_one_device_does_not_stop_others(self):
+        devices = self.create_devices(0, 0)
+        offline_hostname = '127.0.0.2'
+        devices[1].wlan_lib.address = devices[1].server.address.replace(
+            '127.0.0.1', offline_hostname)
+        self.can_ping.side_effect = lambda _, host: host != offline_hostname
+
+        results = async_lib.run_on_devices(devices, get_wlan_status)
+
+        self.assertEqual(results[0].value['result'], 'connected')
+        self.assertIsInstance(results[1].exception, DeviceOffline)
+
+    def test_polls_devices_concurrently(self):
+        # Each poll of a device waits for the same poll of the other device.
+        barrier = threading.Barrier(2, timeout=5)
+        devices = [
+            FakeFuchsiaDevice(statuses=['idle', 'connecting', 'connected'],
+                              barrier=barrier) for _ in range(2)
+        ]
+        for device in devices:
+            self.addCleanup(device.close)
+
+        async def wait_for_connection(fd):
+            polls = 1
+            while (await get_wlan_status(fd))['result'] != 'connected':
+                polls += 1
+                await asyncio.sleep(.01)
+            return polls
+
+        results = async_lib.run_on_devices(devices, wait_for_connection,
+                                           timeout=20)
+
+        self.assertFalse(barrier.broken)
+        self.assertEqual([result.value for result in results], [3, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
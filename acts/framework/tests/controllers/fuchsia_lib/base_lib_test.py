@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import threading
+import time
+import unittest
+
+import mock
+import requests
+
+from acts.controllers.fuchsia_lib import base_lib
+from acts.controllers.fuchsia_lib.sysinfo_lib import FuchsiaSysInfoLib
+from acts.controllers.fuchsia_lib.wlan_lib import FuchsiaWlanLib
+from tests.controllers.fuchsia_lib.fake_sl4f_server import FakeSl4fServer
+
+
+def sleep_and_echo(params):
+    time.sleep(params.get('delay', 0))
+    return params
+
+
+class Sl4fTransportTest(unittest.TestCase):
+    """Tests acts.controllers.fuchsia_lib.base_lib.Sl4fTransport."""
+
+    def setUp(self):
+        self.server = FakeSl4fServer({'test.echo': sleep_and_echo})
+        self.addCleanup(self.server.close)
+        self.transport = base_lib.Sl4fTransport(self.server.address)
+        self.addCleanup(self.transport.close)
+        patcher = mock.patch('acts.utils.can_ping', return_value=True)
+        self.can_ping = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send(self, params, timeout=30):
+        return self.transport.send(self.server.address, 'id', 'test.echo',
+                                   params, timeout)
+
+    def test_commands_reuse_a_connection(self):
+        for i in range(5):
+            self.assertEqual(self.send({'i': i})['result'], {'i': i})
+
+        self.assertEqual(self.server.connections, 1)
+
+    def test_pings_only_once_liveness_expires(self):
+        for _ in range(3):
+            self.send({})
+        self.assertEqual(self.can_ping.call_count, 1)
+
+        self.transport.liveness_ttl = 0
+        self.send({})
+        self.assertEqual(self.can_ping.call_count, 2)
+
+    def test_raises_device_offline_if_not_pingable(self):
+        self.can_ping.return_value = False
+
+        with self.assertRaises(base_lib.DeviceOffline):
+            self.send({})
+
+        self.assertEqual(self.server.requests, [])
+
+    def test_timeout_of_online_device(self):
+        self.send({})
+
+        with self.assertRaises(requests.exceptions.Timeout):
+            self.send({'delay': .5}, timeout=.1)
+
+        self.assertEqual(self.can_ping.call_count, 2)
+
+    def test_timeout_of_offline_device(self):
+        self.send({})
+        self.can_ping.return_value = False
+
+        with self.assertRaises(base_lib.DeviceOffline):
+            self.send({'delay': .5}, timeout=.1)
+
+    def test_connection_error_of_offline_device(self):
+        self.send({})
+        self.server.close()
+        self.transport.close()
+        self.transport._last_alive_time = time.time()
+        self.can_ping.return_value = False
+
+        with self.assertRaises(base_lib.DeviceOffline):
+            self.send({})
+
+    def test_concurrent_commands(self):
+        results = []
+
+        def send():
+            results.append(self.send({'delay': .2})['result'])
+
+        threads = [threading.Thread(target=send) for _ in range(4)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(time.time() - start, .6)
+        self.assertEqual(results, [{'delay': .2}] * 4)
+
+    def test_records_latency_per_method(self):
+        self.server.handlers['test.other'] = sleep_and_echo
+        for _ in range(3):
+            self.send({'delay': .01})
+        self.transport.send(self.server.address, 'id', 'test.other', {})
+
+        report = self.transport.get_latency_report()
+
+        self.assertEqual(report['test.echo']['count'], 3)
+        self.assertGreaterEqual(report['test.echo']['mean'], .01)
+        self.assertEqual(report['test.other']['count'], 1)
+        self.assertEqual(sum(report['test.echo']['buckets'].values()), 3)
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    """Tests acts.controllers.fuchsia_lib.base_lib.LatencyHistogram."""
+
+    def test_percentiles(self):
+        histogram = base_lib.LatencyHistogram()
+        for latency in [.0015] * 90 + [.3] * 9 + [4]:
+            histogram.add(latency)
+
+        self.assertEqual(histogram.percentile(50), .002)
+        self.assertEqual(histogram.percentile(95), .5)
+        self.assertEqual(histogram.percentile(100), 4)
+        self.assertEqual(histogram.max, 4)
+        self.assertEqual(histogram.count, 100)
+
+
+class BaseLibTest(unittest.TestCase):
+    """Tests acts.controllers.fuchsia_lib.base_lib.BaseLib."""
+
+    def test_facades_of_a_device_share_connections(self):
+        server = FakeSl4fServer({
+            'wlan.status': lambda params: 'status',
+            'sysinfo_facade.GetBoardName': lambda params: 'board',
+        })
+        self.addCleanup(server.close)
+        wlan_lib = FuchsiaWlanLib(server.address, 0, 'client')
+        sysinfo_lib = FuchsiaSysInfoLib(server.address, 0, 'client')
+        self.addCleanup(wlan_lib.transport.close)
+
+        with mock.patch('acts.utils.can_ping', return_value=True):
+            self.assertEqual(wlan_lib.wlanStatus()['result'], 'status')
+            self.assertEqual(sysinfo_lib.getBoardName()['result'], 'board')
+
+        self.assertIs(wlan_lib.transport, sysinfo_lib.transport)
+        self.assertEqual(server.connections, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
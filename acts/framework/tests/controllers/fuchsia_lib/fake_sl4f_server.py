@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""A local stand-in for the SL4F HTTP server, for tests and benchmarks."""
+
+import http.server
+import json
+import threading
+
+
+class _Sl4fRequestHandler(http.server.BaseHTTPRequestHandler):
+    # Keeps connections alive between requests, like SL4F.
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        request = json.loads(
+            self.rfile.read(int(self.headers['Content-Length'])))
+        with self.server.lock:
+            self.server.requests.append((self.path, request['method']))
+        handler = self.server.handlers.get(request['method'])
+        response = {'id': request['id'], 'result': None, 'error': None}
+        if handler is None:
+            response['error'] = 'Unknown method: %s' % request['method']
+        else:
+            response['result'] = handler(request['params'])
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSl4fServer(http.server.ThreadingHTTPServer):
+    """Serves SL4F JSON-RPC commands on a local port.
+
+    Attributes:
+        handlers: A dict of SL4F method names to the functions handling them.
+            A function is called with the command's params, and returns its
+            result.
+        requests: A list of the (path, method) of the commands received.
+        connections: The number of connections accepted.
+        address: The URL of the server.
+    """
+    daemon_threads = True
+
+    def __init__(self, handlers=None):
+        super().__init__(('127.0.0.1', 0), _Sl4fRequestHandler)
+        self.handlers = dict(handlers or {})
+        self.requests = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self.address = 'http://127.0.0.1:%d' % self.server_address[1]
+        threading.Thread(target=self.serve_forever, args=(.01, ),
+                         daemon=True).start()
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
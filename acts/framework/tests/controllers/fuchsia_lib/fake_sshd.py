@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""A local stand-in for the sshd of a Fuchsia device, for tests.
+
+The simulated device runs the commands it is sent with the host's /bin/sh.
+"""
+
+import socket
+import subprocess
+import threading
+
+import paramiko
+
+
+class _SshServer(paramiko.ServerInterface):
+    def __init__(self, sshd):
+        self._sshd = sshd
+        self.refuses_channels = False
+
+    def get_allowed_auths(self, username):
+        return 'publickey'
+
+    def check_auth_publickey(self, username, key):
+        if key == self._sshd.client_key:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session' and not self.refuses_channels:
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        with self._sshd.lock:
+            self._sshd.commands.append(command.decode())
+        threading.Thread(target=self._run,
+                         args=(channel, command),
+                         daemon=True).start()
+        return True
+
+    @staticmethod
+    def _run(channel, command):
+        process = subprocess.run(['/bin/sh', '-c', command],
+                                 stdin=subprocess.DEVNULL,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+        # Ends with EOF rather than closing the channel, which could reach
+        # the client before the reply to its exec request.
+        try:
+            channel.sendall(process.stdout)
+            channel.sendall_stderr(process.stderr)
+            channel.send_exit_status(process.returncode)
+            channel.shutdown_write()
+        except (OSError, EOFError, paramiko.SSHException):
+            channel.close()
+
+
+class FakeSshd(object):
+    """Serves SSH on a local port, accepting one client key.
+
+    Attributes:
+        client_key: The public key clients authenticate with.
+        commands: The commands received, in order.
+        connections: The number of connections accepted.
+        port: The port the server listens on.
+    """
+
+    def __init__(self, host_key, client_key):
+        self.client_key = client_key
+        self.commands = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._host_key = host_key
+        self._transports = []
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(16)
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(conn)
+            transport.add_server_key(self._host_key)
+            server = _SshServer(self)
+            transport.server_object = server
+            with self.lock:
+                self.connections += 1
+                self._transports.append(transport)
+            try:
+                transport.start_server(server=server)
+            except (EOFError, paramiko.SSHException):
+                transport.close()
+
+    def refuse_channels(self):
+        """Refuses new channels on the current connections.
+
+        The connections stay active, like those of a server refusing more
+        sessions than it allows.
+        """
+        with self.lock:
+            for transport in self._transports:
+                transport.server_object.refuses_channels = True
+
+    def drop_connections(self):
+        """Closes every connection, like the device rebooting."""
+        with self.lock:
+            transports, self._transports = self._transports, []
+        for transport in transports:
+            transport.close()
+
+    def close(self):
+        self._server.close()
+        self.drop_connections()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+import paramiko
+
+from acts.controllers.fuchsia_lib import utils_lib
+from tests.controllers.fuchsia_lib.fake_sshd import FakeSshd
+
+
+def run(connection, command):
+    stdin, stdout, stderr = connection.exec_command(command, timeout=10)
+    return utils_lib.SshResults(stdin, stdout, stderr, stdout.channel)
+
+
+class PersistentSshConnectionTest(unittest.TestCase):
+    """Tests acts.controllers.fuchsia_lib.utils_lib.PersistentSshConnection."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.host_key = paramiko.RSAKey.generate(2048)
+        cls.client_key = paramiko.RSAKey.generate(2048)
+
+    def setUp(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        key_path = os.path.join(tmp_dir, 'id_rsa')
+        self.client_key.write_private_key_file(key_path)
+        ssh_config = os.path.join(tmp_dir, 'ssh_config')
+        with open(ssh_config, 'w') as f:
+            f.write('Host *\n  IdentityFile %s\n' % key_path)
+
+        self.sshd = FakeSshd(self.host_key, self.client_key)
+        self.addCleanup(self.sshd.close)
+        self.connection = utils_lib.PersistentSshConnection(
+            '127.0.0.1', 'fuchsia', ssh_config, ssh_port=self.sshd.port)
+        self.addCleanup(self.connection.close)
+        patcher = mock.patch('acts.utils.can_ping', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_commands_reuse_a_connection(self):
+        results = [
+            run(self.connection, 'echo %d; echo err >&2; exit %d' % (i, i))
+            for i in range(3)
+        ]
+
+        self.assertEqual([result.stdout for result in results],
+                         ['0\n', '1\n', '2\n'])
+        self.assertEqual([result.stderr for result in results],
+                         ['err\n'] * 3)
+        self.assertEqual([result.exit_status for result in results],
+                         [0, 1, 2])
+        self.assertEqual(self.sshd.connections, 1)
+
+    def test_concurrent_commands_run_on_separate_channels(self):
+        results = []
+
+        def run_command():
+            results.append(run(self.connection, 'sleep .3; echo ok'))
+
+        run(self.connection, 'true')
+        threads = [threading.Thread(target=run_command) for _ in range(4)]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(time.time() - start, .9)
+        self.assertEqual([result.stdout for result in results], ['ok\n'] * 4)
+        self.assertEqual(self.sshd.connections, 1)
+
+    def test_reconnects_after_connection_drops(self):
+        run(self.connection, 'true')
+        self.sshd.drop_connections()
+        time.sleep(.1)
+
+        self.assertEqual(run(self.connection, 'echo ok').stdout, 'ok\n')
+        self.assertEqual(self.sshd.connections, 2)
+
+    def test_reconnects_if_connection_drops_while_opening_channel(self):
+        run(self.connection, 'true')
+        transport = self.connection._ssh_client.get_transport()
+
+        def open_session(*args, **kwargs):
+            transport.close()
+            raise EOFError()
+
+        transport.open_session = open_session
+
+        self.assertEqual(run(self.connection, 'echo ok').stdout, 'ok\n')
+        self.assertEqual(self.sshd.connections, 2)
+        self.assertEqual(self.sshd.commands, ['true', 'echo ok'])
+
+    def test_keeps_connection_if_channel_is_refused(self):
+        run(self.connection, 'true')
+        self.sshd.refuse_channels()
+
+        with self.assertRaises(paramiko.ChannelException):
+            run(self.connection, 'echo ok')
+
+        self.assertEqual(self.sshd.connections, 1)
+        self.assertTrue(utils_lib.ssh_is_connected(
+            self.connection._ssh_client))
+
+    def test_metrics_record_connection_setup(self):
+        run(self.connection, 'true')
+        self.connection.close()
+        run(self.connection, 'true')
+
+        metrics = self.connection.get_metrics()
+
+        self.assertEqual(metrics['connections'], 2)
+        self.assertGreater(metrics['connect_time']['mean'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
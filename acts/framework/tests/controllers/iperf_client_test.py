@@ -14,12 +14,20 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 import logging
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
 import unittest
 
 import mock
 import os
 
 from acts.controllers import iperf_client
+from acts.controllers.iperf_server import IPerfResult
+from acts.controllers.iperf_server import RateConvergence
+from acts.libs.proc import job
 from acts.controllers.iperf_client import IPerfClient
 from acts.controllers.iperf_client import IPerfClientBase
 from acts.controllers.iperf_client import IPerfClientOverAdb
@@ -31,6 +39,47 @@ ARGS = 0
 # The position in the call tuple that represents the kwargs dict.
 KWARGS = 1
 
+# An iperf3 client printing -t intervals of --json-stream results, or fewer
+# if interrupted.
+FAKE_IPERF3 = """#!%s
+import json
+import signal
+import sys
+import time
+
+interrupted = []
+signal.signal(signal.SIGINT, lambda *_: interrupted.append(True))
+
+
+def emit(event, data):
+    print(json.dumps({'event': event, 'data': data}, separators=(',', ':')))
+    sys.stdout.flush()
+
+
+emit('start', {'args': sys.argv[1:]})
+rate = 8 * 1024 ** 2
+for index in range(int(sys.argv[sys.argv.index('-t') + 1])):
+    if interrupted:
+        break
+    time.sleep(.01)
+    emit('interval', {'sum': {'seconds': 1, 'bytes': rate / 8,
+                              'bits_per_second': rate * (1 + index %% 2)}})
+emit('end', {'sum_received': {'bits_per_second': rate}})
+""" % sys.executable
+
+
+class FakeIPerfTestCase(unittest.TestCase):
+    """Runs iperf clients with FAKE_IPERF3 as their binary."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.iperf_binary = os.path.join(self.tmp_dir, 'iperf3')
+        with open(self.iperf_binary, 'w') as f:
+            f.write(FAKE_IPERF3)
+        os.chmod(self.iperf_binary, stat.S_IRWXU)
+        self.out_path = os.path.join(self.tmp_dir, 'IPerfClient.log')
+
 
 class IPerfClientModuleTest(unittest.TestCase):
     """Tests the acts.controllers.iperf_client module functions."""
@@ -98,6 +147,49 @@ class IPerfClientTest(unittest.TestCase):
         )
 
 
+class IPerfClientStreamingTest(FakeIPerfTestCase):
+    """Tests IPerfClientBase.start_streaming() with a local IPerfClient."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = IPerfClient()
+        self.client._get_full_file_path = lambda _: self.out_path
+
+    def test_start_streaming_runs_iperf_with_json_stream(self):
+        self.client.start_streaming('127.0.0.1', '-t 3', 'TAG',
+                                    iperf_binary=self.iperf_binary)
+
+        self.assertEqual(self.client.stream.start['args'],
+                         ['-c', '127.0.0.1', '-t', '3', '-J', '--json-stream',
+                          '--forceflush'])
+
+    def test_start_streaming_reports_each_interval(self):
+        rates = []
+
+        self.client.start_streaming(
+            '127.0.0.1', '-t 4', 'TAG', iperf_binary=self.iperf_binary,
+            on_interval=lambda stream: rates.append(
+                stream.instantaneous_rates[-1]))
+
+        self.assertEqual(rates, [1, 2, 1, 2])
+        self.assertTrue(self.client.stream.finished)
+        self.assertEqual(IPerfResult(self.out_path).instantaneous_rates,
+                         [1, 2, 1, 2])
+
+    def test_start_streaming_stops_once_rates_converge(self):
+        convergence = RateConvergence(tolerance=.2, min_intervals=6,
+                                      ignored_intervals=0)
+
+        self.client.start_streaming('127.0.0.1', '-t 1000', 'TAG',
+                                    iperf_binary=self.iperf_binary,
+                                    convergence=convergence)
+
+        result = IPerfResult(self.out_path)
+        self.assertGreaterEqual(len(result.instantaneous_rates), 6)
+        self.assertLess(len(result.instantaneous_rates), 1000)
+        self.assertIsNotNone(result.avg_receive_rate)
+
+
 class IPerfClientOverSshTest(unittest.TestCase):
     """Test acts.controllers.iperf_client.IPerfClientOverSshTest."""
 
@@ -135,5 +227,29 @@ class IPerfClientOverAdbTest(unittest.TestCase):
         mock_open().__enter__().write.assert_called_with('output')
 
 
+class IPerfClientOverAdbStreamingTest(FakeIPerfTestCase):
+    """Tests IPerfClientOverAdb.start_streaming(), with a local adb shell."""
+
+    def test_start_streaming_interrupts_remote_client(self):
+        client = IPerfClientOverAdb(None)
+        client._get_full_file_path = lambda _: self.out_path
+        convergence = RateConvergence(tolerance=.2, min_intervals=6,
+                                      ignored_intervals=0)
+
+        with mock.patch('acts.controllers.iperf_client.'
+                        'IPerfClientOverAdb._android_device') as adb_device:
+            adb_device.adb.shell_nb.side_effect = job.run_async
+            adb_device.adb.shell.side_effect = (
+                lambda command, **_: subprocess.call(command, shell=True))
+            client.start_streaming('127.0.0.1', '-t 1000', 'TAG',
+                                   iperf_binary=self.iperf_binary,
+                                   convergence=convergence)
+
+        kill_command = adb_device.adb.shell.call_args[ARGS][0]
+        self.assertRegex(kill_command, r'^kill -INT \d+$')
+        self.assertLess(len(IPerfResult(self.out_path).instantaneous_rates),
+                        1000)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -13,13 +13,18 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
+import json
 import logging
+import tempfile
 import unittest
 
 import mock
 import os
 
 from acts.controllers import iperf_server
+from acts.controllers.iperf_server import IPerfResult
+from acts.controllers.iperf_server import IPerfResultStream
+from acts.controllers.iperf_server import RateConvergence
 from acts.controllers.iperf_server import IPerfServer
 from acts.controllers.iperf_server import IPerfServerOverAdb
 from acts.controllers.iperf_server import IPerfServerOverSsh
@@ -87,6 +92,105 @@ class IPerfServerModuleTest(unittest.TestCase):
             iperf_server._get_port_from_ss_output(ss_output, '<PID>'), '<PORT>')
 
 
+def json_stream_line(event, data):
+    return json.dumps({'event': event, 'data': data},
+                      separators=(',', ':')) + '\n'
+
+
+def interval_line(bits_per_second):
+    return json_stream_line(
+        'interval', {
+            'sum': {
+                'seconds': 1,
+                'bytes': bits_per_second / 8,
+                'bits_per_second': bits_per_second
+            }
+        })
+
+
+class IPerfResultStreamTest(unittest.TestCase):
+    """Tests acts.controllers.iperf_server.IPerfResultStream."""
+
+    def test_feed_returns_event_names(self):
+        stream = IPerfResultStream()
+
+        self.assertEqual(stream.feed(json_stream_line('start', {})), 'start')
+        self.assertEqual(stream.feed(interval_line(8 * 1024**2)), 'interval')
+        self.assertIsNone(stream.feed('iperf3: some warning\n'))
+        self.assertIsNone(stream.feed('{"event":"interval","da'))
+        self.assertEqual(stream.feed(json_stream_line('end', {})), 'end')
+        self.assertTrue(stream.finished)
+
+    def test_instantaneous_rates_are_in_reporting_units(self):
+        stream = IPerfResultStream(reporting_speed_units='Mbits')
+        stream.feed(interval_line(1024**2))
+        stream.feed(interval_line(2 * 1024**2))
+
+        self.assertEqual(stream.instantaneous_rates, [1, 2])
+        self.assertFalse(stream.finished)
+
+    def test_get_result_computes_end_of_interrupted_run(self):
+        stream = IPerfResultStream()
+        stream.feed(interval_line(8 * 1024**2))
+        stream.feed(interval_line(24 * 1024**2))
+
+        result = stream.get_result()
+
+        self.assertEqual(result.instantaneous_rates, [1, 3])
+        self.assertEqual(result.avg_rate, 2)
+
+    def test_iperf_result_loads_json_stream_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.log') as f:
+            f.write(json_stream_line('start', {}))
+            f.write(interval_line(8 * 1024**2))
+            f.write(
+                json_stream_line(
+                    'end', {'sum_received': {
+                        'bits_per_second': 8 * 1024**2
+                    }}))
+            f.flush()
+
+            result = IPerfResult(f.name)
+
+        self.assertEqual(result.instantaneous_rates, [1])
+        self.assertEqual(result.avg_receive_rate, 1)
+
+
+class RateConvergenceTest(unittest.TestCase):
+    """Tests acts.controllers.iperf_server.RateConvergence."""
+
+    def test_steady_rates_converge(self):
+        convergence = RateConvergence(min_intervals=5, ignored_intervals=0)
+
+        self.assertTrue(convergence.has_converged([100, 101, 99, 100, 100]))
+
+    def test_too_few_rates_do_not_converge(self):
+        convergence = RateConvergence(min_intervals=5, ignored_intervals=2)
+
+        self.assertFalse(convergence.has_converged([0, 0, 100, 100, 100, 100]))
+
+    def test_noisy_rates_do_not_converge(self):
+        convergence = RateConvergence(min_intervals=5, ignored_intervals=0)
+
+        self.assertFalse(convergence.has_converged([50, 150, 60, 140, 100]))
+
+    def test_ignores_first_rates(self):
+        convergence = RateConvergence(min_intervals=5, ignored_intervals=2)
+
+        self.assertTrue(
+            convergence.has_converged([0, 10, 100, 101, 99, 100, 100]))
+
+    def test_tolerance_is_relative_to_mean(self):
+        rates = [100, 110, 90, 100, 105, 95]
+
+        self.assertFalse(
+            RateConvergence(tolerance=.01,
+                            ignored_intervals=0).has_converged(rates))
+        self.assertTrue(
+            RateConvergence(tolerance=.1,
+                            ignored_intervals=0).has_converged(rates))
+
+
 class IPerfServerBaseTest(unittest.TestCase):
     """Tests acts.controllers.iperf_server.IPerfServerBase."""
 
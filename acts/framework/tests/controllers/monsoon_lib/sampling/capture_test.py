@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from acts.controllers import power_metrics
+from acts.controllers.monsoon_lib.sampling import capture
+from acts.controllers.monsoon_lib.sampling.capture import CaptureError
+from acts.controllers.monsoon_lib.sampling.capture import CaptureFile
+from acts.controllers.monsoon_lib.sampling.capture import CaptureWriter
+from acts.controllers.monsoon_lib.sampling.common import ReadingBlock
+from acts.controllers.monsoon_lib.sampling.engine.transformers import CaptureTee
+from acts.controllers.monsoon_lib.sampling.hvpm.transformers import HvpmReading
+
+
+class CaptureTest(unittest.TestCase):
+    """Unit tests the Monsoon binary capture format."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'capture')
+        self.sample_times = np.arange(1000) * .0002 + 100
+        self.currents = np.linspace(0, 1, 1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_capture(self, index_stride=16, batch_size=37, **kwargs):
+        writer = CaptureWriter(self.path, index_stride=index_stride, **kwargs)
+        for low in range(0, len(self.sample_times), batch_size):
+            writer.write(self.sample_times[low:low + batch_size],
+                         self.currents[low:low + batch_size])
+        writer.close()
+
+    def test_capture_round_trips_samples(self):
+        self.write_capture()
+
+        capture_file = CaptureFile(self.path)
+
+        self.assertEqual(len(capture_file), len(self.sample_times))
+        self.assertEqual(capture_file[3],
+                         (self.sample_times[3], self.currents[3]))
+        self.assertEqual(list(capture_file),
+                         list(zip(self.sample_times, self.currents)))
+
+    def test_float32_capture_stores_reduced_precision(self):
+        self.write_capture(current_dtype=np.float32)
+
+        capture_file = CaptureFile(self.path)
+
+        np.testing.assert_array_equal(
+            capture_file.records['current'],
+            self.currents.astype(np.float32))
+
+    def test_find_range_matches_full_search(self):
+        self.write_capture()
+        capture_file = CaptureFile(self.path)
+
+        for start, end in [(99, 99.5), (100.01, 100.05), (100.0502, 100.0502),
+                           (100.1, 200), (100.05, 100.01)]:
+            expected = np.flatnonzero((self.sample_times >= start)
+                                      & (self.sample_times <= end))
+            low, high = capture_file.find_range(start, end)
+            self.assertEqual(list(range(low, high)), list(expected))
+
+    def test_missing_index_is_rebuilt(self):
+        self.write_capture()
+        os.remove(self.path + capture.INDEX_SUFFIX)
+
+        capture_file = CaptureFile(self.path)
+
+        times, currents = capture_file.get_range(100.01, 100.02)
+        self.assertEqual(times[0], self.sample_times[50])
+        self.assertEqual(currents[-1], self.currents[100])
+
+    def test_set_time_offset_shifts_sample_times(self):
+        self.write_capture()
+
+        capture.set_time_offset(self.path, -100)
+        capture_file = CaptureFile(self.path)
+
+        self.assertAlmostEqual(capture_file[0][0], 0)
+        times, _ = capture_file.get_range(0, .001)
+        self.assertEqual(len(times), 6)
+
+    def test_export_text_is_readable_by_import_raw_data(self):
+        self.write_capture()
+        text_path = os.path.join(self.tmp_dir, 'text')
+
+        CaptureFile(self.path).export_text(text_path)
+
+        with open(text_path) as f:
+            self.assertEqual(f.readline(), '%.9f %s\n' % (self.sample_times[0],
+                                                          self.currents[0]))
+        self.assertEqual(len(list(power_metrics.import_raw_data(text_path))),
+                         len(self.sample_times))
+
+    def test_empty_capture(self):
+        CaptureWriter(self.path).close()
+
+        capture_file = CaptureFile(self.path)
+
+        self.assertEqual(len(capture_file), 0)
+        self.assertEqual(capture_file.find_range(0, 1), (0, 0))
+
+    def test_invalid_file_raises(self):
+        with open(self.path, 'w') as f:
+            f.write('100.0 0.5\n')
+
+        self.assertFalse(capture.is_capture_file(self.path))
+        with self.assertRaises(CaptureError):
+            CaptureFile(self.path)
+
+    def test_find_capture_file_finds_capture_next_to_text_path(self):
+        text_path = os.path.join(self.tmp_dir, 'output.txt')
+        self.path = capture.capture_path_for(text_path)
+        self.write_capture()
+
+        self.assertEqual(capture.find_capture_file(text_path), self.path)
+        self.assertEqual(
+            len(list(power_metrics.import_raw_data(text_path))), 1000)
+
+    def test_generate_test_metrics_matches_raw_data(self):
+        self.write_capture()
+        timestamps = {
+            'a': {'start': 100010, 'end': 100050},
+            'b': {'start': 100040, 'end': 100190.5},
+        }
+
+        from_capture = power_metrics.generate_test_metrics(
+            CaptureFile(self.path), timestamps=timestamps, voltage=4.2)
+        from_list = power_metrics.generate_test_metrics(
+            list(zip(self.sample_times, self.currents)),
+            timestamps=timestamps,
+            voltage=4.2)
+
+        for seg_name in timestamps:
+            self.assertEqual([m.value for m in from_capture[seg_name]],
+                             [m.value for m in from_list[seg_name]])
+
+
+class CaptureTeeTest(unittest.TestCase):
+    """Unit tests the transformers.CaptureTee class."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'capture')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_transform_buffer_writes_measured_samples(self):
+        tee = CaptureTee(self.path, measure_after_seconds=1)
+        tee.on_begin()
+
+        tee._transform_buffer([
+            HvpmReading([1.5, 0, 0, 0, 0], 10.0),
+            HvpmReading([2.5, 0, 0, 0, 0], 10.5),
+        ])
+        tee._transform_buffer(
+            ReadingBlock([[3.5, 4.5], [0, 0], [0, 0], [0, 0], [0, 0]],
+                         [11.0, 12.0], HvpmReading))
+        tee.on_end()
+
+        self.assertEqual(list(CaptureFile(self.path)), [(11.0, 3.5),
+                                                        (12.0, 4.5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,6 +14,8 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import multiprocessing
+import threading
 import unittest
 
 import mock
@@ -22,6 +24,7 @@ from acts.controllers.monsoon_lib.sampling.engine.assembly_line import AssemblyL
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import DevNullBufferStream
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import IndexedBuffer
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ProcessAssemblyLine
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import SharedMemoryBufferStream
 from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ThreadAssemblyLine
 
 ASSEMBLY_LINE_MODULE = (
@@ -177,6 +180,17 @@ class AssemblyLineBuilderTest(unittest.TestCase):
         self.assertEqual(queue_generator(),
                          builder.nodes[-1].input_stream._buffer_queue)
 
+    def test_into_uses_stream_generator_if_given(self):
+        """Tests into() creates the input_stream with the stream_generator."""
+        stream_generator = mock.Mock()
+        builder = AssemblyLineBuilder(mock.Mock(), mock.Mock(),
+                                      stream_generator)
+        builder.source(mock.Mock())
+
+        builder.into(mock.Mock())
+
+        self.assertEqual(stream_generator(), builder.nodes[-1].input_stream)
+
     def test_into_returns_self(self):
         """Tests into() returns the builder."""
         builder = AssemblyLineBuilder(mock.Mock(), mock.Mock())
@@ -244,5 +258,88 @@ class IndexedBufferTest(unittest.TestCase):
         self.assertEqual(len(IndexedBuffer(0, buffer_len).buffer), buffer_len)
 
 
+
+def _write_buffers(stream, buffers):
+    for index, buffer in enumerate(buffers):
+        stream.add_indexed_buffer(IndexedBuffer(index, buffer))
+    stream.end_stream()
+
+
+@unittest.skipUnless(SharedMemoryBufferStream.is_supported(),
+                     'multiprocessing.shared_memory is not available.')
+class SharedMemoryBufferStreamTest(unittest.TestCase):
+    """Tests the SharedMemoryBufferStream class."""
+
+    def setUp(self):
+        self.stream = SharedMemoryBufferStream(num_slots=4, slot_size=256)
+
+    def tearDown(self):
+        self.stream.close()
+
+    def test_bytes_lists_are_passed_through(self):
+        self.stream.add_indexed_buffer(
+            IndexedBuffer(3, [b'\x00\x01', None, b'', b'packet']))
+
+        buffer = self.stream.remove_indexed_buffer()
+
+        self.assertEqual(buffer.index, 3)
+        self.assertEqual(buffer.buffer, [b'\x00\x01', None, b'', b'packet'])
+
+    def test_other_buffers_are_pickled(self):
+        self.stream.add_indexed_buffer(IndexedBuffer(1, {'key': [1.5, 2]}))
+
+        self.assertEqual(self.stream.remove_indexed_buffer().buffer,
+                         {'key': [1.5, 2]})
+
+    def test_end_stream_is_read_as_none(self):
+        self.stream.end_stream()
+
+        self.assertIsNone(self.stream.remove_indexed_buffer())
+
+    def test_add_indexed_buffer_raises_if_buffer_is_too_large(self):
+        with self.assertRaises(ValueError):
+            self.stream.add_indexed_buffer(IndexedBuffer(0, [b'\x00' * 256]))
+
+    def test_bytes_list_slot_size_fits_the_largest_buffer(self):
+        # A full buffer of the largest LVPM packets.
+        buffer = [b'\xff' * 270] * 64
+        stream = SharedMemoryBufferStream(
+            num_slots=1,
+            slot_size=SharedMemoryBufferStream.bytes_list_slot_size(64, 270))
+        self.addCleanup(stream.close)
+
+        stream.add_indexed_buffer(IndexedBuffer(0, buffer))
+
+        self.assertEqual(stream.remove_indexed_buffer().buffer, buffer)
+
+    def test_add_indexed_buffer_waits_for_a_free_slot(self):
+        buffers = [[bytes([index])] for index in range(4)]
+        writer = threading.Thread(target=_write_buffers,
+                                  args=(self.stream, buffers))
+        writer.start()
+        writer.join(timeout=0.1)
+        self.assertTrue(writer.is_alive())
+
+        self.assertEqual(self.stream.remove_indexed_buffer().buffer, [b'\x00'])
+        writer.join(timeout=5)
+        self.assertFalse(writer.is_alive())
+
+    def test_buffers_are_passed_between_processes_in_order(self):
+        buffers = [[bytes([index]) * index, None] for index in range(20)]
+        writer = multiprocessing.Process(target=_write_buffers,
+                                         args=(self.stream, buffers))
+        writer.start()
+
+        received = []
+        while True:
+            indexed_buffer = self.stream.remove_indexed_buffer()
+            if indexed_buffer is None:
+                break
+            received.append(indexed_buffer.buffer)
+        writer.join()
+
+        self.assertEqual(received, buffers)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Benchmarks the BufferStreams linking ProcessAssemblyLine stages.
+
+A paced source emits HVPM-sized raw packets into a second process, which
+decodes them like SampleNormalizer does. Packets the source cannot emit in
+time overflow a simulated device FIFO and are counted as dropped, like the
+Monsoon's dropped_count. Each stream is measured twice: unpaced, for the
+sustained throughput, and paced at the given sample rate, for the drop rate.
+
+Usage:
+    python3 buffer_stream_benchmark.py [--seconds 5] [--rate 5000]
+"""
+
+import argparse
+import struct
+import time
+
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ProcessAssemblyLineBuilder
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import SharedMemoryBufferStream
+from acts.controllers.monsoon_lib.sampling.engine.transformer import ParallelTransformer
+from acts.controllers.monsoon_lib.sampling.engine.transformer import SourceTransformer
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import decode_packets
+
+MEASUREMENTS_PER_PACKET = 3
+# The number of packets the simulated device can hold before dropping any.
+FIFO_PACKETS = 128
+
+_MEASUREMENT = struct.pack('>8H2B', *range(8), 7, 0x03)
+
+
+def _build_packet(time_of_read):
+    header = struct.pack('<2dhBB', time_of_read, 0, 0, 0,
+                         MEASUREMENTS_PER_PACKET)
+    return header + _MEASUREMENT * MEASUREMENTS_PER_PACKET
+
+
+class PacedPacketSource(SourceTransformer):
+    """Emits raw packets at a fixed sample rate, like a Monsoon would."""
+
+    def __init__(self, duration, samples_per_second, results):
+        """Creates a PacedPacketSource.
+
+        Args:
+            duration: The number of seconds to emit packets for.
+            samples_per_second: The sample rate to emit packets at, or 0 to
+                emit them as fast as possible.
+            results: A manager dict to store the packet counts in.
+        """
+        super().__init__()
+        self._duration = duration
+        self._packet_rate = samples_per_second / MEASUREMENTS_PER_PACKET
+        self._results = results
+        self._start_time = None
+        self._packets_due = 0
+        self._packets_sent = 0
+        self._packets_dropped = 0
+
+    def on_begin(self):
+        self._start_time = time.time()
+
+    def on_end(self):
+        self._results['packets_sent'] = self._packets_sent
+        self._results['packets_dropped'] = self._packets_dropped
+
+    def _transform_buffer(self, buffer):
+        now = time.time()
+        if now - self._start_time > self._duration:
+            return None
+        if self._packet_rate:
+            scheduled = (now - self._start_time) * self._packet_rate
+            backlog = scheduled - self._packets_due
+            if backlog > FIFO_PACKETS:
+                # The device FIFO overflowed while we were busy.
+                self._packets_dropped += int(backlog - FIFO_PACKETS)
+                self._packets_due += int(backlog - FIFO_PACKETS)
+            ready_time = (self._start_time +
+                          (self._packets_due + len(buffer)) / self._packet_rate)
+            if ready_time > now:
+                time.sleep(ready_time - now)
+            self._packets_due += len(buffer)
+
+        for index in range(len(buffer)):
+            buffer[index] = _build_packet(time.time())
+        self._packets_sent += len(buffer)
+        return buffer
+
+
+class DecodingSink(ParallelTransformer):
+    """Decodes the raw packets, counting the samples received."""
+
+    def __init__(self, results):
+        super().__init__()
+        self._results = results
+        self._num_samples = 0
+
+    def on_end(self):
+        self._results['samples_received'] = self._num_samples
+        self._results['end_time'] = time.time()
+
+    def _transform_buffer(self, buffer):
+        self._num_samples += len(decode_packets(buffer))
+        return None
+
+
+def run_benchmark(stream_generator, duration, samples_per_second):
+    """Runs a source and a sink process linked by the given stream type.
+
+    Returns:
+        A tuple of (samples received per second, fraction of packets dropped).
+    """
+    builder = ProcessAssemblyLineBuilder(stream_generator)
+    results = builder.manager.dict()
+    start_time = time.time()
+    (builder.source(PacedPacketSource(duration, samples_per_second, results))
+     .into(DecodingSink(results))
+     .build().run())
+    results = dict(results)
+    builder.manager.shutdown()
+
+    elapsed = results['end_time'] - start_time
+    packets_total = results['packets_sent'] + results['packets_dropped']
+    return (results['samples_received'] / elapsed,
+            results['packets_dropped'] / max(packets_total, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rate', type=int, default=5000,
+                        help='The paced sample rate, in samples per second.')
+    args = parser.parse_args()
+
+    streams = [('queue', None)]
+    if SharedMemoryBufferStream.is_supported():
+        streams.append(('shared_memory', SharedMemoryBufferStream))
+
+    print('%-14s %18s %18s %12s' % ('stream', 'max samples/sec',
+                                     'paced samples/sec', 'drop rate'))
+    for name, stream_generator in streams:
+        max_rate, _ = run_benchmark(stream_generator, args.seconds, 0)
+        paced_rate, drop_rate = run_benchmark(stream_generator, args.seconds,
+                                              args.rate)
+        print('%-14s %18.0f %18.0f %11.3f%%' % (name, max_rate, paced_rate,
+                                                drop_rate * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import statistics
+import unittest
+
+import numpy as np
+
+from acts.controllers.monsoon_lib.sampling.engine.running_stats import QuantileSketch
+from acts.controllers.monsoon_lib.sampling.engine.running_stats import RunningStats
+
+
+class RunningStatsTest(unittest.TestCase):
+    """Unit tests the running_stats.RunningStats class."""
+
+    def test_merged_chunks_match_whole_data(self):
+        samples = np.random.RandomState(0).normal(1e3, 1e-3, 10000)
+        running_stats = RunningStats()
+        for chunk in np.array_split(samples, 7):
+            running_stats.add_samples(chunk)
+
+        self.assertEqual(running_stats.count, 10000)
+        self.assertAlmostEqual(running_stats.mean, statistics.mean(samples))
+        self.assertAlmostEqual(running_stats.stdev / statistics.stdev(samples),
+                               1)
+        self.assertEqual(running_stats.min, samples.min())
+        self.assertEqual(running_stats.max, samples.max())
+
+    def test_stdev_of_fewer_than_two_samples_is_zero(self):
+        running_stats = RunningStats()
+        running_stats.add_samples(np.array([5.0]))
+
+        self.assertEqual(running_stats.stdev, 0)
+
+    def test_add_empty_chunk_does_nothing(self):
+        running_stats = RunningStats()
+        running_stats.add_samples(np.array([]))
+
+        self.assertEqual(running_stats.count, 0)
+        self.assertIsNone(running_stats.max)
+
+
+class QuantileSketchTest(unittest.TestCase):
+    """Unit tests the running_stats.QuantileSketch class."""
+
+    def test_quantiles_are_within_relative_accuracy(self):
+        samples = np.random.RandomState(0).lognormal(-3, 1, 10000)
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for chunk in np.array_split(samples, 3):
+            sketch.add_samples(chunk)
+
+        sorted_samples = np.sort(samples)
+        for q in (0, .5, .9, .99, 1):
+            expected = sorted_samples[int(q * (len(samples) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q), expected,
+                                   delta=0.01 * expected)
+
+    def test_handles_zero_and_negative_values(self):
+        sketch = QuantileSketch()
+        sketch.add_samples(np.array([-2, 0, 0, 3]))
+
+        self.assertAlmostEqual(sketch.quantile(0), -2, delta=0.02)
+        self.assertEqual(sketch.quantile(.5), 0)
+        self.assertAlmostEqual(sketch.quantile(1), 3, delta=0.03)
+
+    def test_merge_equals_sketch_of_all_samples(self):
+        samples = np.random.RandomState(1).uniform(0, 1, 1000)
+        merged = QuantileSketch()
+        other = QuantileSketch()
+        merged.add_samples(samples[:400])
+        other.add_samples(samples[400:])
+        merged.merge(other)
+        whole = QuantileSketch()
+        whole.add_samples(samples)
+
+        self.assertEqual(merged.count, 1000)
+        for q in (.1, .5, .9):
+            self.assertEqual(merged.quantile(q), whole.quantile(q))
+
+    def test_empty_sketch_returns_none(self):
+        self.assertIsNone(QuantileSketch().quantile(.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
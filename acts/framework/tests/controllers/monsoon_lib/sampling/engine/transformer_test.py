@@ -14,6 +14,8 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import os
+import tempfile
 import unittest
 
 import mock
@@ -25,6 +27,7 @@ from acts.controllers.monsoon_lib.sampling.engine.transformer import ParallelTra
 from acts.controllers.monsoon_lib.sampling.engine.transformer import SequentialTransformer
 from acts.controllers.monsoon_lib.sampling.engine.transformer import SourceTransformer
 from acts.controllers.monsoon_lib.sampling.engine.transformer import Transformer
+from acts.controllers.monsoon_lib.sampling.engine import transformer
 
 # The indexes of the arguments returned in Mock's call lists.
 ARGS = 0
@@ -264,5 +267,81 @@ class ParallelTransformerTest(unittest.TestCase):
             output_stream.add_indexed_buffer.call_args_list[0][ARGS][0].index)
 
 
+
+class AddOneTransformer(ParallelTransformer):
+    """A ParallelTransformer that adds one to every value in a buffer."""
+
+    def _transform_buffer(self, buffer):
+        return [value + 1 for value in buffer]
+
+
+class StageInstrumentationTest(unittest.TestCase):
+    """Tests the opt-in per-stage instrumentation of Transformers."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.report_path = os.path.join(self.tmp_dir, 'report.stages.jsonl')
+
+    def tearDown(self):
+        transformer.disable_instrumentation()
+
+    def run_transformer(self, num_buffers=3):
+        input_stream = BufferStream(mock.Mock)
+        input_stream._buffer_queue = mock.Mock()
+        input_stream._buffer_queue.get.side_effect = [
+            IndexedBuffer(i, [i]) for i in range(num_buffers)
+        ] + [BufferStream.END]
+        input_stream._buffer_queue.qsize.return_value = num_buffers
+        output_stream = mock.Mock()
+        stage = AddOneTransformer()
+        stage.set_output_stream(output_stream)
+        stage.transform(input_stream)
+        return stage, output_stream
+
+    def test_transform_writes_nothing_when_disabled(self):
+        self.run_transformer()
+
+        self.assertEqual(os.listdir(self.tmp_dir), [])
+
+    def test_transform_writes_stage_stats_when_enabled(self):
+        transformer.enable_instrumentation(self.report_path)
+
+        self.run_transformer(num_buffers=3)
+
+        [stats] = transformer.read_stage_report(self.report_path)
+        self.assertEqual(stats['stage'], 'AddOneTransformer')
+        self.assertEqual(stats['pid'], os.getpid())
+        self.assertEqual(stats['buffers_processed'], 3)
+        self.assertGreaterEqual(stats['wall_seconds'], stats['busy_seconds'])
+        self.assertEqual(stats['queue_depths'][0][1], 3)
+
+    def test_transform_still_transforms_buffers_when_enabled(self):
+        transformer.enable_instrumentation(self.report_path)
+
+        stage, output_stream = self.run_transformer(num_buffers=2)
+
+        self.assertEqual([
+            call[ARGS][0].buffer
+            for call in output_stream.add_indexed_buffer.call_args_list
+        ], [[1], [2]])
+        self.assertIs(stage.output_stream, output_stream)
+
+    def test_enable_instrumentation_clears_existing_report(self):
+        transformer.enable_instrumentation(self.report_path)
+        self.run_transformer()
+        transformer.enable_instrumentation(self.report_path)
+
+        self.assertEqual(transformer.read_stage_report(self.report_path), [])
+
+    def test_disable_instrumentation_stops_reporting(self):
+        transformer.enable_instrumentation(self.report_path)
+        self.run_transformer()
+        transformer.disable_instrumentation()
+        self.run_transformer()
+
+        self.assertEqual(
+            len(transformer.read_stage_report(self.report_path)), 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -17,10 +17,13 @@ import statistics
 import unittest
 
 import mock
+import numpy as np
 
+from acts.controllers.monsoon_lib.sampling.common import ReadingBlock
 from acts.controllers.monsoon_lib.sampling.engine.transformers import DownSampler
 from acts.controllers.monsoon_lib.sampling.engine.transformers import PerfgateTee
 from acts.controllers.monsoon_lib.sampling.engine.transformers import SampleAggregator
+from acts.controllers.monsoon_lib.sampling.engine.transformers import SegmentStatsSink
 from acts.controllers.monsoon_lib.sampling.engine.transformers import Tee
 from acts.controllers.monsoon_lib.sampling.hvpm.transformers import HvpmReading
 
@@ -64,9 +67,9 @@ class TeeTest(unittest.TestCase):
             HvpmReading([3.14159265359, 0, 0, 0, 0], 0.03),
         ])
 
-        for call, out in zip(open_mock().write.call_args_list,
-                             expected_output):
-            self.assertEqual(call[ARGS][0], out)
+        written = ''.join(
+            call[ARGS][0] for call in open_mock().write.call_args_list)
+        self.assertEqual(written, ''.join(expected_output))
 
 
 class PerfgateTeeTest(unittest.TestCase):
@@ -106,9 +109,24 @@ class PerfgateTeeTest(unittest.TestCase):
             HvpmReading([0.000225, 0, 0, 4.193135, 0], 1596149635.572549376),
         ])
 
-        for call, out in zip(open_mock().write.call_args_list,
-                             expected_output):
-            self.assertEqual(call[ARGS][0], out)
+        written = ''.join(
+            call[ARGS][0] for call in open_mock().write.call_args_list)
+        self.assertEqual(written, ''.join(expected_output))
+
+
+    @mock.patch('builtins.open')
+    def test_transform_buffer_accepts_reading_blocks(self, open_mock):
+        tee = PerfgateTee('foo', measure_after_seconds=1)
+        tee.on_begin()
+
+        tee._transform_buffer(
+            ReadingBlock([[0.000223, 0.000212], [0, 0], [0, 0],
+                          [4.193050, 4.193190], [0, 0]], [1.0, 2.0],
+                         HvpmReading))
+
+        written = ''.join(
+            call[ARGS][0] for call in open_mock().write.call_args_list)
+        self.assertEqual(written, '2000000000,0.000212,4.193190\n')
 
 
 class SampleAggregatorTest(unittest.TestCase):
@@ -137,6 +155,62 @@ class SampleAggregatorTest(unittest.TestCase):
         self.assertAlmostEqual(sample_aggregator.sum_currents, 7.27408804442)
 
 
+class SegmentStatsSinkTest(unittest.TestCase):
+    """Unit tests the transformers.SegmentStatsSink class."""
+
+    @staticmethod
+    def _block(currents, sample_times):
+        readings = np.zeros((5, len(currents)))
+        readings[0] = currents
+        return ReadingBlock(readings, np.array(sample_times, dtype=float),
+                            HvpmReading)
+
+    def test_transform_buffer_only_counts_samples_within_segments(self):
+        sink = SegmentStatsSink()
+        sink.add_segment('middle', 1, 2)
+        sink._transform_buffer(self._block([1, 2, 3, 4], [0, 1, 2, 3]))
+
+        stats = sink.get_stats('middle')
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.mean, 2.5)
+        self.assertEqual(stats.min, 2)
+        self.assertEqual(stats.max, 3)
+
+    def test_stats_match_whole_data_across_buffers(self):
+        currents = np.random.RandomState(0).uniform(0, 1, 10000)
+        sample_times = np.arange(10000) / 5000
+        sink = SegmentStatsSink()
+        sink.add_segment('all', 0)
+        for low in range(0, 10000, 777):
+            sink._transform_buffer(
+                self._block(currents[low:low + 777],
+                            sample_times[low:low + 777]))
+
+        stats = sink.get_stats('all')
+        self.assertEqual(stats.count, 10000)
+        self.assertAlmostEqual(stats.mean, statistics.mean(currents))
+        self.assertAlmostEqual(stats.stdev, statistics.stdev(currents))
+        self.assertAlmostEqual(stats.percentile(50),
+                               np.percentile(currents, 50),
+                               delta=0.01 * np.percentile(currents, 50))
+
+    def test_open_segment_ends_when_closed(self):
+        sink = SegmentStatsSink()
+        sink.open_segment('live', start_time=1)
+        sink._transform_buffer(self._block([1, 2], [0, 1]))
+        sink.close_segment('live', end_time=2)
+        sink._transform_buffer(self._block([3, 4], [2, 3]))
+
+        self.assertEqual(sink.get_stats('live').count, 2)
+        self.assertEqual(sink.get_stats('live').mean, 2.5)
+
+    def test_add_segment_disallows_duplicate_names(self):
+        sink = SegmentStatsSink()
+        sink.add_segment('segment', 0)
+        with self.assertRaises(ValueError):
+            sink.add_segment('segment', 1)
+
+
 class DownSamplerTest(unittest.TestCase):
     """Unit tests the DownSampler class."""
 
@@ -158,6 +232,9 @@ class DownSamplerTest(unittest.TestCase):
             self.assertAlmostEqual(
                 down_sample.main_current,
                 ((buffer[2 * i] + buffer[2 * i + 1]) / 2).main_current)
+            self.assertAlmostEqual(
+                down_sample.sample_time,
+                ((buffer[2 * i] + buffer[2 * i + 1]) / 2).sample_time)
 
     def test_transform_stores_unused_values_in_leftovers(self):
         downsampler = DownSampler(3)
@@ -172,8 +249,8 @@ class DownSamplerTest(unittest.TestCase):
         downsampler._transform_buffer(buffer)
 
         self.assertEqual(len(downsampler._leftovers), 2)
-        self.assertIn(buffer[-2], downsampler._leftovers)
-        self.assertIn(buffer[-1], downsampler._leftovers)
+        self.assertEqual(list(downsampler._leftovers.main_current), [8, 10])
+        self.assertEqual(list(downsampler._leftovers.sample_time), [.07, .09])
 
     def test_transform_uses_leftovers_on_next_calculation(self):
         downsampler = DownSampler(3)
@@ -181,7 +258,7 @@ class DownSamplerTest(unittest.TestCase):
             HvpmReading([2, 0, 0, 0, 0], .01),
             HvpmReading([4, 0, 0, 0, 0], .03),
         ]
-        downsampler._leftovers = starting_leftovers
+        downsampler._leftovers = ReadingBlock.from_readings(starting_leftovers)
         buffer = [
             HvpmReading([6, 0, 0, 0, 0], .05),
             HvpmReading([8, 0, 0, 0, 0], .07),
@@ -192,8 +269,7 @@ class DownSamplerTest(unittest.TestCase):
         values = downsampler._transform_buffer(buffer)
 
         self.assertEqual(len(values), 2)
-        self.assertNotIn(starting_leftovers[0], downsampler._leftovers)
-        self.assertNotIn(starting_leftovers[1], downsampler._leftovers)
+        self.assertEqual(len(downsampler._leftovers), 0)
 
         self.assertAlmostEqual(
             values[0].main_current,
@@ -210,6 +286,18 @@ class DownSamplerTest(unittest.TestCase):
                 buffer[3].main_current,
             ]))
 
+    def test_transform_returns_lazy_reading_views(self):
+        downsampler = DownSampler(2)
+        block = ReadingBlock([[2, 4], [0, 0], [0, 0], [1, 3], [0, 0]],
+                             [.01, .03], HvpmReading)
+
+        values = downsampler._transform_buffer(block)
+
+        self.assertIsInstance(values, ReadingBlock)
+        self.assertIsInstance(values[0], HvpmReading)
+        self.assertEqual(values[0].main_current, 3)
+        self.assertEqual(values[0].main_voltage, 2)
+
 
 if __name__ == '__main__':
     unittest.main()
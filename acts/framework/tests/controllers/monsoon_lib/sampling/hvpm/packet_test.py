@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2019 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import struct
+import unittest
+
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import HvpmMeasurement
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import Packet
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import SampleType
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import decode_packets
+
+
+def build_raw_packet(time_of_read, time_since_last_sample, dropped_count,
+                     measurements, flags=0):
+    """Builds the raw bytes of a packet as sent by PacketCollector.
+
+    Args:
+        measurements: A list of 10-value tuples, one for each measurement.
+    """
+    header = struct.pack('<2dhBB', time_of_read, time_since_last_sample,
+                         dropped_count, flags, len(measurements))
+    return header + b''.join(
+        struct.pack('>8H2B', *values) for values in measurements)
+
+
+def build_measurement(seed, sample_type=SampleType.MEASUREMENT):
+    return tuple(seed + i for i in range(8)) + (7, sample_type | 0x03)
+
+
+class DecodePacketsTest(unittest.TestCase):
+    """Tests the batch packet decoder against the Packet class."""
+
+    def setUp(self):
+        self.raw_packets = [
+            build_raw_packet(10.0, 0.3, 0, [
+                build_measurement(100),
+                build_measurement(200, SampleType.ZERO_CAL),
+                build_measurement(300),
+            ], flags=0x01),
+            build_raw_packet(10.5, 0.5, -1, [build_measurement(400)]),
+            None,
+            build_raw_packet(11.0, 0.5, 3, [
+                build_measurement(500, SampleType.REF_CAL),
+                build_measurement(600),
+            ]),
+        ]
+
+    def test_decode_packets_matches_packet_objects(self):
+        samples = decode_packets(self.raw_packets)
+
+        expected = []
+        for raw_packet in self.raw_packets:
+            if raw_packet is None:
+                continue
+            packet = Packet(raw_packet)
+            for measurement in packet:
+                expected.append((packet, measurement))
+
+        self.assertEqual(len(samples), len(expected))
+        for sample, (packet, measurement) in zip(samples, expected):
+            self.assertEqual(sample['dropped_count'], packet.dropped_count)
+            self.assertEqual(sample['flags'], packet.flags)
+            self.assertEqual(sample['sample_type'],
+                             measurement.get_sample_type())
+            self.assertEqual(sample['sample_time'],
+                             measurement.get_sample_time())
+            for index, field in enumerate(HvpmMeasurement.FIELDS):
+                self.assertEqual(sample[field], measurement.values[index])
+
+    def test_decode_packets_empty_buffer(self):
+        self.assertEqual(len(decode_packets([])), 0)
+        self.assertEqual(len(decode_packets([None, None])), 0)
+
+    def test_get_field_matches_get_index(self):
+        for channel in range(3):
+            for reading in (0, 1, 4, 6):
+                self.assertEqual(
+                    HvpmMeasurement.get_field(channel, reading),
+                    HvpmMeasurement.FIELDS[HvpmMeasurement.get_index(
+                        channel, reading)])
+
+
+if __name__ == '__main__':
+    unittest.main()
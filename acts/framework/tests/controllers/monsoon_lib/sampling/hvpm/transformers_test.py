@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2019 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import struct
+import unittest
+
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import SampleType
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import decode_packets
+from acts.controllers.monsoon_lib.sampling.hvpm.transformers import PacketReader
+from acts.controllers.monsoon_lib.sampling.hvpm.transformers import SampleChunker
+
+
+def build_raw_packet(time_of_read, dropped_count, sample_types):
+    """Builds a raw packet holding one measurement per given SampleType."""
+    header = struct.pack('<2dhBB', time_of_read, .5, dropped_count, 0,
+                         len(sample_types))
+    return header + b''.join(
+        struct.pack('>8H2B', *range(8), 0, sample_type)
+        for sample_type in sample_types)
+
+
+class PacketReaderTest(unittest.TestCase):
+    """Unit tests the hvpm PacketReader class."""
+
+    def test_transform_buffer_counts_dropped_count_rollovers(self):
+        reader = PacketReader()
+        reader._transform_buffer([
+            build_raw_packet(0, -1, [SampleType.MEASUREMENT]),
+            build_raw_packet(2, 10, [SampleType.MEASUREMENT]),
+            build_raw_packet(3, 10, [SampleType.MEASUREMENT]),
+            build_raw_packet(4, 5, [SampleType.MEASUREMENT]),
+        ])
+
+        self.assertEqual(reader.rollover_count, 1)
+        self.assertEqual(reader.total_dropped_count, 2**16 + 5)
+
+
+class SampleChunkerTest(unittest.TestCase):
+    """Unit tests the hvpm SampleChunker class."""
+
+    def test_transform_buffer_cuts_chunks_at_calibration_samples(self):
+        chunker = SampleChunker()
+        samples = decode_packets([
+            build_raw_packet(1, 0, [
+                SampleType.MEASUREMENT, SampleType.MEASUREMENT,
+                SampleType.ZERO_CAL
+            ]),
+            build_raw_packet(2, 0, [
+                SampleType.MEASUREMENT, SampleType.REF_CAL,
+                SampleType.MEASUREMENT
+            ]),
+        ])
+
+        chunks = chunker._transform_buffer(samples)
+
+        self.assertEqual([len(chunk.samples) for chunk in chunks], [2, 1])
+        self.assertEqual(len(chunker._stored_raw_samples), 1)
+        self.assertEqual(chunker._cut_new_buffer().samples['sample_time'][0],
+                         samples['sample_time'][-1])
+
+    def test_transform_buffer_stores_samples_across_buffers(self):
+        chunker = SampleChunker()
+
+        chunker._transform_buffer(
+            decode_packets([build_raw_packet(1, 0, [SampleType.MEASUREMENT])]))
+        chunks = chunker._transform_buffer(
+            decode_packets([
+                build_raw_packet(2, 0,
+                                 [SampleType.MEASUREMENT, SampleType.ZERO_CAL])
+            ]))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(len(chunks[0].samples), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
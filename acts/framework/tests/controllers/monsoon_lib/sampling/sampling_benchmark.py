@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Benchmarks the Monsoon sampling engine with synthetic packet streams.
+
+Runs the real HVPM and LVPM stock transformer chains on packets generated by
+monsoon_lib.sampling.synthetic, and reports the samples processed per second,
+the latency of each stage per buffer, and the peak RSS.
+
+The *_chain scenarios run every stage in a ThreadAssemblyLine, so each stage
+can be timed. The hvpm_sampler scenario mirrors Monsoon.measure_power(): the
+SampleNormalizer runs in its own process, behind the packet collector.
+
+Usage:
+    python3 sampling_benchmark.py [--packets 100000] [--json report.json]
+        [--min-samples-per-second N]
+
+With --min-samples-per-second, exits with a non-zero status if any scenario
+is slower, so the benchmark can gate engine changes.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from acts.controllers.monsoon_lib.sampling import synthetic
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import AssemblyLineBuilder
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ProcessAssemblyLineBuilder
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import SharedMemoryBufferStream
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ThreadAssemblyLine
+from acts.controllers.monsoon_lib.sampling.engine.assembly_line import ThreadAssemblyLineBuilder
+from acts.controllers.monsoon_lib.sampling.engine.transformer import Transformer
+from acts.controllers.monsoon_lib.sampling.engine.transformers import SampleAggregator
+from acts.controllers.monsoon_lib.sampling.engine.transformers import Tee
+from acts.controllers.monsoon_lib.sampling.hvpm import transformers as hvpm_transformers
+from acts.controllers.monsoon_lib.sampling.lvpm_stock import stock_transformers as lvpm_transformers
+
+
+def _time_stage(transformer, latencies):
+    """Records the duration of each of transformer's _transform_buffer calls.
+
+    Returns:
+        The transformer, for chaining.
+    """
+    transform_buffer = transformer._transform_buffer
+
+    def timed_transform_buffer(buffer):
+        start = time.perf_counter()
+        result = transform_buffer(buffer)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    transformer._transform_buffer = timed_transform_buffer
+    return transformer
+
+
+def _peak_rss_kb():
+    """Returns the peak RSS of this process and its children, in KB."""
+    return max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+class _SyntheticHvpmSampler(Transformer):
+    """An HvpmTransformer that collects synthetic packets."""
+
+    def __init__(self, packets):
+        super().__init__()
+        self._packets = packets
+
+    def _transform(self, input_stream):
+        stream_generator = None
+        if SharedMemoryBufferStream.is_supported():
+            stream_generator = SharedMemoryBufferStream
+        # yapf: disable. Yapf doesn't handle fluent interfaces well.
+        (ProcessAssemblyLineBuilder(stream_generator)
+         .source(synthetic.SyntheticPacketCollector(self._packets))
+         .into(hvpm_transformers.SampleNormalizer(
+             synthetic.SyntheticStatusPacket()))
+         .build(output_stream=self.output_stream).run())
+        # yapf: enable
+
+
+def _run_chain(source, stages, output_dir):
+    """Runs source and stages, then a Tee and a SampleAggregator, in threads.
+
+    Returns:
+        A tuple of (the SampleAggregator, a dict of stage name to latencies).
+    """
+    aggregator = SampleAggregator()
+    stages = stages + [Tee(os.path.join(output_dir, 'samples.txt')),
+                       aggregator]
+    latencies = {}
+    builder = ThreadAssemblyLineBuilder().source(source)
+    for stage in stages:
+        name = stage.__class__.__name__
+        builder.into(_time_stage(stage, latencies.setdefault(name, [])))
+    builder.build().run()
+    return aggregator, latencies
+
+
+def run_hvpm_chain(num_packets, output_dir):
+    packets = synthetic.generate_hvpm_packets(num_packets,
+                                              drops_per_packet=0.01)
+    return _run_chain(synthetic.SyntheticPacketCollector(packets), [
+        hvpm_transformers.PacketReader(),
+        hvpm_transformers.SampleChunker(),
+        hvpm_transformers.CalibrationApplier(
+            synthetic.SyntheticStatusPacket()),
+    ], output_dir)
+
+
+def run_lvpm_stock_chain(num_packets, output_dir):
+    # LVPM packets carry 5 samples rather than 3. Send as many samples.
+    packets = synthetic.generate_lvpm_packets(num_packets * 3 // 5)
+    return _run_chain(
+        synthetic.SyntheticPacketCollector(packets, synthetic.LVPM_STOCK), [
+            lvpm_transformers.PacketReader(),
+            lvpm_transformers.SampleChunker(),
+            lvpm_transformers.CalibrationApplier(),
+        ], output_dir)
+
+
+def run_hvpm_sampler(num_packets, output_dir):
+    packets = synthetic.generate_hvpm_packets(num_packets)
+    aggregator = SampleAggregator()
+    manager = multiprocessing.Manager()
+    # Mirrors hvpm.monsoon.Monsoon.measure_power().
+    (AssemblyLineBuilder(manager.Queue, ThreadAssemblyLine)
+     .source(_SyntheticHvpmSampler(packets))
+     .into(Tee(os.path.join(output_dir, 'samples.txt')))
+     .into(aggregator)
+     .build().run())
+    manager.shutdown()
+    return aggregator, {}
+
+
+SCENARIOS = {
+    'hvpm_chain': run_hvpm_chain,
+    'lvpm_stock_chain': run_lvpm_stock_chain,
+    'hvpm_sampler': run_hvpm_sampler,
+}
+
+
+def run_scenario(name, num_packets):
+    """Runs a benchmark scenario.
+
+    Returns:
+        A dict report of the scenario's results.
+    """
+    output_dir = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        aggregator, latencies = SCENARIOS[name](num_packets, output_dir)
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_dir)
+    return {
+        'scenario': name,
+        'samples': aggregator.num_samples,
+        'seconds': elapsed,
+        'samples_per_second': aggregator.num_samples / elapsed,
+        'peak_rss_kb': _peak_rss_kb(),
+        'stage_latency_ms': {
+            stage: {
+                'buffers': len(times),
+                'mean': float(np.mean(times)) * 1000 if times else 0,
+                'p99': float(np.percentile(times, 99)) * 1000 if times else 0,
+            }
+            for stage, times in latencies.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--packets', type=int, default=100000,
+                        help='The number of HVPM packets per scenario.')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS),
+                        choices=list(SCENARIOS))
+    parser.add_argument('--json', help='A path to write the report to.')
+    parser.add_argument('--min-samples-per-second', type=float,
+                        help='Fail if any scenario is slower than this.')
+    args = parser.parse_args()
+    # Keep the dropped count warnings from flooding the report.
+    logging.basicConfig(level=logging.ERROR)
+
+    reports = []
+    for name in args.scenarios:
+        report = run_scenario(name, args.packets)
+        reports.append(report)
+        print('%s: %d samples in %.2fs, %.0f samples/sec, peak RSS %d KB' %
+              (name, report['samples'], report['seconds'],
+               report['samples_per_second'], report['peak_rss_kb']))
+        for stage, latency in report['stage_latency_ms'].items():
+            print('    %-20s %7d buffers  mean %8.3f ms  p99 %8.3f ms' %
+                  (stage, latency['buffers'], latency['mean'],
+                   latency['p99']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+    if args.min_samples_per_second:
+        slow = [report['scenario'] for report in reports
+                if report['samples_per_second'] < args.min_samples_per_second]
+        if slow:
+            print('Slower than %s samples/sec: %s' %
+                  (args.min_samples_per_second, ', '.join(slow)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from acts.controllers.monsoon_lib.sampling import synthetic
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import SampleType as HvpmSampleType
+from acts.controllers.monsoon_lib.sampling.hvpm.packet import decode_packets
+from acts.controllers.monsoon_lib.sampling.lvpm_stock.packet import Packet as LvpmPacket
+from acts.controllers.monsoon_lib.sampling.lvpm_stock.packet import SampleType as LvpmSampleType
+
+
+def _collect_all(collector, buffer_size=4):
+    """Runs the collector until it is done, returning the buffers sent."""
+    collector.on_begin()
+    buffers = []
+    while True:
+        buffer = collector._transform_buffer([None] * buffer_size)
+        if buffer is None:
+            return buffers
+        buffers.append(buffer)
+
+
+class GeneratePacketsTest(unittest.TestCase):
+    """Tests the synthetic packet generators."""
+
+    def test_hvpm_packets_start_with_calibration_samples(self):
+        packets = synthetic.generate_hvpm_packets(10)
+        samples = decode_packets(
+            [struct.pack('dd', 0, 0) + packet for packet in packets])
+
+        self.assertEqual(
+            list(samples['sample_type'][:10]),
+            [HvpmSampleType.ZERO_CAL, HvpmSampleType.REF_CAL] * 5)
+        self.assertEqual(len(samples), 10 + 10 * 3)
+        self.assertTrue(
+            np.all(samples['sample_type'][10:] == HvpmSampleType.MEASUREMENT))
+
+    def test_hvpm_packets_repeat_calibration_at_interval(self):
+        packets = synthetic.generate_hvpm_packets(10, calibration_interval=4)
+
+        # 10 initial calibration packets, 10 measurement packets, and 2 pairs
+        # of calibration packets after the 4th and 8th measurement packets.
+        self.assertEqual(len(packets), 10 + 10 + 4)
+
+    def test_hvpm_dropped_count_rolls_over(self):
+        packets = synthetic.generate_hvpm_packets(
+            3, drops_per_packet=1, initial_dropped_count=2**16 - 2,
+            calibration_interval=0)
+
+        dropped_counts = [
+            struct.unpack_from('<H', packet)[0] for packet in packets[10:]
+        ]
+        self.assertEqual(dropped_counts, [2**16 - 2, 2**16 - 1, 0])
+
+    def test_lvpm_packets_are_parsed_by_lvpm_packet(self):
+        packets = synthetic.generate_lvpm_packets(3, measurements_per_packet=4)
+
+        parsed = [LvpmPacket(packet, 0, 0) for packet in packets]
+        self.assertEqual(parsed[0].packet_type, LvpmSampleType.ZERO_CAL)
+        self.assertEqual(parsed[1].packet_type, LvpmSampleType.REF_CAL)
+        self.assertEqual(parsed[-1].packet_type, LvpmSampleType.MEASUREMENT)
+        self.assertEqual(len(parsed[-1]), 4)
+
+    def test_count_samples(self):
+        hvpm_packet = synthetic.generate_hvpm_packets(1)[-1]
+        lvpm_packet = synthetic.generate_lvpm_packets(1)[-1]
+
+        self.assertEqual(synthetic.count_samples(synthetic.HVPM, hvpm_packet),
+                         3)
+        self.assertEqual(
+            synthetic.count_samples(synthetic.LVPM_STOCK, lvpm_packet), 5)
+
+
+class SavePacketsTest(unittest.TestCase):
+    """Tests recording and loading packets."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_packets_returns_saved_packets(self):
+        path = os.path.join(self.tmp_dir, 'packets.bin')
+        packets = synthetic.generate_lvpm_packets(5)
+
+        synthetic.save_packets(path, packets)
+
+        self.assertEqual(synthetic.load_packets(path), packets)
+
+
+class SyntheticPacketCollectorTest(unittest.TestCase):
+    """Tests the SyntheticPacketCollector class."""
+
+    def test_packets_are_prefixed_with_rate_based_times(self):
+        packets = synthetic.generate_hvpm_packets(2, calibration_interval=0)
+        collector = synthetic.SyntheticPacketCollector(packets[10:],
+                                                       sample_rate=1000)
+
+        buffers = _collect_all(collector)
+
+        self.assertEqual(len(buffers), 1)
+        first, second = (struct.unpack_from('dd', packet)
+                         for packet in buffers[0])
+        self.assertAlmostEqual(first[0] - collector.start_time, .003)
+        self.assertAlmostEqual(second[0] - collector.start_time, .006)
+        self.assertAlmostEqual(second[1], .003)
+        self.assertEqual(buffers[0][0][16:], packets[10])
+
+    def test_last_buffer_is_trimmed_to_remaining_packets(self):
+        packets = synthetic.generate_hvpm_packets(0)
+        collector = synthetic.SyntheticPacketCollector(packets)
+
+        buffers = _collect_all(collector, buffer_size=4)
+
+        self.assertEqual([len(buffer) for buffer in buffers], [4, 4, 2])
+        self.assertEqual(collector.num_samples, 10)
+
+    def test_sampling_duration_limits_samples_sent(self):
+        packets = synthetic.generate_hvpm_packets(1000, calibration_interval=0)
+        collector = synthetic.SyntheticPacketCollector(packets,
+                                                       sample_rate=1000,
+                                                       sampling_duration=1)
+
+        _collect_all(collector)
+
+        self.assertEqual(collector.num_samples, 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -145,7 +145,72 @@ class PowerMetricsTest(unittest.TestCase):
                                                       timestamps=timestamps,
                                                       voltage=self.VOLTAGE)
 
-        self.assertEqual(mock_power_metric.update_metrics.call_count, 5)
+        update_call = mock_power_metric.update_metrics_from_array.call_args
+        self.assertEqual(list(update_call[0][0]), self.SAMPLES[4:9])
+
+    def test_generate_test_metrics_matches_per_sample_metrics(self):
+        """Test that the vectorized metrics are identical to the ones computed
+        sample by sample, including for overlapping and empty segments."""
+        samples = [(i * .0002, ((i * 7919) % 1000) / 997)
+                   for i in range(5000)]
+        timestamps = {
+            'all': {START_TIMESTAMP: 0, END_TIMESTAMP: 1000},
+            'first': {START_TIMESTAMP: 0, END_TIMESTAMP: 500},
+            'overlap': {START_TIMESTAMP: 250, END_TIMESTAMP: 750.2},
+            'edge': {START_TIMESTAMP: 500, END_TIMESTAMP: 500},
+            'empty': {START_TIMESTAMP: 2000, END_TIMESTAMP: 3000},
+        }
+
+        for raw_data in (samples, list(reversed(samples))):
+            metrics = power_metrics.generate_test_metrics(
+                raw_data, timestamps=timestamps, voltage=self.VOLTAGE)
+
+            for seg_name, times in timestamps.items():
+                expected = PowerMetrics(self.VOLTAGE)
+                for timestamp, amps in raw_data:
+                    if (times[START_TIMESTAMP] / 1000 <= timestamp <=
+                            times[END_TIMESTAMP] / 1000):
+                        expected.update_metrics(amps)
+                self.assertEqual(
+                    [metric.value for metric in metrics[seg_name]], [
+                        expected.avg_current.value,
+                        expected.max_current.value,
+                        expected.min_current.value,
+                        expected.stdev_current.value,
+                        expected.avg_power.value
+                    ], seg_name)
+
+    @patch('acts.controllers.power_metrics.RAW_DATA_CHUNK_SIZE', 7)
+    def test_generate_test_metrics_streams_generators_in_chunks(self):
+        """Test that a generator is consumed in chunks, with the same metrics
+        as the whole data at once."""
+        samples = [(i * .0002, ((i * 7919) % 1000) / 997)
+                   for i in range(100)]
+        timestamps = {'segment': {START_TIMESTAMP: 3, END_TIMESTAMP: 15}}
+        consumed = []
+
+        def generate():
+            for sample in samples:
+                consumed.append(sample)
+                yield sample
+
+        chunk_sizes = []
+        update = PowerMetrics.update_metrics_from_array
+
+        def update_metrics_from_array(metrics, amps):
+            chunk_sizes.append(len(consumed))
+            update(metrics, amps)
+
+        with patch.object(PowerMetrics, 'update_metrics_from_array',
+                          update_metrics_from_array):
+            metrics = power_metrics.generate_test_metrics(
+                generate(), timestamps=timestamps, voltage=self.VOLTAGE)
+        expected = power_metrics.generate_test_metrics(
+            samples, timestamps=timestamps, voltage=self.VOLTAGE)
+
+        self.assertEqual([metric.value for metric in metrics['segment']],
+                         [metric.value for metric in expected['segment']])
+        self.assertEqual(chunk_sizes[:3], [7, 14, 21])
 
     def test_numeric_metrics(self):
         """Test that the numeric metrics have correct values."""
@@ -13,8 +13,19 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
+import os
+import shutil
+import tempfile
 import unittest
+
+import mock
+
 from acts.controllers import power_monitor
+from acts.controllers.monsoon_lib.sampling import capture
+from acts.controllers.monsoon_lib.sampling.engine import transformer
+from acts.controllers.monsoon_lib.sampling.engine.transformers import CaptureTee
+from acts.controllers.monsoon_lib.sampling.engine.transformers import SegmentStatsSink
+from acts.controllers.monsoon_lib.sampling.hvpm.transformers import HvpmReading
 
 
 class PowerMonitorTest(unittest.TestCase):
@@ -38,5 +49,103 @@ class PowerMonitorTest(unittest.TestCase):
         power_monitor._REGISTRY = {}
 
 
+class PowerMonitorMonsoonFacadeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.tmp_dir, 'monsoon.txt')
+        self.monsoon = mock.Mock()
+        self.monsoon.measure_power.side_effect = self._fake_measure_power
+        self.facade = power_monitor.PowerMonitorMonsoonFacade(self.monsoon)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _fake_measure_power(self, transformers=(), **__):
+        for transformer in transformers:
+            transformer.on_begin()
+            transformer._transform_buffer([
+                HvpmReading([.1, 0, 0, 0, 0], 10.0),
+                HvpmReading([.2, 0, 0, 0, 0], 10.5),
+            ])
+            transformer.on_end()
+
+    def test_measure_writes_capture_with_start_time_offset(self):
+        self.facade.measure(measurement_args={'duration': 1},
+                            start_time=5,
+                            monsoon_output_path=self.output_path,
+                            export_text=False)
+
+        transformers = self.monsoon.measure_power.call_args[1]['transformers']
+        self.assertIsInstance(transformers[0], CaptureTee)
+        self.assertFalse(os.path.exists(self.output_path))
+        self.assertEqual(list(self.facade.get_waveform(self.output_path)),
+                         [(15.0, .1), (15.5, .2)])
+
+    def test_measure_exports_text_by_default(self):
+        self.facade.measure(measurement_args={'duration': 1},
+                            start_time=5,
+                            monsoon_output_path=self.output_path)
+
+        os.remove(capture.capture_path_for(self.output_path))
+        self.assertEqual(self.facade.get_waveform(self.output_path),
+                         [(15.0, .1), (15.5, .2)])
+
+    def test_measure_instruments_stages_on_demand(self):
+        report_paths = []
+        self.monsoon.measure_power.side_effect = (
+            lambda **_: report_paths.append(transformer._stage_report_path))
+
+        self.facade.measure(measurement_args={'duration': 1},
+                            monsoon_output_path=self.output_path,
+                            instrument_stages=True)
+
+        report_path = self.output_path + transformer.STAGE_REPORT_SUFFIX
+        self.assertEqual(report_paths, [report_path])
+        self.assertTrue(os.path.exists(report_path))
+        self.assertIsNone(transformer._stage_report_path)
+
+    def test_measure_computes_metrics_of_open_segments(self):
+        self.facade.open_segment('whole', start_time=0)
+        self.facade.open_segment('first', start_time=0)
+        self.facade.close_segment('first', end_time=10.0)
+
+        self.facade.measure(measurement_args={'duration': 1})
+
+        transformers = self.monsoon.measure_power.call_args[1]['transformers']
+        self.assertIsInstance(transformers[0], SegmentStatsSink)
+        metrics = self.facade.get_metrics(voltage=4)
+        self.assertEqual(list(metrics), ['whole', 'first'])
+        self.assertAlmostEqual(metrics['whole'][0].value, 150)
+        self.assertAlmostEqual(metrics['whole'][1].value, 200)
+        self.assertAlmostEqual(metrics['whole'][4].value, 600)
+        self.assertAlmostEqual(metrics['first'][0].value, 100)
+
+    def test_get_metrics_with_timestamps_reads_the_capture(self):
+        self.facade.measure(measurement_args={'duration': 1},
+                            start_time=5,
+                            monsoon_output_path=self.output_path)
+
+        metrics = self.facade.get_metrics(
+            start_time=5, voltage=4, monsoon_file_path=self.output_path,
+            timestamps={'segment': {'start': 15500, 'end': 16000}})
+        self.assertAlmostEqual(metrics['segment'][0].value, 200)
+
+    def test_get_metrics_of_another_file_requires_timestamps(self):
+        self.facade.open_segment('whole', start_time=0)
+        self.facade.measure(measurement_args={'duration': 1},
+                            start_time=5,
+                            monsoon_output_path=self.output_path)
+
+        self.assertIn('whole',
+                      self.facade.get_metrics(
+                          start_time=5, voltage=4,
+                          monsoon_file_path=self.output_path))
+        with self.assertRaises(power_monitor.MonsoonError):
+            self.facade.get_metrics(
+                start_time=5, voltage=4,
+                monsoon_file_path=os.path.join(self.tmp_dir, 'other.txt'))
+
+
 if __name__ == '__main__':
     unittest.main()
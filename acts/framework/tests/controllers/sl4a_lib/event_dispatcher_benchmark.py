@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Benchmarks the wake-up latency of SL4A EventDispatcher waits.
+
+Starts one EventDispatcher per simulated device, each polling a fake RPC
+client that hands out events as they are produced. For every device, a waiter
+thread blocks in pop_event, pop_events or wait_for_event while events arrive
+at random intervals, among unrelated events. Reports the latency between an
+event being produced and its waiter returning, and the CPU time used.
+
+Usage:
+    python3 event_dispatcher_benchmark.py [--devices 8] [--events 200]
+        [--json report.json] [--max-p99-ms N]
+
+With --max-p99-ms, exits with a non-zero status if the p99 latency of any
+wait is higher, so the benchmark can gate dispatcher changes.
+"""
+
+import argparse
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+
+import mock
+import numpy as np
+
+from acts.controllers.sl4a_lib import event_dispatcher
+
+# The number of unrelated events produced for every awaited event.
+NOISE_EVENTS = 3
+
+
+class _FakeEventRpcClient(object):
+    """Hands out the events put in its queue through eventWait."""
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.is_alive = True
+        self.uid = 1
+
+    def eventWait(self, timeout_ms, timeout=None):
+        try:
+            return self.events.get(timeout=timeout_ms / 1000)
+        except queue.Empty:
+            return None
+
+
+def _wait_pop_event(dispatcher):
+    return dispatcher.pop_event('Awaited', 30)
+
+
+def _wait_pop_events(dispatcher):
+    return dispatcher.pop_events('Await.*', 30)[0]
+
+
+def _wait_for_event(dispatcher):
+    return dispatcher.wait_for_event('Awaited',
+                                     lambda event: event['data']['match'], 30)
+
+
+WAITS = {
+    'pop_event': _wait_pop_event,
+    'pop_events': _wait_pop_events,
+    'wait_for_event': _wait_for_event,
+}
+
+
+def run_wait(name, num_devices, num_events, interval):
+    """Runs a benchmark of one kind of wait.
+
+    Returns:
+        A dict report of the wait's results.
+    """
+    wait = WAITS[name]
+    clients = [_FakeEventRpcClient() for _ in range(num_devices)]
+    dispatchers = []
+    for serial, client in enumerate(clients):
+        dispatcher = event_dispatcher.EventDispatcher(str(serial), client)
+        dispatcher.log = mock.Mock()
+        dispatcher.start()
+        dispatchers.append(dispatcher)
+
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def waiter(dispatcher):
+        for _ in range(num_events):
+            event = wait(dispatcher)
+            latency = time.perf_counter() - event['time']
+            with latencies_lock:
+                latencies.append(latency)
+
+    def producer(client):
+        rng = random.Random(client.uid)
+        for _ in range(num_events):
+            for _ in range(NOISE_EVENTS):
+                client.events.put({
+                    'name': 'Unrelated',
+                    'time': time.perf_counter(),
+                    'data': {}
+                })
+                # Non-matching events of the awaited name, for
+                # wait_for_event's predicate.
+                client.events.put({
+                    'name': 'Awaited' if name == 'wait_for_event' else
+                            'Unrelated',
+                    'time': time.perf_counter(),
+                    'data': {
+                        'match': False
+                    }
+                })
+            time.sleep(rng.uniform(0, 2 * interval))
+            client.events.put({
+                'name': 'Awaited',
+                'time': time.perf_counter(),
+                'data': {
+                    'match': True
+                }
+            })
+
+    threads = [
+        threading.Thread(target=waiter, args=(dispatcher, ))
+        for dispatcher in dispatchers
+    ] + [threading.Thread(target=producer, args=(client, ))
+         for client in clients]
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+
+    for client, dispatcher in zip(clients, dispatchers):
+        client.events.put({'name': 'EventDispatcherShutdown'})
+        dispatcher.close()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'wait': name,
+        'devices': num_devices,
+        'events': len(latencies),
+        'seconds': elapsed,
+        'cpu_seconds': cpu_seconds,
+        'latency_ms': {
+            'mean': float(np.mean(latencies_ms)),
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p99': float(np.percentile(latencies_ms, 99)),
+            'max': float(np.max(latencies_ms)),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--devices', type=int, default=8,
+                        help='The number of simulated devices.')
+    parser.add_argument('--events', type=int, default=200,
+                        help='The number of awaited events per device.')
+    parser.add_argument('--interval', type=float, default=.005,
+                        help='The mean seconds between awaited events.')
+    parser.add_argument('--waits', nargs='+', default=list(WAITS),
+                        choices=list(WAITS))
+    parser.add_argument('--json', help='A path to write the report to.')
+    parser.add_argument('--max-p99-ms', type=float,
+                        help='Fail if any wait has a higher p99 latency.')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    reports = []
+    for name in args.waits:
+        report = run_wait(name, args.devices, args.events, args.interval)
+        reports.append(report)
+        latency = report['latency_ms']
+        print('%-15s %5d events in %.2fs, CPU %.2fs, latency mean %.3f ms  '
+              'p50 %.3f ms  p99 %.3f ms  max %.3f ms' %
+              (name, report['events'], report['seconds'],
+               report['cpu_seconds'], latency['mean'], latency['p50'],
+               latency['p99'], latency['max']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+    if args.max_p99_ms:
+        slow = [report['wait'] for report in reports
+                if report['latency_ms']['p99'] > args.max_p99_ms]
+        if slow:
+            print('p99 latency above %s ms: %s' %
+                  (args.max_p99_ms, ', '.join(slow)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
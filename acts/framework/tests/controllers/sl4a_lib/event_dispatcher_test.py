@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import collections
+import queue
+import threading
+import time
+import unittest
+
+import mock
+
+from acts.controllers.sl4a_lib import event_dispatcher
+from acts.controllers.sl4a_lib import rpc_client
+from tests.controllers.sl4a_lib.fake_sl4a_server import FakeSl4aServer
+
+
+def make_event(name, event_time=0, **data):
+    return {'name': name, 'time': event_time, 'data': data}
+
+
+class EventDispatcherTest(unittest.TestCase):
+    """Tests the event_dispatcher.EventDispatcher class."""
+
+    def setUp(self):
+        self.dispatcher = event_dispatcher.EventDispatcher(
+            'serial', mock.Mock())
+        self.dispatcher.log = mock.Mock()
+        self.dispatcher._started = True
+
+    def queue(self, event):
+        self.dispatcher._queue_events([event])
+
+    def queue_later(self, event, delay=.05):
+        """Queues the event from another thread after the given delay."""
+        timer = threading.Timer(delay, self.dispatcher._queue_events,
+                                ([event], ))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def test_pop_event_requires_started_dispatcher(self):
+        self.dispatcher._started = False
+
+        with self.assertRaises(event_dispatcher.IllegalStateError):
+            self.dispatcher.pop_event('Event')
+
+    def test_pop_event_returns_oldest_event(self):
+        first = make_event('Event', 1)
+        self.queue(first)
+        self.queue(make_event('Event', 2))
+
+        self.assertIs(self.dispatcher.pop_event('Event'), first)
+        self.assertEqual(len(self.dispatcher.get_event_q('Event')), 1)
+
+    def test_pop_event_wakes_up_when_event_is_queued(self):
+        event = make_event('Event')
+        self.queue_later(event)
+
+        start = time.time()
+        self.assertIs(self.dispatcher.pop_event('Event', 5), event)
+        self.assertLess(time.time() - start, 1)
+
+    def test_pop_event_times_out(self):
+        with self.assertRaises(queue.Empty):
+            self.dispatcher.pop_event('Event', .01)
+        with self.assertRaises(queue.Empty):
+            self.dispatcher.pop_event('Event', 0)
+        self.assertEqual(self.dispatcher._name_waiters['Event'], set())
+
+    def test_pop_events_pops_one_event_per_matching_name(self):
+        for name, event_time in (('ScanB', 2), ('ScanA', 1), ('ScanA', 3),
+                                 ('Other', 0)):
+            self.queue(make_event(name, event_time))
+
+        events = self.dispatcher.pop_events('Scan.*', 1)
+
+        self.assertEqual([(e['name'], e['time']) for e in events],
+                         [('ScanA', 1), ('ScanB', 2)])
+
+    def test_pop_events_wakes_up_for_new_matching_names(self):
+        self.dispatcher.get_event_q('ScanA')
+        self.assertEqual(self.dispatcher._get_pattern_names('Scan.*'),
+                         {'ScanA'})
+        event = make_event('ScanB')
+        self.queue_later(make_event('Other'), delay=.01)
+        self.queue_later(event)
+
+        start = time.time()
+        self.assertEqual(self.dispatcher.pop_events('Scan.*', 5), [event])
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(len(self.dispatcher.get_event_q('Other')), 1)
+
+    def test_pop_events_times_out(self):
+        self.queue(make_event('Other'))
+
+        with self.assertRaises(queue.Empty):
+            self.dispatcher.pop_events('Scan.*', .01)
+
+    def test_wait_for_event_consumes_ignored_events(self):
+        for value in range(3):
+            self.queue(make_event('Event', value=value))
+
+        event = self.dispatcher.wait_for_event(
+            'Event', lambda e: e['data']['value'] == 1, 1)
+
+        self.assertEqual(event['data']['value'], 1)
+        self.assertEqual(
+            [e['data']['value'] for e in self.dispatcher.pop_all('Event')],
+            [2])
+
+    def test_wait_for_event_keeps_ignored_events_in_order(self):
+        for value in range(3):
+            self.queue(make_event('Event', value=value))
+
+        event = self.dispatcher.wait_for_event(
+            'Event',
+            lambda e: e['data']['value'] == 1,
+            1,
+            consume_ignored_events=False)
+
+        self.assertEqual(event['data']['value'], 1)
+        self.assertEqual(
+            [e['data']['value'] for e in self.dispatcher.pop_all('Event')],
+            [0, 2])
+
+    def test_wait_for_event_passes_args_to_predicate(self):
+        self.queue_later(make_event('Event', value='b'))
+
+        event = self.dispatcher.wait_for_event(
+            'Event', self.dispatcher.is_event_match, 5, 'value', 'b')
+
+        self.assertEqual(event['data']['value'], 'b')
+
+    def test_wait_for_event_times_out(self):
+        self.queue(make_event('Event'))
+
+        with self.assertRaises(queue.Empty):
+            self.dispatcher.wait_for_event('Event', lambda _: False, .01)
+
+    def test_clear_events(self):
+        self.queue(make_event('Event'))
+        self.queue(make_event('Other'))
+
+        self.dispatcher.clear_events('Event')
+        self.assertEqual(self.dispatcher.pop_all('Event'), [])
+        self.dispatcher.clear_all_events()
+        self.assertEqual(self.dispatcher.pop_all('Other'), [])
+
+    def test_clear_new_events_keeps_older_events(self):
+        self.queue(make_event('Event', 1))
+        self.queue(make_event('Event', 2))
+        count = self.dispatcher.get_queued_count('Event$')
+        self.queue(make_event('Event', 3))
+        self.queue(make_event('Event', 4))
+        self.dispatcher.pop_event('Event', 0)
+
+        self.dispatcher.clear_new_events('Event', count)
+
+        self.assertEqual(
+            [event['time'] for event in self.dispatcher.pop_all('Event')],
+            [2])
+
+    def test_get_queued_count_counts_popped_events(self):
+        self.queue(make_event('EventA'))
+        self.queue(make_event('EventB'))
+        self.queue(make_event('Other'))
+        self.dispatcher.pop_event('EventA', 0)
+
+        self.assertEqual(self.dispatcher.get_queued_count('Event.*'), 2)
+
+    def test_wait_for_new_events_does_not_pop_events(self):
+        count = self.dispatcher.get_queued_count('Event.*')
+        self.queue_later(make_event('EventA'))
+
+        new_count = self.dispatcher.wait_for_new_events('Event.*', count, 5)
+
+        self.assertEqual(new_count, count + 1)
+        self.assertEqual(len(self.dispatcher.pop_all('EventA')), 1)
+
+    def test_wait_for_new_events_ignores_events_already_counted(self):
+        self.queue(make_event('EventA'))
+        count = self.dispatcher.get_queued_count('Event.*')
+
+        self.assertIsNone(
+            self.dispatcher.wait_for_new_events('Event.*', count, .01))
+
+    def test_poll_events_queues_events_by_name(self):
+        events = [make_event('A'), make_event('B'), make_event('A')]
+        self.dispatcher._rpc_client.eventWait.side_effect = events + [
+            None, {
+                'name': 'EventDispatcherShutdown'
+            }
+        ]
+
+        self.dispatcher.poll_events()
+
+        self.assertEqual(self.dispatcher.pop_all('A'), [events[0], events[2]])
+        self.assertEqual(self.dispatcher.pop_all('B'), [events[1]])
+
+
+
+
+class EventRetentionTest(unittest.TestCase):
+    """Tests the retention policies of EventDispatcher event queues."""
+
+    def setUp(self):
+        self.dispatcher = event_dispatcher.EventDispatcher(
+            'serial', mock.Mock())
+        self.dispatcher.log = mock.Mock()
+        self.dispatcher._started = True
+
+    def queue(self, *events):
+        self.dispatcher._queue_events(list(events))
+
+    def test_retention_policy_rejects_invalid_values(self):
+        with self.assertRaises(ValueError):
+            event_dispatcher.RetentionPolicy(overflow='drop_all')
+        with self.assertRaises(ValueError):
+            event_dispatcher.RetentionPolicy(max_length=0)
+
+    def test_default_policy_is_bounded(self):
+        max_length = event_dispatcher.DEFAULT_MAX_QUEUED_EVENTS
+        self.queue(*[make_event('Scan', i) for i in range(max_length + 10)])
+
+        event_queue = self.dispatcher.get_event_q('Scan')
+        self.assertEqual(len(event_queue), max_length)
+        self.assertEqual(next(iter(event_queue))['time'], 10)
+        self.assertEqual(self.dispatcher.get_dropped_counts(),
+                         {'Scan': {
+                             'overflow': 10,
+                             'expired': 0
+                         }})
+        self.assertEqual(self.dispatcher.default_retention_policy.ttl,
+                         event_dispatcher.DEFAULT_EVENT_TTL)
+
+    def test_drop_oldest_keeps_newest_events(self):
+        self.dispatcher.set_retention_policy(
+            'Scan.*', event_dispatcher.RetentionPolicy(max_length=3))
+
+        self.queue(*[make_event('ScanResult', i) for i in range(10)])
+        self.queue(make_event('Other'), make_event('Other'))
+
+        self.assertEqual(
+            [e['time'] for e in self.dispatcher.pop_all('ScanResult')],
+            [7, 8, 9])
+        self.assertEqual(len(self.dispatcher.pop_all('Other')), 2)
+        self.assertEqual(self.dispatcher.get_dropped_counts(),
+                         {'ScanResult': {
+                             'overflow': 7,
+                             'expired': 0
+                         }})
+        self.assertEqual(self.dispatcher.log.warning.call_count, 1)
+
+    def test_drop_newest_keeps_oldest_events(self):
+        self.dispatcher.set_retention_policy(
+            'Scan',
+            event_dispatcher.RetentionPolicy(
+                max_length=3,
+                overflow=event_dispatcher.RetentionPolicy.DROP_NEWEST))
+
+        self.queue(*[make_event('Scan', i) for i in range(10)])
+
+        self.assertEqual([e['time'] for e in self.dispatcher.pop_all('Scan')],
+                         [0, 1, 2])
+
+    def test_set_retention_policy_trims_existing_queue(self):
+        self.queue(*[make_event('Scan', i) for i in range(10)])
+
+        self.dispatcher.set_retention_policy(
+            'Scan', event_dispatcher.RetentionPolicy(max_length=2))
+
+        self.assertEqual([e['time'] for e in self.dispatcher.pop_all('Scan')],
+                         [8, 9])
+
+    def test_later_policies_override_earlier_ones(self):
+        self.dispatcher.set_retention_policy(
+            '.*', event_dispatcher.RetentionPolicy(max_length=1))
+        self.dispatcher.set_retention_policy(
+            'Scan', event_dispatcher.RetentionPolicy(max_length=5))
+
+        self.queue(*[make_event('Scan', i) for i in range(10)])
+        self.queue(*[make_event('Other', i) for i in range(10)])
+
+        self.assertEqual(len(self.dispatcher.get_event_q('Scan')), 5)
+        self.assertEqual(len(self.dispatcher.get_event_q('Other')), 1)
+
+    def test_ttl_expires_old_events(self):
+        self.dispatcher.set_retention_policy(
+            'Scan', event_dispatcher.RetentionPolicy(ttl=10))
+        with mock.patch('time.monotonic', return_value=100):
+            self.queue(make_event('Scan', 0))
+        with mock.patch('time.monotonic', return_value=105):
+            self.queue(make_event('Scan', 1))
+
+        with mock.patch('time.monotonic', return_value=112):
+            self.assertEqual(self.dispatcher.pop_event('Scan', 0)['time'], 1)
+            with self.assertRaises(queue.Empty):
+                self.dispatcher.pop_event('Scan', 0)
+            self.assertEqual(self.dispatcher.get_dropped_counts(),
+                             {'Scan': {
+                                 'overflow': 0,
+                                 'expired': 1
+                             }})
+
+    def test_memory_report(self):
+        self.dispatcher.set_retention_policy(
+            'Scan', event_dispatcher.RetentionPolicy(max_length=2))
+        self.queue(*[make_event('Scan', i, payload='x' * 100)
+                     for i in range(5)])
+        self.queue(make_event('Other'))
+
+        report = self.dispatcher.get_memory_report()
+
+        self.assertEqual(report['total_events'], 3)
+        self.assertEqual(report['queues']['Scan']['events'], 2)
+        self.assertEqual(report['queues']['Scan']['dropped_overflow'], 3)
+        self.assertGreater(report['queues']['Scan']['bytes'], 200)
+        self.assertEqual(
+            report['total_bytes'], report['queues']['Scan']['bytes'] +
+            report['queues']['Other']['bytes'])
+
+class FakeEventFacade(object):
+    """The event buffer of SL4A's EventFacade, for a FakeSl4aServer."""
+
+    def __init__(self):
+        self.events = collections.deque()
+        self.condition = threading.Condition()
+
+    def post(self, events):
+        with self.condition:
+            self.events.extend(events)
+            self.condition.notify_all()
+
+    def event_wait(self, timeout_ms):
+        with self.condition:
+            self.condition.wait_for(lambda: self.events, timeout_ms / 1000)
+            return self.events.popleft() if self.events else None
+
+    def event_poll(self, number_of_events):
+        with self.condition:
+            return [
+                self.events.popleft()
+                for _ in range(min(number_of_events, len(self.events)))
+            ]
+
+
+class EventDrainTest(unittest.TestCase):
+    """Tests EventDispatcher.poll_events against a fake SL4A server."""
+
+    NUM_EVENTS = 1000
+
+    def setUp(self):
+        self.facade = FakeEventFacade()
+        self.server = FakeSl4aServer({
+            'eventWait': self.facade.event_wait,
+            'eventPoll': self.facade.event_poll,
+        })
+        self.client = rpc_client.RpcClient(rpc_client.UNKNOWN_UID, 'serial',
+                                           mock.Mock(), self.server.connect)
+
+    def tearDown(self):
+        self.client.terminate()
+        self.server.close()
+
+    def receive_events(self, drain_size):
+        """Sends NUM_EVENTS through the dispatcher.
+
+        Returns:
+            A tuple of (events received per second, event RPCs sent).
+        """
+        dispatcher = event_dispatcher.EventDispatcher(
+            'serial', self.client, drain_size=drain_size)
+        dispatcher.log = mock.Mock()
+        self.facade.post(
+            make_event('Scan', i) for i in range(self.NUM_EVENTS))
+        start = time.time()
+        dispatcher.start()
+        received = [
+            dispatcher.pop_event('Scan', 10)['time']
+            for _ in range(self.NUM_EVENTS)
+        ]
+        elapsed = time.time() - start
+        self.facade.post([{'name': 'EventDispatcherShutdown'}])
+        dispatcher.close()
+
+        self.assertEqual(received, list(range(self.NUM_EVENTS)))
+        requests = len(self.server.requests)
+        self.server.requests.clear()
+        return self.NUM_EVENTS / elapsed, requests
+
+    def test_drain_receives_events_in_bulk(self):
+        throughput, requests = self.receive_events(drain_size=0)
+        drained_throughput, drained_requests = self.receive_events(
+            drain_size=100)
+
+        self.assertEqual(requests, self.NUM_EVENTS + 1)
+        # One eventWait, 10 eventPolls of 100 events, then the shutdown.
+        self.assertEqual(drained_requests, 12)
+        self.assertGreater(drained_throughput, throughput)
+
+    def test_drain_is_disabled_if_unsupported(self):
+        del self.server.handlers['eventPoll']
+
+        _, requests = self.receive_events(drain_size=100)
+
+        self.assertEqual(requests, self.NUM_EVENTS + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""A local stand-in for the SL4A JSON-RPC server, for tests and benchmarks."""
+
+import json
+import socket
+import threading
+
+import mock
+
+from acts.controllers.sl4a_lib import rpc_connection
+
+
+class FakeRpcError(Exception):
+    """Raised by a handler to send back a JSON-RPC 2.0 error object."""
+
+    def __init__(self, message, code=-1, data=None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.data = data
+
+
+class FakeSl4aServer(object):
+    """Serves SL4A's line-delimited JSON-RPC protocol on a local port.
+
+    Like SL4A, the requests of each connection are handled one at a time, in
+    order, unless the server is made concurrent.
+
+    Attributes:
+        handlers: A dict of RPC method name to the function handling it. The
+            function is called with the RPC params, and returns its result or
+            raises FakeRpcError. Unknown methods return a JSON-RPC 1.0 error.
+        concurrent: If True, every request is handled in its own thread, so
+            responses may be sent out of order.
+        requests: A list of (connection number, method, params) tuples, in the
+            order the requests were received.
+        reads: The number of reads it took to receive the requests.
+        port: The port the server listens on.
+    """
+
+    UID = 1
+
+    def __init__(self, handlers=None, concurrent=False):
+        self.handlers = dict(handlers or {})
+        self.concurrent = concurrent
+        self.requests = []
+        self.reads = 0
+        self._lock = threading.Lock()
+        self._connections = []
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(16)
+        self.port = self._server.getsockname()[1]
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._connections.append(conn)
+                number = len(self._connections) - 1
+            threading.Thread(target=self._serve,
+                             args=(conn, number),
+                             daemon=True).start()
+
+    def _serve(self, conn, number):
+        write_lock = threading.Lock()
+        data = b''
+        while True:
+            try:
+                chunk = conn.recv(65536)
+            except OSError:
+                return
+            if not chunk:
+                return
+            with self._lock:
+                self.reads += 1
+            data += chunk
+            *lines, data = data.split(b'\n')
+            for line in lines:
+                request = json.loads(line.decode('utf8'))
+                if 'cmd' in request:
+                    self._send(conn, write_lock, {
+                        'status': True,
+                        'uid': self.UID
+                    })
+                    continue
+                with self._lock:
+                    self.requests.append(
+                        (number, request['method'], request['params']))
+                if self.concurrent:
+                    threading.Thread(target=self._handle,
+                                     args=(conn, write_lock, request),
+                                     daemon=True).start()
+                else:
+                    self._handle(conn, write_lock, request)
+
+    def _handle(self, conn, write_lock, request):
+        response = {'id': request['id'], 'result': None, 'error': None}
+        handler = self.handlers.get(request['method'])
+        if handler is None:
+            response['error'] = 'Unknown RPC: %s' % request['method']
+        else:
+            try:
+                response['result'] = handler(*request['params'])
+            except FakeRpcError as e:
+                response['error'] = {
+                    'code': e.code,
+                    'message': e.message,
+                    'data': e.data
+                }
+        self._send(conn, write_lock, response)
+
+    def _send(self, conn, write_lock, response):
+        with write_lock:
+            try:
+                conn.sendall(json.dumps(response).encode('utf8') + b'\n')
+            except OSError:
+                pass
+
+    def connect(self, uid=rpc_connection.UNKNOWN_UID):
+        """Returns an opened RpcConnection to the server."""
+        client_socket = socket.create_connection(('127.0.0.1', self.port))
+        connection = rpc_connection.RpcConnection(
+            mock.Mock(), mock.Mock(), client_socket,
+            client_socket.makefile(mode='brw'), uid=uid)
+        connection.open()
+        return connection
+
+    def drop_connections(self):
+        """Closes the server side of every open connection."""
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def close(self):
+        self.drop_connections()
+        self._server.close()
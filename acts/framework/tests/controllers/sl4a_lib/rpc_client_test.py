@@ -13,11 +13,15 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
+import threading
+import time
 import unittest
 
 import mock
 
 from acts.controllers.sl4a_lib import rpc_client
+from tests.controllers.sl4a_lib.fake_sl4a_server import FakeRpcError
+from tests.controllers.sl4a_lib.fake_sl4a_server import FakeSl4aServer
 
 
 class BreakoutError(Exception):
@@ -214,5 +218,346 @@ class RpcClientTest(unittest.TestCase):
             kwarg2=2)
 
 
+
+class PipelinedRpcClientTest(unittest.TestCase):
+    """Tests the pipelined mode of rpc_client.RpcClient."""
+
+    def setUp(self):
+        self.server = FakeSl4aServer({
+            'echo': lambda value: value,
+            'fail': self._fail,
+        })
+        self.on_error = mock.Mock()
+        self.client = rpc_client.RpcClient(rpc_client.UNKNOWN_UID,
+                                           'serial',
+                                           self.on_error,
+                                           self.server.connect,
+                                           pipelined=True)
+
+    def tearDown(self):
+        self.client.terminate()
+        self.server.close()
+
+    @staticmethod
+    def _fail():
+        raise FakeRpcError('Failed.', code=7, data={'reason': 'test'})
+
+    def test_rpc_returns_result(self):
+        """Tests that pipelined RPCs return the result sent by SL4A."""
+        self.assertEqual(self.client.echo('hello'), 'hello')
+
+    def test_rpc_raises_api_error(self):
+        """Tests that RPC errors are raised with the JSON-RPC 2.0 fields."""
+        with self.assertRaises(rpc_client.Sl4aApiError) as context:
+            self.client.fail()
+
+        self.assertEqual(context.exception.code, 7)
+        self.assertEqual(context.exception.message, 'Failed.')
+        self.assertEqual(context.exception.data, {'reason': 'test'})
+        self.assertEqual(context.exception.rpc_name, 'fail')
+
+    def test_rpc_raises_api_error_for_json_rpc_1_errors(self):
+        with self.assertRaises(rpc_client.Sl4aApiError) as context:
+            self.client.unknownRpc()
+
+        self.assertEqual(context.exception.message, 'Unknown RPC: unknownRpc')
+
+    def test_futures_share_a_single_connection(self):
+        """Tests that concurrent futures are all sent over one connection."""
+        results = [self.client.future.echo(i) for i in range(50)]
+
+        self.assertEqual([future.result(5) for future in results],
+                         list(range(50)))
+        self.assertEqual(len({number for number, _, _ in self.server.requests
+                              }), 1)
+
+    def test_futures_are_matched_to_responses_by_id(self):
+        """Tests that responses sent out of order complete the right futures.
+        """
+        self.server.concurrent = True
+        release = threading.Event()
+        self.server.handlers['slow'] = lambda: release.wait(5) and 'slow'
+
+        slow = self.client.future.slow()
+        fast = self.client.future.echo('fast')
+
+        self.assertEqual(fast.result(5), 'fast')
+        self.assertFalse(slow.done())
+        release.set()
+        self.assertEqual(slow.result(5), 'slow')
+
+    def test_rpc_timeout_keeps_the_pipeline_usable(self):
+        self.server.concurrent = True
+        release = threading.Event()
+        self.server.handlers['slow'] = lambda: release.wait(5)
+
+        with self.assertRaises(rpc_client.Sl4aRpcTimeoutError):
+            self.client.slow(timeout=.05)
+
+        self.assertEqual(self.client.echo('still alive'), 'still alive')
+        release.set()
+
+    def test_dropped_connection_fails_pending_futures(self):
+        """Tests that losing the connection fails futures and reports it."""
+        self.server.handlers['hang'] = lambda: time.sleep(5)
+        future = self.client.future.hang()
+        while not self.server.requests:
+            time.sleep(.01)
+
+        self.server.drop_connections()
+
+        with self.assertRaises(rpc_client.Sl4aException):
+            future.result(5)
+        self.client._pipeline._reader.join(5)
+        self.assertTrue(self.on_error.called)
+
+    def test_malformed_response_fails_pending_futures(self):
+        """Tests that a response that cannot be decoded fails the pipeline
+        instead of killing its reader."""
+        for response in (b'{"id": 1, "resu', b'{"result": 1}', b'[1]'):
+            connection = mock.Mock()
+            connection.get_new_ticket.return_value = 1
+            sent = threading.Event()
+            connection.send_requests.side_effect = lambda _: sent.set()
+            connection.get_response.side_effect = (
+                lambda: sent.wait(5) and response)
+            on_error = mock.Mock()
+            pipeline = rpc_client.RpcPipeline(connection, on_error,
+                                              mock.Mock())
+
+            future = pipeline.submit('echo', [1])
+
+            self.assertIsInstance(future.exception(5),
+                                  rpc_client.Sl4aProtocolError)
+            pipeline._reader.join(5)
+            self.assertFalse(pipeline._reader.is_alive())
+            on_error.assert_called_once_with(connection)
+            with self.assertRaises(rpc_client.Sl4aConnectionError):
+                pipeline.submit('echo', [2])
+
+    def test_blocking_rpcs_do_not_hold_up_the_pipeline(self):
+        """Tests that RPCs sent during an eventWait are answered right away.
+        """
+        release = threading.Event()
+        self.server.handlers['eventWait'] = (
+            lambda timeout: release.wait(5) and 'event')
+
+        event = self.client.future.eventWait(60000)
+        while not self.server.requests:
+            time.sleep(.01)
+
+        self.assertEqual(self.client.echo('during wait'), 'during wait')
+        self.assertFalse(event.done())
+        release.set()
+        self.assertEqual(event.result(5), 'event')
+        connection_numbers = [number for number, _, _ in self.server.requests]
+        self.assertNotEqual(connection_numbers[0], connection_numbers[1])
+
+    def test_rpc_is_retried_on_a_new_pipeline(self):
+        calls = []
+
+        def drop_first_call(value):
+            calls.append(value)
+            if len(calls) == 1:
+                self.server.drop_connections()
+            return value
+
+        self.server.handlers['flaky'] = drop_first_call
+
+        self.assertEqual(self.client.flaky(1), 1)
+        self.assertEqual(calls, [1, 1])
+
+    def test_rpc_is_tried_retries_times(self):
+        calls = []
+
+        def drop(value):
+            calls.append(value)
+            self.server.drop_connections()
+
+        self.server.handlers['drop'] = drop
+
+        with self.assertRaises(rpc_client.Sl4aException):
+            self.client.drop(1, retries=2)
+        self.assertEqual(calls, [1, 1])
+
+    def test_pipeline_is_reopened_after_failure(self):
+        self.client.echo(1)
+        self.client._pipeline._fail(rpc_client.Sl4aConnectionError('Lost.'))
+
+        self.assertEqual(self.client.echo(2), 2)
+
+    def test_terminate_does_not_report_an_error(self):
+        self.client.echo(1)
+
+        self.client.terminate()
+        self.client._pipeline = None
+
+        self.assertFalse(self.on_error.called)
+
+
+
+class RpcBatchTest(unittest.TestCase):
+    """Tests rpc_client.RpcClient.batch against a fake SL4A server."""
+
+    def setUp(self):
+        self.server = FakeSl4aServer({
+            'echo': lambda value: value,
+            'add': lambda a, b: a + b,
+            'fail': self._fail,
+        })
+        self.on_error = mock.Mock()
+
+    def tearDown(self):
+        self.server.close()
+
+    @staticmethod
+    def _fail():
+        raise FakeRpcError('Failed.', code=7)
+
+    def create_client(self, pipelined=False):
+        client = rpc_client.RpcClient(rpc_client.UNKNOWN_UID,
+                                      'serial',
+                                      self.on_error,
+                                      self.server.connect,
+                                      pipelined=pipelined)
+        self.addCleanup(client.terminate)
+        return client
+
+    def test_batch_returns_results_in_call_order(self):
+        for pipelined in (False, True):
+            client = self.create_client(pipelined)
+            with client.batch() as batch:
+                first = batch.echo('first')
+                total = batch.add(1, 2)
+
+            self.assertEqual(first.result(0), 'first')
+            self.assertEqual(total.result(0), 3)
+
+    def test_batch_sends_calls_in_a_single_write(self):
+        client = self.create_client()
+        reads = self.server.reads
+
+        with client.batch() as batch:
+            for i in range(20):
+                batch.echo(i)
+
+        self.assertEqual(self.server.reads - reads, 1)
+        self.assertEqual(len(self.server.requests), 20)
+
+    def test_batch_reports_errors_per_call(self):
+        for pipelined in (False, True):
+            client = self.create_client(pipelined)
+            with client.batch() as batch:
+                failed = batch.fail()
+                unknown = batch.unknownRpc()
+                succeeded = batch.echo('ok')
+
+            with self.assertRaises(rpc_client.Sl4aApiError) as context:
+                failed.result(0)
+            self.assertEqual(context.exception.code, 7)
+            self.assertEqual(context.exception.rpc_name, 'fail')
+            self.assertIsInstance(unknown.exception(0),
+                                  rpc_client.Sl4aApiError)
+            self.assertEqual(succeeded.result(0), 'ok')
+
+    def test_batch_is_not_sent_on_exception(self):
+        client = self.create_client()
+
+        with self.assertRaises(BreakoutError):
+            with client.batch() as batch:
+                future = batch.echo(1)
+                raise BreakoutError()
+
+        self.assertEqual(self.server.requests, [])
+        self.assertIsInstance(future.exception(0), rpc_client.Sl4aException)
+        with self.assertRaises(rpc_client.Sl4aException):
+            batch.send()
+
+    def test_batch_cannot_be_sent_twice(self):
+        client = self.create_client()
+        with client.batch() as batch:
+            batch.echo(1)
+
+        with self.assertRaises(rpc_client.Sl4aException):
+            batch.echo(2)
+        with self.assertRaises(rpc_client.Sl4aException):
+            batch.send()
+
+    def test_batch_failure_fails_every_call(self):
+        client = self.create_client()
+        connection = mock.Mock()
+        connection.get_new_ticket.side_effect = range(1, 10)
+        connection.get_response.return_value = b''
+        client._free_connections = [connection]
+
+        batch = client.batch()
+        first = batch.echo(1)
+        second = batch.echo(2)
+        with self.assertRaises(rpc_client.Sl4aProtocolError):
+            batch.send()
+
+        self.assertIsInstance(first.exception(0), rpc_client.Sl4aProtocolError)
+        self.assertIsInstance(second.exception(0),
+                              rpc_client.Sl4aProtocolError)
+        self.assertTrue(self.on_error.called)
+        self.assertIn(connection, client._free_connections)
+
+    def test_batch_connection_error_fails_every_call(self):
+        client = self.create_client()
+        connection = mock.Mock()
+        connection.get_new_ticket.side_effect = range(1, 10)
+        connection.get_response.side_effect = ConnectionResetError()
+        client._free_connections = [connection]
+
+        batch = client.batch()
+        first = batch.echo(1)
+        second = batch.echo(2)
+        with self.assertRaises(ConnectionResetError):
+            batch.send()
+
+        self.assertIsInstance(first.exception(0), ConnectionResetError)
+        self.assertIsInstance(second.exception(0), ConnectionResetError)
+
+    def test_batch_with_malformed_response_discards_the_connection(self):
+        client = self.create_client()
+        connection = mock.Mock()
+        connection.get_new_ticket.side_effect = range(1, 10)
+        connection.get_response.return_value = b'{"id": 1, "resu'
+        client._free_connections = [connection]
+
+        batch = client.batch()
+        first = batch.echo(1)
+        with self.assertRaises(rpc_client.Sl4aProtocolError):
+            batch.send()
+
+        self.assertIsInstance(first.exception(0), rpc_client.Sl4aProtocolError)
+        self.on_error.assert_called_once_with(connection)
+        connection.close.assert_called_once_with()
+        self.assertNotIn(connection, client._free_connections)
+        self.assertNotIn(connection, client._working_connections)
+
+    def test_batch_with_mismatched_id_reports_the_connection(self):
+        """Tests that a connection left with unread responses is reported,
+        rather than reused as is."""
+        client = self.create_client()
+        connection = mock.Mock()
+        connection.get_new_ticket.side_effect = range(1, 10)
+        connection.get_response.return_value = (
+            b'{"id": 99, "result": 1, "error": null}')
+        client._free_connections = [connection]
+
+        batch = client.batch()
+        batch.echo(1)
+        batch.echo(2)
+        with self.assertRaises(rpc_client.Sl4aProtocolError):
+            batch.send()
+
+        self.assertEqual(connection.get_response.call_count, 1)
+        self.on_error.assert_called_once_with(connection)
+        connection.close.assert_called_once_with()
+        self.assertNotIn(connection, client._free_connections)
+        self.assertNotIn(connection, client._working_connections)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -21,10 +21,14 @@ import unittest
 from mock import patch
 
 from acts.controllers.adb_lib.error import AdbError
+from acts.controllers.sl4a_lib import event_dispatcher
 from acts.controllers.sl4a_lib import sl4a_ports
 from acts.controllers.sl4a_lib import rpc_client
 from acts.controllers.sl4a_lib.rpc_client import Sl4aStartError
 from acts.controllers.sl4a_lib.sl4a_session import Sl4aSession
+from tests.controllers.sl4a_lib.event_dispatcher_test import FakeEventFacade
+from tests.controllers.sl4a_lib.event_dispatcher_test import make_event
+from tests.controllers.sl4a_lib.fake_sl4a_server import FakeSl4aServer
 
 
 class Sl4aSessionTest(unittest.TestCase):
@@ -239,5 +243,73 @@ class Sl4aSessionTest(unittest.TestCase):
             Sl4aSession._create_forwarded_port(mock_session, 9999, 0)
 
 
+class Sl4aSessionEventDispatcherTest(unittest.TestCase):
+    """Tests the EventDispatcher of an Sl4aSession against a fake server."""
+
+    NUM_EVENTS = 250
+
+    def setUp(self):
+        self.facade = FakeEventFacade()
+        self.server = FakeSl4aServer({
+            'eventWait': self.facade.event_wait,
+            'eventPoll': self.facade.event_poll,
+        })
+
+    def tearDown(self):
+        self.server.close()
+
+    def connect(self, ports, uid):
+        return self.server.connect(uid)
+
+    def create_session(self, **kwargs):
+        with patch.object(Sl4aSession,
+                          '_create_rpc_connection',
+                          side_effect=self.connect):
+            session = Sl4aSession(mock.Mock(), 0, 0, lambda port: port,
+                                  mock.Mock(), **kwargs)
+        self.addCleanup(session.rpc_client.terminate)
+        return session
+
+    def receive_events(self, session):
+        """Sends NUM_EVENTS through the session's dispatcher.
+
+        Returns:
+            The names of the event RPCs sent.
+        """
+        dispatcher = session.get_event_dispatcher()
+        dispatcher.log = mock.Mock()
+        self.facade.post(
+            make_event('Scan', i) for i in range(self.NUM_EVENTS))
+        dispatcher.start()
+        received = [
+            dispatcher.pop_event('Scan', 10)['time']
+            for _ in range(self.NUM_EVENTS)
+        ]
+        self.facade.post([{'name': 'EventDispatcherShutdown'}])
+        dispatcher.close()
+
+        self.assertEqual(received, list(range(self.NUM_EVENTS)))
+        return [method for _, method, _ in self.server.requests]
+
+    def test_event_dispatcher_drains_events_by_default(self):
+        session = self.create_session()
+
+        methods = self.receive_events(session)
+
+        self.assertEqual(session.get_event_dispatcher().drain_size,
+                         event_dispatcher.DEFAULT_DRAIN_SIZE)
+        self.assertIn('eventPoll', methods)
+        self.assertLess(len(methods), self.NUM_EVENTS)
+
+    def test_event_dispatcher_uses_the_session_drain_size(self):
+        session = self.create_session(event_drain_size=0)
+
+        methods = self.receive_events(session)
+
+        self.assertEqual(session.get_event_dispatcher().drain_size, 0)
+        self.assertNotIn('eventPoll', methods)
+        self.assertEqual(len(methods), self.NUM_EVENTS + 1)
+
+
 if __name__ == '__main__':
     unittest.main()
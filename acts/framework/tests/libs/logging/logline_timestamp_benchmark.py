@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Benchmarks the per-line cost of filtering log lines by timestamp.
+
+Generates logcat lines a few ms apart, and times how long it takes to keep
+those within a time window with each way of handling their timestamps:
+
+    tuple:    validating and comparing each line with the tuple-walking
+              comparator acts.logger used to have.
+    strptime: parsing each line with datetime.strptime.
+    key:      validating each line, and comparing its integer key.
+    block:    parsing the keys of blocks of lines at once, with numpy.
+
+Usage:
+    python3 logline_timestamp_benchmark.py [--lines 200000]
+        [--block-size 4096] [--json report.json]
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import time
+
+from acts import logger as acts_logger
+from acts.libs.logging import logline_timestamp
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def _parse_tuple(t):
+    date, clock = t.split(' ')
+    year, month, day = date.split('-')
+    h, m, s = clock.split(':')
+    s, ms = s.split('.')
+    return year, month, day, h, m, s, ms
+
+
+def _tuple_comparator(t1, t2):
+    for u1, u2 in zip(_parse_tuple(t1), _parse_tuple(t2)):
+        if u1 < u2:
+            return -1
+        elif u1 > u2:
+            return 1
+    return 0
+
+
+def filter_tuple(lines, begin, end):
+    kept = 0
+    for line in lines:
+        line_time = line[:acts_logger.log_line_timestamp_len]
+        if not acts_logger.is_valid_logline_timestamp(line_time):
+            continue
+        if (_tuple_comparator(begin, line_time) <= 0
+                and _tuple_comparator(end, line_time) >= 0):
+            kept += 1
+    return kept
+
+
+def filter_strptime(lines, begin, end):
+    begin = datetime.datetime.strptime(begin, TIME_FORMAT)
+    end = datetime.datetime.strptime(end, TIME_FORMAT)
+    kept = 0
+    for line in lines:
+        try:
+            line_time = datetime.datetime.strptime(
+                line[:acts_logger.log_line_timestamp_len], TIME_FORMAT)
+        except ValueError:
+            continue
+        if begin <= line_time <= end:
+            kept += 1
+    return kept
+
+
+def filter_key(lines, begin, end):
+    begin = logline_timestamp.to_key(begin)
+    end = logline_timestamp.to_key(end)
+    kept = 0
+    for line in lines:
+        line_time = line[:acts_logger.log_line_timestamp_len]
+        if not acts_logger.is_valid_logline_timestamp(line_time):
+            continue
+        if begin <= logline_timestamp.to_key(line_time) <= end:
+            kept += 1
+    return kept
+
+
+def filter_block(lines, begin, end, block_size):
+    begin = logline_timestamp.to_key(begin)
+    end = logline_timestamp.to_key(end)
+    kept = 0
+    lines = iter(lines)
+    while True:
+        block = list(itertools.islice(lines, block_size))
+        if not block:
+            return kept
+        keys = logline_timestamp.parse_block(block)
+        kept += int(((keys != logline_timestamp.INVALID_KEY)
+                     & (keys >= begin) & (keys <= end)).sum())
+
+
+def generate_lines(count):
+    start = datetime.datetime(2020, 12, 31, 23, 0)
+    lines = []
+    for index in range(count):
+        if index % 1000 == 0:
+            lines.append('--------- beginning of main\n')
+        timestamp = start + datetime.timedelta(milliseconds=7 * index)
+        lines.append('%s  968  1001 D ActivityManager: message %d\n' %
+                     (timestamp.strftime(TIME_FORMAT)[:-3], index))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lines', type=int, default=200000,
+                        help='The number of log lines to filter.')
+    parser.add_argument('--block-size', type=int, default=4096,
+                        help='The number of lines parsed at once by block.')
+    parser.add_argument('--json', help='A path to write the report to.')
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines)
+    timestamps = [
+        line[:acts_logger.log_line_timestamp_len] for line in lines
+        if not line.startswith('-')
+    ]
+    begin = timestamps[len(timestamps) // 4]
+    end = timestamps[3 * len(timestamps) // 4]
+    methods = {
+        'tuple': lambda: filter_tuple(lines, begin, end),
+        'strptime': lambda: filter_strptime(lines, begin, end),
+        'key': lambda: filter_key(lines, begin, end),
+        'block': lambda: filter_block(lines, begin, end, args.block_size),
+    }
+
+    reports = []
+    expected = None
+    for name, method in methods.items():
+        start = time.perf_counter()
+        kept = method()
+        elapsed = time.perf_counter() - start
+        if expected is None:
+            expected = kept
+        elif kept != expected:
+            raise AssertionError('%s kept %d lines instead of %d.' %
+                                 (name, kept, expected))
+        ns_per_line = elapsed / len(lines) * 1e9
+        reports.append({
+            'method': name,
+            'lines': len(lines),
+            'kept': kept,
+            'seconds': elapsed,
+            'ns_per_line': ns_per_line,
+        })
+        print('%-8s %8d lines in %.3fs: %7.1f ns/line' %
+              (name, len(lines), elapsed, ns_per_line))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
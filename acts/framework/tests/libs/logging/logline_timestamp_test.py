@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2020 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import datetime
+import random
+import unittest
+
+from acts.libs.logging import logline_timestamp
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def _random_datetimes(count):
+    rng = random.Random(0)
+    start = datetime.datetime(1970, 1, 1)
+    for _ in range(count):
+        dt = start + datetime.timedelta(
+            milliseconds=rng.randrange(100 * 365 * 24 * 3600 * 1000))
+        yield dt
+
+
+class LoglineTimestampTest(unittest.TestCase):
+    """Tests acts.libs.logging.logline_timestamp."""
+
+    def test_to_key_matches_strptime(self):
+        for dt in _random_datetimes(1000):
+            timestamp = dt.strftime(TIME_FORMAT)[:-3]
+
+            self.assertEqual(logline_timestamp.to_key(timestamp),
+                             logline_timestamp.datetime_to_key(dt))
+            self.assertEqual(logline_timestamp.to_datetime(timestamp), dt)
+
+    def test_to_key_handles_leap_days(self):
+        self.assertEqual(
+            logline_timestamp.to_key('2020-03-01 00:00:00.000') -
+            logline_timestamp.to_key('2020-02-28 00:00:00.000'),
+            2 * 24 * 3600 * logline_timestamp.US_PER_SECOND)
+        self.assertEqual(
+            logline_timestamp.to_key('2100-03-01 00:00:00.000') -
+            logline_timestamp.to_key('2100-02-28 00:00:00.000'),
+            24 * 3600 * logline_timestamp.US_PER_SECOND)
+
+    def test_to_key_reads_any_number_of_fraction_digits(self):
+        self.assertEqual(
+            logline_timestamp.to_datetime('2020-08-12 14:26:42.611043'),
+            datetime.datetime(2020, 8, 12, 14, 26, 42, 611043))
+        self.assertEqual(logline_timestamp.to_datetime('2020-08-12 14:26:42.5'),
+                         datetime.datetime(2020, 8, 12, 14, 26, 42, 500000))
+        self.assertEqual(logline_timestamp.to_datetime('2020-08-12 14:26:42'),
+                         datetime.datetime(2020, 8, 12, 14, 26, 42))
+
+    def test_to_key_uses_given_year_for_timestamps_without_one(self):
+        self.assertEqual(
+            logline_timestamp.to_key('08-12 14:26:42.611', year=2020),
+            logline_timestamp.to_key('2020-08-12 14:26:42.611'))
+
+    def test_to_key_raises_on_invalid_timestamps(self):
+        for timestamp in ['', '--------- beginning of main',
+                          '2020-08-12 14:26:xx.611', '08-12 14:26:42.611']:
+            with self.assertRaises(ValueError):
+                logline_timestamp.to_key(timestamp)
+
+    def test_compare(self):
+        self.assertEqual(
+            logline_timestamp.compare('2020-08-12 14:26:42.611',
+                                      '2020-08-12 14:26:42.612'), -1)
+        self.assertEqual(
+            logline_timestamp.compare('2021-01-01 00:00:00.000',
+                                      '2020-12-31 23:59:59.999'), 1)
+        self.assertEqual(
+            logline_timestamp.compare('2020-08-12 14:26:42.611',
+                                      '2020-08-12 14:26:42.611'), 0)
+
+    def test_epoch_ms_to_timestamp_pads_milliseconds(self):
+        epoch_ms = int(datetime.datetime(2020, 8, 12, 14, 26, 42).timestamp() *
+                       1000)
+
+        self.assertEqual(logline_timestamp.epoch_ms_to_timestamp(epoch_ms + 5),
+                         '2020-08-12 14:26:42.005')
+        self.assertEqual(
+            logline_timestamp.epoch_ms_to_timestamp(epoch_ms + 1005),
+            '2020-08-12 14:26:43.005')
+
+    def test_parse_block_matches_to_key(self):
+        lines = [
+            dt.strftime(TIME_FORMAT)[:-3] + '  968  1001 D Tag: message\n'
+            for dt in _random_datetimes(1000)
+        ]
+
+        keys = logline_timestamp.parse_block(lines)
+
+        self.assertEqual(list(keys),
+                         [logline_timestamp.to_key(line[:23]) for line in lines])
+        self.assertEqual(
+            list(logline_timestamp.parse_block(
+                [line.encode('utf-8') for line in lines])), list(keys))
+
+    def test_parse_block_marks_lines_without_timestamps(self):
+        lines = [
+            '--------- beginning of main\n',
+            '2020-08-12 14:26:42.611  968  1001 D Tag: message\n',
+            '08-12 14:26:42.611  968  1001 D Tag: message\n',
+            '2020-08-12 14:26:4\n',
+            '2020-é8-12 14:26:42.611  968  1001 D Tag: message\n',
+            '',
+        ]
+
+        keys = logline_timestamp.parse_block(lines)
+
+        self.assertEqual(list(keys), [
+            logline_timestamp.INVALID_KEY,
+            logline_timestamp.to_key('2020-08-12 14:26:42.611'),
+        ] + [logline_timestamp.INVALID_KEY] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
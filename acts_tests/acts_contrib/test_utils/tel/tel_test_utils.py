@@ -44,6 +44,7 @@ from acts.libs.proc import job
 from acts_contrib.test_utils.tel.loggers.protos.telephony_metric_pb2 import TelephonyVoiceTestResult
 from acts_contrib.test_utils.tel.tel_defines import CarrierConfigs, CARRIER_NTT_DOCOMO, CARRIER_KDDI, CARRIER_RAKUTEN, \
     CARRIER_SBM
+from acts_contrib.test_utils.tel import tel_wait_utils
 from acts_contrib.test_utils.tel.tel_defines import AOSP_PREFIX
 from acts_contrib.test_utils.tel.tel_defines import CARD_POWER_DOWN
 from acts_contrib.test_utils.tel.tel_defines import CARD_POWER_UP
@@ -4738,8 +4739,14 @@ def wait_for_cell_data_connection_for_subscription(
         # The bug is tracked here: b/22612607
         # So we use _is_network_connected_state_match.
 
-        if _wait_for_droid_in_state(log, ad, timeout_value,
-                                    _is_network_connected_state_match, state):
+        if tel_wait_utils.wait_for_droids_in_state(
+                log, [ad],
+                timeout_value,
+                _is_network_connected_state_match, (state, ),
+                watched_events=[
+                    tel_wait_utils.DATA_CONNECTION_STATE,
+                    tel_wait_utils.CONNECTIVITY_STATE
+                ]):
             return _wait_for_nw_data_connection(
                 log, ad, state, NETWORK_CONNECTION_TYPE_CELL, timeout_value)
         else:
@@ -4856,9 +4863,11 @@ def _wait_for_nw_data_connection(
         # data connection state.
         # Otherwise, the network state will not be correct.
         # The bug is tracked here: b/20921915
-        if _wait_for_droid_in_state(log, ad, timeout_value,
-                                    _is_network_connected_state_match,
-                                    is_connected):
+        if tel_wait_utils.wait_for_droids_in_state(
+                log, [ad],
+                timeout_value,
+                _is_network_connected_state_match, (is_connected, ),
+                watched_events=[tel_wait_utils.CONNECTIVITY_STATE]):
             current_type = get_internet_connection_type(log, ad)
             ad.log.info("current data connection type: %s", current_type)
             if not connection_type:
@@ -5568,43 +5577,26 @@ def toggle_video_calling_for_subscription(ad, new_state=None, sub_id=None):
 
 def _wait_for_droid_in_state(log, ad, max_time, state_check_func, *args,
                              **kwargs):
-    while max_time >= 0:
-        if state_check_func(log, ad, *args, **kwargs):
-            return True
-
-        time.sleep(WAIT_TIME_BETWEEN_STATE_CHECK)
-        max_time -= WAIT_TIME_BETWEEN_STATE_CHECK
-
-    return False
+    return tel_wait_utils.wait_for_droids_in_state(
+        log, [ad], max_time, state_check_func, args, kwargs)
 
 
 def _wait_for_droid_in_state_for_subscription(
         log, ad, sub_id, max_time, state_check_func, *args, **kwargs):
-    while max_time >= 0:
-        if state_check_func(log, ad, sub_id, *args, **kwargs):
-            return True
-
-        time.sleep(WAIT_TIME_BETWEEN_STATE_CHECK)
-        max_time -= WAIT_TIME_BETWEEN_STATE_CHECK
-
-    return False
+    return tel_wait_utils.wait_for_droids_in_state(
+        log, [ad], max_time, state_check_func, args, kwargs, sub_id=sub_id)
 
 
 def _wait_for_droids_in_state(log, ads, max_time, state_check_func, *args,
                               **kwargs):
-    while max_time > 0:
-        success = True
-        for ad in ads:
-            if not state_check_func(log, ad, *args, **kwargs):
-                success = False
-                break
-        if success:
-            return True
+    return tel_wait_utils.wait_for_droids_in_state(
+        log, ads, max_time, state_check_func, args, kwargs)
 
-        time.sleep(WAIT_TIME_BETWEEN_STATE_CHECK)
-        max_time -= WAIT_TIME_BETWEEN_STATE_CHECK
 
-    return False
+def _wait_for_droids_in_state_concurrently(log, ads, max_time,
+                                           state_check_func, *args, **kwargs):
+    return tel_wait_utils.wait_for_droids_in_state_concurrently(
+        log, ads, max_time, state_check_func, args, kwargs)
 
 
 def is_phone_in_call(log, ad):
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - Google
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""Waits for droids to reach a state, woken up by SL4A events.
+
+Instead of checking a droid's state every WAIT_TIME_BETWEEN_STATE_CHECK
+seconds, the state is checked again as soon as a telephony callback related
+to it is received, e.g. a call state change for is_phone_in_call. Between
+events, and for states without any related callback, the state is polled with
+a growing interval, from MIN_STATE_CHECK_INTERVAL up to
+WAIT_TIME_BETWEEN_STATE_CHECK.
+"""
+
+import functools
+import threading
+import time
+
+from acts import utils
+from acts_contrib.test_utils.tel.tel_defines import EventCallStateChanged
+from acts_contrib.test_utils.tel.tel_defines import EventConnectivityChanged
+from acts_contrib.test_utils.tel.tel_defines import EventDataConnectionStateChanged
+from acts_contrib.test_utils.tel.tel_defines import EventServiceStateChanged
+from acts_contrib.test_utils.tel.tel_defines import WAIT_TIME_BETWEEN_STATE_CHECK
+
+# The first interval between two state checks, in seconds.
+MIN_STATE_CHECK_INTERVAL = 0.5
+# The factor the interval between state checks grows by, up to
+# WAIT_TIME_BETWEEN_STATE_CHECK.
+STATE_CHECK_BACKOFF = 1.5
+
+
+class TrackedEvent(object):
+    """An SL4A callback that reports changes of a droid's state.
+
+    Attributes:
+        event_name: The name of the events the callback sends.
+        start_rpc: The RPC starting the callback.
+        stop_rpc: The RPC stopping the callback.
+        start_rpc_for_subscription: The RPC starting the callback for a given
+            subscription, or None if there is none.
+        stop_rpc_for_subscription: The RPC stopping the callback for a given
+            subscription, or None if there is none.
+    """
+
+    def __init__(self,
+                 event_name,
+                 start_rpc,
+                 stop_rpc,
+                 start_rpc_for_subscription=None,
+                 stop_rpc_for_subscription=None):
+        self.event_name = event_name
+        self.start_rpc = start_rpc
+        self.stop_rpc = stop_rpc
+        self.start_rpc_for_subscription = start_rpc_for_subscription
+        self.stop_rpc_for_subscription = stop_rpc_for_subscription
+
+    def _call(self, ad, rpc, rpc_for_subscription, sub_id):
+        if sub_id is not None and rpc_for_subscription:
+            getattr(ad.droid, rpc_for_subscription)(sub_id)
+        else:
+            getattr(ad.droid, rpc)()
+
+    def start(self, ad, sub_id=None):
+        self._call(ad, self.start_rpc, self.start_rpc_for_subscription, sub_id)
+
+    def stop(self, ad, sub_id=None):
+        self._call(ad, self.stop_rpc, self.stop_rpc_for_subscription, sub_id)
+
+    def __repr__(self):
+        return '<TrackedEvent %s>' % self.event_name
+
+
+CALL_STATE = TrackedEvent(
+    EventCallStateChanged, 'telephonyStartTrackingCallState',
+    'telephonyStopTrackingCallStateChange',
+    'telephonyStartTrackingCallStateForSubscription',
+    'telephonyStopTrackingCallStateChangeForSubscription')
+SERVICE_STATE = TrackedEvent(
+    EventServiceStateChanged, 'telephonyStartTrackingServiceStateChange',
+    'telephonyStopTrackingServiceStateChange',
+    'telephonyStartTrackingServiceStateChangeForSubscription',
+    'telephonyStopTrackingServiceStateChangeForSubscription')
+DATA_CONNECTION_STATE = TrackedEvent(
+    EventDataConnectionStateChanged,
+    'telephonyStartTrackingDataConnectionStateChange',
+    'telephonyStopTrackingDataConnectionStateChange',
+    'telephonyStartTrackingDataConnectionStateChangeForSubscription',
+    'telephonyStopTrackingDataConnectionStateChangeForSubscription')
+CONNECTIVITY_STATE = TrackedEvent(
+    EventConnectivityChanged,
+    'connectivityStartTrackingConnectivityStateChange',
+    'connectivityStopTrackingConnectivityStateChange')
+
+# The callbacks reporting the changes of the states checked by the
+# tel_test_utils functions of the given names. SL4A has no callback for IMS
+# registration, so IMS, VoLTE, WFC and VT states are polled.
+STATE_CHECK_EVENTS = {
+    'is_phone_in_call': [CALL_STATE],
+    'is_phone_not_in_call': [CALL_STATE],
+    '_is_attached': [SERVICE_STATE],
+    '_is_attached_for_subscription': [SERVICE_STATE],
+    'is_droid_in_rat_family': [SERVICE_STATE],
+    'is_droid_in_rat_family_for_subscription': [SERVICE_STATE],
+    'is_droid_in_rat_family_list': [SERVICE_STATE],
+    'is_droid_in_rat_family_list_for_subscription': [SERVICE_STATE],
+    'is_droid_in_network_generation': [SERVICE_STATE],
+    'is_droid_in_network_generation_for_subscription': [SERVICE_STATE],
+    '_is_network_connected_state_match':
+    [DATA_CONNECTION_STATE, CONNECTIVITY_STATE],
+}
+
+# The number of waiters tracking each event of each device, by
+# (serial, event name, sub_id). SL4A callbacks are not reference counted, so
+# a callback is only stopped once no waiter tracks it anymore.
+_tracking_counts = {}
+# The (event dispatcher, queued count) of each event of each device when the
+# waiters last stopped tracking it, by (serial, event name, sub_id).
+_stopped_counts = {}
+_tracking_lock = threading.Lock()
+
+
+def get_tracked_events(state_check_func):
+    """Returns the TrackedEvents reporting changes of a checked state."""
+    return STATE_CHECK_EVENTS.get(
+        getattr(state_check_func, '__name__', None), [])
+
+
+class _DeviceWatch(object):
+    """Tracks the events reporting state changes of one device.
+
+    The events of watched_events are tracked by the caller, so they are
+    waited for, but their tracking is neither started nor stopped. The same
+    goes for the tracked events that the caller may have started tracking
+    with a direct RPC, see _is_tracked_by_caller.
+    """
+
+    def __init__(self, log, ad, tracked_events, sub_id, watched_events=()):
+        self._log = log
+        self._ad = ad
+        self._sub_id = sub_id
+        self._started = []
+        # The queued count of each event when this watch started tracking it.
+        self._start_counts = {}
+        self._pattern = None
+        self._queued_count = 0
+        ed = getattr(ad, 'ed', None)
+        if ed is None:
+            # Without an event dispatcher, the state can only be polled.
+            return
+        watched_events = list(watched_events)
+        for tracked_event in tracked_events:
+            event_name = tracked_event.event_name
+            key = (ad.serial, event_name, sub_id)
+            with _tracking_lock:
+                start_count = ed.get_queued_count('%s$' % event_name)
+                if not _tracking_counts.get(key):
+                    if _is_tracked_by_caller(ed, key, start_count):
+                        watched_events.append(tracked_event)
+                        continue
+                    try:
+                        tracked_event.start(ad, sub_id)
+                    except Exception as e:
+                        log.debug('%s: cannot track %s, polling instead: %s',
+                                  ad.serial, event_name, e)
+                        continue
+                _tracking_counts[key] = _tracking_counts.get(key, 0) + 1
+            self._started.append(tracked_event)
+            self._start_counts[event_name] = start_count
+        event_names = [
+            tracked_event.event_name
+            for tracked_event in self._started + watched_events
+        ]
+        if event_names:
+            self._pattern = '(%s)$' % '|'.join(event_names)
+            self._queued_count = ed.get_queued_count(self._pattern)
+
+    @property
+    def has_events(self):
+        return self._pattern is not None
+
+    def wait(self, timeout):
+        """Waits for an event, or the timeout.
+
+        Returns:
+            True if an event was received, False otherwise.
+        """
+        if self._pattern is None:
+            time.sleep(timeout)
+            return False
+        count = self._ad.ed.wait_for_new_events(self._pattern,
+                                                self._queued_count, timeout)
+        if count is None:
+            return False
+        self._queued_count = count
+        return True
+
+    def close(self):
+        ed = self._ad.ed if self._started else None
+        for tracked_event in self._started:
+            event_name = tracked_event.event_name
+            key = (self._ad.serial, event_name, self._sub_id)
+            with _tracking_lock:
+                _tracking_counts[key] -= 1
+                if _tracking_counts[key]:
+                    continue
+                del _tracking_counts[key]
+                try:
+                    tracked_event.stop(self._ad, self._sub_id)
+                    # The events sent since the tracking started are only
+                    # for the waiters, so they are not left for a later
+                    # wait_for_event. The events queued before are kept.
+                    ed.clear_new_events(event_name,
+                                        self._start_counts[event_name])
+                except Exception as e:
+                    self._log.debug('%s: cannot stop tracking %s: %s',
+                                    self._ad.serial, event_name, e)
+                _stopped_counts[key] = (ed, ed.get_queued_count('%s$' %
+                                                                event_name))
+        self._started = []
+
+
+def _is_tracked_by_caller(ed, key, queued_count):
+    """Returns whether the caller may have started tracking an event itself.
+
+    SL4A cannot tell whether a callback is active, so tracking is deemed
+    started by the caller if events were received since the waiters last
+    stopped it, e.g. by hangup_call. Such tracking is left to the caller.
+    Must be called with _tracking_lock held.
+
+    Args:
+        ed: The EventDispatcher of the device.
+        key: The (serial, event name, sub_id) of the tracked event.
+        queued_count: The current get_queued_count of the event.
+    """
+    stopped_ed, stopped_count = _stopped_counts.get(key, (ed, 0))
+    if stopped_ed is not ed:
+        # The device has a new event dispatcher, which counts from 0.
+        stopped_count = 0
+    # Later waiters count from now on, so that they track the event again
+    # once the caller stops tracking it.
+    _stopped_counts[key] = (ed, queued_count)
+    return queued_count > stopped_count
+
+
+def wait_for_droids_in_state(log,
+                             ads,
+                             max_time,
+                             state_check_func,
+                             args=(),
+                             kwargs=None,
+                             sub_id=None,
+                             tracked_events=None,
+                             watched_events=None):
+    """Waits until every droid is in the state checked by state_check_func.
+
+    The states are checked right away, then as soon as an event reporting a
+    state change is received from the first droid not in the state. Without
+    events, they are checked again after a growing interval.
+
+    Args:
+        log: The log object.
+        ads: The list of AndroidDevice objects.
+        max_time: The number of seconds to wait for.
+        state_check_func: A function called with (log, ad, *args, **kwargs),
+            or with (log, ad, sub_id, *args, **kwargs) if sub_id is given,
+            returning whether the droid is in the state.
+        args: The additional positional args of state_check_func.
+        kwargs: The additional keyword args of state_check_func.
+        sub_id: The subscription the state is checked for, if any.
+        tracked_events: The list of TrackedEvents reporting changes of the
+            state. Defaults to the get_tracked_events(state_check_func) not in
+            watched_events.
+        watched_events: The list of TrackedEvents reporting changes of the
+            state that the caller already tracks. They are waited for, but
+            their tracking is left to the caller.
+
+    Returns:
+        True if all droids were in the state at once before max_time, False
+        otherwise.
+    """
+    kwargs = kwargs or {}
+    check_args = tuple(args) if sub_id is None else (sub_id, ) + tuple(args)
+    watched_events = watched_events or []
+    if tracked_events is None:
+        tracked_events = [
+            tracked_event
+            for tracked_event in get_tracked_events(state_check_func)
+            if tracked_event not in watched_events
+        ]
+    watches = {}
+    deadline = time.time() + max_time
+    interval = MIN_STATE_CHECK_INTERVAL
+    try:
+        while True:
+            waiting_ad = None
+            for ad in ads:
+                if not state_check_func(log, ad, *check_args, **kwargs):
+                    waiting_ad = ad
+                    break
+            if waiting_ad is None:
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            watch = watches.get(waiting_ad)
+            if watch is None:
+                watch = _DeviceWatch(log, waiting_ad, tracked_events, sub_id,
+                                     watched_events)
+                watches[waiting_ad] = watch
+                if watch.has_events:
+                    # Events cover changes from now on, so the state is
+                    # checked again in case it changed before.
+                    continue
+            if watch.wait(min(interval, remaining)):
+                interval = MIN_STATE_CHECK_INTERVAL
+            else:
+                interval = min(interval * STATE_CHECK_BACKOFF,
+                               WAIT_TIME_BETWEEN_STATE_CHECK)
+    finally:
+        for watch in watches.values():
+            watch.close()
+
+
+class StateWaitResult(object):
+    """The outcome of wait_for_droids_in_state_concurrently.
+
+    Evaluates to True if every droid reached the state.
+
+    Attributes:
+        ready_times: A dict of the number of seconds each droid took to reach
+            the state, or None if it did not, by serial.
+    """
+
+    def __init__(self, ready_times):
+        self.ready_times = ready_times
+
+    @property
+    def not_ready(self):
+        """The serials of the droids which did not reach the state."""
+        return [
+            serial for serial, ready_time in self.ready_times.items()
+            if ready_time is None
+        ]
+
+    def __bool__(self):
+        return not self.not_ready
+
+    def __repr__(self):
+        return '<StateWaitResult %s>' % self.ready_times
+
+
+def wait_for_droids_in_state_concurrently(log,
+                                          ads,
+                                          max_time,
+                                          state_check_func,
+                                          args=(),
+                                          kwargs=None,
+                                          sub_id=None,
+                                          tracked_events=None,
+                                          watched_events=None):
+    """Waits until each droid has been in the state checked by
+    state_check_func.
+
+    Unlike wait_for_droids_in_state, each droid is waited for on its own
+    thread of the executor shared by acts.utils.run_concurrent_calls, and is
+    not checked anymore once it reached the state. So waiting for N droids
+    takes as long as the slowest one instead of the sum of their checks, but
+    the droids are not required to be in the state at the same time.
+
+    Args:
+        See wait_for_droids_in_state.
+
+    Returns:
+        A StateWaitResult, evaluating to True if every droid reached the state
+        before max_time.
+
+    Raises:
+        The first exception raised by state_check_func, if any.
+    """
+    start_time = time.time()
+
+    def wait_for_droid(ad):
+        if wait_for_droids_in_state(log, [ad], max_time, state_check_func,
+                                    args, kwargs, sub_id, tracked_events,
+                                    watched_events):
+            return time.time() - start_time
+        return None
+
+    results = utils.run_concurrent_calls(
+        [functools.partial(wait_for_droid, ad) for ad in ads])
+    exceptions = [
+        result for result in results if result.exception is not None
+    ]
+    if exceptions:
+        raise min(exceptions, key=lambda result: result.end_time).exception
+    result = StateWaitResult(
+        {ad.serial: result.value
+         for ad, result in zip(ads, results)})
+    if not result:
+        log.info('%s not in state after %ss: %s', result.not_ready, max_time,
+                 result.ready_times)
+    return result
@@ -871,6 +871,130 @@ def get_full_rf_connection_map(attenuators,
 
 
 # Generic device utils
+class AdaptiveAttenuationSweep(object):
+    """Class to choose the attenuations at which to measure an RvR curve.
+
+    Instead of measuring every point of an attenuation range, the sweep
+    measures every coarse_step-th point and, before moving on to the next one,
+    bisects the interval it closes if throughput changes across it by more
+    than the tolerance, until the interval cannot be split further. Flat parts
+    of the curve are measured coarsely and its slopes and cliffs at every
+    point of the range. Points are measured in increasing attenuation order,
+    except within the interval being refined, so the DUT is never taken more
+    than coarse_step points past a point before it is measured. Once
+    max_consecutive_floor coarse points in a row are at the throughput floor,
+    e.g., the DUT disconnected, the rest of the range is assumed to be at the
+    floor and is not measured.
+
+    Attributes:
+        atten_range: list of attenuations that can be measured, increasing
+        results: OrderedDict of measurement results by measured attenuation,
+        in increasing attenuation order
+        floor_range: list of attenuations assumed at the throughput floor
+    """
+    def __init__(self,
+                 atten_range,
+                 coarse_step=4,
+                 abs_tolerance=5,
+                 pct_tolerance=5,
+                 max_consecutive_floor=2,
+                 is_floor=None):
+        """Initializes the sweep.
+
+        Args:
+            atten_range: list of attenuations that can be measured, increasing
+            coarse_step: number of range points between coarse measurements
+            abs_tolerance: throughput change in Mbps below which an interval
+            is not refined
+            pct_tolerance: throughput change, in percent of the peak coarse
+            throughput, below which an interval is not refined
+            max_consecutive_floor: number of consecutive coarse points at the
+            floor after which the sweep stops
+            is_floor: function taking a measurement result and returning True
+            if it is at the throughput floor. Defaults to zero throughput.
+        """
+        self.atten_range = list(atten_range)
+        self.coarse_step = max(int(coarse_step), 1)
+        self.abs_tolerance = abs_tolerance
+        self.pct_tolerance = pct_tolerance
+        self.max_consecutive_floor = max_consecutive_floor
+        self.is_floor = is_floor or (lambda result: result['throughput'] == 0)
+        self.results = collections.OrderedDict()
+        self.floor_range = []
+
+    def run(self, measure, restore=None):
+        """Measures the curve.
+
+        Args:
+            measure: function taking an attenuation and returning the dict
+            of measurement results at it, including its 'throughput'
+            restore: function taking an attenuation, called before measuring
+            at an attenuation lower than one already measured, e.g., to
+            reconnect a DUT that disconnected at the higher attenuation and
+            would otherwise not reconnect at the lower one
+        Returns:
+            results: OrderedDict of measurement results by attenuation
+        """
+        results = {}
+        self.floor_range = []
+        if not self.atten_range:
+            self.results = collections.OrderedDict()
+            return self.results
+
+        def measure_idx(idx):
+            if restore and results and idx < max(results):
+                restore(self.atten_range[idx])
+            results[idx] = measure(self.atten_range[idx])
+            return results[idx]
+
+        def refine(low_idx, high_idx, tolerance):
+            # Refine sub-intervals in increasing attenuation order
+            intervals = [(high_idx, low_idx)]
+            while intervals:
+                high_idx, low_idx = intervals.pop()
+                if high_idx - low_idx < 2:
+                    continue
+                low_result = results[low_idx]
+                high_result = results[high_idx]
+                if self.is_floor(low_result) and self.is_floor(high_result):
+                    continue
+                if abs(low_result['throughput'] -
+                       high_result['throughput']) <= tolerance:
+                    continue
+                mid_idx = (low_idx + high_idx) // 2
+                measure_idx(mid_idx)
+                intervals.append((high_idx, mid_idx))
+                intervals.append((mid_idx, low_idx))
+
+        last_idx = len(self.atten_range) - 1
+        coarse_indices = list(range(0, last_idx, self.coarse_step))
+        coarse_indices.append(last_idx)
+        consecutive_floor = 0
+        peak_throughput = 0
+        prev_idx = None
+        for idx in coarse_indices:
+            result = measure_idx(idx)
+            peak_throughput = max(peak_throughput, result['throughput'])
+            if prev_idx is not None:
+                refine(
+                    prev_idx, idx,
+                    max(self.abs_tolerance,
+                        peak_throughput * self.pct_tolerance / 100))
+            prev_idx = idx
+            if self.is_floor(result):
+                consecutive_floor = consecutive_floor + 1
+            else:
+                consecutive_floor = 0
+            if consecutive_floor == self.max_consecutive_floor:
+                logging.info('Throughput stable at floor. Stopping sweep.')
+                self.floor_range = self.atten_range[idx + 1:]
+                break
+
+        self.results = collections.OrderedDict(
+            (self.atten_range[idx], results[idx]) for idx in sorted(results))
+        return self.results
+
+
 def get_dut_temperature(dut):
     """Function to get dut temperature.
 
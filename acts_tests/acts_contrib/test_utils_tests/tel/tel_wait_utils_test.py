@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import threading
+import time
+import unittest
+
+from unittest import mock
+
+from acts.controllers.sl4a_lib import event_dispatcher
+from acts_contrib.test_utils.tel import tel_wait_utils
+from acts_contrib.test_utils.tel.tel_defines import EventCallStateChanged
+
+
+class FakeDevice(object):
+    """A device whose state is changed by another thread, with an event."""
+
+    def __init__(self, serial, in_state=False):
+        self.serial = serial
+        self.in_state = in_state
+        self.checks = 0
+        self.droid = mock.Mock()
+        self.ed = event_dispatcher.EventDispatcher(serial, mock.Mock())
+        self.ed.log = mock.Mock()
+        self.ed._started = True
+
+    def change_state_later(self, delay, send_event=True):
+        def change_state():
+            self.in_state = True
+            if send_event:
+                self.ed._queue_events([{
+                    'name': EventCallStateChanged,
+                    'time': time.time(),
+                    'data': {}
+                }])
+
+        timer = threading.Timer(delay, change_state)
+        timer.start()
+        return timer
+
+
+def is_phone_in_call(log, ad):
+    ad.checks += 1
+    return ad.in_state
+
+
+class TelWaitUtilsTest(unittest.TestCase):
+    """Tests acts_contrib.test_utils.tel.tel_wait_utils."""
+
+    def setUp(self):
+        self.log = mock.Mock()
+
+    def test_returns_as_soon_as_event_is_received(self):
+        ad = FakeDevice('1')
+        timer = ad.change_state_later(.2)
+        self.addCleanup(timer.cancel)
+
+        start = time.time()
+        result = tel_wait_utils.wait_for_droids_in_state(
+            self.log, [ad], 30, is_phone_in_call)
+
+        self.assertTrue(result)
+        self.assertLess(time.time() - start, 1)
+        ad.droid.telephonyStartTrackingCallState.assert_called_once_with()
+        ad.droid.telephonyStopTrackingCallStateChange.assert_called_once_with()
+        # The events of the tracking it started are not left behind.
+        self.assertEqual(ad.ed.pop_all(EventCallStateChanged), [])
+
+    def test_waits_for_watched_events_without_tracking_them(self):
+        ad = FakeDevice('1')
+        timer = ad.change_state_later(.2)
+        self.addCleanup(timer.cancel)
+
+        start = time.time()
+        result = tel_wait_utils.wait_for_droids_in_state(
+            self.log, [ad],
+            30,
+            is_phone_in_call,
+            watched_events=[tel_wait_utils.CALL_STATE])
+
+        self.assertTrue(result)
+        self.assertLess(time.time() - start, 1)
+        ad.droid.telephonyStartTrackingCallState.assert_not_called()
+        ad.droid.telephonyStopTrackingCallStateChange.assert_not_called()
+        # The event is left for the caller tracking it.
+        self.assertEqual(len(ad.ed.pop_all(EventCallStateChanged)), 1)
+
+    def test_leaves_tracking_started_by_caller(self):
+        ad = FakeDevice('1')
+        # An event of the tracking the caller started, e.g. in hangup_call.
+        ad.ed._queue_events([{'name': EventCallStateChanged, 'time': 0}])
+        timer = ad.change_state_later(.2)
+        self.addCleanup(timer.cancel)
+
+        start = time.time()
+        result = tel_wait_utils.wait_for_droids_in_state(
+            self.log, [ad], 30, is_phone_in_call)
+
+        self.assertTrue(result)
+        self.assertLess(time.time() - start, 1)
+        ad.droid.telephonyStartTrackingCallState.assert_not_called()
+        ad.droid.telephonyStopTrackingCallStateChange.assert_not_called()
+        self.assertEqual(len(ad.ed.pop_all(EventCallStateChanged)), 2)
+
+    def test_tracks_again_once_caller_stopped_tracking(self):
+        ad = FakeDevice('1')
+        ad.ed._queue_events([{'name': EventCallStateChanged, 'time': 0}])
+
+        def wait():
+            ad.in_state = False
+            timer = ad.change_state_later(.1, send_event=False)
+            self.addCleanup(timer.cancel)
+            self.assertTrue(
+                tel_wait_utils.wait_for_droids_in_state(
+                    self.log, [ad], 30, is_phone_in_call))
+
+        wait()
+        ad.droid.telephonyStartTrackingCallState.assert_not_called()
+        # No event was received since, so the caller stopped tracking.
+        wait()
+        ad.droid.telephonyStartTrackingCallState.assert_called_once_with()
+        ad.droid.telephonyStopTrackingCallStateChange.assert_called_once_with()
+
+    def test_clears_only_the_events_of_its_tracking(self):
+        ad = FakeDevice('1')
+        ad.ed._queue_events([{'name': EventCallStateChanged, 'time': 0}])
+        timer = ad.change_state_later(.2)
+        self.addCleanup(timer.cancel)
+
+        # The event was queued before a waiter last stopped tracking.
+        with mock.patch.dict(
+                tel_wait_utils._stopped_counts,
+            {('1', EventCallStateChanged, None): (ad.ed, 1)}):
+            self.assertTrue(
+                tel_wait_utils.wait_for_droids_in_state(
+                    self.log, [ad], 30, is_phone_in_call))
+
+        ad.droid.telephonyStopTrackingCallStateChange.assert_called_once_with()
+        self.assertEqual(
+            [event['time'] for event in ad.ed.pop_all(EventCallStateChanged)],
+            [0])
+
+    def test_tracks_events_of_subscription(self):
+        ad = FakeDevice('1')
+        timer = ad.change_state_later(.1)
+        self.addCleanup(timer.cancel)
+
+        def is_phone_in_call_for_subscription(log, ad, sub_id):
+            return is_phone_in_call(log, ad)
+
+        self.assertTrue(
+            tel_wait_utils.wait_for_droids_in_state(
+                self.log, [ad], 30, is_phone_in_call_for_subscription,
+                sub_id=2, tracked_events=[tel_wait_utils.CALL_STATE]))
+
+        ad.droid.telephonyStartTrackingCallStateForSubscription.\
+            assert_called_once_with(2)
+        ad.droid.telephonyStopTrackingCallStateChangeForSubscription.\
+            assert_called_once_with(2)
+
+    def test_times_out_if_state_never_changes(self):
+        ad = FakeDevice('1')
+
+        start = time.time()
+        result = tel_wait_utils.wait_for_droids_in_state(
+            self.log, [ad], .3, is_phone_in_call)
+
+        self.assertFalse(result)
+        self.assertGreaterEqual(time.time() - start, .3)
+
+    def test_polls_with_backoff_without_events(self):
+        ad = FakeDevice('1')
+        timer = ad.change_state_later(1.2, send_event=False)
+        self.addCleanup(timer.cancel)
+
+        with mock.patch.object(tel_wait_utils, 'MIN_STATE_CHECK_INTERVAL',
+                               .1):
+            result = tel_wait_utils.wait_for_droids_in_state(
+                self.log, [ad], 30, is_phone_in_call, tracked_events=[])
+
+        self.assertTrue(result)
+        # Checks at 0, .1, .25, .475, .81, 1.32: fewer than at a fixed .1s.
+        self.assertLess(ad.checks, 8)
+        ad.droid.telephonyStartTrackingCallState.assert_not_called()
+
+    def test_falls_back_to_polling_if_tracking_fails(self):
+        ad = FakeDevice('1')
+        ad.droid.telephonyStartTrackingCallState.side_effect = Exception()
+        timer = ad.change_state_later(.2, send_event=False)
+        self.addCleanup(timer.cancel)
+
+        self.assertTrue(
+            tel_wait_utils.wait_for_droids_in_state(self.log, [ad], 30,
+                                                    is_phone_in_call))
+        ad.droid.telephonyStopTrackingCallStateChange.assert_not_called()
+
+    def test_waits_for_all_devices(self):
+        ads = [FakeDevice('1'), FakeDevice('2'), FakeDevice('3', True)]
+        for index, ad in enumerate(ads[:2]):
+            timer = ad.change_state_later(.1 * (2 - index))
+            self.addCleanup(timer.cancel)
+
+        start = time.time()
+        result = tel_wait_utils.wait_for_droids_in_state(
+            self.log, ads, 30, is_phone_in_call)
+
+        self.assertTrue(result)
+        self.assertLess(time.time() - start, 1)
+
+    def test_nested_waits_stop_tracking_once(self):
+        ad = FakeDevice('1')
+        inner_results = []
+
+        def is_in_state_after_inner_wait(log, ad):
+            # The outer wait tracks events after its first check.
+            if ad.checks and not inner_results:
+                timer = ad.change_state_later(.1)
+                self.addCleanup(timer.cancel)
+                inner_results.append(
+                    tel_wait_utils.wait_for_droids_in_state(
+                        log, [ad], 30, is_phone_in_call))
+                ad.droid.telephonyStopTrackingCallStateChange.\
+                    assert_not_called()
+            return is_phone_in_call(log, ad)
+
+        tel_wait_utils.wait_for_droids_in_state(
+            self.log, [ad],
+            30,
+            is_in_state_after_inner_wait,
+            tracked_events=[tel_wait_utils.CALL_STATE])
+
+        self.assertEqual(inner_results, [True])
+        ad.droid.telephonyStopTrackingCallStateChange.assert_called_once_with()
+
+    def test_concurrent_wait_times_each_device(self):
+        ads = [FakeDevice('1'), FakeDevice('2', True)]
+        timer = ads[0].change_state_later(.3)
+        self.addCleanup(timer.cancel)
+
+        result = tel_wait_utils.wait_for_droids_in_state_concurrently(
+            self.log, ads, 30, is_phone_in_call)
+
+        self.assertTrue(result)
+        self.assertGreaterEqual(result.ready_times['1'], .3)
+        self.assertLess(result.ready_times['1'], 1)
+        self.assertLess(result.ready_times['2'], .3)
+        # A device in the state is not checked again.
+        self.assertEqual(ads[1].checks, 1)
+
+    def test_concurrent_wait_reports_devices_not_in_state(self):
+        ads = [FakeDevice('1'), FakeDevice('2', True)]
+
+        result = tel_wait_utils.wait_for_droids_in_state_concurrently(
+            self.log, ads, .2, is_phone_in_call)
+
+        self.assertFalse(result)
+        self.assertEqual(result.not_ready, ['1'])
+        self.assertIsNone(result.ready_times['1'])
+
+    def test_concurrent_wait_raises_check_exceptions(self):
+        ads = [FakeDevice('1'), FakeDevice('2', True)]
+
+        def raises(log, ad):
+            if ad.serial == '1':
+                raise ValueError()
+            return True
+
+        with self.assertRaises(ValueError):
+            tel_wait_utils.wait_for_droids_in_state_concurrently(
+                self.log, ads, 30, raises)
+
+
+if __name__ == '__main__':
+    unittest.main()
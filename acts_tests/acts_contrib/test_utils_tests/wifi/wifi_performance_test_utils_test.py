@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+#
+#   Copyright 2021 - The Android Open Source Project
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import random
+import unittest
+
+import numpy
+
+from acts_contrib.test_utils.wifi import wifi_performance_test_utils as wputils
+
+PEAK_THROUGHPUT = 600
+CLIFF_THROUGHPUT = 150
+SLOPE_START = 30
+CLIFF = 72
+# Attenuation below the cliff under which a disconnected DUT reconnects
+HYSTERESIS = 10
+
+
+def simulated_throughput(atten, noise=0):
+    """A throughput vs attenuation model: flat, sloped, then a cliff."""
+    if atten < SLOPE_START:
+        throughput = PEAK_THROUGHPUT
+    elif atten < CLIFF:
+        throughput = PEAK_THROUGHPUT - (PEAK_THROUGHPUT - CLIFF_THROUGHPUT) * (
+            atten - SLOPE_START) / (CLIFF - SLOPE_START)
+    else:
+        return 0
+    return throughput * (1 + random.uniform(-noise, noise))
+
+
+class AdaptiveAttenuationSweepTest(unittest.TestCase):
+    """Tests wifi_performance_test_utils.AdaptiveAttenuationSweep."""
+
+    def setUp(self):
+        random.seed(0)
+        self.measured = []
+
+    def measure(self, atten, noise=0):
+        self.measured.append(atten)
+        return {'throughput': simulated_throughput(atten, noise)}
+
+    def assert_curve_within(self, sweep, tolerance):
+        attenuation = list(sweep.results) + sweep.floor_range
+        throughput = [result['throughput'] for result in sweep.results.values()
+                      ] + [0] * len(sweep.floor_range)
+        self.assertEqual(attenuation, sorted(attenuation))
+        interpolated = numpy.interp(sweep.atten_range, attenuation,
+                                    throughput)
+        for atten, curr_throughput in zip(sweep.atten_range, interpolated):
+            self.assertLessEqual(
+                abs(curr_throughput - simulated_throughput(atten)), tolerance)
+
+    def test_halves_measurements_of_curve(self):
+        sweep = wputils.AdaptiveAttenuationSweep(range(0, 95, 2))
+
+        sweep.run(self.measure)
+
+        self.assertLessEqual(len(self.measured),
+                             len(sweep.atten_range) / 2 + 2)
+        self.assertEqual(len(set(self.measured)), len(self.measured))
+        self.assert_curve_within(sweep, PEAK_THROUGHPUT * 0.05)
+
+    def test_tolerates_measurement_noise(self):
+        sweep = wputils.AdaptiveAttenuationSweep(range(0, 95))
+
+        sweep.run(lambda atten: self.measure(atten, noise=0.03))
+
+        self.assertLess(len(self.measured), len(sweep.atten_range) / 2)
+        self.assert_curve_within(sweep, PEAK_THROUGHPUT * 0.1)
+
+    def test_measures_every_point_of_cliff(self):
+        sweep = wputils.AdaptiveAttenuationSweep(range(0, 95))
+
+        sweep.run(self.measure)
+
+        self.assertIn(CLIFF - 1, sweep.results)
+        self.assertIn(CLIFF, sweep.results)
+
+    def test_stops_at_throughput_floor(self):
+        sweep = wputils.AdaptiveAttenuationSweep(range(0, 95),
+                                                 coarse_step=4,
+                                                 max_consecutive_floor=2)
+
+        sweep.run(self.measure)
+
+        self.assertLessEqual(max(self.measured), CLIFF + 8)
+        self.assertEqual(sweep.floor_range,
+                         list(range(max(self.measured) + 1, 95)))
+
+    def test_uses_floor_function(self):
+        sweep = wputils.AdaptiveAttenuationSweep(
+            range(0, 95),
+            is_floor=lambda result: result['throughput'] < 300)
+
+        sweep.run(self.measure)
+
+        self.assertLess(max(self.measured), CLIFF)
+
+    def test_measures_every_point_if_curve_is_steep(self):
+        sweep = wputils.AdaptiveAttenuationSweep(range(SLOPE_START, CLIFF),
+                                                 coarse_step=4,
+                                                 abs_tolerance=1,
+                                                 pct_tolerance=0)
+
+        sweep.run(self.measure)
+
+        self.assertEqual(list(sweep.results), sweep.atten_range)
+
+    def test_refines_intervals_before_next_coarse_point(self):
+        sweep = wputils.AdaptiveAttenuationSweep(range(0, 95), coarse_step=4)
+
+        sweep.run(self.measure)
+
+        for idx, atten in enumerate(self.measured[1:], 1):
+            self.assertLess(max(self.measured[:idx]) - atten, 4)
+
+    def test_restores_dut_before_lower_attenuations(self):
+        connected = [True]
+        restored = []
+
+        def measure_with_hysteresis(atten):
+            if atten >= CLIFF:
+                connected[0] = False
+            elif atten < CLIFF - HYSTERESIS:
+                connected[0] = True
+            if not connected[0]:
+                self.measured.append(atten)
+                return {'throughput': 0}
+            return self.measure(atten)
+
+        def restore(atten):
+            restored.append((max(self.measured), atten))
+            connected[0] = True
+
+        sweep = wputils.AdaptiveAttenuationSweep(range(0, 95))
+
+        sweep.run(measure_with_hysteresis, restore)
+
+        self.assertTrue(restored)
+        for highest_atten, atten in restored:
+            self.assertLess(atten, highest_atten)
+        self.assertIn(CLIFF - 1, sweep.results)
+        self.assert_curve_within(sweep, PEAK_THROUGHPUT * 0.05)
+
+    def test_empty_range(self):
+        sweep = wputils.AdaptiveAttenuationSweep([])
+
+        self.assertEqual(sweep.run(self.measure), {})
+        self.assertEqual(self.measured, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -24,6 +24,7 @@ import time
 from acts import asserts
 from acts import base_test
 from acts import utils
+from acts.controllers import attenuator
 from acts.controllers import iperf_server as ipf
 from acts.controllers.utils_lib import ssh
 from acts.metrics.loggers.blackbox import BlackboxMappedMetricLogger
@@ -346,12 +347,131 @@ class WifiRvrTest(base_test.BaseTestClass):
         self.plot_rvr_result(rvr_result)
         self.compute_test_metrics(rvr_result)
 
+    def measure_rvr_point(self, testcase_params, llstats_obj, atten):
+        """Measures throughput, RSSI and link layer stats at an attenuation.
+
+        Args:
+            testcase_params: dict containing test-specific parameters
+            llstats_obj: LinkLayerStats object of the monitored DUT
+            atten: attenuation to set on all attenuators
+        Returns:
+            rvr_point: dict containing throughput, rssi and llstats
+        """
+        for dev in self.android_devices:
+            if not wputils.health_check(dev, 5, 50):
+                asserts.skip('DUT health check failed. Skipping test.')
+        # Set Attenuation
+        attenuator.set_attens(self.attenuators,
+                              atten,
+                              strict=False,
+                              skip_unchanged=True)
+        # Refresh link layer stats
+        llstats_obj.update_stats()
+        # Setup sniffer
+        if self.testbed_params['sniffer_enable']:
+            self.sniffer.start_capture(
+                network=testcase_params['test_network'],
+                chan=int(testcase_params['channel']),
+                bw=testcase_params['bandwidth'],
+                duration=self.testclass_params['iperf_duration'] / 5)
+        # Start iperf session
+        if self.testclass_params.get('monitor_rssi', 1):
+            rssi_future = wputils.get_connected_rssi_nb(
+                self.monitored_dut,
+                self.testclass_params['iperf_duration'] - 1,
+                1,
+                1,
+                interface=self.monitored_interface)
+        self.iperf_server.start(tag=str(atten))
+        client_output_path = self.iperf_client.start(
+            testcase_params['iperf_server_address'],
+            testcase_params['iperf_args'], str(atten),
+            self.testclass_params['iperf_duration'] + self.TEST_TIMEOUT)
+        server_output_path = self.iperf_server.stop()
+        if self.testclass_params.get('monitor_rssi', 1):
+            rssi_result = rssi_future.result()
+            current_rssi = {
+                'signal_poll_rssi': rssi_result['signal_poll_rssi']['mean'],
+                'chain_0_rssi': rssi_result['chain_0_rssi']['mean'],
+                'chain_1_rssi': rssi_result['chain_1_rssi']['mean']
+            }
+        else:
+            current_rssi = {
+                'signal_poll_rssi': float('nan'),
+                'chain_0_rssi': float('nan'),
+                'chain_1_rssi': float('nan')
+            }
+        # Stop sniffer
+        if self.testbed_params['sniffer_enable']:
+            self.sniffer.stop_capture(tag=str(atten))
+        # Parse and log result
+        if testcase_params['use_client_output']:
+            iperf_file = client_output_path
+        else:
+            iperf_file = server_output_path
+        try:
+            iperf_result = ipf.IPerfResult(iperf_file)
+            curr_throughput = numpy.mean(iperf_result.instantaneous_rates[
+                self.testclass_params['iperf_ignored_interval']:-1]) * 8 * (
+                    1.024**2)
+        except:
+            self.log.warning(
+                'ValueError: Cannot get iperf result. Setting to 0')
+            curr_throughput = 0
+        llstats_obj.update_stats()
+        curr_llstats = llstats_obj.llstats_incremental.copy()
+        self.log.info(('Throughput at {0:.2f} dB is {1:.2f} Mbps. '
+                       'RSSI = {2:.2f} [{3:.2f}, {4:.2f}].').format(
+                           atten, curr_throughput,
+                           current_rssi['signal_poll_rssi'],
+                           current_rssi['chain_0_rssi'],
+                           current_rssi['chain_1_rssi']))
+        return {
+            'throughput': curr_throughput,
+            'rssi': current_rssi,
+            'llstats': curr_llstats
+        }
+
+    @staticmethod
+    def is_throughput_floor(rvr_point):
+        """Returns True if no throughput is expected beyond an RvR point."""
+        return rvr_point['throughput'] == 0 and (
+            rvr_point['rssi']['signal_poll_rssi'] < -80
+            or numpy.isnan(rvr_point['rssi']['signal_poll_rssi']))
+
+    def restore_rvr_connection(self, testcase_params, atten):
+        """Reconnects the DUT if it disconnected before measuring at atten.
+
+        Called by the adaptive sweep before it goes back to a lower
+        attenuation. A DUT that disconnected at a higher attenuation may not
+        reconnect on its own at atten, so it is reconnected at 0 dB.
+
+        Args:
+            testcase_params: dict containing test-specific parameters
+            atten: attenuation about to be measured
+        """
+        if 'test_network' not in testcase_params:
+            return
+        ssid = testcase_params['test_network']['SSID']
+        if wputils.validate_network(self.sta_dut, ssid):
+            return
+        self.log.info(
+            'DUT disconnected. Reconnecting before measuring at {} dB.'.format(
+                atten))
+        attenuator.set_attens(self.attenuators, 0, strict=False)
+        wutils.wifi_connect(self.sta_dut,
+                            testcase_params['test_network'],
+                            num_of_tries=5,
+                            check_connectivity=False)
+
     def run_rvr_test(self, testcase_params):
         """Test function to run RvR.
 
         The function runs an RvR test in the current device/AP configuration.
         Function is called from another wrapper function that sets up the
-        testbed for the RvR test
+        testbed for the RvR test. If the adaptive_sweep test param is set,
+        throughput is only measured at the attenuations chosen by an
+        AdaptiveAttenuationSweep rather than at every point of atten_range.
 
         Args:
             testcase_params: dict containing test-specific parameters
@@ -363,97 +483,54 @@ class WifiRvrTest(base_test.BaseTestClass):
         llstats_obj = wputils.LinkLayerStats(
             self.monitored_dut,
             self.testclass_params.get('monitor_llstats', 1))
-        zero_counter = 0
-        throughput = []
-        llstats = []
-        rssi = []
-        for atten in testcase_params['atten_range']:
-            for dev in self.android_devices:
-                if not wputils.health_check(dev, 5, 50):
-                    asserts.skip('DUT health check failed. Skipping test.')
-            # Set Attenuation
-            for attenuator in self.attenuators:
-                attenuator.set_atten(atten, strict=False)
-            # Refresh link layer stats
-            llstats_obj.update_stats()
-            # Setup sniffer
-            if self.testbed_params['sniffer_enable']:
-                self.sniffer.start_capture(
-                    network=testcase_params['test_network'],
-                    chan=int(testcase_params['channel']),
-                    bw=testcase_params['bandwidth'],
-                    duration=self.testclass_params['iperf_duration'] / 5)
-            # Start iperf session
-            if self.testclass_params.get('monitor_rssi', 1):
-                rssi_future = wputils.get_connected_rssi_nb(
-                    self.monitored_dut,
-                    self.testclass_params['iperf_duration'] - 1,
-                    1,
-                    1,
-                    interface=self.monitored_interface)
-            self.iperf_server.start(tag=str(atten))
-            client_output_path = self.iperf_client.start(
-                testcase_params['iperf_server_address'],
-                testcase_params['iperf_args'], str(atten),
-                self.testclass_params['iperf_duration'] + self.TEST_TIMEOUT)
-            server_output_path = self.iperf_server.stop()
-            if self.testclass_params.get('monitor_rssi', 1):
-                rssi_result = rssi_future.result()
-                current_rssi = {
-                    'signal_poll_rssi':
-                    rssi_result['signal_poll_rssi']['mean'],
-                    'chain_0_rssi': rssi_result['chain_0_rssi']['mean'],
-                    'chain_1_rssi': rssi_result['chain_1_rssi']['mean']
-                }
-            else:
-                current_rssi = {
-                    'signal_poll_rssi': float('nan'),
-                    'chain_0_rssi': float('nan'),
-                    'chain_1_rssi': float('nan')
-                }
-            rssi.append(current_rssi)
-            # Stop sniffer
-            if self.testbed_params['sniffer_enable']:
-                self.sniffer.stop_capture(tag=str(atten))
-            # Parse and log result
-            if testcase_params['use_client_output']:
-                iperf_file = client_output_path
-            else:
-                iperf_file = server_output_path
-            try:
-                iperf_result = ipf.IPerfResult(iperf_file)
-                curr_throughput = numpy.mean(iperf_result.instantaneous_rates[
-                    self.testclass_params['iperf_ignored_interval']:-1]
-                                             ) * 8 * (1.024**2)
-            except:
-                self.log.warning(
-                    'ValueError: Cannot get iperf result. Setting to 0')
-                curr_throughput = 0
-            throughput.append(curr_throughput)
-            llstats_obj.update_stats()
-            curr_llstats = llstats_obj.llstats_incremental.copy()
-            llstats.append(curr_llstats)
-            self.log.info(
-                ('Throughput at {0:.2f} dB is {1:.2f} Mbps. '
-                 'RSSI = {2:.2f} [{3:.2f}, {4:.2f}].').format(
-                     atten, curr_throughput, current_rssi['signal_poll_rssi'],
-                     current_rssi['chain_0_rssi'],
-                     current_rssi['chain_1_rssi']))
-            if curr_throughput == 0 and (
-                    current_rssi['signal_poll_rssi'] < -80
-                    or numpy.isnan(current_rssi['signal_poll_rssi'])):
-                zero_counter = zero_counter + 1
-            else:
-                zero_counter = 0
-            if zero_counter == self.MAX_CONSECUTIVE_ZEROS:
-                self.log.info(
-                    'Throughput stable at 0 Mbps. Stopping test now.')
-                throughput.extend(
-                    [0] *
-                    (len(testcase_params['atten_range']) - len(throughput)))
-                break
-        for attenuator in self.attenuators:
-            attenuator.set_atten(0, strict=False)
+        measure = partial(self.measure_rvr_point, testcase_params,
+                          llstats_obj)
+        if self.testclass_params.get('adaptive_sweep', 0):
+            sweep = wputils.AdaptiveAttenuationSweep(
+                testcase_params['atten_range'],
+                coarse_step=self.testclass_params.get(
+                    'adaptive_sweep_coarse_step', 4),
+                abs_tolerance=self.testclass_params.get(
+                    'adaptive_sweep_abs_tolerance', 5),
+                pct_tolerance=self.testclass_params.get(
+                    'adaptive_sweep_pct_tolerance', 5),
+                max_consecutive_floor=self.testclass_params.get(
+                    'adaptive_sweep_consecutive_zeros', 2),
+                is_floor=self.is_throughput_floor)
+            rvr_points = sweep.run(
+                measure, partial(self.restore_rvr_connection, testcase_params))
+            self.log.info('Measured {} of {} attenuation points.'.format(
+                len(rvr_points), len(sweep.atten_range)))
+            attenuation = list(rvr_points) + sweep.floor_range
+            throughput = [
+                rvr_point['throughput'] for rvr_point in rvr_points.values()
+            ] + [0] * len(sweep.floor_range)
+            rssi = [rvr_point['rssi'] for rvr_point in rvr_points.values()]
+            llstats = [
+                rvr_point['llstats'] for rvr_point in rvr_points.values()
+            ]
+        else:
+            attenuation = list(testcase_params['atten_range'])
+            zero_counter = 0
+            throughput = []
+            llstats = []
+            rssi = []
+            for atten in testcase_params['atten_range']:
+                rvr_point = measure(atten)
+                throughput.append(rvr_point['throughput'])
+                rssi.append(rvr_point['rssi'])
+                llstats.append(rvr_point['llstats'])
+                if self.is_throughput_floor(rvr_point):
+                    zero_counter = zero_counter + 1
+                else:
+                    zero_counter = 0
+                if zero_counter == self.MAX_CONSECUTIVE_ZEROS:
+                    self.log.info(
+                        'Throughput stable at 0 Mbps. Stopping test now.')
+                    throughput.extend([0] * (len(attenuation) -
+                                             len(throughput)))
+                    break
+        attenuator.set_attens(self.attenuators, 0, strict=False)
         # Compile test result and meta data
         rvr_result = collections.OrderedDict()
         rvr_result['test_name'] = self.current_test_name
@@ -461,7 +538,7 @@ class WifiRvrTest(base_test.BaseTestClass):
         rvr_result['ap_settings'] = self.access_point.ap_settings.copy()
         rvr_result['fixed_attenuation'] = self.testbed_params[
             'fixed_attenuation'][str(testcase_params['channel'])]
-        rvr_result['attenuation'] = list(testcase_params['atten_range'])
+        rvr_result['attenuation'] = attenuation
         rvr_result['total_attenuation'] = [
             att + rvr_result['fixed_attenuation']
             for att in rvr_result['attenuation']
@@ -539,8 +616,7 @@ class WifiRvrTest(base_test.BaseTestClass):
         # Configure AP
         self.setup_ap(testcase_params)
         # Set attenuator to 0 dB
-        for attenuator in self.attenuators:
-            attenuator.set_atten(0, strict=False)
+        attenuator.set_attens(self.attenuators, 0, strict=False)
         # Reset, configure, and connect DUT
         self.setup_dut(testcase_params)
         # Wait before running the first wifi test